@@ -11,107 +11,51 @@
 from six.moves import xrange
 
 from pysmt.shortcuts import Symbol, Not, Equals, And, Times, Int, Plus, LE
-from pysmt.shortcuts import is_sat, is_unsat
+from pysmt.shortcuts import is_unsat
 from pysmt.typing import INT
+from pysmt.bmc import TransitionSystem, BMCUnroller
 
 
-def next_var(v):
-    """Returns the 'next' of the given variable"""
-    return Symbol("next(%s)" % v.symbol_name(), v.symbol_type())
-
-def at_time(v, t):
-    """Builds an SMT variable representing v at time t"""
-    return Symbol("%s@%d" % (v.symbol_name(), t), v.symbol_type())
-
-
-class TransitionSystem(object):
-    """Trivial representation of a Transition System."""
-
-    def __init__(self, variables, init, trans):
-        self.variables = variables
-        self.init = init
-        self.trans = trans
-
-# EOC TransitionSystem
-
-
-
-def get_subs(system, i):
-    """Builds a map from x to x@i and from x' to x@(i+1), for all x in system."""
-    subs_i = {}
-    for v in system.variables:
-        subs_i[v] = at_time(v, i)
-        subs_i[next_var(v)] = at_time(v, i+1)
-    return subs_i
-
-
-def get_unrolling(system, k):
-    """Unrolling of the transition relation from 0 to k:
-
-    E.g. T(0,1) & T(1,2) & ... & T(k-1,k)
-    """
-    res = []
-    for i in xrange(k):
-        subs_i = get_subs(system, i)
-        res.append(system.trans.substitute(subs_i))
-    return And(res)
-
-
-def get_simple_path(system, k):
+def get_simple_path(system, unroller, k):
     """Simple path constraint for k-induction:
     each time encodes a different state
     """
     res = []
     for i in xrange(k):
-        subs_i = get_subs(system, i)
         for j in xrange(i+1, k):
-            subs_j = get_subs(system, j)
             for v in system.variables:
-                v_i = v.substitute(subs_i)
-                v_j = v.substitute(subs_j)
+                v_i = unroller.get_symbol(v, i)
+                v_j = unroller.get_symbol(v, j)
                 res.append(Not(Equals(v_i, v_j)))
     return And(res)
 
 
-def get_k_hypothesis(system, prop, k):
-    """Hypothesis for k-induction: each state up to k fulfills the property"""
-    res = []
-    for i in xrange(k):
-        subs_i = get_subs(system, i)
-        res.append(prop.substitute(subs_i))
-    return And(res)
-
-
-def get_bmc(system, prop, k):
-    """Returns the BMC encoding at step k"""
-    init_0 = system.init.substitute(get_subs(system, 0))
-    prop_k = prop.substitute(get_subs(system, k))
-    return And(get_unrolling(system, k), init_0, Not(prop_k))
-
-def get_k_induction(system, prop, k):
+def get_k_induction(system, unroller, prop, k):
     """Returns the K-Induction encoding at step K"""
-    subs_k = get_subs(system, k)
-    prop_k = prop.substitute(subs_k)
-    return And(get_unrolling(system, k),
-               get_k_hypothesis(system, prop, k),
-               get_simple_path(system, k),
-               Not(prop_k))
+    return And(And([unroller.at_time(system.trans, i) for i in xrange(k)]),
+               And([unroller.at_time(prop, i) for i in xrange(k)]),
+               get_simple_path(system, unroller, k),
+               Not(unroller.at_time(prop, k)))
+
 
 def check_property(system, prop):
     """Interleaves BMC and K-Ind to verify the property."""
     print("Checking property %s..." % prop)
-    for b in xrange(100):
-        f = get_bmc(system, prop, b)
-        print("   [BMC]    Checking bound %d..." % (b+1))
-        if is_sat(f):
-            print("--> Bug found at step %d" % (b+1))
-            return
-
-        f = get_k_induction(system, prop, b)
-        print("   [K-IND]  Checking bound %d..." % (b+1))
-        if is_unsat(f):
-            print("--> The system is safe!")
-            return
+    # The BMC unrolling is kept in an incremental solver, and the
+    # time-shifted copies of the formulae are shared with k-induction
+    with BMCUnroller(system) as bmc:
+        unroller = bmc.unroller
+        for b in xrange(100):
+            print("   [BMC]    Checking bound %d..." % (b+1))
+            if bmc.check_bound(prop, b):
+                print("--> Bug found at step %d" % (b+1))
+                return
+
+            f = get_k_induction(system, unroller, prop, b)
+            print("   [K-IND]  Checking bound %d..." % (b+1))
+            if is_unsat(f):
+                print("--> The system is safe!")
+                return
 
 
 def main():
@@ -126,7 +70,7 @@ def main():
     # TRANS: next(y) = y + 2;
 
     x, y = [Symbol(s, INT) for s in "xy"]
-    nx, ny = [next_var(Symbol(s, INT)) for s in "xy"]
+    nx, ny = [Symbol("next(%s)" % s, INT) for s in "xy"]
 
     example = TransitionSystem(variables = [x, y],
                init = And(Equals(x, Int(1)),
@@ -0,0 +1,585 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""And-Inverter Graphs (AIGs).
+
+An AIG is stored in arrays indexed by variable. As in the AIGER
+format, the literal of a variable v is 2*v, and its negation is
+2*v+1. Variable 0 is the constant FALSE, thus literal 0 is FALSE and
+literal 1 is TRUE.
+
+AND gates are created through :py:meth:`AIG.And`, that performs
+constant propagation, local two-level minimization and structural
+hashing. :py:class:`AIGEncoder` converts Boolean FNodes into AIG
+literals. AIGs can be written and read in the ASCII (aag) and binary
+(aig) AIGER formats.
+"""
+
+from array import array
+
+from six.moves import xrange
+
+from pysmt.walkers import DagWalker
+from pysmt.exceptions import ConvertExpressionError
+
+
+class AIG(object):
+    """An array-backed And-Inverter Graph."""
+
+    FALSE = 0
+    TRUE = 1
+
+    _CONSTANT, _INPUT, _LATCH, _AND = range(4)
+
+    def __init__(self):
+        self._kind = bytearray([AIG._CONSTANT])
+        self._fanin0 = array('i', [0])
+        self._fanin1 = array('i', [0])
+        self._strash = {}
+        self._names = {}
+
+        self.inputs = []
+        self.latches = []
+        self.outputs = []
+        self._latch_next = {}
+        self._latch_init = {}
+        self._output_names = {}
+
+    @property
+    def num_vars(self):
+        """The largest variable index."""
+        return len(self._kind) - 1
+
+    @property
+    def num_ands(self):
+        return len(self._strash)
+
+    def _new_var(self, kind, fanin0=0, fanin1=0):
+        self._kind.append(kind)
+        self._fanin0.append(fanin0)
+        self._fanin1.append(fanin1)
+        return 2 * (len(self._kind) - 1)
+
+    def new_input(self, name=None):
+        """Returns the literal of a new primary input."""
+        lit = self._new_var(AIG._INPUT)
+        self.inputs.append(lit >> 1)
+        if name is not None:
+            self._names[lit >> 1] = name
+        return lit
+
+    def new_latch(self, name=None, init=0):
+        """Returns the literal of a new latch.
+
+        init is the reset value: 0, 1 or None (uninitialized). The
+        next-state function is given with :py:meth:`set_next`.
+        """
+        lit = self._new_var(AIG._LATCH)
+        var = lit >> 1
+        self.latches.append(var)
+        self._latch_next[var] = AIG.FALSE
+        self._latch_init[var] = init
+        if name is not None:
+            self._names[var] = name
+        return lit
+
+    def set_next(self, latch, next_lit):
+        """Sets the next-state function of the given latch literal."""
+        assert self.is_latch(latch)
+        self._latch_next[latch >> 1] = next_lit
+
+    def get_next(self, latch):
+        return self._latch_next[latch >> 1]
+
+    def get_init(self, latch):
+        return self._latch_init[latch >> 1]
+
+    def add_output(self, lit, name=None):
+        """Adds lit to the outputs and returns its index."""
+        self.outputs.append(lit)
+        if name is not None:
+            self._output_names[len(self.outputs) - 1] = name
+        return len(self.outputs) - 1
+
+    def get_name(self, lit):
+        """Returns the name of the input or latch of lit (if any)."""
+        return self._names.get(lit >> 1)
+
+    def get_output_name(self, idx):
+        return self._output_names.get(idx)
+
+    def is_constant(self, lit):
+        return lit < 2
+
+    def is_input(self, lit):
+        return self._kind[lit >> 1] == AIG._INPUT
+
+    def is_latch(self, lit):
+        return self._kind[lit >> 1] == AIG._LATCH
+
+    def is_and(self, lit):
+        return self._kind[lit >> 1] == AIG._AND
+
+    def fanins(self, lit):
+        """Returns the two fanins of the AND gate of lit.
+
+        The sign of lit is ignored.
+        """
+        var = lit >> 1
+        assert self._kind[var] == AIG._AND
+        return self._fanin0[var], self._fanin1[var]
+
+    @staticmethod
+    def Not(lit):
+        return lit ^ 1
+
+    def And(self, a, b):
+        """Returns the literal of the conjunction of a and b.
+
+        Constants are propagated, and the optimization rules of level
+        1 and 2 (and the asymmetric substitution rule of level 3) of
+        Brummayer and Biere, "Local Two-Level And-Inverter Graph
+        Minimization without Blowup", are applied before looking up
+        the structural hash.
+        """
+        while True:
+            if a > b:
+                a, b = b, a
+            # Level 1: neutrality, boundedness, idempotence, contradiction
+            if a == AIG.FALSE:
+                return AIG.FALSE
+            if a == AIG.TRUE or a == b:
+                return b
+            if a == b ^ 1:
+                return AIG.FALSE
+
+            kind_a = self._kind[a >> 1]
+            kind_b = self._kind[b >> 1]
+            subst = None
+            for p, kind_p, q in ((a, kind_a, b), (b, kind_b, a)):
+                if kind_p != AIG._AND:
+                    continue
+                x, y = self._fanin0[p >> 1], self._fanin1[p >> 1]
+                if p & 1 == 0:
+                    # Level 2: contradiction and idempotence (asymmetric)
+                    if q == x ^ 1 or q == y ^ 1:
+                        return AIG.FALSE
+                    if q == x or q == y:
+                        return p
+                else:
+                    # Level 2: subsumption (asymmetric)
+                    if q == x ^ 1 or q == y ^ 1:
+                        return q
+                    # Level 3: substitution (asymmetric)
+                    if q == x:
+                        subst = (q, y ^ 1)
+                        break
+                    if q == y:
+                        subst = (q, x ^ 1)
+                        break
+            if subst is not None:
+                a, b = subst
+                continue
+
+            if kind_a == AIG._AND and kind_b == AIG._AND and \
+               a & 1 == 0 and b & 1 == 0:
+                fa = (self._fanin0[a >> 1], self._fanin1[a >> 1])
+                fb = (self._fanin0[b >> 1], self._fanin1[b >> 1])
+                # Level 2: contradiction (symmetric)
+                if any(x == y ^ 1 for x in fa for y in fb):
+                    return AIG.FALSE
+            break
+
+        key = (a, b)
+        res = self._strash.get(key)
+        if res is None:
+            res = self._new_var(AIG._AND, b, a)
+            self._strash[key] = res
+        return res
+
+    def Or(self, a, b):
+        return self.And(a ^ 1, b ^ 1) ^ 1
+
+    def Implies(self, a, b):
+        return self.And(a, b ^ 1) ^ 1
+
+    def Iff(self, a, b):
+        return self.And(self.Implies(a, b), self.Implies(b, a))
+
+    def Xor(self, a, b):
+        return self.Iff(a, b) ^ 1
+
+    def Ite(self, c, t, e):
+        if t == e:
+            return t
+        return self.And(self.Implies(c, t), self.Implies(c ^ 1, e))
+
+    def And_n(self, lits):
+        """Returns the conjunction of lits, as a balanced tree."""
+        lits = list(lits)
+        if not lits:
+            return AIG.TRUE
+        while len(lits) > 1:
+            nxt = [self.And(lits[i], lits[i + 1])
+                   for i in xrange(0, len(lits) - 1, 2)]
+            if len(lits) % 2 == 1:
+                nxt.append(lits[-1])
+            lits = nxt
+        return lits[0]
+
+    def Or_n(self, lits):
+        return self.And_n(l ^ 1 for l in lits) ^ 1
+
+    def cone(self, lits):
+        """Returns the AND variables in the cone of lits, in
+        topological order."""
+        kind = self._kind
+        seen = set()
+        res = []
+        stack = [(l >> 1, False) for l in lits]
+        while stack:
+            var, expanded = stack.pop()
+            if kind[var] != AIG._AND:
+                continue
+            if expanded:
+                res.append(var)
+            elif var not in seen:
+                seen.add(var)
+                stack.append((var, True))
+                for f in (self._fanin0[var], self._fanin1[var]):
+                    if (f >> 1) not in seen:
+                        stack.append((f >> 1, False))
+        return res
+
+    def to_formula(self, lit, environment=None, symbols=None):
+        """Returns an FNode equivalent to lit.
+
+        Inputs and latches are mapped using the dictionary symbols
+        (from variables to FNodes), or to Boolean symbols named after
+        them.
+        """
+        if environment is None:
+            import pysmt.environment
+            environment = pysmt.environment.get_env()
+        mgr = environment.formula_manager
+        memo = {0: mgr.FALSE()}
+
+        def node(l):
+            res = memo[l >> 1]
+            return mgr.Not(res) if l & 1 else res
+
+        for var in self.inputs + self.latches:
+            if symbols is not None and var in symbols:
+                memo[var] = symbols[var]
+            else:
+                memo[var] = mgr.Symbol(self._names.get(var, "aig_%d" % var))
+        for var in self.cone([lit]):
+            memo[var] = mgr.And(node(self._fanin0[var]),
+                                node(self._fanin1[var]))
+        return node(lit)
+
+    def write_aiger(self, stream, binary=True):
+        """Writes the AIG in AIGER format on the given binary stream.
+
+        Only the AND gates in the cone of the outputs and of the latch
+        next-state functions are written. Variables are renumbered as
+        required by the format.
+        """
+        roots = self.outputs + [self._latch_next[v] for v in self.latches]
+        ands = self.cone(roots)
+        var_map = {0: 0}
+        for var in self.inputs + self.latches + ands:
+            var_map[var] = len(var_map)
+
+        def lit(l):
+            return 2 * var_map[l >> 1] + (l & 1)
+
+        out = bytearray()
+        out += ("%s %d %d %d %d %d\n" %
+                ("aig" if binary else "aag", len(var_map) - 1,
+                 len(self.inputs), len(self.latches),
+                 len(self.outputs), len(ands))).encode("ascii")
+        if not binary:
+            out += "".join("%d\n" % lit(2 * v)
+                           for v in self.inputs).encode("ascii")
+        for var in self.latches:
+            init = self._latch_init[var]
+            if init is None:
+                init = lit(2 * var)
+            line = "%d\n" % lit(self._latch_next[var])
+            if init != 0:
+                line = "%d %d\n" % (lit(self._latch_next[var]), init)
+            if not binary:
+                line = "%d %s" % (lit(2 * var), line)
+            out += line.encode("ascii")
+        out += "".join("%d\n" % lit(o) for o in self.outputs).encode("ascii")
+
+        for var in ands:
+            lhs = 2 * var_map[var]
+            rhs0, rhs1 = lit(self._fanin0[var]), lit(self._fanin1[var])
+            if rhs0 < rhs1:
+                rhs0, rhs1 = rhs1, rhs0
+            if binary:
+                _encode_delta(out, lhs - rhs0)
+                _encode_delta(out, rhs0 - rhs1)
+            else:
+                out += ("%d %d %d\n" % (lhs, rhs0, rhs1)).encode("ascii")
+
+        symbols = []
+        for i, var in enumerate(self.inputs):
+            if var in self._names:
+                symbols.append("i%d %s\n" % (i, self._names[var]))
+        for i, var in enumerate(self.latches):
+            if var in self._names:
+                symbols.append("l%d %s\n" % (i, self._names[var]))
+        for i in sorted(self._output_names):
+            symbols.append("o%d %s\n" % (i, self._output_names[i]))
+        out += "".join(symbols).encode("utf-8")
+        stream.write(bytes(out))
+
+    @staticmethod
+    def read_aiger(source):
+        """Reads an AIG in ASCII or binary AIGER format.
+
+        source is either a binary stream or a bytes object. The gates
+        are rebuilt through :py:meth:`And`, thus the resulting AIG
+        can be smaller than the one that was written. Raises
+        SyntaxError on malformed input.
+        """
+        data = source.read() if hasattr(source, "read") else bytes(source)
+        reader = _AigerReader(data)
+        return reader.read()
+
+    def __str__(self):
+        return "AIG(inputs=%d, latches=%d, outputs=%d, ands=%d)" % \
+            (len(self.inputs), len(self.latches), len(self.outputs),
+             self.num_ands)
+
+
+def _encode_delta(out, x):
+    while x & ~0x7f:
+        out.append((x & 0x7f) | 0x80)
+        x >>= 7
+    out.append(x)
+
+
+class _AigerReader(object):
+    """Parser for the AIGER format."""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def line(self):
+        end = self.data.find(b"\n", self.pos)
+        if end < 0:
+            end = len(self.data)
+        res = self.data[self.pos:end]
+        self.pos = end + 1
+        return res.decode("utf-8")
+
+    def ints(self, count):
+        if not isinstance(count, tuple):
+            count = (count,)
+        try:
+            res = [int(t) for t in self.line().split()]
+        except ValueError:
+            res = None
+        if res is None or len(res) not in count:
+            raise SyntaxError("Expected %s integers" %
+                              " or ".join(str(c) for c in count))
+        return res
+
+    def delta(self):
+        x, shift = 0, 0
+        while True:
+            if self.pos >= len(self.data):
+                raise SyntaxError("Unexpected end of binary AIGER data")
+            ch = self.data[self.pos]
+            if not isinstance(ch, int):
+                ch = ord(ch)
+            self.pos += 1
+            x |= (ch & 0x7f) << shift
+            if not ch & 0x80:
+                return x
+            shift += 7
+
+    def read(self):
+        header = self.line().split()
+        if len(header) < 6 or header[0] not in ("aag", "aig"):
+            raise SyntaxError("Invalid AIGER header")
+        binary = header[0] == "aig"
+        try:
+            counts = [int(t) for t in header[1:]]
+        except ValueError:
+            raise SyntaxError("Invalid AIGER header")
+        if any(counts[5:]):
+            raise SyntaxError("Bad state, constraint, justice and fairness "
+                              "sections are not supported")
+        m, i, l, o, a = counts[:5]
+
+        aig = AIG()
+        lit_map = {0: AIG.FALSE}
+        if binary:
+            input_lits = [2 * (k + 1) for k in xrange(i)]
+        else:
+            input_lits = [self.ints(1)[0] for _ in xrange(i)]
+        latch_lines = []
+        for k in xrange(l):
+            values = self.ints((1, 2) if binary else (2, 3))
+            if binary:
+                values = [2 * (i + k + 1)] + values
+            latch_lines.append(values)
+        outputs = [self.ints(1)[0] for _ in xrange(o)]
+
+        for lit in input_lits:
+            lit_map[lit >> 1] = aig.new_input()
+        latch_lits = []
+        for values in latch_lines:
+            init = values[2] if len(values) == 3 else 0
+            if init not in (0, 1):
+                init = None
+            latch_lits.append(aig.new_latch(init=init))
+            lit_map[values[0] >> 1] = latch_lits[-1]
+
+        gates = {}
+        for k in xrange(a):
+            if binary:
+                lhs = 2 * (i + l + k + 1)
+                rhs0 = lhs - self.delta()
+                rhs1 = rhs0 - self.delta()
+            else:
+                lhs, rhs0, rhs1 = self.ints(3)
+            gates[lhs >> 1] = (rhs0, rhs1)
+        if max([m] + [v >> 1 for v in outputs]) > m:
+            raise SyntaxError("Literal exceeds the maximum variable index")
+
+        def lit(l):
+            var = l >> 1
+            if var not in lit_map:
+                # Build the cone of var, in topological order
+                stack = [var]
+                while stack:
+                    cur = stack[-1]
+                    if cur in lit_map:
+                        stack.pop()
+                        continue
+                    if cur not in gates:
+                        raise SyntaxError("Undefined literal %d" % (2 * cur))
+                    f0, f1 = gates[cur]
+                    todo = [f >> 1 for f in (f0, f1)
+                            if (f >> 1) not in lit_map]
+                    if todo:
+                        if len(stack) > 2 * len(gates) + 1:
+                            raise SyntaxError("Cyclic AND gates")
+                        stack.extend(todo)
+                    else:
+                        stack.pop()
+                        lit_map[cur] = aig.And(lit_map[f0 >> 1] ^ (f0 & 1),
+                                               lit_map[f1 >> 1] ^ (f1 & 1))
+            return lit_map[var] ^ (l & 1)
+
+        for values, latch in zip(latch_lines, latch_lits):
+            aig.set_next(latch, lit(values[1]))
+        for out in outputs:
+            aig.add_output(lit(out))
+
+        # Symbol table
+        while self.pos < len(self.data):
+            entry = self.line()
+            if entry.startswith("c"):
+                break
+            if not entry:
+                continue
+            kind, _, name = entry.partition(" ")
+            try:
+                idx = int(kind[1:])
+            except ValueError:
+                raise SyntaxError("Invalid symbol table entry: '%s'" % entry)
+            if kind[0] == "i" and idx < i:
+                aig._names[aig.inputs[idx]] = name
+            elif kind[0] == "l" and idx < l:
+                aig._names[aig.latches[idx]] = name
+            elif kind[0] == "o" and idx < o:
+                aig._output_names[idx] = name
+            else:
+                raise SyntaxError("Invalid symbol table entry: '%s'" % entry)
+        return aig
+
+
+class AIGEncoder(DagWalker):
+    """Encodes Boolean formulae into literals of an AIG.
+
+    Boolean symbols are mapped to inputs of the AIG, that are shared
+    among all the formulae encoded by the same AIGEncoder.
+    """
+
+    def __init__(self, aig=None, environment=None):
+        DagWalker.__init__(self, env=environment)
+        self.aig = aig if aig is not None else AIG()
+        self.symbol_inputs = {}
+
+    def encode(self, formula):
+        """Returns the AIG literal representing formula."""
+        return self.walk(formula)
+
+    def get_symbols(self):
+        """Returns a dictionary mapping input variables to symbols."""
+        return dict((lit >> 1, s) for s, lit in self.symbol_inputs.items())
+
+    def walk_symbol(self, formula, args, **kwargs):
+        if not formula.symbol_type().is_bool_type():
+            raise ConvertExpressionError("Only Boolean symbols can be "
+                                         "encoded in an AIG", formula)
+        lit = self.symbol_inputs.get(formula)
+        if lit is None:
+            lit = self.aig.new_input(formula.symbol_name())
+            self.symbol_inputs[formula] = lit
+        return lit
+
+    def walk_bool_constant(self, formula, args, **kwargs):
+        return AIG.TRUE if formula.is_true() else AIG.FALSE
+
+    def walk_and(self, formula, args, **kwargs):
+        return self.aig.And_n(args)
+
+    def walk_or(self, formula, args, **kwargs):
+        return self.aig.Or_n(args)
+
+    def walk_not(self, formula, args, **kwargs):
+        return args[0] ^ 1
+
+    def walk_implies(self, formula, args, **kwargs):
+        return self.aig.Implies(args[0], args[1])
+
+    def walk_iff(self, formula, args, **kwargs):
+        return self.aig.Iff(args[0], args[1])
+
+    def walk_ite(self, formula, args, **kwargs):
+        if not self.env.stc.get_type(formula).is_bool_type():
+            return self.walk_error(formula, args=args, **kwargs)
+        return self.aig.Ite(args[0], args[1], args[2])
+
+# EOC AIGEncoder
+
+
+def to_aig(formulae, environment=None):
+    """Returns an AIG having one output for each of the given formulae."""
+    encoder = AIGEncoder(environment=environment)
+    for f in formulae:
+        encoder.aig.add_output(encoder.encode(f))
+    return encoder.aig
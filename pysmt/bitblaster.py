@@ -0,0 +1,520 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Bit-blasting of QF_BV formulae.
+
+The BitBlaster lowers bit-vector terms to lists of bits (least
+significant bit first) built with a Boolean circuit, and Boolean
+formulae to a single bit. Two circuits are available:
+
+* FNodeCircuit: bits are Boolean FNodes, and each bit of a bit-vector
+  symbol is a fresh Boolean symbol. The result can be given to any
+  SAT backend, or converted to DIMACS with DimacsCNF.from_formula.
+
+* An AIG: bits are AIG literals, and each bit of a bit-vector symbol
+  is an input. The result can be exported with DimacsCNF.from_aig or
+  in the AIGER format.
+"""
+
+from six.moves import xrange
+
+import pysmt.typing as types
+from pysmt.aig import AIG
+from pysmt.walkers import DagWalker
+from pysmt.exceptions import ConvertExpressionError
+
+
+class FNodeCircuit(object):
+    """Builds Boolean FNodes with the interface of an AIG.
+
+    Constants are propagated, and trivial gates (e.g., a & a, a & ~a)
+    are simplified.
+    """
+
+    def __init__(self, environment):
+        self.mgr = environment.formula_manager
+        self.TRUE = self.mgr.TRUE()
+        self.FALSE = self.mgr.FALSE()
+
+    def new_input(self, name):
+        template = name.replace("%", "%%") + "#%d"
+        return self.mgr.FreshSymbol(types.BOOL, template=template)
+
+    def Not(self, a):
+        if a.is_not():
+            return a.arg(0)
+        if a.is_bool_constant():
+            return self.FALSE if a.is_true() else self.TRUE
+        return self.mgr.Not(a)
+
+    def _is_complement(self, a, b):
+        return (a.is_not() and a.arg(0) == b) or \
+            (b.is_not() and b.arg(0) == a)
+
+    def And(self, a, b):
+        if a.is_false() or b.is_false():
+            return self.FALSE
+        if a.is_true() or a == b:
+            return b
+        if b.is_true():
+            return a
+        if self._is_complement(a, b):
+            return self.FALSE
+        return self.mgr.And(a, b)
+
+    def Or(self, a, b):
+        return self.Not(self.And(self.Not(a), self.Not(b)))
+
+    def Implies(self, a, b):
+        return self.Or(self.Not(a), b)
+
+    def Iff(self, a, b):
+        if a.is_bool_constant():
+            return b if a.is_true() else self.Not(b)
+        if b.is_bool_constant():
+            return a if b.is_true() else self.Not(a)
+        if a == b:
+            return self.TRUE
+        if self._is_complement(a, b):
+            return self.FALSE
+        return self.mgr.Iff(a, b)
+
+    def Xor(self, a, b):
+        return self.Not(self.Iff(a, b))
+
+    def Ite(self, c, t, e):
+        if c.is_bool_constant():
+            return t if c.is_true() else e
+        if t == e:
+            return t
+        if t.is_bool_constant():
+            return self.Or(c, e) if t.is_true() else \
+                self.And(self.Not(c), e)
+        if e.is_bool_constant():
+            return self.Or(self.Not(c), t) if e.is_true() else \
+                self.And(c, t)
+        return self.mgr.Ite(c, t, e)
+
+    def And_n(self, lits):
+        res = self.TRUE
+        args = []
+        for l in lits:
+            if l.is_false():
+                return self.FALSE
+            if not l.is_true():
+                args.append(l)
+        if len(args) == 1:
+            return args[0]
+        if args:
+            res = self.mgr.And(args)
+        return res
+
+    def Or_n(self, lits):
+        return self.Not(self.And_n(self.Not(l) for l in lits))
+
+# EOC FNodeCircuit
+
+
+class BitBlaster(DagWalker):
+    """Lowers QF_BV formulae to Boolean circuits.
+
+    If aig is None, bits are FNodes (see FNodeCircuit), otherwise they
+    are literals of the given AIG. adder is either "ripple" or "cla"
+    (carry-lookahead in blocks of 4 bits), and is used for all the
+    arithmetic operators.
+
+    The bits of each term are memoized, so that the bits of a symbol
+    (and of any shared subterm) are the same in all the formulae
+    blasted by the same BitBlaster.
+    """
+
+    CLA_BLOCK = 4
+
+    def __init__(self, aig=None, adder="ripple", environment=None):
+        DagWalker.__init__(self, env=environment)
+        if adder not in ("ripple", "cla"):
+            raise ValueError("Unknown adder '%s'" % adder)
+        self.aig = aig
+        self.circuit = FNodeCircuit(self.env) if aig is None else aig
+        self.adder = adder
+        self.symbol_bits = {}
+        self._divisions = {}
+
+    def blast(self, formula):
+        """Returns the bit (FNode or AIG literal) of a Boolean formula."""
+        if not self.env.stc.get_type(formula).is_bool_type():
+            raise ConvertExpressionError("Expected a Boolean formula",
+                                         formula)
+        return self.walk(formula)
+
+    def blast_term(self, term):
+        """Returns the list of bits of a bit-vector term, LSB first."""
+        if not self.env.stc.get_type(term).is_bv_type():
+            raise ConvertExpressionError("Expected a bit-vector term", term)
+        return list(self.walk(term))
+
+    def get_bits(self, symbol):
+        """Returns the bits of a bit-vector symbol, LSB first."""
+        return list(self.symbol_bits[symbol])
+
+    def get_bv_values(self, model):
+        """Returns a dictionary mapping the blasted bit-vector symbols
+        to their values.
+
+        model can be a Model of the blasted formulae (when the bits
+        are FNodes), or a function mapping each bit to a truth value.
+        """
+        mgr = self.env.formula_manager
+        if callable(model):
+            value = model
+        else:
+            value = model.get_py_value
+        res = {}
+        for symbol, bits in self.symbol_bits.items():
+            if not symbol.symbol_type().is_bv_type():
+                continue
+            num = 0
+            for i, b in enumerate(bits):
+                if self._truth(value, b):
+                    num |= 1 << i
+            res[symbol] = mgr.BV(num, len(bits))
+        return res
+
+    def _truth(self, value, bit):
+        if self.aig is not None:
+            if bit < 2:
+                return bit == AIG.TRUE
+            return bool(value(bit & ~1)) != bool(bit & 1)
+        if bit.is_bool_constant():
+            return bit.is_true()
+        return bool(value(bit))
+
+    #
+    # Circuits
+    #
+
+    def _const(self, value, width):
+        c = self.circuit
+        return [c.TRUE if (value >> i) & 1 else c.FALSE
+                for i in xrange(width)]
+
+    def _mux(self, cond, a, b):
+        ite = self.circuit.Ite
+        return [ite(cond, x, y) for x, y in zip(a, b)]
+
+    def _is_const(self, bits):
+        c = self.circuit
+        return all(b == c.TRUE or b == c.FALSE for b in bits)
+
+    def _add(self, a, b, carry):
+        """Returns (sum, carry-out) of a + b + carry."""
+        if self.adder == "cla":
+            return self._cla_add(a, b, carry)
+        return self._ripple_add(a, b, carry)
+
+    def _ripple_add(self, a, b, carry):
+        c = self.circuit
+        res = []
+        for x, y in zip(a, b):
+            p = c.Xor(x, y)
+            res.append(c.Xor(p, carry))
+            carry = c.Or(c.And(x, y), c.And(p, carry))
+        return res, carry
+
+    def _cla_add(self, a, b, carry):
+        c = self.circuit
+        gen = [c.And(x, y) for x, y in zip(a, b)]
+        prop = [c.Xor(x, y) for x, y in zip(a, b)]
+        res = []
+        for start in xrange(0, len(a), self.CLA_BLOCK):
+            end = min(start + self.CLA_BLOCK, len(a))
+            carries = [carry]
+            for i in xrange(start, end):
+                # c[i+1] = g[i] | p[i] g[i-1] | ... | p[i]..p[start] c
+                terms = [gen[i]]
+                chain = prop[i]
+                for j in xrange(i - 1, start - 1, -1):
+                    terms.append(c.And(chain, gen[j]))
+                    chain = c.And(chain, prop[j])
+                terms.append(c.And(chain, carry))
+                carries.append(c.Or_n(terms))
+            for i in xrange(start, end):
+                res.append(c.Xor(prop[i], carries[i - start]))
+            carry = carries[-1]
+        return res, carry
+
+    def _neg(self, a):
+        c = self.circuit
+        res, _ = self._add([c.Not(x) for x in a], self._const(0, len(a)),
+                           c.TRUE)
+        return res
+
+    def _sub(self, a, b):
+        """Returns (a - b, not borrow), i.e. the carry out is true iff
+        a >= b (unsigned)."""
+        c = self.circuit
+        return self._add(a, [c.Not(y) for y in b], c.TRUE)
+
+    def _mul(self, a, b):
+        c = self.circuit
+        width = len(a)
+        if self._is_const(a) and not self._is_const(b):
+            a, b = b, a
+        res = self._const(0, width)
+        for i in xrange(width):
+            if b[i] == c.FALSE:
+                continue
+            if b[i] == c.TRUE:
+                partial = a[:width - i]
+            else:
+                partial = [c.And(x, b[i]) for x in a[:width - i]]
+            # The partial product only affects the bits from i
+            high, _ = self._add(res[i:], partial, c.FALSE)
+            res = res[:i] + high
+        return res
+
+    def _divrem(self, a, b, signed):
+        # Division and remainder of the same operands share the circuit
+        key = (tuple(a), tuple(b), signed)
+        res = self._divisions.get(key)
+        if res is None:
+            if signed:
+                res = self._sdivrem(a, b)
+            else:
+                res = self._udivrem(a, b)
+            self._divisions[key] = res
+        return res
+
+    def _udivrem(self, a, b):
+        """Restoring division: returns (quotient, remainder).
+
+        Division by zero yields the all-ones quotient and a as the
+        remainder, as required by SMT-LIB.
+        """
+        c = self.circuit
+        width = len(a)
+        divisor = list(b) + [c.FALSE]
+        rem = self._const(0, width)
+        quot = [None] * width
+        for i in xrange(width - 1, -1, -1):
+            shifted = [a[i]] + rem
+            diff, geq = self._sub(shifted, divisor)
+            quot[i] = geq
+            rem = self._mux(geq, diff[:width], shifted[:width])
+        return quot, rem
+
+    def _sdivrem(self, a, b):
+        c = self.circuit
+        sa, sb = a[-1], b[-1]
+        abs_a = self._mux(sa, self._neg(a), a)
+        abs_b = self._mux(sb, self._neg(b), b)
+        quot, rem = self._udivrem(abs_a, abs_b)
+        quot = self._mux(c.Xor(sa, sb), self._neg(quot), quot)
+        rem = self._mux(sa, self._neg(rem), rem)
+        return quot, rem
+
+    def _shift(self, a, amount, left, fill):
+        """Barrel shifter: shifts a by the (symbolic) amount."""
+        c = self.circuit
+        width = len(a)
+        res = list(a)
+        overflow = []
+        for k, bit in enumerate(amount):
+            step = 1 << k
+            if step >= width:
+                overflow.append(bit)
+                continue
+            if left:
+                shifted = [fill] * step + res[:width - step]
+            else:
+                shifted = res[step:] + [fill] * step
+            res = self._mux(bit, shifted, res)
+        return self._mux(c.Or_n(overflow), [fill] * width, res)
+
+    def _ult(self, a, b):
+        c = self.circuit
+        res = c.FALSE
+        for x, y in zip(a, b):
+            # From the LSB: a < b iff the most significant difference
+            # has a[i] = 0 and b[i] = 1
+            res = c.Or(c.And(c.Not(x), y), c.And(c.Iff(x, y), res))
+        return res
+
+    def _slt(self, a, b):
+        c = self.circuit
+        return self._ult(a[:-1] + [c.Not(a[-1])], b[:-1] + [c.Not(b[-1])])
+
+    def _equals(self, a, b):
+        c = self.circuit
+        return c.And_n([c.Iff(x, y) for x, y in zip(a, b)])
+
+    #
+    # Walker functions
+    #
+
+    def walk_symbol(self, formula, args, **kwargs):
+        ty = formula.symbol_type()
+        res = self.symbol_bits.get(formula)
+        if res is not None:
+            return res if ty.is_bv_type() else res[0]
+        name = formula.symbol_name()
+        if ty.is_bool_type():
+            if self.aig is None:
+                res = formula
+            else:
+                res = self.aig.new_input(name)
+            self.symbol_bits[formula] = [res]
+            return res
+        if ty.is_bv_type():
+            res = [self.circuit.new_input("%s[%d]" % (name, i))
+                   for i in xrange(ty.width)]
+            self.symbol_bits[formula] = res
+            return res
+        raise ConvertExpressionError("Only Boolean and bit-vector symbols "
+                                     "can be bit-blasted", formula)
+
+    def walk_bool_constant(self, formula, args, **kwargs):
+        return self.circuit.TRUE if formula.is_true() else self.circuit.FALSE
+
+    def walk_and(self, formula, args, **kwargs):
+        return self.circuit.And_n(args)
+
+    def walk_or(self, formula, args, **kwargs):
+        return self.circuit.Or_n(args)
+
+    def walk_not(self, formula, args, **kwargs):
+        return self.circuit.Not(args[0])
+
+    def walk_implies(self, formula, args, **kwargs):
+        return self.circuit.Implies(args[0], args[1])
+
+    def walk_iff(self, formula, args, **kwargs):
+        return self.circuit.Iff(args[0], args[1])
+
+    def walk_ite(self, formula, args, **kwargs):
+        if self.env.stc.get_type(formula).is_bv_type():
+            return self._mux(args[0], args[1], args[2])
+        if not self.env.stc.get_type(formula).is_bool_type():
+            raise ConvertExpressionError("Only Boolean and bit-vector "
+                                         "terms can be bit-blasted", formula)
+        return self.circuit.Ite(args[0], args[1], args[2])
+
+    def walk_equals(self, formula, args, **kwargs):
+        if not self.env.stc.get_type(formula.arg(0)).is_bv_type():
+            raise ConvertExpressionError("Only bit-vector equalities "
+                                         "can be bit-blasted", formula)
+        return self._equals(args[0], args[1])
+
+    def walk_bv_constant(self, formula, args, **kwargs):
+        return self._const(formula.constant_value(), formula.bv_width())
+
+    def walk_bv_not(self, formula, args, **kwargs):
+        return [self.circuit.Not(x) for x in args[0]]
+
+    def walk_bv_and(self, formula, args, **kwargs):
+        return [self.circuit.And(x, y) for x, y in zip(args[0], args[1])]
+
+    def walk_bv_or(self, formula, args, **kwargs):
+        return [self.circuit.Or(x, y) for x, y in zip(args[0], args[1])]
+
+    def walk_bv_xor(self, formula, args, **kwargs):
+        return [self.circuit.Xor(x, y) for x, y in zip(args[0], args[1])]
+
+    def walk_bv_concat(self, formula, args, **kwargs):
+        # The first argument holds the most significant bits
+        return args[1] + args[0]
+
+    def walk_bv_extract(self, formula, args, **kwargs):
+        return args[0][formula.bv_extract_start():
+                       formula.bv_extract_end() + 1]
+
+    def walk_bv_zext(self, formula, args, **kwargs):
+        return args[0] + [self.circuit.FALSE] * formula.bv_extend_step()
+
+    def walk_bv_sext(self, formula, args, **kwargs):
+        return args[0] + [args[0][-1]] * formula.bv_extend_step()
+
+    def walk_bv_rol(self, formula, args, **kwargs):
+        width = len(args[0])
+        step = formula.bv_rotation_step() % width
+        return args[0][width - step:] + args[0][:width - step]
+
+    def walk_bv_ror(self, formula, args, **kwargs):
+        step = formula.bv_rotation_step() % len(args[0])
+        return args[0][step:] + args[0][:step]
+
+    def walk_bv_lshl(self, formula, args, **kwargs):
+        return self._shift(args[0], args[1], True, self.circuit.FALSE)
+
+    def walk_bv_lshr(self, formula, args, **kwargs):
+        return self._shift(args[0], args[1], False, self.circuit.FALSE)
+
+    def walk_bv_ashr(self, formula, args, **kwargs):
+        return self._shift(args[0], args[1], False, args[0][-1])
+
+    def walk_bv_ult(self, formula, args, **kwargs):
+        return self._ult(args[0], args[1])
+
+    def walk_bv_ule(self, formula, args, **kwargs):
+        return self.circuit.Not(self._ult(args[1], args[0]))
+
+    def walk_bv_slt(self, formula, args, **kwargs):
+        return self._slt(args[0], args[1])
+
+    def walk_bv_sle(self, formula, args, **kwargs):
+        return self.circuit.Not(self._slt(args[1], args[0]))
+
+    def walk_bv_comp(self, formula, args, **kwargs):
+        return [self._equals(args[0], args[1])]
+
+    def walk_bv_neg(self, formula, args, **kwargs):
+        return self._neg(args[0])
+
+    def walk_bv_add(self, formula, args, **kwargs):
+        res, _ = self._add(args[0], args[1], self.circuit.FALSE)
+        return res
+
+    def walk_bv_sub(self, formula, args, **kwargs):
+        res, _ = self._sub(args[0], args[1])
+        return res
+
+    def walk_bv_mul(self, formula, args, **kwargs):
+        return self._mul(args[0], args[1])
+
+    def walk_bv_udiv(self, formula, args, **kwargs):
+        return self._divrem(args[0], args[1], False)[0]
+
+    def walk_bv_urem(self, formula, args, **kwargs):
+        return self._divrem(args[0], args[1], False)[1]
+
+    def walk_bv_sdiv(self, formula, args, **kwargs):
+        return self._divrem(args[0], args[1], True)[0]
+
+    def walk_bv_srem(self, formula, args, **kwargs):
+        return self._divrem(args[0], args[1], True)[1]
+
+# EOC BitBlaster
+
+
+def bitblast(formula, adder="ripple", environment=None):
+    """Returns a Boolean formula equisatisfiable with the given QF_BV
+    formula.
+
+    Each bit of a bit-vector symbol is replaced by a fresh Boolean
+    symbol.
+    """
+    return BitBlaster(adder=adder, environment=environment).blast(formula)
@@ -0,0 +1,235 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Transition systems and Bounded Model Checking.
+
+A TransitionSystem is given by a set of state variables, an initial
+condition over them, and a transition relation over the state
+variables and their next versions. The Unroller builds the copies of
+formulae at a given time, in which each variable v is replaced by the
+timed symbol v@k and its next version by v@(k+1).
+
+The BMCUnroller feeds the unrolling to a solver incrementally: each
+transition is asserted only once, and the property at each bound is
+checked under an assumption (or within a push/pop), so that checking
+all the bounds up to k takes work linear in k.
+"""
+
+from six.moves import xrange
+
+from pysmt.environment import get_env
+from pysmt.walkers import IdentityDagWalker
+
+
+class TransitionSystem(object):
+    """A symbolic transition system.
+
+    next_vars maps each variable to its next version; by default the
+    next version of v is the symbol 'next(v)' of the same type.
+    Formulae are expected to be quantifier-free.
+    """
+
+    def __init__(self, variables, init, trans, next_vars=None,
+                 environment=None):
+        self.env = environment if environment is not None else get_env()
+        mgr = self.env.formula_manager
+        self.variables = list(variables)
+        self.init = init
+        self.trans = trans
+        if next_vars is None:
+            next_vars = dict((v, mgr.Symbol("next(%s)" % v.symbol_name(),
+                                            v.symbol_type()))
+                             for v in self.variables)
+        self.next_vars = next_vars
+
+    def next(self, v):
+        """Returns the next version of the variable v."""
+        return self.next_vars[v]
+
+    def get_next(self, formula):
+        """Returns formula over the next version of the variables."""
+        return formula.substitute(self.next_vars)
+
+# EOC TransitionSystem
+
+
+class Unroller(IdentityDagWalker):
+    """Builds time-shifted copies of formulae over the variables of a
+    TransitionSystem.
+
+    The memoization is keyed by (node, time) and kept across calls:
+    each node of a formula is visited once per time step. Nodes that
+    do not depend on the state variables are shared by all the steps.
+    """
+
+    def __init__(self, system, environment=None):
+        if environment is None:
+            environment = system.env
+        IdentityDagWalker.__init__(self, env=environment)
+        self.system = system
+        self.get_free_variables = self.env.fvo.get_free_variables
+        # Maps the state symbols to (variable, time shift)
+        self._state = {}
+        for v in system.variables:
+            self._state[v] = (v, 0)
+            self._state[system.next(v)] = (v, 1)
+        self._timed = {}
+        self._depends = {}
+
+    def get_symbol(self, v, k):
+        """Returns the symbol v@k."""
+        key = (v, k)
+        res = self._timed.get(key)
+        if res is None:
+            res = self.mgr.Symbol("%s@%d" % (v.symbol_name(), k),
+                                  v.symbol_type())
+            self._timed[key] = res
+        return res
+
+    def get_step_map(self, k):
+        """Returns the map from the state variables (and their next
+        versions) to their copies at time k (and k+1)."""
+        res = {}
+        for symbol, (v, shift) in self._state.items():
+            res[symbol] = self.get_symbol(v, k + shift)
+        return res
+
+    def at_time(self, formula, k):
+        """Returns the copy of formula at time k."""
+        return self.walk(formula, k=k)
+
+    def _get_key(self, formula, k, **kwargs):
+        depends = self._depends.get(formula)
+        if depends is None:
+            support = self.get_free_variables(formula)
+            depends = any(v in self._state for v in support)
+            self._depends[formula] = depends
+        return (formula, k) if depends else formula
+
+    def walk_symbol(self, formula, args, k, **kwargs):
+        entry = self._state.get(formula)
+        if entry is None:
+            return formula
+        v, shift = entry
+        return self.get_symbol(v, k + shift)
+
+# EOC Unroller
+
+
+class BMCUnroller(object):
+    """Incremental Bounded Model Checking of invariant properties.
+
+    The initial condition at time 0 and the transitions up to the
+    current depth are asserted in the solver, each of them only once.
+    The negation of the property at bound k is either guarded by a
+    fresh activation literal, used as assumption and then disabled
+    (mode="assumptions"), or asserted within a push/pop (mode="push").
+    """
+
+    def __init__(self, system, solver=None, solver_name=None, logic=None,
+                 mode="assumptions", environment=None):
+        if mode not in ("assumptions", "push"):
+            raise ValueError("Unknown mode '%s'" % mode)
+        if environment is None:
+            environment = system.env
+        self.env = environment
+        self.system = system
+        self.unroller = Unroller(system, environment)
+        if solver is None:
+            solver = environment.factory.Solver(name=solver_name,
+                                                logic=logic)
+        self.solver = solver
+        self.mode = mode
+        self.depth = 0
+        self._trace = None
+        self.solver.add_assertion(self.unroller.at_time(system.init, 0))
+
+    def at_time(self, formula, k):
+        return self.unroller.at_time(formula, k)
+
+    def unroll(self, k):
+        """Asserts the transitions up to time k (if not done yet)."""
+        while self.depth < k:
+            self.solver.add_assertion(self.at_time(self.system.trans,
+                                                   self.depth))
+            self.depth += 1
+
+    def check_bound(self, prop, k):
+        """Returns True iff a state violating prop is reachable with
+        exactly k transitions.
+
+        If so, the counterexample can be retrieved with get_trace().
+        """
+        mgr = self.env.formula_manager
+        self.unroll(k)
+        bad = mgr.Not(self.at_time(prop, k))
+        if self.mode == "push":
+            self.solver.push()
+            try:
+                self.solver.add_assertion(bad)
+                res = self.solver.solve()
+                if res:
+                    self._trace = self._extract_trace(k)
+            finally:
+                self.solver.pop()
+            return res
+
+        act = mgr.FreshSymbol(template="bmc_act_%d")
+        self.solver.add_assertion(mgr.Implies(act, bad))
+        res = self.solver.solve([act])
+        if res:
+            self._trace = self._extract_trace(k)
+        # The activation literal is not needed anymore
+        self.solver.add_assertion(mgr.Not(act))
+        return res
+
+    def check_property(self, prop, max_bound):
+        """Checks the bounds from 0 to max_bound.
+
+        Returns the first bound at which prop is violated, or None.
+        """
+        for k in xrange(max_bound + 1):
+            if self.check_bound(prop, k):
+                return k
+        return None
+
+    def _extract_trace(self, k):
+        trace = []
+        for i in xrange(k + 1):
+            symbols = [self.unroller.get_symbol(v, i)
+                       for v in self.system.variables]
+            values = self.solver.get_values(symbols)
+            trace.append(dict((v, values[s]) for v, s in
+                              zip(self.system.variables, symbols)))
+        return trace
+
+    def get_trace(self):
+        """Returns the counterexample found by the last satisfiable
+        check_bound, as a list of states (dictionaries from the state
+        variables to their values)."""
+        return self._trace
+
+    def exit(self):
+        return self.solver.exit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.exit()
+
+# EOC BMCUnroller
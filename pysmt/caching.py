@@ -0,0 +1,497 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Persistent cache of satisfiability results.
+
+Queries are identified by a canonical hash of the set of asserted
+formulae, that does not depend on the Environment: symbols are
+renamed by order of first occurrence, and the arguments of
+commutative operators (and the assertions themselves) are sorted by
+their shape. Two queries that are equal up to renaming and
+commutativity usually have the same hash; queries with the same hash
+are equisatisfiable.
+
+The results (and, optionally, the values of the symbols) are stored
+in a sqlite database, that can be shared by many processes.
+"""
+
+import json
+import time
+import hashlib
+import sqlite3
+from fractions import Fraction
+
+from six import string_types
+
+import pysmt.operators as op
+from pysmt.environment import get_env
+from pysmt.hashing import encode_payload
+from pysmt.solvers.eager import EagerModel
+
+
+FORMAT_VERSION = "1"
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Canonizer(object):
+    """Computes the canonical hash of sets of formulae.
+
+    The shapes (hashes that ignore the names of the symbols) are
+    memoized, so that a Canonizer can be reused for queries that
+    share sub-formulae.
+    """
+
+    def __init__(self, environment=None):
+        self.env = environment if environment is not None else get_env()
+        self._shapes = {}
+
+    def _children(self, node):
+        """Returns the sub-terms of node, including the symbols that
+        are part of the payload."""
+        if node.is_function_application():
+            return (node.function_name(),) + node.args()
+        if node.is_quantifier():
+            return tuple(node.quantifier_vars()) + node.args()
+        return node.args()
+
+    def _label(self, node):
+        if node.is_symbol():
+            return "S:%s" % node.symbol_type()
+        if node.is_function_application() or node.is_quantifier():
+            return str(node.node_type())
+        return "%d:%s" % (node.node_type(),
+                          encode_payload(node._content.payload))
+
+    def _postorder(self, roots, memo):
+        """Yields the nodes reachable from roots that are not in memo,
+        children first."""
+        visited = set()
+        stack = [(r, False) for r in roots]
+        while stack:
+            node, expanded = stack.pop()
+            if node in memo or (not expanded and node in visited):
+                continue
+            if expanded:
+                yield node
+            else:
+                visited.add(node)
+                stack.append((node, True))
+                for c in self._children(node):
+                    stack.append((c, False))
+
+    def _combine(self, node, label, digests):
+        if node.node_type() in op.COMMUTATIVE_OPERATORS:
+            digests = sorted(digests)
+        elif node.is_quantifier():
+            nvars = len(node.quantifier_vars())
+            digests = sorted(digests[:nvars]) + digests[nvars:]
+        return _digest("%s(%s)" % (label, " ".join(digests)))
+
+    def shape(self, node):
+        """Returns a hash of node that does not depend on the names of
+        the symbols."""
+        shapes = self._shapes
+        for n in self._postorder([node], shapes):
+            shapes[n] = self._combine(n, self._label(n),
+                                      [shapes[c] for c in self._children(n)])
+        return shapes[node]
+
+    def _ordered_children(self, node):
+        children = self._children(node)
+        if node.node_type() in op.COMMUTATIVE_OPERATORS:
+            return sorted(children, key=self._shapes.__getitem__)
+        return children
+
+    def get_roots(self, formulae):
+        """Returns the conjuncts of formulae, without duplicates and
+        sorted by shape."""
+        roots = []
+        seen = set()
+        stack = list(reversed(formulae))
+        while stack:
+            f = stack.pop()
+            if f in seen:
+                continue
+            seen.add(f)
+            if f.is_and():
+                stack.extend(reversed(f.args()))
+            elif not f.is_true():
+                roots.append(f)
+        for r in roots:
+            self.shape(r)
+        # Ties are broken by the order of the formulae
+        return sorted(roots, key=self._shapes.__getitem__)
+
+    def canonize(self, formulae):
+        """Returns the pair (hash, symbols), where symbols is the list of
+        the symbols of formulae, in canonical order.
+
+        The canonical name of symbols[i] is "v<i>".
+        """
+        roots = self.get_roots(formulae)
+        # Canonical names are assigned in pre-order
+        index = {}
+        symbols = []
+        stack = list(reversed(roots))
+        visited = set()
+        while stack:
+            node = stack.pop()
+            if node in visited:
+                continue
+            visited.add(node)
+            if node.is_symbol():
+                index[node] = len(symbols)
+                symbols.append(node)
+            stack.extend(reversed(self._ordered_children(node)))
+
+        digests = {}
+        for n in self._postorder(roots, digests):
+            if n.is_symbol():
+                label = "v%d:%s" % (index[n], n.symbol_type())
+            else:
+                label = self._label(n)
+            digests[n] = self._combine(n, label,
+                                       [digests[c]
+                                        for c in self._children(n)])
+        key = _digest("%s[%s]" % (FORMAT_VERSION,
+                                  " ".join(sorted(digests[r]
+                                                  for r in roots))))
+        return key, symbols
+
+# EOC Canonizer
+
+
+def canonical_hash(formulae, environment=None):
+    """Returns the canonical hash of the set of formulae."""
+    return Canonizer(environment).canonize(formulae)[0]
+
+
+class ResultCache(object):
+    """A sqlite store of satisfiability results.
+
+    If path is None, the cache is kept in memory. When the number of
+    entries exceeds max_entries, the least recently used ones are
+    evicted (down to 90% of max_entries).
+    """
+
+    def __init__(self, path=None, max_entries=100000):
+        self.path = path if path is not None else ":memory:"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.db = sqlite3.connect(self.path, timeout=30,
+                                  isolation_level=None)
+        self.db.execute("CREATE TABLE IF NOT EXISTS results ("
+                        "key TEXT PRIMARY KEY, result INTEGER NOT NULL, "
+                        "model TEXT, last_used REAL NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_lru "
+                        "ON results(last_used)")
+
+    def get(self, key):
+        """Returns the pair (result, model) stored for key, or None.
+
+        model is None or a dictionary from the canonical index of a
+        symbol to its encoded value.
+        """
+        row = self.db.execute("SELECT result, model FROM results "
+                              "WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute("UPDATE results SET last_used = ? WHERE key = ?",
+                        (time.time(), key))
+        result, model = row
+        if model is not None:
+            model = dict((int(k), v) for k, v in json.loads(model).items())
+        return bool(result), model
+
+    def put(self, key, result, model=None):
+        if model is not None:
+            model = json.dumps(dict((str(k), v) for k, v in model.items()),
+                               sort_keys=True)
+        self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                        (key, int(result), model, time.time()))
+        self.stores += 1
+        if self.max_entries is not None:
+            size = len(self)
+            if size > self.max_entries:
+                self.evict(size - int(self.max_entries * 0.9))
+
+    def evict(self, count):
+        """Removes the count least recently used entries."""
+        cursor = self.db.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results "
+            "ORDER BY last_used LIMIT ?)", (count,))
+        self.evictions += cursor.rowcount
+
+    def clear(self):
+        self.db.execute("DELETE FROM results")
+
+    def statistics(self):
+        """Returns a dictionary of hit/miss statistics of this
+        instance."""
+        return {"hits": self.hits, "misses": self.misses,
+                "stores": self.stores, "evictions": self.evictions,
+                "entries": len(self)}
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+# EOC ResultCache
+
+
+def encode_value(value):
+    """Returns a JSON representation of a constant, or None."""
+    if value.is_bool_constant():
+        return ["b", bool(value.constant_value())]
+    if value.is_int_constant():
+        return ["i", str(value.constant_value())]
+    if value.is_real_constant():
+        return ["r", str(value.constant_value())]
+    if value.is_bv_constant():
+        return ["bv", str(value.constant_value()), value.bv_width()]
+    return None
+
+
+def decode_value(data, environment=None):
+    mgr = (environment if environment is not None else get_env()).formula_manager
+    kind = data[0]
+    if kind == "b":
+        return mgr.Bool(data[1])
+    if kind == "i":
+        return mgr.Int(int(data[1]))
+    if kind == "r":
+        return mgr.Real(Fraction(data[1]))
+    assert kind == "bv"
+    return mgr.BV(int(data[1]), data[2])
+
+
+class CachingSolver(object):
+    """Front-end of a Solver that looks up the results of solve in a
+    ResultCache.
+
+    The assertions (and push levels) are buffered, and passed to the
+    backend only on a cache miss. If store_models is True, the values
+    of the symbols are stored together with satisfiable results, and the models of cache
+    hits are served without the backend (if a value cannot be stored,
+    the backend is solved when the model is requested). Timeouts and
+    unknown results are not cached.
+
+    Unsat cores are not stored: after a cache hit, the backend is
+    solved when they are requested. The other methods are forwarded
+    to the backend, after passing it the buffered assertions.
+    """
+
+    def __init__(self, solver, cache, store_models=True, environment=None):
+        if environment is None:
+            environment = getattr(solver, "environment", None)
+        if isinstance(cache, string_types):
+            cache = ResultCache(cache)
+        self.solver = solver
+        self.cache = cache
+        self.store_models = store_models
+        self.canonizer = Canonizer(environment)
+        self.env = self.canonizer.env
+        self._assertions = []
+        self._names = {}
+        self._backtrack_points = []
+        self._forwarded = 0
+        self._backend_levels = 0
+        self._model = None
+        self._backend_solved = False
+        self._last_assumptions = None
+        self.last_result = None
+
+    @property
+    def assertions(self):
+        return list(self._assertions)
+
+    def add_assertion(self, formula, named=None):
+        if named is not None:
+            self._names[len(self._assertions)] = named
+        self._assertions.append(formula)
+
+    def add_assertions(self, formulae):
+        for formula in formulae:
+            self.add_assertion(formula)
+
+    def push(self, levels=1):
+        for _ in range(levels):
+            self._backtrack_points.append(len(self._assertions))
+
+    def pop(self, levels=1):
+        for _ in range(levels):
+            size = self._backtrack_points.pop()
+            del self._assertions[size:]
+            if len(self._backtrack_points) < self._backend_levels:
+                self.solver.pop()
+                self._backend_levels -= 1
+                self._forwarded = size
+        self._backend_solved = False
+        size = len(self._assertions)
+        for i in list(self._names):
+            if i >= size:
+                del self._names[i]
+
+    def reset_assertions(self):
+        self._assertions = []
+        self._names = {}
+        self._backtrack_points = []
+        self._reset_backend()
+
+    def _reset_backend(self):
+        self.solver.reset_assertions()
+        self._forwarded = 0
+        self._backend_levels = 0
+        self._backend_solved = False
+
+    def _forward(self, size):
+        for i in range(self._forwarded, size):
+            self.solver.add_assertion(self._assertions[i],
+                                      named=self._names.get(i))
+        self._forwarded = max(self._forwarded, size)
+
+    def _sync(self):
+        """Passes the buffered assertions and push levels to the
+        backend."""
+        points = self._backtrack_points
+        for level in range(self._backend_levels, len(points)):
+            self._forward(points[level])
+            self.solver.push()
+        self._backend_levels = len(points)
+        self._forward(len(self._assertions))
+
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
+        if assumptions is not None:
+            assumptions = list(assumptions)
+        self._model = None
+        self._backend_solved = False
+        self._last_assumptions = assumptions
+        key, symbols = self.canonizer.canonize(self._assertions +
+                                               (assumptions or []))
+        entry = self.cache.get(key)
+        if entry is not None:
+            res, model = entry
+            if res and model is not None:
+                assignment = dict((symbols[i], decode_value(v, self.env))
+                                  for i, v in model.items())
+                self._model = EagerModel(assignment, self.env)
+            self.last_result = res
+            return res
+
+        self._sync()
+        res = self.solver.solve(assumptions=assumptions, timeout=timeout,
+                                memory_limit=memory_limit)
+        self._backend_solved = True
+        self.last_result = res
+        model = None
+        if res and self.store_models:
+            model = self._encode_model(symbols)
+        self.cache.put(key, res, model)
+        return res
+
+    def _encode_model(self, symbols):
+        """Returns the values of symbols in the backend model, or None
+        if a value cannot be stored."""
+        model = {}
+        for i, s in enumerate(symbols):
+            if s.symbol_type().is_function_type():
+                continue
+            value = encode_value(self.solver.get_value(s))
+            if value is None:
+                return None
+            model[i] = value
+        return model
+
+    def _solve_backend(self):
+        """Solves the backend after a cache hit, for the methods that
+        depend on the state of the last search."""
+        if not self._backend_solved:
+            self._sync()
+            self.solver.solve(assumptions=self._last_assumptions)
+            self._backend_solved = True
+
+    def get_model(self):
+        if self._model is not None:
+            return self._model
+        # A cache hit without a stored model
+        self._solve_backend()
+        return self.solver.get_model()
+
+    def get_unsat_core(self):
+        self._solve_backend()
+        return self.solver.get_unsat_core()
+
+    def get_named_unsat_core(self):
+        self._solve_backend()
+        return self.solver.get_named_unsat_core()
+
+    def get_value(self, item):
+        return self.get_model().get_value(item)
+
+    def get_values(self, formulae):
+        model = self.get_model()
+        return dict((f, model.get_value(f)) for f in formulae)
+
+    def get_py_value(self, item):
+        return self.get_value(item).constant_value()
+
+    def is_sat(self, formula):
+        self.push()
+        try:
+            self.add_assertion(formula)
+            return self.solve()
+        finally:
+            self.pop()
+
+    def is_unsat(self, formula):
+        return not self.is_sat(formula)
+
+    def is_valid(self, formula):
+        return self.is_unsat(self.env.formula_manager.Not(formula))
+
+    def exit(self):
+        return self.solver.exit()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        self._sync()
+        return getattr(self.solver, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.exit()
+
+# EOC CachingSolver
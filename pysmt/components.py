@@ -0,0 +1,232 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Splitting of assertion sets into independent components.
+
+Two assertions belong to the same component if they (transitively)
+share a free symbol, or an uninterpreted function symbol. The
+conjunction of the assertions is satisfiable iff every component is
+satisfiable, and a model is obtained by merging the models of the
+components.
+
+Components can be solved in separate processes: in this case they are
+exchanged with the workers in SMT-LIB format.
+"""
+
+import multiprocessing
+
+from six.moves import cStringIO
+
+from pysmt.environment import get_env
+from pysmt.logics import convert_logic_from_string
+from pysmt.rewritings import conjunctive_partition
+from pysmt.smtlib.parser import SmtLibParser
+from pysmt.smtlib.script import smtlibscript_from_formula
+from pysmt.solvers.eager import EagerModel
+
+
+def get_components(assertions, environment=None):
+    """Partitions the assertions into variable-disjoint components.
+
+    Returns a list of lists of assertions, in order of first
+    occurrence. Assertions without free symbols are grouped in a
+    single component.
+    """
+    env = environment if environment is not None else get_env()
+    get_free_variables = env.fvo.get_free_variables
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while x != root:
+            x, parent[x] = parent[x], root
+        return root
+
+    assertions = list(assertions)
+    supports = []
+    for formula in assertions:
+        support = get_free_variables(formula)
+        supports.append(support)
+        it = iter(support)
+        first = next(it, None)
+        if first is None:
+            continue
+        root = find(first)
+        for v in it:
+            r = find(v)
+            if r != root:
+                parent[r] = root
+
+    components = []
+    index = {}
+    for formula, support in zip(assertions, supports):
+        key = find(next(iter(support))) if support else None
+        if key not in index:
+            index[key] = len(components)
+            components.append([])
+        components[index[key]].append(formula)
+    return components
+
+
+class ComponentSolver(object):
+    """Solves a set of assertions component by component.
+
+    Components are solved from the smallest one, and solving stops at
+    the first unsatisfiable component. If processes is greater than
+    1, components are solved in a pool of processes.
+
+    The model only contains values for the free (non-function)
+    symbols: interpretations of uninterpreted functions are not
+    merged.
+    """
+
+    def __init__(self, solver_name=None, logic=None, processes=None,
+                 environment=None):
+        self.env = environment if environment is not None else get_env()
+        self.solver_name = solver_name
+        self.logic = logic
+        self.processes = processes
+        self.components = None
+        self.unsat_component = None
+        self._model = None
+
+    def solve(self, assertions):
+        """Returns True iff the conjunction of assertions is
+        satisfiable."""
+        self.components = get_components(assertions, self.env)
+        self.unsat_component = None
+        self._model = None
+        order = sorted(range(len(self.components)),
+                       key=lambda i: len(self.components[i]))
+        if self.processes is not None and self.processes > 1 \
+           and len(order) > 1:
+            results = self._solve_parallel(order)
+        else:
+            results = self._solve_sequential(order)
+
+        assignment = {}
+        try:
+            for i, values in results:
+                if values is None:
+                    self.unsat_component = self.components[i]
+                    return False
+                assignment.update(values)
+        finally:
+            results.close()
+        self._model = EagerModel(assignment, environment=self.env)
+        return True
+
+    def get_model(self):
+        """Returns the merged EagerModel of the last (satisfiable) call
+        to solve."""
+        return self._model
+
+    def _solve_sequential(self, order):
+        mgr = self.env.formula_manager
+        for i in order:
+            formula = mgr.And(self.components[i])
+            model = self.env.factory.get_model(formula,
+                                               solver_name=self.solver_name,
+                                               logic=self.logic)
+            if model is None:
+                yield i, None
+                return
+            yield i, dict((v, model.get_value(v))
+                          for v in _model_symbols(formula))
+
+    def _solve_parallel(self, order):
+        mgr = self.env.formula_manager
+        logic = str(self.logic) if self.logic is not None else None
+        tasks = [(i, _to_smtlib(mgr.And(self.components[i])),
+                  self.solver_name, logic) for i in order]
+        pool = multiprocessing.Pool(min(self.processes, len(tasks)))
+        try:
+            for i, text in pool.imap_unordered(_solve_task, tasks):
+                if text is None:
+                    yield i, None
+                    return
+                formula = _from_smtlib(text, self.env)
+                values = {}
+                for eq in conjunctive_partition(formula):
+                    if eq.is_symbol():
+                        values[eq] = mgr.TRUE()
+                    elif eq.is_not():
+                        values[eq.arg(0)] = mgr.FALSE()
+                    elif not eq.is_true():
+                        values[eq.arg(0)] = eq.arg(1).simplify()
+                yield i, values
+        finally:
+            # Stops the workers still solving other components
+            pool.terminate()
+            pool.join()
+
+# EOC ComponentSolver
+
+
+def solve_components(assertions, solver_name=None, logic=None,
+                     processes=None, environment=None):
+    """Solves the assertions component by component.
+
+    Returns the merged EagerModel, or None if the assertions are
+    unsatisfiable.
+    """
+    solver = ComponentSolver(solver_name=solver_name, logic=logic,
+                             processes=processes, environment=environment)
+    if solver.solve(assertions):
+        return solver.get_model()
+    return None
+
+
+def _model_symbols(formula):
+    return [v for v in formula.get_free_variables()
+            if not v.symbol_type().is_function_type()]
+
+
+def _to_smtlib(formula):
+    buf = cStringIO()
+    smtlibscript_from_formula(formula).serialize(buf, daggify=True)
+    return buf.getvalue()
+
+
+def _from_smtlib(text, environment):
+    parser = SmtLibParser(environment)
+    script = parser.get_script(cStringIO(text))
+    return script.get_last_formula(environment.formula_manager)
+
+
+def _solve_task(task):
+    """Worker function: solves a component given in SMT-LIB format.
+
+    Returns the pair (index, model) where model is the SMT-LIB text
+    of the conjunction of the values of the symbols, or None if the
+    component is unsatisfiable.
+    """
+    i, text, solver_name, logic = task
+    env = get_env()
+    mgr = env.formula_manager
+    formula = _from_smtlib(text, env)
+    if logic is not None:
+        logic = convert_logic_from_string(logic)
+    model = env.factory.get_model(formula, solver_name=solver_name,
+                                  logic=logic)
+    if model is None:
+        return i, None
+    values = [mgr.EqualsOrIff(v, model.get_value(v))
+              for v in _model_symbols(formula)]
+    return i, _to_smtlib(mgr.And(values))
@@ -0,0 +1,403 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Reading and writing of DIMACS and QDIMACS files.
+
+Clauses are kept as integer literals in a ClauseBuffer (see
+:py:class:`pysmt.rewritings.ClauseBuffer`). Conversion from and to
+FNodes is only performed on request. Files are mapped in memory and
+parsed in bulk: NumPy is used, if available, to speed up the parsing.
+"""
+
+import io
+import mmap
+import warnings
+from array import array
+
+from six import PY2, string_types
+from six.moves import xrange
+
+from pysmt.environment import get_env
+from pysmt.rewritings import ClauseBuffer, PolarityCNFizer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Number of clauses serialized at once by the writer
+WRITE_CHUNK_SIZE = 1 << 16
+
+
+class DimacsCNF(object):
+    """A CNF (possibly with a QDIMACS quantifier prefix) over integer
+    variables.
+
+    * num_vars: the number of variables declared in the header
+    * clauses: a ClauseBuffer
+    * prefix: a list of pairs (quantifier, variables), where
+      quantifier is either 'a' or 'e', from the outermost block
+    * symbols: an optional dictionary mapping variables to the FNodes
+      they represent
+    """
+
+    def __init__(self, num_vars=None, clauses=None, prefix=None,
+                 symbols=None):
+        if clauses is None:
+            clauses = ClauseBuffer()
+        if num_vars is None:
+            num_vars = clauses.max_var()
+        self.num_vars = num_vars
+        self.clauses = clauses
+        self.prefix = prefix if prefix is not None else []
+        self.symbols = symbols
+
+    @staticmethod
+    def from_formula(formula, environment=None):
+        """Converts a quantifier-free formula using the PolarityCNFizer."""
+        cnfizer = PolarityCNFizer(environment)
+        clauses = cnfizer.convert(formula)
+        symbols = dict(cnfizer.iter_atoms())
+        return DimacsCNF(cnfizer.max_var, clauses, symbols=symbols)
+
+    @staticmethod
+    def from_aig(aig, lits, symbols=None):
+        """Tseitin encoding of the cone of the given AIG literals.
+
+        Each AIG variable is mapped to the DIMACS variable with the same
+        index, and every literal in lits is asserted as a unit clause.
+        symbols optionally maps AIG variables to FNodes.
+        """
+        clauses = ClauseBuffer()
+
+        def dimacs(l):
+            return -(l >> 1) if l & 1 else (l >> 1)
+
+        for var in aig.cone(lits):
+            f0, f1 = aig.fanins(2 * var)
+            clauses.add_clause([-var, dimacs(f0)])
+            clauses.add_clause([-var, dimacs(f1)])
+            clauses.add_clause([var, -dimacs(f0), -dimacs(f1)])
+        for l in lits:
+            if l == aig.FALSE:
+                clauses.add_clause([])
+            elif l != aig.TRUE:
+                clauses.add_clause([dimacs(l)])
+        return DimacsCNF(aig.num_vars, clauses, symbols=symbols)
+
+    @staticmethod
+    def from_cnf_set(cnf):
+        """Converts the output of :py:meth:`CNFizer.convert`.
+
+        Each Boolean atom is associated with a variable in order of
+        appearance.
+        """
+        clauses = ClauseBuffer()
+        var_ids = {}
+        for clause in cnf:
+            lits = []
+            for lit in clause:
+                atom = lit.arg(0) if lit.is_not() else lit
+                var = var_ids.get(atom)
+                if var is None:
+                    var = len(var_ids) + 1
+                    var_ids[atom] = var
+                lits.append(-var if lit.is_not() else var)
+            clauses.add_clause(lits)
+        symbols = dict((v, a) for a, v in var_ids.items())
+        return DimacsCNF(len(var_ids), clauses, symbols=symbols)
+
+    @property
+    def is_qdimacs(self):
+        return len(self.prefix) > 0
+
+    def get_symbol(self, var, environment=None):
+        """Returns the FNode associated with var.
+
+        If no symbol is known for var, the Boolean symbol 'v<var>' is
+        used.
+        """
+        if self.symbols is not None and var in self.symbols:
+            return self.symbols[var]
+        mgr = (environment or get_env()).formula_manager
+        return mgr.Symbol("v%d" % var)
+
+    def to_formula(self, environment=None):
+        """Returns the FNode represented by the clauses.
+
+        The quantifier prefix (if any) is applied to the matrix.
+        """
+        mgr = (environment or get_env()).formula_manager
+        lits = self.clauses.literals
+        num_vars = max(self.num_vars, self.clauses.max_var())
+        atoms = [None] * (num_vars + 1)
+        negs = [None] * (num_vars + 1)
+        for l in set(lits):
+            var = abs(l)
+            if atoms[var] is None:
+                atoms[var] = self.get_symbol(var, environment)
+            if l < 0 and negs[var] is None:
+                negs[var] = mgr.Not(atoms[var])
+
+        offsets = self.clauses.offsets
+        conj = []
+        for i in xrange(len(self.clauses)):
+            conj.append(mgr.Or([atoms[l] if l > 0 else negs[-l]
+                                for l in lits[offsets[i]:offsets[i+1]]]))
+        res = mgr.And(conj)
+
+        for quantifier, variables in reversed(self.prefix):
+            qvars = [self.get_symbol(v, environment) for v in variables]
+            if quantifier == 'a':
+                res = mgr.ForAll(qvars, res)
+            else:
+                res = mgr.Exists(qvars, res)
+        return res
+
+    def write(self, stream, write_symbols=True):
+        """Writes the CNF in (Q)DIMACS format on the given text or
+        binary stream.
+
+        If write_symbols is True and symbols are known, a comment line
+        'c <var> <symbol>' is written for each of them.
+        """
+        write = _get_bytes_writer(stream)
+        if write_symbols and self.symbols:
+            write("".join("c %d %s\n" % (v, self.symbols[v])
+                          for v in sorted(self.symbols)).encode("utf-8"))
+        write(("p cnf %d %d\n" % (self.num_vars,
+                                   len(self.clauses))).encode("ascii"))
+        for quantifier, variables in self.prefix:
+            write(("%s %s 0\n" % (quantifier,
+                                   " ".join(str(v) for v in variables))
+                   ).encode("ascii"))
+
+        lits = self.clauses.literals
+        offsets = self.clauses.offsets
+        for start in xrange(0, len(self.clauses), WRITE_CHUNK_SIZE):
+            end = min(start + WRITE_CHUNK_SIZE, len(self.clauses))
+            write(_serialize_clauses(lits, offsets, start, end))
+
+    def __eq__(self, other):
+        return isinstance(other, DimacsCNF) and \
+            self.num_vars == other.num_vars and \
+            self.clauses.literals == other.clauses.literals and \
+            self.clauses.offsets == other.clauses.offsets and \
+            [(q, list(v)) for q, v in self.prefix] == \
+            [(q, list(v)) for q, v in other.prefix]
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def _get_bytes_writer(stream):
+    """Returns a function that writes bytes on stream.
+
+    Text streams backed by a binary buffer (e.g., files opened in text
+    mode) are flushed and bypassed; the data is decoded only for the
+    other text streams (e.g., StringIO).
+    """
+    if PY2 or not isinstance(stream, io.TextIOBase):
+        return stream.write
+    buf = getattr(stream, "buffer", None)
+    if buf is not None:
+        stream.flush()
+        return buf.write
+    return lambda data: stream.write(data.decode("utf-8"))
+
+
+def _serialize_clauses(lits, offsets, start, end):
+    """Returns the text of the clauses in [start, end), as bytes."""
+    if np is None:
+        tokens = []
+        for i in xrange(start, end):
+            tokens.extend(map(str, lits[offsets[i]:offsets[i+1]]))
+            tokens.append("0\n")
+        return " ".join(tokens).replace("\n ", "\n").encode("ascii")
+
+    base = offsets[start]
+    chunk = np.frombuffer(lits, dtype=np.intc)[base:offsets[end]]
+    # Each clause is terminated by a 0 inserted at its end
+    ends = np.frombuffer(offsets, dtype=np.intc)[start+1:end+1] - base
+    values = np.insert(chunk, ends, 0)
+    is_end = np.zeros(len(values), dtype=bool)
+    is_end[ends + np.arange(len(ends))] = True
+
+    # Each token is formatted right-aligned in a row of a byte matrix:
+    # padding, an optional sign, the digits and a separator (a space,
+    # or a newline after the terminating 0). The padding is then
+    # dropped by a single masked copy.
+    negative = values < 0
+    absolute = np.abs(values).astype(np.uint32)
+    row = len(str(int(absolute.max()))) + 2
+    grid = np.empty((len(values), row), dtype=np.uint8)
+    digits = np.ones(len(values), dtype=np.intp)
+    rest = absolute
+    ten = np.uint32(10)
+    for col in xrange(row - 2, 0, -1):
+        quotient = rest // ten
+        grid[:, col] = rest - quotient * ten
+        digits += quotient > 0
+        rest = quotient
+    grid[:, 1:row-1] += ord("0")
+    grid[:, row-1] = np.where(is_end, ord("\n"), ord(" "))
+    first = row - 1 - digits
+    sign = np.flatnonzero(negative)
+    grid.reshape(-1)[sign * row + first[sign] - 1] = ord("-")
+    res = grid[np.arange(row) >= (first - negative)[:, None]]
+    return res.tobytes()
+
+
+def write_dimacs(cnf, fname_or_stream, write_symbols=True):
+    """Writes cnf on the given file name or (text or binary) stream.
+
+    cnf can be a DimacsCNF, a ClauseBuffer or the output of
+    :py:meth:`CNFizer.convert`.
+    """
+    if isinstance(cnf, ClauseBuffer):
+        cnf = DimacsCNF(clauses=cnf)
+    elif not isinstance(cnf, DimacsCNF):
+        cnf = DimacsCNF.from_cnf_set(cnf)
+
+    if isinstance(fname_or_stream, string_types):
+        with open(fname_or_stream, "wb", buffering=1 << 20) as stream:
+            cnf.write(stream, write_symbols=write_symbols)
+    else:
+        cnf.write(fname_or_stream, write_symbols=write_symbols)
+
+
+def read_dimacs(source):
+    """Reads a DIMACS or QDIMACS file.
+
+    source can be a file name (the file is mapped in memory), an
+    object supporting the buffer protocol (e.g., bytes or mmap) or a
+    stream. Returns a DimacsCNF. Raises SyntaxError on malformed
+    input.
+    """
+    if isinstance(source, string_types):
+        with open(source, "rb") as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                data = b""
+            try:
+                return parse_dimacs(data)
+            finally:
+                if not isinstance(data, bytes):
+                    data.close()
+    elif hasattr(source, "read"):
+        data = source.read()
+        if not isinstance(data, bytes):
+            data = data.encode("ascii")
+        return parse_dimacs(data)
+    return parse_dimacs(source)
+
+
+def parse_dimacs(data):
+    """Parses the (Q)DIMACS content of a buffer of bytes.
+
+    See :py:func:`read_dimacs`.
+    """
+    num_vars, num_clauses = None, None
+    prefix = []
+    pos, size = 0, len(data)
+    while pos < size:
+        end = data.find(b"\n", pos)
+        if end < 0:
+            end = size
+        line = data[pos:end].strip()
+        if not line or line[:1] == b"c":
+            pos = end + 1
+        elif line[:1] == b"p":
+            tokens = line.split()
+            if len(tokens) != 4 or tokens[1] != b"cnf":
+                raise SyntaxError("Invalid DIMACS header: '%s'" %
+                                  line.decode("ascii", "replace"))
+            num_vars, num_clauses = int(tokens[2]), int(tokens[3])
+            pos = end + 1
+        elif line[:1] in (b"a", b"e"):
+            if num_vars is None:
+                raise SyntaxError("Quantifier prefix before header")
+            tokens = line.split()
+            if tokens[-1] != b"0":
+                raise SyntaxError("Unterminated quantifier block")
+            prefix.append((tokens[0].decode("ascii"),
+                           array('i', [int(t) for t in tokens[1:-1]])))
+            pos = end + 1
+        else:
+            break
+    if num_vars is None:
+        raise SyntaxError("Missing DIMACS header")
+
+    body = data[pos:]
+    # Some benchmark libraries terminate the file with '%'
+    stop = body.find(b"\n%")
+    if stop >= 0:
+        body = body[:stop]
+    if b"\nc" in body or body[:1] == b"c":
+        body = b"\n".join(l for l in body.split(b"\n")
+                          if l.lstrip()[:1] != b"c")
+
+    clauses = _parse_clauses(body)
+    if len(clauses) != num_clauses:
+        raise SyntaxError("Expected %d clauses, found %d" %
+                          (num_clauses, len(clauses)))
+    return DimacsCNF(num_vars, clauses, prefix)
+
+
+def _parse_clauses(body):
+    """Returns a ClauseBuffer with the 0-terminated clauses in body."""
+    res = ClauseBuffer()
+    if not body.strip():
+        return res
+    try:
+        if np is not None:
+            with warnings.catch_warnings():
+                # NumPy warns when the text cannot be parsed to its end
+                warnings.simplefilter("error", DeprecationWarning)
+                flat = np.fromstring(body, dtype=np.intc, sep=" ")
+        else:
+            flat = array('i', [int(t) for t in body.split()])
+    except (ValueError, OverflowError, DeprecationWarning) as ex:
+        raise SyntaxError("Invalid literal in DIMACS clauses: %s" % ex)
+
+    if len(flat) > 0 and flat[-1] != 0:
+        raise SyntaxError("Unterminated clause at end of file")
+
+    if np is not None:
+        zeros = np.flatnonzero(flat == 0)
+        literals = flat[flat != 0]
+        offsets = zeros - np.arange(len(zeros))
+        _frombytes(res.literals, literals.astype(np.intc).tobytes())
+        _frombytes(res.offsets, offsets.astype(np.intc).tobytes())
+    else:
+        start = 0
+        for i, l in enumerate(flat):
+            if l == 0:
+                res.literals.extend(flat[start:i])
+                res.offsets.append(len(res.literals))
+                start = i + 1
+    return res
+
+
+def _frombytes(arr, data):
+    if PY2:
+        arr.fromstring(data)
+    else:
+        arr.frombytes(data)
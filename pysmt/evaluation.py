@@ -0,0 +1,381 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Column-wise evaluation of a formula over many assignments.
+
+The BatchEvaluator walks the formula DAG once and, for each node,
+computes a NumPy array containing the value of the node under every
+assignment. Assignments are provided as columns: a dictionary mapping
+each symbol to an array of values.
+
+Values are represented as follows:
+
+ * BOOL: numpy.bool_
+ * INT:  numpy.int64 (or Python integers in exact mode)
+ * REAL: numpy.float64 (or Fractions in exact mode)
+ * BV:   numpy.uint64 for widths up to 64 bits, Python integers
+         (object arrays) for wider bit-vectors
+
+NumPy is an optional dependency of pySMT, and is required only when
+using this module.
+"""
+from functools import reduce
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import pysmt.walkers
+import pysmt.operators as op
+from pysmt.constants import Fraction
+
+
+MAX_NATIVE_BV_WIDTH = 64
+
+
+class BatchEvaluator(pysmt.walkers.DagWalker):
+    """Evaluates a formula over a batch of assignments.
+
+    If ``exact`` is True, Int and Real values are stored in object
+    arrays of Python integers and Fractions, thus avoiding overflows
+    and rounding errors at the price of speed.
+    """
+
+    def __init__(self, env=None, exact=False):
+        if np is None:
+            raise ImportError("NumPy is required for batch evaluation")
+        pysmt.walkers.DagWalker.__init__(self, env=env,
+                                         invalidate_memoization=True)
+        self.exact = exact
+        self.get_type = self.env.stc.get_type
+        self._columns = None
+
+        self.set_function(self.walk_relation, op.EQUALS, op.LE, op.LT,
+                          op.BV_ULE, op.BV_ULT)
+        self.set_function(self.walk_signed_relation, op.BV_SLE, op.BV_SLT)
+        self.set_function(self.walk_constant, *op.CONSTANTS)
+        self.set_function(self.walk_error, op.ALGEBRAIC_CONSTANT)
+
+    def evaluate(self, formula, assignments):
+        """Returns an array with the value of formula for each assignment.
+
+        assignments is a dictionary mapping symbols to array-like
+        columns of values. All columns must have the same length.
+        """
+        columns = {}
+        size = None
+        for symbol, values in assignments.items():
+            col = self._to_column(values, symbol.symbol_type())
+            if col.ndim != 1:
+                raise ValueError("Column for '%s' is not one-dimensional" %
+                                 symbol)
+            if size is None:
+                size = len(col)
+            elif size != len(col):
+                raise ValueError("Columns have different lengths (%d != %d)" %
+                                 (size, len(col)))
+            columns[symbol] = col
+        if size is None:
+            raise ValueError("Cannot evaluate a batch without columns")
+
+        self._columns = columns
+        try:
+            with np.errstate(all="ignore"):
+                res = self.walk(formula)
+        finally:
+            self._columns = None
+
+        out = np.empty(size, dtype=self._dtype(self.get_type(formula)))
+        out[...] = res
+        return out
+
+    def _dtype(self, ty):
+        if ty.is_bool_type():
+            return np.bool_
+        elif ty.is_int_type():
+            return object if self.exact else np.int64
+        elif ty.is_real_type():
+            return object if self.exact else np.float64
+        elif ty.is_bv_type():
+            if ty.width <= MAX_NATIVE_BV_WIDTH:
+                return np.uint64
+            return object
+        raise TypeError("Unsupported type in batch evaluation: %s" % ty)
+
+    def _to_column(self, values, ty):
+        dtype = self._dtype(ty)
+        if dtype is not object:
+            return np.asarray(values, dtype=dtype)
+        col = np.asarray(values, dtype=object)
+        if ty.is_real_type():
+            return _map_object(Fraction, col)
+        return _map_object(int, col)
+
+    #
+    # Bit-Vector helpers
+    #
+    def _bv_value(self, value, width):
+        """Returns the constant value in the representation for width."""
+        if width <= MAX_NATIVE_BV_WIDTH:
+            return np.uint64(value)
+        return int(value)
+
+    def _bv_cast(self, value, width):
+        """Converts a column into the representation for width."""
+        if width <= MAX_NATIVE_BV_WIDTH:
+            if isinstance(value, np.ndarray):
+                return value.astype(np.uint64)
+            return np.uint64(int(value))
+        if isinstance(value, np.ndarray):
+            return value.astype(object)
+        return int(value)
+
+    def _mask(self, width):
+        return self._bv_value(2**width - 1, width)
+
+    def _shl(self, left, right, width):
+        """Left shift, yielding 0 if right >= width."""
+        w = self._bv_value(width, width)
+        safe = np.minimum(right, self._bv_value(width - 1, width))
+        return np.where(right >= w, self._bv_value(0, width),
+                        (left << safe) & self._mask(width))
+
+    def _shr(self, left, right, width):
+        """Logical right shift, yielding 0 if right >= width."""
+        w = self._bv_value(width, width)
+        safe = np.minimum(right, self._bv_value(width - 1, width))
+        return np.where(right >= w, self._bv_value(0, width), left >> safe)
+
+    def _msb(self, value, width):
+        one = self._bv_value(1, width)
+        return ((value >> self._bv_value(width - 1, width)) & one) == one
+
+    def _neg(self, value, width):
+        return (self._bv_value(0, width) - value) & self._mask(width)
+
+    def _udiv(self, left, right, width):
+        zero = right == self._bv_value(0, width)
+        div = np.where(zero, self._bv_value(1, width), right)
+        return np.where(zero, self._mask(width), left // div)
+
+    def _urem(self, left, right, width):
+        zero = right == self._bv_value(0, width)
+        div = np.where(zero, self._bv_value(1, width), right)
+        return np.where(zero, left, left % div)
+
+    #
+    # Walking functions
+    #
+    def walk_symbol(self, formula, args, **kwargs):
+        try:
+            return self._columns[formula]
+        except KeyError:
+            raise ValueError("No column provided for symbol '%s'" % formula)
+
+    def walk_constant(self, formula, args, **kwargs):
+        value = formula.constant_value()
+        if formula.is_bool_constant():
+            return np.bool_(value)
+        elif formula.is_int_constant():
+            return int(value) if self.exact else np.int64(value)
+        elif formula.is_real_constant():
+            return Fraction(value) if self.exact else float(value)
+        assert formula.is_bv_constant()
+        return self._bv_value(value, formula.bv_width())
+
+    def walk_and(self, formula, args, **kwargs):
+        return reduce(np.logical_and, args)
+
+    def walk_or(self, formula, args, **kwargs):
+        return reduce(np.logical_or, args)
+
+    def walk_not(self, formula, args, **kwargs):
+        return np.logical_not(args[0])
+
+    def walk_implies(self, formula, args, **kwargs):
+        return np.logical_or(np.logical_not(args[0]), args[1])
+
+    def walk_iff(self, formula, args, **kwargs):
+        return np.equal(args[0], args[1])
+
+    def walk_ite(self, formula, args, **kwargs):
+        return np.where(args[0], args[1], args[2])
+
+    def walk_relation(self, formula, args, **kwargs):
+        left, right = args
+        if formula.is_equals():
+            res = left == right
+        elif formula.is_le() or formula.is_bv_ule():
+            res = left <= right
+        else:
+            res = left < right
+        return np.asarray(res, dtype=np.bool_)
+
+    def walk_signed_relation(self, formula, args, **kwargs):
+        # Flipping the sign bit maps the signed order onto the
+        # unsigned one.
+        width = formula.arg(0).bv_width()
+        sign = self._bv_value(2**(width-1), width)
+        left, right = args[0] ^ sign, args[1] ^ sign
+        if formula.is_bv_sle():
+            return np.asarray(left <= right, dtype=np.bool_)
+        return np.asarray(left < right, dtype=np.bool_)
+
+    def walk_plus(self, formula, args, **kwargs):
+        return reduce(np.add, args)
+
+    def walk_minus(self, formula, args, **kwargs):
+        return args[0] - args[1]
+
+    def walk_times(self, formula, args, **kwargs):
+        return reduce(np.multiply, args)
+
+    def walk_div(self, formula, args, **kwargs):
+        return args[0] / args[1]
+
+    def walk_pow(self, formula, args, **kwargs):
+        return args[0] ** args[1]
+
+    def walk_toreal(self, formula, args, **kwargs):
+        if self.exact:
+            return _map_object(Fraction, args[0])
+        return np.asarray(args[0], dtype=np.float64)
+
+    def walk_bv_not(self, formula, args, **kwargs):
+        return args[0] ^ self._mask(formula.bv_width())
+
+    def walk_bv_and(self, formula, args, **kwargs):
+        return args[0] & args[1]
+
+    def walk_bv_or(self, formula, args, **kwargs):
+        return args[0] | args[1]
+
+    def walk_bv_xor(self, formula, args, **kwargs):
+        return args[0] ^ args[1]
+
+    def walk_bv_neg(self, formula, args, **kwargs):
+        return self._neg(args[0], formula.bv_width())
+
+    def walk_bv_add(self, formula, args, **kwargs):
+        return (args[0] + args[1]) & self._mask(formula.bv_width())
+
+    def walk_bv_sub(self, formula, args, **kwargs):
+        return (args[0] - args[1]) & self._mask(formula.bv_width())
+
+    def walk_bv_mul(self, formula, args, **kwargs):
+        return (args[0] * args[1]) & self._mask(formula.bv_width())
+
+    def walk_bv_udiv(self, formula, args, **kwargs):
+        return self._udiv(args[0], args[1], formula.bv_width())
+
+    def walk_bv_urem(self, formula, args, **kwargs):
+        return self._urem(args[0], args[1], formula.bv_width())
+
+    def walk_bv_sdiv(self, formula, args, **kwargs):
+        width = formula.bv_width()
+        left, right = args
+        l_neg, r_neg = self._msb(left, width), self._msb(right, width)
+        abs_l = np.where(l_neg, self._neg(left, width), left)
+        abs_r = np.where(r_neg, self._neg(right, width), right)
+        res = self._udiv(abs_l, abs_r, width)
+        return np.where(l_neg != r_neg, self._neg(res, width), res)
+
+    def walk_bv_srem(self, formula, args, **kwargs):
+        width = formula.bv_width()
+        left, right = args
+        l_neg, r_neg = self._msb(left, width), self._msb(right, width)
+        abs_l = np.where(l_neg, self._neg(left, width), left)
+        abs_r = np.where(r_neg, self._neg(right, width), right)
+        res = self._urem(abs_l, abs_r, width)
+        return np.where(l_neg, self._neg(res, width), res)
+
+    def walk_bv_lshl(self, formula, args, **kwargs):
+        return self._shl(args[0], args[1], formula.bv_width())
+
+    def walk_bv_lshr(self, formula, args, **kwargs):
+        return self._shr(args[0], args[1], formula.bv_width())
+
+    def walk_bv_ashr(self, formula, args, **kwargs):
+        width = formula.bv_width()
+        left, right = args
+        mask = self._mask(width)
+        fill = mask ^ self._shr(mask, right, width)
+        res = self._shr(left, right, width)
+        return np.where(self._msb(left, width), res | fill, res)
+
+    def walk_bv_rol(self, formula, args, **kwargs):
+        width = formula.bv_width()
+        step = formula.bv_rotation_step() % width
+        if step == 0:
+            return args[0]
+        left = (args[0] << self._bv_value(step, width)) & self._mask(width)
+        return left | (args[0] >> self._bv_value(width - step, width))
+
+    def walk_bv_ror(self, formula, args, **kwargs):
+        width = formula.bv_width()
+        step = formula.bv_rotation_step() % width
+        if step == 0:
+            return args[0]
+        left = (args[0] << self._bv_value(width - step, width)) & \
+               self._mask(width)
+        return left | (args[0] >> self._bv_value(step, width))
+
+    def walk_bv_concat(self, formula, args, **kwargs):
+        width = formula.bv_width()
+        left = self._bv_cast(args[0], width)
+        right = self._bv_cast(args[1], width)
+        shift = self._bv_value(formula.arg(1).bv_width(), width)
+        return (left << shift) | right
+
+    def walk_bv_extract(self, formula, args, **kwargs):
+        src_width = formula.arg(0).bv_width()
+        start = self._bv_value(formula.bv_extract_start(), src_width)
+        res = (args[0] >> start) & self._mask(formula.bv_width())
+        return self._bv_cast(res, formula.bv_width())
+
+    def walk_bv_zext(self, formula, args, **kwargs):
+        return self._bv_cast(args[0], formula.bv_width())
+
+    def walk_bv_sext(self, formula, args, **kwargs):
+        width = formula.bv_width()
+        src_width = formula.arg(0).bv_width()
+        value = self._bv_cast(args[0], width)
+        fill = self._bv_value((2**width - 1) ^ (2**src_width - 1), width)
+        return np.where(self._msb(args[0], src_width), value | fill, value)
+
+    def walk_bv_comp(self, formula, args, **kwargs):
+        return np.where(args[0] == args[1],
+                        self._bv_value(1, 1), self._bv_value(0, 1))
+
+# EOC BatchEvaluator
+
+
+def _map_object(function, values):
+    """Applies function to each element, returning an object array."""
+    return np.frompyfunc(function, 1, 1)(values)
+
+
+def evaluate_batch(formula, assignments, exact=False, environment=None):
+    """Evaluates formula over a batch of assignments.
+
+    assignments maps each free symbol of formula to an array-like
+    column of values. The result is a NumPy array containing the value
+    of formula for each row. See :py:class:`BatchEvaluator`.
+    """
+    evaluator = BatchEvaluator(env=environment, exact=exact)
+    return evaluator.evaluate(formula, assignments)
@@ -27,6 +27,10 @@ class SolverReturnedUnknownResultError(Exception):
     """This exception is raised if a solver returns 'unknown' as a result"""
     pass
 
+class SolverTimeoutError(SolverReturnedUnknownResultError):
+    """The solver did not terminate within the given timeout."""
+    pass
+
 class UnknownSolverAnswerError(Exception):
     """Raised when the a solver returns an invalid response."""
     pass
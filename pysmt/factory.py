@@ -23,6 +23,7 @@ This makes it possible to write algorithms that do not depend on a
 particular solver.
 """
 
+import atexit
 from functools import partial
 from six import iteritems
 
@@ -37,7 +38,7 @@ from pysmt.oracles import get_logic
 from pysmt.solvers.qelim import ShannonQuantifierEliminator
 
 DEFAULT_SOLVER_PREFERENCE_LIST = ['msat', 'z3', 'cvc4', 'yices', 'btor',
-                                  'picosat', 'bdd']
+                                  'picosat', 'bdd', 'cdcl']
 DEFAULT_QELIM_PREFERENCE_LIST = ['z3', 'msat_fm', 'msat_lw', 'bdd', 'shannon']
 DEFAULT_INTERPOLATION_PREFERENCE_LIST = ['msat', 'z3']
 DEFAULT_LOGIC = QF_UFLIRA
@@ -63,6 +64,7 @@ class Factory(object):
         self._all_qelims = None
         self._all_interpolators = None
         self._generic_solvers = {}
+        self._process_pool = None
 
         #
         if solver_preference_list is None:
@@ -84,7 +86,13 @@ class Factory(object):
         self._get_available_interpolators()
 
 
-    def get_solver(self, quantified=False, name=None, logic=None, **options):
+    def get_solver(self, quantified=False, name=None, logic=None,
+                   cache=None, **options):
+        """Returns a solver instance.
+
+        If cache is not None (a ResultCache or the path of its
+        database), the solver is wrapped in a CachingSolver.
+        """
         assert quantified is False or logic is None, \
             "Cannot specify both quantified and logic."
 
@@ -99,9 +107,13 @@ class Factory(object):
                                   name=name,
                                   logic=logic)
 
-        return SolverClass(environment=self.environment,
-                           logic=closer_logic,
-                           **options)
+        solver = SolverClass(environment=self.environment,
+                             logic=closer_logic,
+                             **options)
+        if cache is not None:
+            from pysmt.caching import CachingSolver
+            solver = CachingSolver(solver, cache)
+        return solver
 
 
     def get_unsat_core_solver(self, quantified=False, name=None,
@@ -205,12 +217,29 @@ class Factory(object):
             "Cannot find a matching solver in the preference list: %s " % solvers)
 
 
-    def add_generic_solver(self, name, args, logics, unsat_core_support=False):
+    @property
+    def process_pool(self):
+        """The SolverProcessPool used by the generic solvers."""
+        if self._process_pool is None:
+            from pysmt.smtlib.solver import SolverProcessPool
+            self._process_pool = SolverProcessPool()
+            # The idle processes are terminated when Python exits
+            atexit.register(self._process_pool.close)
+        return self._process_pool
+
+    def add_generic_solver(self, name, args, logics, unsat_core_support=False,
+                           pooled=True):
+        """Defines a solver that is used through its SMT-LIB interface.
+
+        If pooled is True, the solver processes are kept in
+        process_pool and reused by the following solver instances.
+        """
         from pysmt.smtlib.solver import SmtLibSolver
         if name in self._all_solvers:
             raise SolverRedefinitionError("Solver %s already defined" % name)
         self._generic_solvers[name] = (args, logics)
-        solver = partial(SmtLibSolver, args, LOGICS=logics)
+        pool = self.process_pool if pooled else None
+        solver = partial(SmtLibSolver, args, LOGICS=logics, pool=pool)
         solver.LOGICS = logics
         solver.UNSAT_CORE_SUPPORT = unsat_core_support
         self._all_solvers[name] = solver
@@ -270,6 +299,10 @@ class Factory(object):
         except SolverAPINotFound:
             pass
 
+        # Pure-python always present
+        from pysmt.solvers.cdcl import CDCLSolver
+        installed_solvers['cdcl'] = CDCLSolver
+
         # If ENV_SOLVER_LIST is set, only a subset of the installed
         # solvers will be available.
         if ENV_SOLVER_LIST is not None:
@@ -450,10 +483,12 @@ class Factory(object):
     ##
     ## Wrappers: These functions are exported in shortcuts
     ##
-    def Solver(self, quantified=False, name=None, logic=None, **options):
+    def Solver(self, quantified=False, name=None, logic=None, cache=None,
+               **options):
         return self.get_solver(quantified=quantified,
                                name=name,
                                logic=logic,
+                               cache=cache,
                                **options)
 
     def UnsatCoreSolver(self, quantified=False, name=None, logic=None,
@@ -514,7 +549,33 @@ class Factory(object):
                             res.append(mgr.Not(a))
                 return mgr.And(res)
 
-    def get_unsat_core(self, clauses, solver_name=None, logic=None):
+    def iter_models(self, formula, important=None, limit=None,
+                    minimize=False, solver_name=None, logic=None):
+        """Returns a generator over the models of formula.
+
+        See :py:func:`Solver.iter_models`. If minimize is True, each
+        model is shrunk to an implicant of the formula.
+        """
+        if logic is None or logic == AUTO_LOGIC:
+            logic = get_logic(formula, self.environment)
+
+        with self.Solver(name=solver_name, logic=logic) \
+             as solver:
+            solver.add_assertion(formula)
+            implicant_of = formula if minimize else None
+            for model in solver.iter_models(important=important,
+                                            limit=limit,
+                                            implicant_of=implicant_of):
+                yield model
+
+    def get_unsat_core(self, clauses, solver_name=None, logic=None,
+                       minimize=None):
+        """Returns the unsat core of the clauses, or None if they are
+        satisfiable.
+
+        If minimize is True or the name of a MUS algorithm (see
+        pysmt.mus.get_mus), the core is minimized.
+        """
         if logic is None or logic == AUTO_LOGIC:
             logic = get_logic(self.environment.formula_manager.And(clauses),
                               self.environment)
@@ -527,7 +588,15 @@ class Factory(object):
             if check:
                 return None
 
-            return solver.get_unsat_core()
+            core = solver.get_unsat_core()
+
+        if minimize:
+            from pysmt.mus import get_mus
+            algorithm = "deletion" if minimize is True else minimize
+            core = set(get_mus(core, algorithm=algorithm,
+                               solver_name=solver_name, logic=logic,
+                               environment=self.environment))
+        return core
 
     def is_valid(self, formula, solver_name=None, logic=None):
         if logic is None or logic == AUTO_LOGIC:
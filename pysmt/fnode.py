@@ -133,6 +133,15 @@ class FNode(object):
         """
         return _env().sizeo.get_size(self, measure)
 
+    def structural_hash(self, alpha=False, commutative=False):
+        """Return a hash of the formula that does not depend on the
+        Environment.
+
+        See :py:mod:`pysmt.hashing`
+        """
+        return _mgr().structural_hash(self, alpha=alpha,
+                                      commutative=commutative)
+
     def get_type(self):
         """Return the type of the formula by calling the Type-Checker.
 
@@ -36,6 +36,7 @@ import pysmt.operators as op
 
 from pysmt.fnode import FNode, FNodeContent
 from pysmt.exceptions import UndefinedSymbolError
+from pysmt.hashing import StructuralHasher
 from pysmt.walkers.identitydag import IdentityDagWalker
 from pysmt.constants import Fraction
 from pysmt.constants import (is_pysmt_fraction, is_python_rational,
@@ -53,7 +54,12 @@ class FormulaManager(object):
         # Attributes for handling symbols and formulae
         self.formulae = {}
         self.symbols = {}
+        # Symbols are numbered densely, in order of creation
+        self._symbol_index = {}
+        self._symbols_by_index = []
         self._fresh_guess = 0
+        # Structural hashers, by (alpha, commutative)
+        self._structural_hashers = {}
         # get_type() from TypeChecker will be initialized lazily
         self.get_type = None
         self._next_free_id = 1
@@ -94,6 +100,8 @@ class FormulaManager(object):
                              args=tuple(),
                              payload=(name, typename))
         self.symbols[name] = n
+        self._symbol_index[n] = len(self._symbols_by_index)
+        self._symbols_by_index.append(n)
         return n
 
     def new_fresh_symbol(self, typename, base="FV%d"):
@@ -116,6 +124,43 @@ class FormulaManager(object):
     def get_all_symbols(self):
         return self.symbols.values()
 
+    def get_symbol_index(self, symbol):
+        """Returns the index of the symbol.
+
+        Symbols are numbered from 0, in order of creation.
+        """
+        return self._symbol_index[symbol]
+
+    def get_symbol_by_index(self, index):
+        """Returns the symbol with the given index."""
+        return self._symbols_by_index[index]
+
+    def _get_structural_hasher(self, alpha, commutative):
+        key = (bool(alpha), bool(commutative))
+        hasher = self._structural_hashers.get(key)
+        if hasher is None:
+            hasher = StructuralHasher(self.env, alpha=alpha,
+                                      commutative=commutative)
+            self._structural_hashers[key] = hasher
+        return hasher
+
+    def structural_hash(self, formula, alpha=False, commutative=False):
+        """Returns the structural hash of the formula.
+
+        The hash does not depend on the Environment, and is memoized.
+        See pysmt.hashing for the meaning of the options.
+        """
+        hasher = self._get_structural_hasher(alpha, commutative)
+        return hasher.get_hash(formula)
+
+    def get_by_structural_hash(self, digest, alpha=False, commutative=False):
+        """Returns a formula that has the given structural hash, or None.
+
+        Only the formulae whose hash has been computed (with the same
+        options) are considered.
+        """
+        return self._get_structural_hasher(alpha, commutative).lookup(digest)
+
     def get_or_create_symbol(self, name, typename):
         s = self.symbols.get(name, None)
         if s is None:
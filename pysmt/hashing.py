@@ -0,0 +1,150 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Structural hashing of formulae.
+
+FNode.__hash__ depends on the order in which the nodes are created.
+The structural hash of a formula only depends on its structure (node
+types, types, payloads and the structural hashes of the children),
+and is the same in every Environment and process. It is a 128-bit
+digest, represented as a hexadecimal string.
+
+Optionally, the hash can be invariant under renaming of the bound
+variables (alpha=True) and under permutation of the arguments of
+commutative operators (commutative=True).
+"""
+
+import hashlib
+
+import pysmt.operators as op
+
+try:
+    from hashlib import blake2b
+
+    def _digest(text):
+        return blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    HASH_ALGORITHM = "blake2b-128"
+except ImportError:
+    # BLAKE2 is available only from Python 3.6
+    def _digest(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+    HASH_ALGORITHM = "sha256-128"
+
+
+def encode_payload(payload):
+    """Returns a string representing the payload of a node, that does
+    not depend on the Python version."""
+    if payload is None:
+        return ""
+    if isinstance(payload, tuple):
+        return "(%s)" % ",".join(encode_payload(p) for p in payload)
+    text = str(payload)
+    return "%d:%s" % (len(text), text)
+
+
+class StructuralHasher(object):
+    """Computes and memoizes the structural hashes of the formulae of
+    an Environment.
+
+    The hashes of the formulae that are not in the scope of a bound
+    variable are stored in memo, and indexed in index (that maps each
+    hash to the first formula that had it).
+    """
+
+    def __init__(self, environment, alpha=False, commutative=False):
+        self.env = environment
+        self.alpha = alpha
+        self.commutative = commutative
+        self.memo = {}
+        self.index = {}
+
+    def get_hash(self, formula):
+        """Returns the structural hash of formula."""
+        res = self.memo.get(formula)
+        if res is None:
+            self._compute(formula, {}, 0, self.memo)
+            res = self.memo[formula]
+        return res
+
+    def lookup(self, digest):
+        """Returns a formula with the given hash, or None."""
+        return self.index.get(digest)
+
+    def _children(self, node):
+        if node.is_function_application():
+            return (node.function_name(),) + node.args()
+        if node.is_quantifier() and not self.alpha:
+            return tuple(node.quantifier_vars()) + node.args()
+        return node.args()
+
+    def _compute(self, root, bound, depth, memo):
+        """Computes the hash of root and of its sub-formulae.
+
+        bound maps the variables bound by the depth enclosing
+        quantified variables to their binding depth: they are hashed by
+        their de Bruijn index.
+        """
+        get_type = self.env.stc.get_type
+        register = memo is self.memo
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node in memo:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                if not (self.alpha and node.is_quantifier()):
+                    for c in self._children(node):
+                        if c not in memo:
+                            stack.append((c, False))
+                continue
+
+            if node.is_symbol() and node in bound:
+                label = "B%d:%s" % (depth - bound[node], node.symbol_type())
+                children = []
+            elif node.is_quantifier() and self.alpha:
+                qvars = node.quantifier_vars()
+                inner = dict(bound)
+                for i, v in enumerate(qvars):
+                    inner[v] = depth + i
+                body = node.arg(0)
+                body_memo = {}
+                self._compute(body, inner, depth + len(qvars), body_memo)
+                label = "%d|%s" % (node.node_type(),
+                                   ",".join(str(v.symbol_type())
+                                            for v in qvars))
+                children = [body_memo[body]]
+            else:
+                if node.is_function_application() or node.is_quantifier():
+                    # The symbols in the payload are children
+                    payload = ""
+                else:
+                    payload = encode_payload(node._content.payload)
+                label = "%d|%s|%s" % (node.node_type(), get_type(node),
+                                      payload)
+                children = [memo[c] for c in self._children(node)]
+                if self.commutative and \
+                   node.node_type() in op.COMMUTATIVE_OPERATORS:
+                    children.sort()
+            res = _digest("%s[%s]" % (label, " ".join(children)))
+            memo[node] = res
+            if register:
+                self.index.setdefault(res, node)
+
+# EOC StructuralHasher
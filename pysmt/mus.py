@@ -0,0 +1,341 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Extraction of minimal unsatisfiable subsets (MUS).
+
+A MUS of an unsatisfiable set of constraints is an unsatisfiable
+subset that becomes satisfiable if any of its constraints is removed.
+Each constraint c_i is asserted once as (s_i -> c_i), where s_i is a
+fresh selector literal, and subsets are checked by solving under the
+assumptions {s_i}: the same solver context is reused by all the
+checks.
+
+The algorithms always keep an unsatisfiable subset (core): if the
+time budget expires, the best core found so far is returned.
+"""
+
+import time
+import multiprocessing
+
+from pysmt.environment import get_env
+from pysmt.logics import AUTO as AUTO_LOGIC
+from pysmt.logics import convert_logic_from_string
+from pysmt.oracles import get_logic
+from pysmt.typing import BOOL
+from pysmt.exceptions import SolverTimeoutError
+from pysmt.components import _to_smtlib, _from_smtlib
+
+
+class MUSExtractor(object):
+    """Extracts a MUS of a list (or dict of named) constraints.
+
+    After each check, callback (if given) is called with the
+    extractor, whose attributes report the progress:
+
+    * checks: the number of satisfiability checks performed;
+    * core: the smallest unsatisfiable subset found so far;
+    * necessary: the number of constraints known to belong to the MUS.
+
+    If time_budget (seconds) expires, the extraction stops and
+    returns core; in this case minimal is False.
+    """
+
+    def __init__(self, constraints, solver_name=None, logic=None,
+                 callback=None, time_budget=None, environment=None):
+        self.env = environment if environment is not None else get_env()
+        if isinstance(constraints, dict):
+            self.names = list(constraints.keys())
+            self.constraints = [constraints[n] for n in self.names]
+        else:
+            self.names = None
+            self.constraints = list(constraints)
+        mgr = self.env.formula_manager
+        if logic is None or logic == AUTO_LOGIC:
+            logic = get_logic(mgr.And(self.constraints), self.env)
+        self.solver_name = solver_name
+        self.logic = logic
+        self.callback = callback
+        self.time_budget = time_budget
+        self.checks = 0
+        self.necessary = 0
+        self.minimal = False
+        self._best = list(range(len(self.constraints)))
+        self._deadline = None
+        self._use_timeout = True
+        self._solver = None
+        self.selectors = [mgr.FreshSymbol(BOOL, "MUS_%d")
+                          for _ in self.constraints]
+
+    @property
+    def core(self):
+        """The smallest unsatisfiable subset found so far."""
+        return self._result(self._best)
+
+    def _result(self, indices):
+        indices = sorted(indices)
+        if self.names is not None:
+            return dict((self.names[i], self.constraints[i])
+                        for i in indices)
+        return [self.constraints[i] for i in indices]
+
+    def _guarded(self, i):
+        return self.env.formula_manager.Implies(self.selectors[i],
+                                                self.constraints[i])
+
+    def _get_solver(self):
+        if self._solver is None:
+            self._solver = self.env.factory.Solver(name=self.solver_name,
+                                                   logic=self.logic)
+            for i in range(len(self.constraints)):
+                self._solver.add_assertion(self._guarded(i))
+        return self._solver
+
+    def _remaining_time(self):
+        if self._deadline is None:
+            return None
+        remaining = self._deadline - time.time()
+        if remaining <= 0:
+            raise SolverTimeoutError("MUS extraction time budget expired")
+        return remaining
+
+    def _notify(self):
+        if self.callback is not None:
+            self.callback(self)
+
+    def _update_best(self, indices):
+        if len(indices) < len(self._best):
+            self._best = list(indices)
+
+    def is_sat(self, indices):
+        """Checks the satisfiability of the subset of the constraints
+        with the given indices."""
+        solver = self._get_solver()
+        assumptions = [self.selectors[i] for i in indices]
+        timeout = self._remaining_time()
+        if timeout is not None and self._use_timeout:
+            try:
+                res = solver.solve(assumptions, timeout=timeout)
+            except NotImplementedError:
+                self._use_timeout = False
+                res = solver.solve(assumptions)
+        else:
+            res = solver.solve(assumptions)
+        self.checks += 1
+        if not res:
+            self._update_best(indices)
+        self._notify()
+        return res
+
+    def _run(self, algorithm, *args):
+        self.checks = 0
+        self.necessary = 0
+        self.minimal = False
+        self._best = list(range(len(self.constraints)))
+        if self.time_budget is not None:
+            self._deadline = time.time() + self.time_budget
+        try:
+            mus = algorithm(*args)
+        except SolverTimeoutError:
+            return self.core
+        self._best = mus
+        self.necessary = len(mus)
+        self.minimal = True
+        return self.core
+
+    def deletion(self):
+        """Deletion-based extraction: each constraint of the core is
+        removed in turn, and put back if the rest becomes
+        satisfiable."""
+        return self._run(self._deletion)
+
+    def _deletion(self):
+        core = list(range(len(self.constraints)))
+        if self.is_sat(core):
+            raise ValueError("The constraints are satisfiable")
+        i = 0
+        while i < len(core):
+            candidate = core[:i] + core[i+1:]
+            if self.is_sat(candidate):
+                self.necessary += 1
+                i += 1
+            else:
+                core = candidate
+        return core
+
+    def quickxplain(self):
+        """QuickXplain (Junker, 2004): divide and conquer extraction,
+        that requires fewer checks than deletion when the MUS is
+        small."""
+        return self._run(self._quickxplain_top)
+
+    def _quickxplain_top(self):
+        core = list(range(len(self.constraints)))
+        if self.is_sat(core):
+            raise ValueError("The constraints are satisfiable")
+        return self._quickxplain([], False, core)
+
+    def _quickxplain(self, background, has_delta, constraints):
+        """Returns a minimal subset X of constraints such that
+        background + X is unsatisfiable."""
+        if has_delta and not self.is_sat(background):
+            return []
+        if len(constraints) == 1:
+            self.necessary += 1
+            return list(constraints)
+        half = len(constraints) // 2
+        c1, c2 = constraints[:half], constraints[half:]
+        d2 = self._quickxplain(background + c1, len(c1) > 0, c2)
+        d1 = self._quickxplain(background + d2, len(d2) > 0, c1)
+        return d1 + d2
+
+    def parallel(self, processes=None, chunk_size=None):
+        """Chunked deletion in a pool of processes.
+
+        The candidates for removal are partitioned in chunks, and the
+        removal of each chunk is checked in parallel; each worker
+        process keeps its own solver context. Unsatisfiable removals
+        are applied, and the chunks that cannot be removed are split,
+        until they contain a single (necessary) constraint.
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        return self._run(self._parallel, processes, chunk_size)
+
+    def _parallel(self, processes, chunk_size):
+        core = list(range(len(self.constraints)))
+        if self.is_sat(core):
+            raise ValueError("The constraints are satisfiable")
+        if chunk_size is None:
+            chunk_size = max(1, len(core) // (4 * processes))
+        chunks = [core[i:i+chunk_size]
+                  for i in range(0, len(core), chunk_size)]
+        # A chunk that cannot be removed from a core cannot be removed
+        # from its subsets either
+        known_sat = [False] * len(chunks)
+
+        mgr = self.env.formula_manager
+        text = _to_smtlib(mgr.And([self._guarded(i)
+                                   for i in range(len(self.constraints))]))
+        names = [s.symbol_name() for s in self.selectors]
+        logic = str(self.logic) if self.logic is not None else None
+        pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                    initargs=(text, names, self.solver_name,
+                                              logic))
+        try:
+            while True:
+                todo = [j for j in range(len(chunks)) if not known_sat[j]]
+                if not todo:
+                    if all(len(c) == 1 for c in chunks):
+                        return core
+                    new_chunks, known_sat = [], []
+                    for c in chunks:
+                        if len(c) == 1:
+                            new_chunks.append(c)
+                            known_sat.append(True)
+                        else:
+                            half = len(c) // 2
+                            new_chunks.extend([c[:half], c[half:]])
+                            known_sat.extend([False, False])
+                    chunks = new_chunks
+                    continue
+
+                timeout = self._remaining_time()
+                tasks = []
+                for j in todo:
+                    removed = set(chunks[j])
+                    tasks.append((j, [i for i in core if i not in removed]))
+                result = pool.map_async(_check_task, tasks)
+                results = result.get(timeout)
+                self.checks += len(results)
+                unsat = [j for j, res in results if not res]
+                for j, res in results:
+                    if res:
+                        known_sat[j] = True
+                        if len(chunks[j]) == 1:
+                            self.necessary += 1
+                if unsat:
+                    j = unsat[0]
+                    removed = set(chunks[j])
+                    core = [i for i in core if i not in removed]
+                    self._update_best(core)
+                    del chunks[j]
+                    del known_sat[j]
+                self._notify()
+        except multiprocessing.TimeoutError:
+            raise SolverTimeoutError("MUS extraction time budget expired")
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def exit(self):
+        if self._solver is not None:
+            self._solver.exit()
+            self._solver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.exit()
+
+# EOC MUSExtractor
+
+
+def get_mus(constraints, algorithm="deletion", solver_name=None, logic=None,
+            callback=None, time_budget=None, processes=None,
+            environment=None):
+    """Returns a minimal unsatisfiable subset of the constraints (a list,
+    or a dict of named constraints).
+
+    algorithm is one of "deletion", "quickxplain" and "parallel". If
+    time_budget expires, the smallest unsatisfiable subset found so
+    far is returned. See MUSExtractor.
+    """
+    with MUSExtractor(constraints, solver_name=solver_name, logic=logic,
+                      callback=callback, time_budget=time_budget,
+                      environment=environment) as extractor:
+        if algorithm == "deletion":
+            return extractor.deletion()
+        elif algorithm == "quickxplain":
+            return extractor.quickxplain()
+        elif algorithm == "parallel":
+            return extractor.parallel(processes=processes)
+        raise ValueError("Unknown MUS algorithm '%s'" % algorithm)
+
+
+# Solver of the worker process, and the selectors of the constraints
+_WORKER = {}
+
+
+def _init_worker(text, names, solver_name, logic):
+    env = get_env()
+    mgr = env.formula_manager
+    if logic is not None:
+        logic = convert_logic_from_string(logic)
+    solver = env.factory.Solver(name=solver_name, logic=logic)
+    solver.add_assertion(_from_smtlib(text, env))
+    _WORKER["solver"] = solver
+    _WORKER["selectors"] = [mgr.Symbol(n, BOOL) for n in names]
+
+
+def _check_task(task):
+    """Worker function: checks the satisfiability of a subset of the
+    constraints, given by their indices."""
+    j, indices = task
+    selectors = _WORKER["selectors"]
+    res = _WORKER["solver"].solve([selectors[i] for i in indices])
+    return j, res
@@ -83,6 +83,10 @@ IRA_OPERATORS = frozenset([PLUS, MINUS, TIMES, TOREAL, DIV, POW])
 
 ARRAY_OPERATORS = frozenset([ARRAY_SELECT, ARRAY_STORE, ARRAY_VALUE])
 
+COMMUTATIVE_OPERATORS = frozenset([AND, OR, IFF, EQUALS, PLUS, TIMES,
+                                   BV_AND, BV_OR, BV_XOR, BV_ADD, BV_MUL,
+                                   BV_COMP])
+
 CUSTOM_NODE_TYPES = []
 
 THEORY_OPERATORS = IRA_OPERATORS | BV_OPERATORS | ARRAY_OPERATORS
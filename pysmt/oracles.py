@@ -21,6 +21,7 @@ properties of formulae.
  * QuantifierOracle says whether a formula is quantifier free
  * TheoryOracle says which logic is used in the formula.
  * FreeVarsOracle says which variables are free in the formula
+ * FreeVarsBitsetOracle does the same, using bitsets over symbol indices
 """
 
 import pysmt.walkers
@@ -301,6 +302,15 @@ DEPENDENCIES_SIMPLE_ARGS = (set(op.ALL_TYPES) - \
                            (set([op.SYMBOL, op.FUNCTION]) | op.QUANTIFIERS | op.CONSTANTS))
 
 class FreeVarsOracle(pysmt.walkers.DagWalker):
+    """Returns the set of free variables of a formula.
+
+    Sets are hash-consed: identical sets are stored only once, and a
+    node whose free variables are the same as one of its children
+    shares the set of the child.
+    """
+
+    EMPTY = frozenset()
+
     def __init__(self, env=None):
         pysmt.walkers.DagWalker.__init__(self, env=env)
 
@@ -320,38 +330,179 @@ class FreeVarsOracle(pysmt.walkers.DagWalker):
         self.set_function(self.walk_symbol, op.SYMBOL)
         self.set_function(self.walk_function, op.FUNCTION)
 
+        self._interned = {}
+
 
     def get_free_variables(self, formula):
         """Returns the set of Symbols appearing free in the formula."""
         return self.walk(formula)
 
+    def depends_on(self, formula, var):
+        """Returns whether var appears free in the formula.
+
+        If the free variables of the formula have not been computed
+        yet, the DAG is visited looking for var, without building any
+        set. The visit is pruned on the sub-formulae whose free
+        variables are already known.
+        """
+        if formula in self.memoization:
+            return var in self.memoization[formula]
+        visited = set()
+        stack = [formula]
+        while stack:
+            f = stack.pop()
+            if f in visited:
+                continue
+            visited.add(f)
+            if f == var:
+                return True
+            known = self.memoization.get(f)
+            if known is not None:
+                if var in known:
+                    return True
+            elif f.is_function_application() and f.function_name() == var:
+                return True
+            elif not (f.is_quantifier() and var in f.quantifier_vars()):
+                stack.extend(f.args())
+        return False
+
+    def _intern(self, res):
+        return self._interned.setdefault(res, res)
+
+    def _union(self, sets):
+        largest = FreeVarsOracle.EMPTY
+        others = []
+        for s in sets:
+            if len(s) > len(largest):
+                if largest:
+                    others.append(largest)
+                largest = s
+            elif s and s is not largest:
+                others.append(s)
+        if not others:
+            return largest
+        res = largest.union(*others)
+        if len(res) == len(largest):
+            return largest
+        return self._intern(res)
+
     def walk_simple_args(self, formula, args, **kwargs):
         #pylint: disable=unused-argument
-        res = set()
-        for arg in args:
-            res.update(arg)
-        return frozenset(res)
+        return self._union(args)
 
     def walk_quantifier(self, formula, args, **kwargs):
         #pylint: disable=unused-argument
-        return args[0].difference(formula.quantifier_vars())
+        res = args[0].difference(formula.quantifier_vars())
+        if len(res) == len(args[0]):
+            return args[0]
+        return self._intern(res)
 
     def walk_symbol(self, formula, args, **kwargs):
         #pylint: disable=unused-argument
-        return frozenset([formula])
+        return self._intern(frozenset([formula]))
 
     def walk_constant(self, formula, args, **kwargs):
         #pylint: disable=unused-argument
-        return frozenset()
+        return FreeVarsOracle.EMPTY
 
     def walk_function(self, formula, args, **kwargs):
-        res = set([formula.function_name()])
-        for arg in args:
-            res.update(arg)
-        return frozenset(res)
+        name = self.walk_symbol(formula.function_name(), None)
+        return self._union([name] + list(args))
 
 # EOC FreeVarsOracle
 
+
+class FreeVarsBitsetOracle(pysmt.walkers.DagWalker):
+    """Computes the free variables of a formula as bitsets.
+
+    Each symbol is associated with its index in the FormulaManager
+    (see :py:meth:`FormulaManager.get_symbol_index`), and the free
+    variables of a formula are represented by a Python int having a
+    bit set for each of them. This is much more compact than
+    frozensets on large DAGs, and makes union and membership queries
+    cheap.
+
+    This class provides the same interface of FreeVarsOracle, thus it
+    can be used as Environment.FreeVarsOracleClass.
+    """
+
+    def __init__(self, env=None):
+        pysmt.walkers.DagWalker.__init__(self, env=env)
+        self.set_function(self.walk_error, *op.ALL_TYPES)
+        self.set_function(self.walk_simple_args, *DEPENDENCIES_SIMPLE_ARGS)
+        self.set_function(self.walk_constant, *op.CONSTANTS)
+        self.set_function(self.walk_quantifier, *op.QUANTIFIERS)
+        self.set_function(self.walk_symbol, op.SYMBOL)
+        self.set_function(self.walk_function, op.FUNCTION)
+
+    def get_free_variables_mask(self, formula):
+        """Returns the bitset of the free variables of the formula."""
+        return self.walk(formula)
+
+    def get_free_variables(self, formula):
+        """Returns the set of Symbols appearing free in the formula."""
+        return frozenset(self.mask_to_symbols(self.walk(formula)))
+
+    def depends_on(self, formula, var):
+        """Returns whether var appears free in the formula."""
+        mask = self.walk(formula)
+        idx = self.env.formula_manager.get_symbol_index(var)
+        return (mask >> idx) & 1 == 1
+
+    def symbols_to_mask(self, symbols):
+        """Returns the bitset representing the given symbols."""
+        get_index = self.env.formula_manager.get_symbol_index
+        res = 0
+        for s in symbols:
+            res |= 1 << get_index(s)
+        return res
+
+    def mask_to_symbols(self, mask):
+        """Returns a generator over the symbols in the bitset."""
+        get_symbol = self.env.formula_manager.get_symbol_by_index
+        idx = 0
+        while mask:
+            # Skip the trailing zeros, one machine word at a time
+            while not mask & 0xFFFFFFFF:
+                mask >>= 32
+                idx += 32
+            if mask & 1:
+                yield get_symbol(idx)
+            mask >>= 1
+            idx += 1
+
+    def walk_simple_args(self, formula, args, **kwargs):
+        #pylint: disable=unused-argument
+        res = 0
+        for a in args:
+            res |= a
+        # Share the object of a child, if possible
+        for a in args:
+            if a == res:
+                return a
+        return res
+
+    def walk_quantifier(self, formula, args, **kwargs):
+        #pylint: disable=unused-argument
+        res = args[0] & ~self.symbols_to_mask(formula.quantifier_vars())
+        return args[0] if res == args[0] else res
+
+    def walk_symbol(self, formula, args, **kwargs):
+        #pylint: disable=unused-argument
+        return 1 << self.env.formula_manager.get_symbol_index(formula)
+
+    def walk_constant(self, formula, args, **kwargs):
+        #pylint: disable=unused-argument
+        return 0
+
+    def walk_function(self, formula, args, **kwargs):
+        res = self.walk_symbol(formula.function_name(), None)
+        for a in args:
+            res |= a
+        return res
+
+# EOC FreeVarsBitsetOracle
+
 class AtomsOracle(pysmt.walkers.DagWalker):
     """This class returns the set of Boolean atoms involved in a formula
     A boolean atom is either a boolean variable or a theory atom
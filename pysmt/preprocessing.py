@@ -0,0 +1,774 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Pipelines of rewritings applied to lists of assertions.
+
+A Preprocessor is a sequence of stages. Each stage transforms every
+assertion of the list, using a single walker: its memoization is thus
+shared among all the assertions. For each stage the Preprocessor
+records the wall time and the DAG size (as computed by the
+SizeOracle) of the assertions before and after the stage.
+
+Example::
+
+    pre = Preprocessor([SimplifierStage(), NNFStage()])
+    assertions = pre.process([f1, f2])
+    for stat in pre.statistics:
+        print(stat)
+
+A Preprocessor can be used as front-end of a Solver by means of
+PreprocessingSolver (or Preprocessor.wrap).
+"""
+
+from collections import namedtuple
+from timeit import default_timer
+
+from pysmt.environment import get_env
+from pysmt.oracles import SizeOracle
+from pysmt.simplifier import Simplifier
+from pysmt.rewritings import (NNFizer, CNFizer, PrenexNormalizer,
+                              TimesDistributor, BVRewriter,
+                              LinearNormalizer, conjunctive_partition)
+from pysmt.solvers.eager import EagerModel
+
+
+StageStatistics = namedtuple("StageStatistics",
+                             ["name", "round", "time", "size_before",
+                              "size_after", "changed", "skipped"])
+StageStatistics.__doc__ = """Statistics of one execution of a stage.
+
+Sizes are DAG sizes of the whole list of assertions. When the stage
+is skipped, time is 0 and the sizes are equal.
+"""
+
+
+class PreprocessingStage(object):
+    """Base class of the stages of a Preprocessor.
+
+    Subclasses must implement transform(formula). The stage object
+    is kept across calls to Preprocessor.process, thus caches can be
+    shared among the assertions and the calls.
+    """
+
+    def __init__(self, name=None, environment=None):
+        self.env = environment if environment is not None else get_env()
+        if name is None:
+            name = type(self).__name__
+        self.name = name
+
+    def transform(self, formula):
+        """Returns the transformed formula."""
+        raise NotImplementedError
+
+    def process(self, assertions):
+        """Returns the list of transformed assertions."""
+        return [self.transform(f) for f in assertions]
+
+    def reset(self):
+        """Clears the caches of the stage."""
+        pass
+
+    def push(self):
+        """Saves the state of the stage (see pop)."""
+        pass
+
+    def pop(self):
+        """Restores the state saved by the matching push.
+
+        Stages that learn information from the assertions (e.g.,
+        definitions) must forget what they learned after the push.
+        """
+        pass
+
+    def get_definitions(self):
+        """Returns the map from the symbols eliminated by the stage to
+        their definition."""
+        return {}
+
+    def extend_model(self, model):
+        """Returns a model of the input of the stage, given a model of
+        its output.
+
+        The default implementation returns model: this is correct for
+        stages that preserve equivalence.
+        """
+        return model
+
+
+class WalkerStage(PreprocessingStage):
+    """Applies a method of a Walker (by default 'walk') to each
+    assertion.
+
+    The memoization of the walker is shared among all the assertions
+    and is emptied by reset().
+    """
+
+    def __init__(self, walker, method="walk", name=None):
+        if name is None:
+            name = type(walker).__name__
+        PreprocessingStage.__init__(self, name=name, environment=walker.env)
+        self.walker = walker
+        self._transform = getattr(walker, method)
+
+    def transform(self, formula):
+        return self._transform(formula)
+
+    def reset(self):
+        memoization = getattr(self.walker, "memoization", None)
+        if memoization is not None:
+            memoization.clear()
+
+
+class FunctionStage(PreprocessingStage):
+    """Applies the given function to each assertion."""
+
+    def __init__(self, function, name=None, environment=None):
+        if name is None:
+            name = getattr(function, "__name__", "FunctionStage")
+        PreprocessingStage.__init__(self, name=name, environment=environment)
+        self.function = function
+
+    def transform(self, formula):
+        return self.function(formula)
+
+
+class SimplifierStage(WalkerStage):
+    def __init__(self, environment=None):
+        env = environment if environment is not None else get_env()
+        WalkerStage.__init__(self, Simplifier(env), "simplify",
+                             name="simplify")
+
+
+class NNFStage(WalkerStage):
+    def __init__(self, environment=None):
+        WalkerStage.__init__(self, NNFizer(environment), "convert",
+                             name="nnf")
+
+
+class CNFStage(WalkerStage):
+    def __init__(self, environment=None):
+        WalkerStage.__init__(self, CNFizer(environment), "convert_as_formula",
+                             name="cnf")
+
+
+class PrenexStage(WalkerStage):
+    def __init__(self, environment=None):
+        WalkerStage.__init__(self, PrenexNormalizer(environment), "normalize",
+                             name="prenex")
+
+
+class TimesDistributorStage(WalkerStage):
+    def __init__(self, environment=None):
+        WalkerStage.__init__(self, TimesDistributor(environment), "walk",
+                             name="distribute_times")
+
+
+class BVRewriterStage(WalkerStage):
+    def __init__(self, environment=None):
+        WalkerStage.__init__(self, BVRewriter(environment), "rewrite",
+                             name="bv_rewrite")
+
+
+class SubstitutionStage(PreprocessingStage):
+    """Applies the substitution subs to each assertion."""
+
+    def __init__(self, subs, environment=None):
+        PreprocessingStage.__init__(self, name="substitute",
+                                    environment=environment)
+        self.subs = subs
+
+    def transform(self, formula):
+        return self.env.substituter.substitute(formula, self.subs)
+
+
+class EqualityPropagator(object):
+    """Eliminates symbols defined by top-level equalities.
+
+    The top-level conjuncts of the assertions of the form x = t,
+    x <-> t, x and !x (where x is a symbol) are used to define x.
+    Linear arithmetic equalities are solved for one of their symbols
+    (with coefficient 1 or -1, for integers). The equalities between
+    symbols are merged with a union-find, whose representative is
+    kept. A definition is discarded (and the equality kept as an
+    assertion) if it would introduce a cycle.
+    The definitions are substituted in the remaining assertions, which
+    are simplified; this is repeated until no new definition is found.
+
+    The propagator is incremental: further calls to propagate apply
+    (and extend) the definitions found so far.
+    """
+
+    def __init__(self, environment=None):
+        self.env = environment if environment is not None else get_env()
+        self.mgr = self.env.formula_manager
+        self.get_free_variables = self.env.fvo.get_free_variables
+        self._linear = LinearNormalizer(self.env)
+        self._parent = {}
+        # Maps representatives to the term defining their class
+        self._value = {}
+        self._conflict = False
+
+    def reset(self):
+        self._parent = {}
+        self._value = {}
+        self._conflict = False
+
+    def get_state(self):
+        """Returns a copy of the definitions learned so far."""
+        return (dict(self._parent), dict(self._value), self._conflict)
+
+    def set_state(self, state):
+        """Restores the definitions returned by get_state."""
+        parent, value, self._conflict = state
+        self._parent, self._value = dict(parent), dict(value)
+
+    def find(self, var):
+        """Returns the representative of the class of var."""
+        root = var
+        parent = self._parent
+        while parent.get(root, root) != root:
+            root = parent[root]
+        # Path compression
+        while var != root:
+            var, parent[var] = parent[var], root
+        return root
+
+    def propagate(self, assertions):
+        """Returns the pair (reduced assertions, reconstruction).
+
+        The reconstruction maps each eliminated symbol to a term over
+        the symbols that are not eliminated. The conjunction of the
+        reduced assertions is equisatisfiable with the conjunction of
+        the assertions, and every model of the former can be extended
+        with the reconstruction to a model of the latter (see
+        extend_model).
+        """
+        subs = self.get_reconstruction()
+        todo = self._reduce(assertions, subs)
+        while not self._conflict:
+            kept = [c for c in todo if not self._learn(c)]
+            if len(kept) == len(todo):
+                break
+            subs = self.get_reconstruction()
+            todo = self._reduce(kept, subs)
+        if self._conflict:
+            return [self.mgr.FALSE()], subs
+        return todo, subs
+
+    def _reduce(self, assertions, subs):
+        res = []
+        seen = set()
+        for f in assertions:
+            if subs:
+                f = self.env.substituter.substitute(f, subs)
+            f = f.simplify()
+            for c in conjunctive_partition(f):
+                if c.is_false():
+                    self._conflict = True
+                elif not c.is_true() and c not in seen:
+                    seen.add(c)
+                    res.append(c)
+        return res
+
+    def _learn(self, conjunct):
+        """Tries to use conjunct as a definition. Returns True if the
+        conjunct is entailed by the definitions."""
+        mgr = self.mgr
+        if conjunct.is_symbol():
+            return self._assign(conjunct, mgr.TRUE())
+        if conjunct.is_not() and conjunct.arg(0).is_symbol():
+            return self._assign(conjunct.arg(0), mgr.FALSE())
+        if conjunct.is_equals() or conjunct.is_iff():
+            left, right = conjunct.args()
+            if _is_variable(left) and _is_variable(right):
+                return self._union(left, right)
+            if _is_variable(left) and self._assign(left, right):
+                return True
+            if _is_variable(right) and self._assign(right, left):
+                return True
+            ty = self.env.stc.get_type(left)
+            if ty.is_int_type() or ty.is_real_type():
+                return self._solve_linear(left, right, ty)
+        return False
+
+    def _solve_linear(self, left, right, ty):
+        """Defines one of the symbols of the linear equality
+        left = right."""
+        poly = self._linear.difference(left, right)
+        candidates = sorted((m[0] for m in poly
+                             if len(m) == 1 and _is_variable(m[0])),
+                            key=lambda v: v.node_id())
+        for var in candidates:
+            coeff = poly[(var,)]
+            if ty.is_int_type() and coeff not in (1, -1):
+                continue
+            # var = -(poly - coeff*var) / coeff
+            rest = {}
+            for m, c in poly.items():
+                if m != (var,):
+                    rest[m] = -c / coeff if ty.is_real_type() \
+                              else -c * coeff
+            term = self._linear.to_formula(rest, ty)
+            if self._assign(var, term):
+                return True
+        return False
+
+    def _depends(self, term, rep):
+        """Returns True if term depends on the class rep, through the
+        definitions."""
+        stack = list(self.get_free_variables(term))
+        visited = set()
+        while stack:
+            r = self.find(stack.pop())
+            if r == rep:
+                return True
+            if r not in visited:
+                visited.add(r)
+                if r in self._value:
+                    stack.extend(self.get_free_variables(self._value[r]))
+        return False
+
+    def _assign(self, var, term):
+        rep = self.find(var)
+        old = self._value.get(rep)
+        if old is not None:
+            if old.is_constant() and term.is_constant() and old != term:
+                self._conflict = True
+            # The equality will be rewritten as old = term
+            return False
+        if self._depends(term, rep):
+            return False
+        self._value[rep] = term
+        return True
+
+    def _union(self, left, right):
+        rl, rr = self.find(left), self.find(right)
+        if rl == rr:
+            return True
+        vl, vr = self._value.get(rl), self._value.get(rr)
+        if vl is not None and vr is not None:
+            return False
+        if vr is not None:
+            rl, rr, vl, vr = rr, rl, vr, vl
+        if vl is not None and self._depends(vl, rr):
+            return False
+        self._parent[rr] = rl
+        return True
+
+    def get_reconstruction(self):
+        """Returns the map from the eliminated symbols to their
+        definition, in terms of the symbols not eliminated."""
+        resolved = {}
+        for rep in self._topological_order():
+            term = self._value[rep]
+            local = {}
+            for v in self.get_free_variables(term):
+                target = self._target(v, resolved)
+                if target != v:
+                    local[v] = target
+            if local:
+                term = self.env.substituter.substitute(term, local).simplify()
+            resolved[rep] = term
+        res = {}
+        for var in set(self._parent) | set(self._value):
+            target = self._target(var, resolved)
+            if target != var:
+                res[var] = target
+        return res
+
+    def _target(self, var, resolved):
+        rep = self.find(var)
+        return resolved.get(rep, rep)
+
+    def _topological_order(self):
+        """Representatives with a value, after those they depend on."""
+        order = []
+        visited = set()
+        for root in self._value:
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(self.get_free_variables(self._value[root])))]
+            while stack:
+                rep, children = stack[-1]
+                for v in children:
+                    r = self.find(v)
+                    if r in self._value and r not in visited:
+                        visited.add(r)
+                        stack.append((r, iter(self.get_free_variables(
+                            self._value[r]))))
+                        break
+                else:
+                    stack.pop()
+                    order.append(rep)
+        return order
+
+    def extend_model(self, model, reconstruction=None):
+        """Returns an EagerModel extending model with the values of the
+        eliminated symbols."""
+        if reconstruction is None:
+            reconstruction = self.get_reconstruction()
+        return extend_model(model, reconstruction, self.env)
+
+# EOC EqualityPropagator
+
+
+def _is_variable(node):
+    return node.is_symbol() and not node.symbol_type().is_function_type()
+
+
+def extend_model(model, reconstruction, environment=None):
+    """Returns an EagerModel with the values of model and of the
+    symbols in the reconstruction map.
+
+    reconstruction maps symbols to terms over the symbols of model,
+    e.g., as returned by EqualityPropagator.propagate.
+    """
+    env = environment if environment is not None else get_env()
+    try:
+        assignment = dict(model)
+    except TypeError:
+        assignment = {}
+    for term in reconstruction.values():
+        for v in env.fvo.get_free_variables(term):
+            if v not in assignment:
+                assignment[v] = model.get_value(v)
+    eager = EagerModel(assignment, environment=env)
+    for var, term in reconstruction.items():
+        assignment[var] = eager.get_value(term)
+    return EagerModel(assignment, environment=env)
+
+
+class EqualityPropagationStage(PreprocessingStage):
+    """Stage eliminating the symbols defined by top-level equalities
+    (see EqualityPropagator).
+
+    The stage keeps the definitions found across calls to process,
+    and uses them to extend the models. The definitions learned after
+    a push are forgotten by the matching pop.
+    """
+
+    def __init__(self, environment=None):
+        PreprocessingStage.__init__(self, name="propagate_equalities",
+                                    environment=environment)
+        self.propagator = EqualityPropagator(self.env)
+        self._states = []
+
+    def process(self, assertions):
+        res, _ = self.propagator.propagate(assertions)
+        return res
+
+    def reset(self):
+        self.propagator.reset()
+        self._states = []
+
+    def push(self):
+        self._states.append(self.propagator.get_state())
+
+    def pop(self):
+        self.propagator.set_state(self._states.pop())
+
+    def get_definitions(self):
+        return self.propagator.get_reconstruction()
+
+    def extend_model(self, model):
+        return self.propagator.extend_model(model)
+
+
+class Preprocessor(object):
+    """A pipeline of PreprocessingStages.
+
+    The stages are applied in order, for at most max_rounds rounds.
+    The pipeline stops as soon as a whole round does not change the
+    assertions. If skip_unproductive is True, a stage is skipped when
+    the assertions did not change since the last time it was applied
+    without making progress. The statistics of the last call to
+    process are available in self.statistics.
+    """
+
+    def __init__(self, stages=None, max_rounds=1, skip_unproductive=True,
+                 measure_size=True, environment=None):
+        self.env = environment if environment is not None else get_env()
+        self.stages = list(stages) if stages is not None else []
+        self.max_rounds = max_rounds
+        self.skip_unproductive = skip_unproductive
+        self.measure_size = measure_size
+        self.statistics = []
+        self._sizeo = SizeOracle(self.env)
+
+    def add_stage(self, stage):
+        """Appends a stage to the pipeline.
+
+        stage can be a PreprocessingStage, a Walker (its walk method
+        is used) or a function from formulae to formulae.
+        """
+        if not isinstance(stage, PreprocessingStage):
+            if hasattr(stage, "walk") and hasattr(stage, "env"):
+                stage = WalkerStage(stage)
+            else:
+                stage = FunctionStage(stage, environment=self.env)
+        self.stages.append(stage)
+        return stage
+
+    def reset(self):
+        """Clears the caches of all stages."""
+        for stage in self.stages:
+            stage.reset()
+
+    def get_size(self, assertions):
+        """Returns the DAG size of the list of assertions."""
+        if not assertions:
+            return 0
+        if len(assertions) == 1:
+            return self._sizeo.get_size(assertions[0],
+                                        SizeOracle.MEASURE_DAG_NODES)
+        conj = self.env.formula_manager.And(assertions)
+        return self._sizeo.get_size(conj, SizeOracle.MEASURE_DAG_NODES) - 1
+
+    def process(self, assertions):
+        """Applies the pipeline to the list of assertions.
+
+        Returns the list of the processed assertions.
+        """
+        assertions = list(assertions)
+        self.statistics = []
+        # For each stage, the assertions on which it made no progress
+        unproductive_on = [None] * len(self.stages)
+        size = self.get_size(assertions) if self.measure_size else None
+        for round_num in range(self.max_rounds):
+            round_changed = False
+            for i, stage in enumerate(self.stages):
+                if self.skip_unproductive and \
+                   unproductive_on[i] == assertions:
+                    self.statistics.append(
+                        StageStatistics(stage.name, round_num, 0.0,
+                                        size, size, False, True))
+                    continue
+                start = default_timer()
+                result = stage.process(assertions)
+                elapsed = default_timer() - start
+                changed = result != assertions
+                if changed:
+                    new_size = self.get_size(result) \
+                               if self.measure_size else None
+                    unproductive_on[i] = None
+                    round_changed = True
+                else:
+                    new_size = size
+                    unproductive_on[i] = result
+                self.statistics.append(
+                    StageStatistics(stage.name, round_num, elapsed,
+                                    size, new_size, changed, False))
+                assertions, size = result, new_size
+            if not round_changed:
+                break
+        return assertions
+
+    def process_formula(self, formula):
+        """Applies the pipeline to a formula, seen as a single
+        assertion."""
+        return self.env.formula_manager.And(self.process([formula]))
+
+    def push(self, levels=1):
+        """Saves the state of the stages."""
+        for _ in range(levels):
+            for stage in self.stages:
+                stage.push()
+
+    def pop(self, levels=1):
+        """Restores the state of the stages saved by push."""
+        for _ in range(levels):
+            for stage in self.stages:
+                stage.pop()
+
+    def get_definitions(self):
+        """Returns the map from the symbols eliminated by the stages to
+        their definition."""
+        res = {}
+        for stage in self.stages:
+            res.update(stage.get_definitions())
+        return res
+
+    def extend_model(self, model):
+        """Extends a model of the processed assertions to a model of
+        the original ones (see PreprocessingStage.extend_model)."""
+        for stage in reversed(self.stages):
+            model = stage.extend_model(model)
+        return model
+
+    def wrap(self, solver):
+        """Returns a PreprocessingSolver using this pipeline."""
+        return PreprocessingSolver(solver, self)
+
+    def print_statistics(self, stream):
+        """Prints a table of the statistics of the last call."""
+        stream.write("%-20s %5s %10s %10s %10s\n" %
+                     ("stage", "round", "time", "before", "after"))
+        for stat in self.statistics:
+            stream.write("%-20s %5d %10s %10s %10s\n" %
+                         (stat.name, stat.round,
+                          "skipped" if stat.skipped else "%.4f" % stat.time,
+                          stat.size_before, stat.size_after))
+
+# EOC Preprocessor
+
+
+class PreprocessingSolver(object):
+    """Front-end of a Solver that preprocesses the assertions.
+
+    Assertions are buffered and preprocessed together before being
+    passed to the solver, at the first call to solve or push.
+    Assumptions are not preprocessed. Models are extended by the
+    Preprocessor to the eliminated symbols. Any other method is
+    forwarded to the underlying solver.
+
+    Each batch is preprocessed using what the stages learned from the
+    previous ones. The definition of an eliminated symbol is asserted
+    to the solver only if the symbol occurs in the formulae that the
+    solver already has, or in the assumptions: this keeps the queries
+    small, and the definition is checked against all the constraints
+    on the symbol. The other definitions are only used to extend the
+    models. Push and pop are propagated to the Preprocessor, to scope
+    the definitions.
+    """
+
+    def __init__(self, solver, preprocessor):
+        self.solver = solver
+        self.preprocessor = preprocessor
+        self._pending = []
+        # Symbols whose definition has been asserted, and free
+        # variables of the formulae passed to the solver
+        self._defined = set()
+        self._solver_vars = set()
+        self._stack = []
+
+    def add_assertion(self, formula, named=None):
+        if named is not None:
+            # Named assertions are passed unchanged, to preserve names
+            self.flush()
+            self._solver_vars.update(formula.get_free_variables())
+            res = self.solver.add_assertion(formula, named=named)
+            self._assert_definitions()
+            return res
+        self._pending.append(formula)
+
+    def add_assertions(self, formulae):
+        for formula in formulae:
+            self.add_assertion(formula)
+
+    def flush(self):
+        """Preprocesses and asserts the buffered assertions, and the
+        definitions of the eliminated symbols they depend on."""
+        if self._pending:
+            pending, self._pending = self._pending, []
+            for formula in self.preprocessor.process(pending):
+                if not formula.is_true():
+                    self._solver_vars.update(formula.get_free_variables())
+                    self.solver.add_assertion(formula)
+            self._assert_definitions()
+
+    def _assert_definitions(self):
+        """Asserts the definitions of the eliminated symbols that occur
+        in the formulae of the solver, to a fixpoint (a definition can
+        refer to other eliminated symbols)."""
+        mgr = self.preprocessor.env.formula_manager
+        definitions = self.preprocessor.get_definitions()
+        while True:
+            needed = [var for var in definitions
+                      if var in self._solver_vars and
+                      var not in self._defined]
+            if not needed:
+                return
+            for var in sorted(needed, key=lambda v: v.node_id()):
+                definition = mgr.EqualsOrIff(var, definitions[var])
+                self._solver_vars.update(definition.get_free_variables())
+                self.solver.add_assertion(definition)
+                self._defined.add(var)
+
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
+        self.flush()
+        if assumptions is not None:
+            assumptions = list(assumptions)
+            for a in assumptions:
+                self._solver_vars.update(a.get_free_variables())
+            self._assert_definitions()
+        return self.solver.solve(assumptions=assumptions, timeout=timeout,
+                                 memory_limit=memory_limit)
+
+    def is_sat(self, formula):
+        self.push()
+        try:
+            self.add_assertion(formula)
+            return self.solve()
+        finally:
+            self.pop()
+
+    def push(self, levels=1):
+        self.flush()
+        for _ in range(levels):
+            self._stack.append((set(self._defined), set(self._solver_vars)))
+        self.preprocessor.push(levels)
+        return self.solver.push(levels)
+
+    def pop(self, levels=1):
+        # The buffered assertions belong to the popped level
+        self._pending = []
+        for _ in range(levels):
+            self._defined, self._solver_vars = self._stack.pop()
+        self.preprocessor.pop(levels)
+        return self.solver.pop(levels)
+
+    def get_model(self):
+        return self.preprocessor.extend_model(self.solver.get_model())
+
+    def get_value(self, item):
+        return self.get_model().get_value(item)
+
+    def get_values(self, formulae):
+        model = self.get_model()
+        return dict((f, model.get_value(f)) for f in formulae)
+
+    def get_py_value(self, item):
+        return self.get_value(item).constant_value()
+
+    def get_py_values(self, formulae):
+        model = self.get_model()
+        return dict((f, model.get_value(f).constant_value())
+                    for f in formulae)
+
+    def reset_assertions(self):
+        self._pending = []
+        self._defined = set()
+        self._solver_vars = set()
+        self._stack = []
+        self.preprocessor.reset()
+        return self.solver.reset_assertions()
+
+    def exit(self):
+        self._pending = []
+        return self.solver.exit()
+
+    def __getattr__(self, name):
+        return getattr(self.solver, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.exit()
+
+# EOC PreprocessingSolver
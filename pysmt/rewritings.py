@@ -19,6 +19,11 @@
 This module defines some rewritings for pySMT formulae.
 """
 
+from array import array
+from collections import Counter
+
+from six.moves import xrange
+
 from pysmt.walkers import DagWalker, IdentityDagWalker
 import pysmt.typing as types
 import pysmt.operators as op
@@ -222,6 +227,264 @@ class CNFizer(DagWalker):
                                   frozenset([i, e, not_k])]))
 
 
+class ClauseBuffer(object):
+    """A list of clauses stored as flat arrays of integer literals.
+
+    Literals follow the DIMACS convention: variables are positive
+    integers and negative integers are negated variables. The i-th
+    clause is literals[offsets[i]:offsets[i+1]].
+    """
+
+    def __init__(self):
+        self.literals = array('i')
+        self.offsets = array('i', [0])
+
+    def add_clause(self, clause):
+        """Appends a clause, given as an iterable of integer literals."""
+        self.literals.extend(clause)
+        self.offsets.append(len(self.literals))
+
+    def extend(self, other):
+        """Appends all the clauses of another ClauseBuffer."""
+        base = len(self.literals)
+        self.literals.extend(other.literals)
+        self.offsets.extend(base + o for o in other.offsets[1:])
+
+    def clause(self, idx):
+        """Returns the idx-th clause as an array of literals."""
+        return self.literals[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def max_var(self):
+        """Returns the largest variable occurring in the clauses."""
+        return max([abs(l) for l in self.literals] or [0])
+
+    def as_numpy(self):
+        """Returns the pair (literals, offsets) as NumPy arrays.
+
+        The arrays share the memory of the buffer. Requires NumPy.
+        """
+        import numpy as np
+        return (np.frombuffer(self.literals, dtype=np.intc),
+                np.frombuffer(self.offsets, dtype=np.intc))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self.clause(i)
+
+
+class PolarityCNFizer(object):
+    """Converts formulae into equisatisfiable CNF over integer variables.
+
+    This implements the Plaisted-Greenbaum encoding: a fresh variable
+    is introduced for each Boolean connective, but only the half of
+    the definition required by the polarity of the connective is
+    emitted. Negations do not introduce variables: the literal of
+    the argument is negated instead. Top-level conjunctions and
+    disjunctions are asserted directly.
+
+    Atoms (Boolean symbols, Boolean function applications and theory
+    relations) and connectives are mapped to the same variable across
+    calls to convert(), so that the converter can be used to feed an
+    incremental solver. Definitions are emitted again by each call
+    that needs them, since the clauses of previous calls might have
+    been retracted by the solver.
+    """
+
+    POSITIVE = 1
+    NEGATIVE = 2
+    BOTH = POSITIVE | NEGATIVE
+
+    def __init__(self, environment=None):
+        if environment is None:
+            import pysmt.environment
+            environment = pysmt.environment.get_env()
+        self.env = environment
+        self.mgr = self.env.formula_manager
+        # Maps formulae (atoms and connectives) to variables
+        self._vars = {}
+        # Maps variables to atoms (None for definitions)
+        self._atoms = [None]
+        self._def_symbols = {}
+
+    @property
+    def max_var(self):
+        """The largest variable allocated so far."""
+        return len(self._atoms) - 1
+
+    def get_atom(self, var):
+        """Returns the atom associated with var, or None for variables
+        introduced by the encoding."""
+        return self._atoms[var]
+
+    def iter_atoms(self):
+        """Returns a generator over the pairs (var, atom)."""
+        for var, atom in enumerate(self._atoms):
+            if atom is not None:
+                yield var, atom
+
+    def _new_var(self, formula, is_atom):
+        var = len(self._atoms)
+        self._vars[formula] = var
+        self._atoms.append(formula if is_atom else None)
+        return var
+
+    def _is_connective(self, formula):
+        return formula.is_and() or formula.is_or() or \
+            formula.is_implies() or formula.is_iff() or \
+            (formula.is_ite() and
+             self.env.stc.get_type(formula).is_bool_type())
+
+    def literal(self, formula):
+        """Returns the integer literal representing formula."""
+        neg = False
+        while formula.is_not():
+            formula = formula.arg(0)
+            neg = not neg
+        if formula.is_false():
+            formula = self.mgr.TRUE()
+            neg = not neg
+
+        var = self._vars.get(formula)
+        if var is None:
+            if formula.is_quantifier():
+                raise NotImplementedError("CNFizer does not support "
+                                          "quantifiers")
+            var = self._new_var(formula,
+                                not self._is_connective(formula) and \
+                                not formula.is_true())
+        return -var if neg else var
+
+    def convert(self, formula):
+        """Convert formula into an Equisatisfiable CNF.
+
+        Returns a ClauseBuffer.
+        """
+        res = ClauseBuffer()
+        emitted = {}
+        todo = []
+        for root in conjunctive_partition(formula):
+            if root.is_true():
+                continue
+            if root.is_or():
+                args = root.args()
+            else:
+                args = [root]
+            res.add_clause([self.literal(a) for a in args])
+            todo.extend((a, PolarityCNFizer.POSITIVE) for a in args)
+            self._define(todo, emitted, res)
+        return res
+
+    @staticmethod
+    def _flip(pol):
+        return ((pol & PolarityCNFizer.POSITIVE) << 1) | \
+            ((pol & PolarityCNFizer.NEGATIVE) >> 1)
+
+    def _define(self, todo, emitted, res):
+        """Emits the definitions of the formulae in todo, each one for
+        the given polarity, and recursively of their subformulae."""
+        mgr = self.mgr
+        while todo:
+            formula, pol = todo.pop()
+            while formula.is_not():
+                formula = formula.arg(0)
+                pol = self._flip(pol)
+
+            if formula.is_bool_constant():
+                if mgr.TRUE() not in emitted:
+                    emitted[mgr.TRUE()] = PolarityCNFizer.BOTH
+                    res.add_clause([self.literal(mgr.TRUE())])
+                continue
+            if not self._is_connective(formula):
+                continue
+
+            done = emitted.get(formula, 0)
+            pol = pol & ~done
+            if not pol:
+                continue
+            emitted[formula] = done | pol
+
+            pos = pol & PolarityCNFizer.POSITIVE
+            neg = pol & PolarityCNFizer.NEGATIVE
+            k = self.literal(formula)
+            args = formula.args()
+            lits = [self.literal(a) for a in args]
+            if formula.is_and():
+                if pos:
+                    for l in lits:
+                        res.add_clause([-k, l])
+                if neg:
+                    res.add_clause([k] + [-l for l in lits])
+                todo.extend((a, pol) for a in args)
+            elif formula.is_or():
+                if pos:
+                    res.add_clause([-k] + lits)
+                if neg:
+                    for l in lits:
+                        res.add_clause([k, -l])
+                todo.extend((a, pol) for a in args)
+            elif formula.is_implies():
+                a, b = lits
+                if pos:
+                    res.add_clause([-k, -a, b])
+                if neg:
+                    res.add_clause([k, a])
+                    res.add_clause([k, -b])
+                todo.append((args[0], self._flip(pol)))
+                todo.append((args[1], pol))
+            elif formula.is_iff():
+                a, b = lits
+                if pos:
+                    res.add_clause([-k, -a, b])
+                    res.add_clause([-k, a, -b])
+                if neg:
+                    res.add_clause([k, a, b])
+                    res.add_clause([k, -a, -b])
+                todo.extend((x, PolarityCNFizer.BOTH) for x in args)
+            else:
+                c, t, e = lits
+                if pos:
+                    res.add_clause([-k, -c, t])
+                    res.add_clause([-k, c, e])
+                if neg:
+                    res.add_clause([k, -c, -t])
+                    res.add_clause([k, c, -e])
+                todo.append((args[0], PolarityCNFizer.BOTH))
+                todo.append((args[1], pol))
+                todo.append((args[2], pol))
+
+    def literal_to_formula(self, lit):
+        """Returns the FNode representing the integer literal.
+
+        Variables introduced by the encoding are represented by fresh
+        symbols, that are created on demand.
+        """
+        var = abs(lit)
+        res = self._atoms[var]
+        if res is None:
+            res = self._def_symbols.get(var)
+            if res is None:
+                res = self.mgr.FreshSymbol()
+                self._def_symbols[var] = res
+        if lit < 0:
+            return self.mgr.Not(res)
+        return res
+
+    def convert_as_formula(self, formula):
+        """Convert formula into an Equisatisfiable CNF.
+
+        Returns an FNode.
+        """
+        clauses = self.convert(formula)
+        return self.mgr.And(self.mgr.Or(self.literal_to_formula(l)
+                                        for l in clause)
+                            for clause in clauses)
+
+# EOC PolarityCNFizer
+
+
 class NNFizer(DagWalker):
     """Converts a formula into Negation Normal Form.
 
@@ -686,6 +949,768 @@ class TimesDistributor(IdentityDagWalker):
 # EOC TimesDistributivity
 
 
+class LinearNormalizer(DagWalker):
+    """Normalizes arithmetic terms into a canonical sum of monomials.
+
+    Each term is represented as a polynomial: a dictionary mapping
+    monomials to their (non-zero) coefficient. A monomial is a tuple
+    of atoms, sorted by node id; the empty monomial represents the
+    constant term. Atoms are the sub-terms that are not Plus, Minus,
+    Times or numeric constants (e.g., symbols, function applications
+    and Ite). Products of non-constant sums are not distributed, but
+    are treated as atoms.
+
+    Polynomials are memoized. :py:meth:`normalize` rebuilds the
+    canonical FNode, thus equal polynomials result in the same node.
+    """
+
+    def __init__(self, environment=None):
+        DagWalker.__init__(self, env=environment)
+        self.mgr = self.env.formula_manager
+        self.get_type = self.env.stc.get_type
+        self.set_function(self.walk_atom, *op.ALL_TYPES)
+        self.set_function(self.walk_plus, op.PLUS)
+        self.set_function(self.walk_minus, op.MINUS)
+        self.set_function(self.walk_times, op.TIMES)
+        self.set_function(self.walk_number, op.INT_CONSTANT, op.REAL_CONSTANT)
+
+    def _get_children(self, formula):
+        if formula.is_plus() or formula.is_minus() or formula.is_times():
+            return formula.args()
+        # Atoms are not visited
+        return []
+
+    def get_polynomial(self, term):
+        """Returns the polynomial of term, as a dictionary from
+        monomials to coefficients."""
+        return self.walk(term)
+
+    def difference(self, left, right):
+        """Returns the polynomial of left - right."""
+        res = dict(self.walk(left))
+        for m, c in self.walk(right).items():
+            _add_monomial(res, m, -c)
+        return res
+
+    def normalize(self, term):
+        """Returns the canonical form of the arithmetic term."""
+        return self.to_formula(self.walk(term), self.get_type(term))
+
+    def to_formula(self, poly, ty):
+        """Builds the canonical FNode of the polynomial of type ty."""
+        mgr = self.mgr
+        const = mgr.Real if ty.is_real_type() else mgr.Int
+        summands = []
+        for m in sorted(poly, key=_monomial_key):
+            if not m:
+                continue
+            coeff = poly[m]
+            if coeff == 1:
+                factors = list(m)
+            else:
+                factors = list(m) + [const(coeff)]
+            if len(factors) == 1:
+                summands.append(factors[0])
+            else:
+                summands.append(mgr.Times(factors))
+        if () in poly or not summands:
+            summands.append(const(poly.get((), 0)))
+        if len(summands) == 1:
+            return summands[0]
+        return mgr.Plus(summands)
+
+    def walk_atom(self, formula, args, **kwargs):
+        #pylint: disable=unused-argument
+        return {(formula,): 1}
+
+    def walk_number(self, formula, args, **kwargs):
+        #pylint: disable=unused-argument
+        value = formula.constant_value()
+        if value == 0:
+            return {}
+        return {(): value}
+
+    def walk_plus(self, formula, args, **kwargs):
+        #pylint: disable=unused-argument
+        res = dict(args[0])
+        for poly in args[1:]:
+            for m, c in poly.items():
+                _add_monomial(res, m, c)
+        return res
+
+    def walk_minus(self, formula, args, **kwargs):
+        #pylint: disable=unused-argument
+        res = dict(args[0])
+        for m, c in args[1].items():
+            _add_monomial(res, m, -c)
+        return res
+
+    def walk_times(self, formula, args, **kwargs):
+        coeff = 1
+        monomial = []
+        sums = []
+        for poly in args:
+            if not poly:
+                return {}
+            if len(poly) == 1:
+                m, c = next(iter(poly.items()))
+                coeff *= c
+                monomial.extend(m)
+            else:
+                sums.append(poly)
+        if len(sums) > 1 or (sums and monomial):
+            # Non-linear product of sums: keep it as an atom, with
+            # normalized arguments sorted as the factors of monomials
+            ty = self.get_type(formula)
+            factors = [self.to_formula(p, ty) for p in args]
+            atom = self.mgr.Times(sorted(factors, key=_node_id))
+            return {(atom,): 1}
+        if sums:
+            return dict((m, c * coeff) for m, c in sums[0].items())
+        return {tuple(sorted(monomial, key=_node_id)): coeff}
+
+# EOC LinearNormalizer
+
+
+class BVRewriter(IdentityDagWalker):
+    """Word-level rewriting of bit-vector terms.
+
+    Differently from the Simplifier, that only folds operators whose
+    arguments are all constants, the rewriter applies the following
+    (equivalence preserving) rules:
+
+     * add_chain, mul_chain: chains of bvadd, bvsub, bvneg and bvmul
+       by constants are collected into a linear combination of atoms
+       with constant coefficients. The canonical term is built when
+       this reduces the number of leaves;
+     * extract_*: extract of extract, of concat, of zero- and
+       sign-extension and of the full width;
+     * concat_*: concatenation of adjacent extracts of the same term,
+       of constants, and of a zero prefix (that becomes a zext);
+     * extend_extend: nested extensions;
+     * shift_const, rotate_const: shifts and rotations by a constant
+       amount are expressed with extract and concat;
+     * compare_min_max: unsigned and signed comparisons against the
+       minimum and maximum value of the type;
+     * compare_extend: comparisons between extensions by the same
+       amount, and equalities between extensions and constants;
+     * signed_to_unsigned: signed comparisons between terms whose
+       most significant bit is known to be zero;
+     * comp_equals, concat_equals, equals_solve: rewriting of
+       bvcomp in equalities, of equalities between concatenations and
+       constants, and of linear equalities over a single atom;
+     * equals: comparisons between identical terms;
+     * bitwise: and/or/xor/not with constants or identical arguments;
+     * constant_fold: operators over constant arguments.
+
+    The number of applications of each rule is accumulated in the
+    Counter self.stats.
+    """
+
+    def __init__(self, environment=None):
+        IdentityDagWalker.__init__(self, env=environment)
+        self.simplifier = self.env.simplifier
+        self.get_type = self.env.stc.get_type
+        self.stats = Counter()
+        # Maps a BV term to the pair (linear combination, leaves)
+        self._polys = {}
+
+    def rewrite(self, formula):
+        """Returns the rewritten formula."""
+        return self.walk(formula)
+
+    def reset_stats(self):
+        self.stats = Counter()
+
+    def _fire(self, rule):
+        self.stats[rule] += 1
+
+    def _fold(self, node):
+        if all(a.is_bv_constant() for a in node.args()):
+            self._fire("constant_fold")
+            return self.simplifier.simplify(node)
+        return node
+
+    #
+    # Linear combinations
+    #
+
+    def _poly(self, term):
+        """Returns the linear combination represented by the BV term.
+
+        The result is a pair (poly, leaves): poly maps atoms to their
+        (non-zero) coefficient modulo 2**width, with None being the
+        key of the constant; leaves is the number of atoms and
+        constants occurring in the chain of arithmetic operators.
+        """
+        res = self._polys.get(term)
+        if res is not None:
+            return res
+        mask = (1 << term.bv_width()) - 1
+        if term.is_bv_constant():
+            value = term.constant_value()
+            res = ({None: value} if value else {}), 1
+        elif term.is_bv_add() or term.is_bv_sub():
+            p0, l0 = self._poly(term.arg(0))
+            p1, l1 = self._poly(term.arg(1))
+            sign = mask if term.is_bv_sub() else 1
+            poly = dict(p0)
+            for t, c in p1.items():
+                _add_bv_coeff(poly, t, c * sign, mask)
+            res = poly, l0 + l1
+        elif term.is_bv_neg():
+            p0, l0 = self._poly(term.arg(0))
+            res = dict((t, (-c) & mask) for t, c in p0.items()), l0
+        elif term.is_bv_mul():
+            (p0, l0), (p1, l1) = self._poly(term.arg(0)), \
+                                 self._poly(term.arg(1))
+            if _is_constant_poly(p1):
+                p0, p1 = p1, p0
+            if _is_constant_poly(p0):
+                k = p0.get(None, 0)
+                poly = {}
+                for t, c in p1.items():
+                    _add_bv_coeff(poly, t, c * k, mask)
+                res = poly, l0 + l1
+            else:
+                res = {term: 1}, 1
+        else:
+            res = {term: 1}, 1
+        self._polys[term] = res
+        return res
+
+    def _from_poly(self, poly, width):
+        """Builds the canonical term of the linear combination."""
+        mgr = self.mgr
+        mask = (1 << width) - 1
+        res = None
+        for t in sorted((t for t in poly if t is not None), key=_node_id):
+            c = poly[t]
+            if c == mask:
+                if res is None:
+                    res = mgr.BVNeg(t)
+                else:
+                    res = mgr.BVSub(res, t)
+                continue
+            if c != 1:
+                t = mgr.BVMul(t, mgr.BV(c, width))
+            res = t if res is None else mgr.BVAdd(res, t)
+        if None in poly:
+            const = mgr.BV(poly[None], width)
+            res = const if res is None else mgr.BVAdd(res, const)
+        if res is None:
+            res = mgr.BV(0, width)
+        return res
+
+    def _arith(self, node):
+        width = node.bv_width()
+        poly, leaves = self._poly(node)
+        cost = _bv_poly_cost(poly, (1 << width) - 1)
+        if cost < leaves or cost <= 1:
+            res = self._from_poly(poly, width)
+            if res != node:
+                self._fire("mul_chain" if node.is_bv_mul() else "add_chain")
+                self._polys[res] = poly, cost
+                return res
+        return node
+
+    def walk_bv_add(self, formula, args, **kwargs):
+        return self._arith(self.mgr.BVAdd(args[0], args[1]))
+
+    def walk_bv_sub(self, formula, args, **kwargs):
+        return self._arith(self.mgr.BVSub(args[0], args[1]))
+
+    def walk_bv_neg(self, formula, args, **kwargs):
+        return self._arith(self.mgr.BVNeg(args[0]))
+
+    def walk_bv_mul(self, formula, args, **kwargs):
+        return self._arith(self.mgr.BVMul(args[0], args[1]))
+
+    #
+    # Extract, concat and extensions
+    #
+
+    def _extract(self, term, start, end):
+        mgr = self.mgr
+        width = term.bv_width()
+        if start == 0 and end == width - 1:
+            self._fire("extract_full")
+            return term
+        if term.is_bv_constant():
+            self._fire("constant_fold")
+            size = end - start + 1
+            value = (term.constant_value() >> start) & ((1 << size) - 1)
+            return mgr.BV(value, size)
+        if term.is_bv_extract():
+            self._fire("extract_extract")
+            offset = term.bv_extract_start()
+            return self._extract(term.arg(0), offset + start, offset + end)
+        if term.is_bv_concat():
+            self._fire("extract_concat")
+            high, low = term.args()
+            low_width = low.bv_width()
+            if end < low_width:
+                return self._extract(low, start, end)
+            if start >= low_width:
+                return self._extract(high, start - low_width, end - low_width)
+            return self._concat(self._extract(high, 0, end - low_width),
+                                self._extract(low, start, low_width - 1))
+        if term.is_bv_zext() or term.is_bv_sext():
+            self._fire("extract_extend")
+            arg = term.arg(0)
+            arg_width = arg.bv_width()
+            if end < arg_width:
+                return self._extract(arg, start, end)
+            if term.is_bv_zext():
+                if start >= arg_width:
+                    return mgr.BV(0, end - start + 1)
+                return self._zext(self._extract(arg, start, arg_width - 1),
+                                  end - arg_width + 1)
+            if start >= arg_width - 1:
+                msb = self._extract(arg, arg_width - 1, arg_width - 1)
+                return self._sext(msb, end - start)
+            return self._sext(self._extract(arg, start, arg_width - 1),
+                              end - arg_width + 1)
+        return mgr.BVExtract(term, start, end)
+
+    def _concat(self, high, low):
+        mgr = self.mgr
+        if high.is_bv_constant() and low.is_bv_constant():
+            self._fire("constant_fold")
+            value = (high.constant_value() << low.bv_width()) | \
+                    low.constant_value()
+            return mgr.BV(value, high.bv_width() + low.bv_width())
+        if high.is_bv_constant() and low.is_bv_concat() and \
+           low.arg(0).is_bv_constant():
+            self._fire("concat_constants")
+            return self._concat(self._concat(high, low.arg(0)), low.arg(1))
+        if high.is_bv_constant() and high.constant_value() == 0:
+            self._fire("concat_zero")
+            return self._zext(low, high.bv_width())
+        if _adjacent_extracts(high, low):
+            self._fire("concat_extract")
+            return self._extract(low.arg(0), low.bv_extract_start(),
+                                 high.bv_extract_end())
+        if low.is_bv_concat() and _adjacent_extracts(high, low.arg(0)):
+            self._fire("concat_extract")
+            mid = low.arg(0)
+            merged = self._extract(mid.arg(0), mid.bv_extract_start(),
+                                   high.bv_extract_end())
+            return self._concat(merged, low.arg(1))
+        return mgr.BVConcat(high, low)
+
+    def _zext(self, term, increase):
+        if increase == 0:
+            return term
+        if term.is_bv_constant():
+            self._fire("constant_fold")
+            return self.mgr.BV(term.constant_value(),
+                               term.bv_width() + increase)
+        if term.is_bv_zext():
+            self._fire("extend_extend")
+            return self._zext(term.arg(0), term.bv_extend_step() + increase)
+        return self.mgr.BVZExt(term, increase)
+
+    def _sext(self, term, increase):
+        if increase == 0:
+            return term
+        if term.is_bv_constant():
+            self._fire("constant_fold")
+            return self.mgr.BV(term.bv_signed_value() %
+                               (1 << (term.bv_width() + increase)),
+                               term.bv_width() + increase)
+        if term.is_bv_sext():
+            self._fire("extend_extend")
+            return self._sext(term.arg(0), term.bv_extend_step() + increase)
+        if term.is_bv_zext():
+            # The most significant bit is zero
+            self._fire("extend_extend")
+            return self._zext(term.arg(0), term.bv_extend_step() + increase)
+        return self.mgr.BVSExt(term, increase)
+
+    def walk_bv_extract(self, formula, args, **kwargs):
+        return self._extract(args[0], formula.bv_extract_start(),
+                             formula.bv_extract_end())
+
+    def walk_bv_concat(self, formula, args, **kwargs):
+        return self._concat(args[0], args[1])
+
+    def walk_bv_zext(self, formula, args, **kwargs):
+        return self._zext(args[0], formula.bv_extend_step())
+
+    def walk_bv_sext(self, formula, args, **kwargs):
+        return self._sext(args[0], formula.bv_extend_step())
+
+    #
+    # Shifts and rotations
+    #
+
+    def walk_bv_lshl(self, formula, args, **kwargs):
+        term, amount = args
+        if not amount.is_bv_constant() or term.is_bv_constant():
+            return self._fold(self.mgr.BVLShl(term, amount))
+        self._fire("shift_const")
+        width, n = term.bv_width(), amount.constant_value()
+        if n == 0:
+            return term
+        if n >= width:
+            return self.mgr.BV(0, width)
+        return self._concat(self._extract(term, 0, width - n - 1),
+                            self.mgr.BV(0, n))
+
+    def walk_bv_lshr(self, formula, args, **kwargs):
+        term, amount = args
+        if not amount.is_bv_constant() or term.is_bv_constant():
+            return self._fold(self.mgr.BVLShr(term, amount))
+        self._fire("shift_const")
+        width, n = term.bv_width(), amount.constant_value()
+        if n == 0:
+            return term
+        if n >= width:
+            return self.mgr.BV(0, width)
+        return self._zext(self._extract(term, n, width - 1), n)
+
+    def walk_bv_ashr(self, formula, args, **kwargs):
+        term, amount = args
+        if not amount.is_bv_constant() or term.is_bv_constant():
+            return self._fold(self.mgr.BVAShr(term, amount))
+        self._fire("shift_const")
+        width = term.bv_width()
+        n = min(amount.constant_value(), width - 1)
+        if n == 0:
+            return term
+        return self._sext(self._extract(term, n, width - 1), n)
+
+    def _rotate_left(self, term, steps):
+        width = term.bv_width()
+        steps = steps % width
+        self._fire("rotate_const")
+        if steps == 0:
+            return term
+        return self._concat(self._extract(term, 0, width - steps - 1),
+                            self._extract(term, width - steps, width - 1))
+
+    def walk_bv_rol(self, formula, args, **kwargs):
+        return self._rotate_left(args[0], formula.bv_rotation_step())
+
+    def walk_bv_ror(self, formula, args, **kwargs):
+        width = args[0].bv_width()
+        return self._rotate_left(args[0],
+                                 width - formula.bv_rotation_step() % width)
+
+    #
+    # Comparisons
+    #
+
+    def _equals(self, left, right):
+        mgr = self.mgr
+        if left == right:
+            self._fire("equals")
+            return mgr.TRUE()
+        if left.is_bv_constant() and right.is_bv_constant():
+            self._fire("constant_fold")
+            return mgr.FALSE()
+        if left.is_bv_constant():
+            left, right = right, left
+
+        if right.is_bv_constant():
+            value = right.constant_value()
+            if left.is_bv_comp():
+                self._fire("comp_equals")
+                res = self._equals(left.arg(0), left.arg(1))
+                return res if value == 1 else mgr.Not(res)
+            if left.is_bv_concat():
+                self._fire("concat_equals")
+                high, low = left.args()
+                return mgr.And(self._equals(high,
+                                            self._extract(right,
+                                                          low.bv_width(),
+                                                          right.bv_width()-1)),
+                               self._equals(low,
+                                            self._extract(right, 0,
+                                                          low.bv_width()-1)))
+            if left.is_bv_zext() or left.is_bv_sext():
+                arg = left.arg(0)
+                low = self._extract(right, 0, arg.bv_width() - 1)
+                extended = self._zext(low, left.bv_extend_step()) \
+                           if left.is_bv_zext() else \
+                              self._sext(low, left.bv_extend_step())
+                self._fire("compare_extend")
+                if extended != right:
+                    return mgr.FALSE()
+                return self._equals(arg, low)
+        elif _same_extension(left, right):
+            self._fire("compare_extend")
+            return self._equals(left.arg(0), right.arg(0))
+
+        width = left.bv_width()
+        mask = (1 << width) - 1
+        p0, _ = self._poly(left)
+        p1, _ = self._poly(right)
+        diff = dict(p0)
+        for t, c in p1.items():
+            _add_bv_coeff(diff, t, -c, mask)
+        atoms = [t for t in diff if t is not None]
+        if not atoms:
+            self._fire("equals_solve")
+            return mgr.Bool(not diff)
+        if len(atoms) == 1 and diff[atoms[0]] in (1, mask):
+            # c*x + k = 0, with c = 1 or c = -1
+            atom = atoms[0]
+            k = diff.get(None, 0)
+            value = (-k) & mask if diff[atom] == 1 else k
+            res = mgr.Equals(atom, mgr.BV(value, width))
+            if res != mgr.Equals(left, right):
+                self._fire("equals_solve")
+                return res
+        return mgr.Equals(left, right)
+
+    def walk_equals(self, formula, args, **kwargs):
+        if self.get_type(args[0]).is_bv_type():
+            return self._equals(args[0], args[1])
+        return self.mgr.Equals(args[0], args[1])
+
+    def _unsigned_lt(self, left, right, strict):
+        mgr = self.mgr
+        if left == right:
+            self._fire("equals")
+            return mgr.Bool(not strict)
+        if left.is_bv_constant() and right.is_bv_constant():
+            self._fire("constant_fold")
+            if strict:
+                return mgr.Bool(left.constant_value() < right.constant_value())
+            return mgr.Bool(left.constant_value() <= right.constant_value())
+        if _same_extension(left, right) and left.is_bv_zext():
+            self._fire("compare_extend")
+            return self._unsigned_lt(left.arg(0), right.arg(0), strict)
+        if (left.is_bv_zext() and right.is_bv_constant()) or \
+           (right.is_bv_zext() and left.is_bv_constant()):
+            self._fire("compare_extend")
+            return self._zext_lt_constant(left, right, strict)
+        width = left.bv_width()
+        res = self._min_max(left, right, strict, 0, (1 << width) - 1)
+        if res is not None:
+            return res
+        if strict:
+            return mgr.BVULT(left, right)
+        return mgr.BVULE(left, right)
+
+    def _zext_lt_constant(self, left, right, strict):
+        """Compares a zero-extended term with a constant."""
+        ext, const = (left, right) if left.is_bv_zext() else (right, left)
+        arg = ext.arg(0)
+        if (const.constant_value() >> arg.bv_width()) != 0:
+            # The constant is larger than any value of the extension
+            return self.mgr.Bool(ext is left)
+        low = self._extract(const, 0, arg.bv_width() - 1)
+        if ext is left:
+            return self._unsigned_lt(arg, low, strict)
+        return self._unsigned_lt(low, arg, strict)
+
+    def _signed_lt(self, left, right, strict):
+        mgr = self.mgr
+        if left == right:
+            self._fire("equals")
+            return mgr.Bool(not strict)
+        if left.is_bv_constant() and right.is_bv_constant():
+            self._fire("constant_fold")
+            if strict:
+                return mgr.Bool(left.bv_signed_value() <
+                                right.bv_signed_value())
+            return mgr.Bool(left.bv_signed_value() <= right.bv_signed_value())
+        if _same_extension(left, right) and left.is_bv_sext():
+            self._fire("compare_extend")
+            return self._signed_lt(left.arg(0), right.arg(0), strict)
+        if _msb_is_zero(left) and _msb_is_zero(right):
+            self._fire("signed_to_unsigned")
+            return self._unsigned_lt(left, right, strict)
+        width = left.bv_width()
+        res = self._min_max(left, right, strict,
+                            1 << (width - 1), (1 << (width - 1)) - 1)
+        if res is not None:
+            return res
+        if strict:
+            return mgr.BVSLT(left, right)
+        return mgr.BVSLE(left, right)
+
+    def _min_max(self, left, right, strict, min_value, max_value):
+        """Rewrites the comparison when one of the sides is the
+        minimum or maximum value (as unsigned integers)."""
+        mgr = self.mgr
+        width = left.bv_width()
+        lvalue = left.constant_value() if left.is_bv_constant() else None
+        rvalue = right.constant_value() if right.is_bv_constant() else None
+        if strict:
+            if rvalue == min_value or lvalue == max_value:
+                res = mgr.FALSE()
+            elif rvalue == max_value:
+                res = mgr.Not(self._equals(left, mgr.BV(max_value, width)))
+            elif lvalue == min_value:
+                res = mgr.Not(self._equals(right, mgr.BV(min_value, width)))
+            else:
+                return None
+        else:
+            if rvalue == max_value or lvalue == min_value:
+                res = mgr.TRUE()
+            elif rvalue == min_value:
+                res = self._equals(left, right)
+            elif lvalue == max_value:
+                res = self._equals(left, right)
+            else:
+                return None
+        self._fire("compare_min_max")
+        return res
+
+    def walk_bv_ult(self, formula, args, **kwargs):
+        return self._unsigned_lt(args[0], args[1], strict=True)
+
+    def walk_bv_ule(self, formula, args, **kwargs):
+        return self._unsigned_lt(args[0], args[1], strict=False)
+
+    def walk_bv_slt(self, formula, args, **kwargs):
+        return self._signed_lt(args[0], args[1], strict=True)
+
+    def walk_bv_sle(self, formula, args, **kwargs):
+        return self._signed_lt(args[0], args[1], strict=False)
+
+    def walk_bv_comp(self, formula, args, **kwargs):
+        mgr = self.mgr
+        left, right = args
+        if left == right:
+            self._fire("equals")
+            return mgr.BV(1, 1)
+        if left.is_bv_constant() and right.is_bv_constant():
+            self._fire("constant_fold")
+            return mgr.BV(0, 1)
+        if left.is_bv_constant():
+            left, right = right, left
+        if right.is_bv_constant() and right.bv_width() == 1:
+            self._fire("comp_equals")
+            if right.constant_value() == 1:
+                return left
+            return mgr.BVNot(left)
+        return mgr.BVComp(left, right)
+
+    #
+    # Bit-wise operators
+    #
+
+    def _bitwise(self, node):
+        mgr = self.mgr
+        if all(a.is_bv_constant() for a in node.args()):
+            return self._fold(node)
+        if node.is_bv_not():
+            if node.arg(0).is_bv_not():
+                self._fire("bitwise")
+                return node.arg(0).arg(0)
+            return node
+        left, right = node.args()
+        if left.is_bv_constant():
+            left, right = right, left
+        width = node.bv_width()
+        mask = (1 << width) - 1
+        res = None
+        if left == right:
+            res = mgr.BV(0, width) if node.is_bv_xor() else left
+        elif right.is_bv_constant():
+            value = right.constant_value()
+            if value == 0:
+                res = right if node.is_bv_and() else left
+            elif value == mask:
+                if node.is_bv_and():
+                    res = left
+                elif node.is_bv_or():
+                    res = right
+                else:
+                    res = self._bitwise(mgr.BVNot(left))
+        if res is None:
+            return node
+        self._fire("bitwise")
+        return res
+
+    def walk_bv_and(self, formula, args, **kwargs):
+        return self._bitwise(self.mgr.BVAnd(args[0], args[1]))
+
+    def walk_bv_or(self, formula, args, **kwargs):
+        return self._bitwise(self.mgr.BVOr(args[0], args[1]))
+
+    def walk_bv_xor(self, formula, args, **kwargs):
+        return self._bitwise(self.mgr.BVXor(args[0], args[1]))
+
+    def walk_bv_not(self, formula, args, **kwargs):
+        return self._bitwise(self.mgr.BVNot(args[0]))
+
+    def walk_bv_udiv(self, formula, args, **kwargs):
+        return self._fold(self.mgr.BVUDiv(args[0], args[1]))
+
+    def walk_bv_urem(self, formula, args, **kwargs):
+        return self._fold(self.mgr.BVURem(args[0], args[1]))
+
+    def walk_bv_sdiv(self, formula, args, **kwargs):
+        return self._fold(self.mgr.BVSDiv(args[0], args[1]))
+
+    def walk_bv_srem(self, formula, args, **kwargs):
+        return self._fold(self.mgr.BVSRem(args[0], args[1]))
+
+# EOC BVRewriter
+
+
+def _node_id(node):
+    return node.node_id()
+
+
+def _monomial_key(monomial):
+    return (len(monomial), [a.node_id() for a in monomial])
+
+
+def _add_monomial(poly, monomial, coeff):
+    res = poly.get(monomial, 0) + coeff
+    if res == 0:
+        poly.pop(monomial, None)
+    else:
+        poly[monomial] = res
+
+
+def _add_bv_coeff(poly, term, coeff, mask):
+    res = (poly.get(term, 0) + coeff) & mask
+    if res == 0:
+        poly.pop(term, None)
+    else:
+        poly[term] = res
+
+
+def _is_constant_poly(poly):
+    return all(t is None for t in poly)
+
+
+def _bv_poly_cost(poly, mask):
+    """Number of leaves of the canonical term of poly."""
+    return sum(1 if t is None or c in (1, mask) else 2
+               for t, c in poly.items())
+
+
+def _adjacent_extracts(high, low):
+    return high.is_bv_extract() and low.is_bv_extract() and \
+        high.arg(0) == low.arg(0) and \
+        high.bv_extract_start() == low.bv_extract_end() + 1
+
+
+def _same_extension(left, right):
+    return ((left.is_bv_zext() and right.is_bv_zext()) or
+            (left.is_bv_sext() and right.is_bv_sext())) and \
+            left.bv_extend_step() == right.bv_extend_step()
+
+
+def _msb_is_zero(term):
+    """Returns True if the most significant bit of term is known to
+    be zero."""
+    while term.is_bv_concat():
+        term = term.arg(0)
+    if term.is_bv_constant():
+        return (term.constant_value() >> (term.bv_width() - 1)) == 0
+    return term.is_bv_zext() and term.bv_extend_step() > 0
+
+
 def nnf(formula, environment=None):
     """Converts the given formula in NNF"""
     nnfizer = NNFizer(environment)
@@ -704,6 +1729,18 @@ def cnf_as_set(formula, environment=None):
     return cnfizer.convert(formula)
 
 
+def linear_normal_form(term, environment=None):
+    """Converts the given arithmetic term in its canonical linear form"""
+    normalizer = LinearNormalizer(environment)
+    return normalizer.normalize(term)
+
+
+def bv_rewrite(formula, environment=None):
+    """Applies the word-level rewritings of BVRewriter to formula"""
+    rewriter = BVRewriter(environment)
+    return rewriter.rewrite(formula)
+
+
 def prenex_normal_form(formula, environment=None):
     """Converts the given formula in Prenex Normal Form"""
     normalizer = PrenexNormalizer(environment)
@@ -76,6 +76,13 @@ def get_atoms(formula):
     """Returns the set of atoms of the formula."""
     return get_env().ao.get_atoms(formula)
 
+def structural_hash(formula, alpha=False, commutative=False):
+    """Returns a hash of the formula that does not depend on the
+    environment. See pysmt.hashing for details.
+    """
+    return get_env().formula_manager.structural_hash(formula, alpha=alpha,
+                                                     commutative=commutative)
+
 def get_formula_size(formula, measure=None):
     """Returns the size of the formula as measured by the given counting type.
     See pysmt.oracles.SizeOracle for details.
@@ -464,6 +471,27 @@ def get_model(formula, solver_name=None, logic=None):
                                  solver_name=solver_name,
                                  logic=logic)
 
+def iter_models(formula, important=None, limit=None, minimize=False,
+                solver_name=None, logic=None):
+    """Returns a generator over the models of formula, projected on the
+    important symbols.
+
+    At most limit models are generated. If minimize is True, each
+    model is shrunk to a partial assignment that makes formula True
+    for all its completions.
+    """
+    env = get_env()
+    if formula not in env.formula_manager:
+        warnings.warn("Warning: Contextualizing formula during iter_models")
+        formula = env.formula_manager.normalize(formula)
+
+    return env.factory.iter_models(formula,
+                                   important=important,
+                                   limit=limit,
+                                   minimize=minimize,
+                                   solver_name=solver_name,
+                                   logic=logic)
+
 def get_implicant(formula, solver_name=None, logic=None):
     """Returns a formula f_i such that Implies(f_i, formula) is valid or None
     if formula is unsatisfiable.
@@ -480,9 +508,13 @@ def get_implicant(formula, solver_name=None, logic=None):
                                      solver_name=solver_name,
                                      logic=logic)
 
-def get_unsat_core(clauses, solver_name=None, logic=None):
+def get_unsat_core(clauses, solver_name=None, logic=None, minimize=None):
     """Similar to :py:func:`get_model` but returns the unsat core of the
-    conjunction of the input clauses"""
+    conjunction of the input clauses.
+
+    If minimize is True or the name of a MUS algorithm (see
+    :py:func:`pysmt.mus.get_mus`), a minimal unsat core is returned.
+    """
     env = get_env()
     clauses = list(clauses)
     if any(c not in env.formula_manager for c in clauses):
@@ -491,7 +523,8 @@ def get_unsat_core(clauses, solver_name=None, logic=None):
 
     return env.factory.get_unsat_core(clauses,
                                       solver_name=solver_name,
-                                      logic=logic)
+                                      logic=logic,
+                                      minimize=minimize)
 
 def is_valid(formula, solver_name=None, logic=None):
     """Similar to :py:func:`is_sat` but checks validity."""
@@ -21,6 +21,7 @@ import pysmt.walkers
 import pysmt.operators as op
 import pysmt.typing as types
 from pysmt.utils import set_bit
+from pysmt.rewritings import LinearNormalizer
 
 
 class Simplifier(pysmt.walkers.DagWalker):
@@ -36,6 +37,7 @@ class Simplifier(pysmt.walkers.DagWalker):
 
         self._validate_simplifications = None
         self.original_walk = self.walk
+        self._linear = LinearNormalizer(self.env)
 
     @property
     def validate_simplifications(self):
@@ -58,11 +60,75 @@ class Simplifier(pysmt.walkers.DagWalker):
 
     def simplify(self, formula):
         """Performs simplification of the given formula."""
-        return self.walk(formula)
+        try:
+            return self.walk(formula)
+        finally:
+            # The polynomials are only needed within a simplification
+            self._linear.memoization.clear()
 
     def _get_key(self, formula, **kwargs):
         return formula
 
+    def _constant_difference(self, left, right):
+        """Returns the value of left - right, if the two arithmetic terms
+        differ by a constant, and None otherwise."""
+        ty = self.env.stc.get_type(left)
+        if not (ty.is_int_type() or ty.is_real_type()):
+            return None
+        if self._linear_atoms(left)[0] != self._linear_atoms(right)[0]:
+            return None
+        diff = self._linear.difference(left, right)
+        if len(diff) > 1 or (diff and () not in diff):
+            return None
+        return diff.get((), 0)
+
+    def _linear_atoms(self, term):
+        """Returns the atoms of the arithmetic term (the leaves of its
+        sums, differences and products), and whether an atom, a
+        sub-term or a constant occurs more than once.
+
+        This is a cheap necessary condition for the LinearNormalizer
+        to cancel or merge summands, or to find that two terms differ
+        by a constant.
+        """
+        atoms = set()
+        visited = set()
+        repeated = False
+        constants = 0
+        stack = [term]
+        while stack:
+            t = stack.pop()
+            if t.is_constant():
+                constants += 1
+            elif t in visited:
+                repeated = True
+            else:
+                visited.add(t)
+                if t.is_plus() or t.is_minus() or t.is_times():
+                    stack.extend(t.args())
+                else:
+                    atoms.add(t)
+        return atoms, repeated or constants > 1
+
+    def _cancel_summands(self, term):
+        """Returns the canonical linear form of the sum, if some of its
+        arguments cancel out or can be merged."""
+        if not (term.is_plus() or term.is_minus()):
+            return term
+        if not self._linear_atoms(term)[1]:
+            return term
+        poly = self._linear.get_polynomial(term)
+        summands, stack = 0, [term]
+        while stack:
+            t = stack.pop()
+            if t.is_plus() or t.is_minus():
+                stack.extend(t.args())
+            else:
+                summands += 1
+        if len(poly) < summands:
+            return self._linear.to_formula(poly, self.env.stc.get_type(term))
+        return term
+
     def walk_debug(self, formula, **kwargs):
         from pysmt.shortcuts import Equals, Iff, get_type, is_valid
         from pysmt.typing import BOOL
@@ -176,8 +242,11 @@ class Simplifier(pysmt.walkers.DagWalker):
             return self.manager.Bool(l == r)
         elif sl == sr:
             return self.manager.TRUE()
-        else:
-            return self.manager.Equals(sl, sr)
+
+        diff = self._constant_difference(sl, sr)
+        if diff is not None:
+            return self.manager.Bool(diff == 0)
+        return self.manager.Equals(sl, sr)
 
     def walk_ite(self, formula, args, **kwargs):
         assert len(args) == 3
@@ -206,6 +275,10 @@ class Simplifier(pysmt.walkers.DagWalker):
             r = sr.constant_value()
             return self.manager.Bool(l <= r)
 
+        diff = self._constant_difference(sl, sr)
+        if diff is not None:
+            return self.manager.Bool(diff <= 0)
+
         # # (le 0 (- X Y)) => (le Y X)
         if sl.is_zero() and sr.is_minus():
             x, y = sr.arg(0), sr.arg(1)
@@ -226,6 +299,10 @@ class Simplifier(pysmt.walkers.DagWalker):
             l = sl.constant_value()
             r = sr.constant_value()
             return self.manager.Bool(l < r)
+
+        diff = self._constant_difference(sl, sr)
+        if diff is not None:
+            return self.manager.Bool(diff < 0)
         return self.manager.LT(sl, sr)
 
     def walk_forall(self, formula, args, **kwargs):
@@ -278,20 +355,24 @@ class Simplifier(pysmt.walkers.DagWalker):
             if ns[0].is_times() and len(ns[0].args()) == 2:
                 t = ns[0]
                 if t.arg(0) == minus_one:
-                    return self.manager.Minus(ns[1], t.arg(1))
+                    return self._cancel_summands(
+                        self.manager.Minus(ns[1], t.arg(1)))
                 if t.arg(1) == minus_one:
-                    return self.manager.Minus(ns[1], t.arg(0))
+                    return self._cancel_summands(
+                        self.manager.Minus(ns[1], t.arg(0)))
             # (+ Y (* -1 X)) => (- Y X)
             if ns[1].is_times() and len(ns[0].args()) == 2:
                 t = ns[1]
                 if t.arg(0) == minus_one:
-                    return self.manager.Minus(ns[0], t.arg(1))
+                    return self._cancel_summands(
+                        self.manager.Minus(ns[0], t.arg(1)))
                 if t.arg(1) == minus_one:
-                    return self.manager.Minus(ns[0], t.arg(0))
+                    return self._cancel_summands(
+                        self.manager.Minus(ns[0], t.arg(0)))
 
         if len(ns) == 1:
             return ns[0]
-        return self.manager.Plus(ns)
+        return self._cancel_summands(self.manager.Plus(ns))
 
     def walk_times(self, formula, args, **kwargs):
         new_args = []
@@ -371,7 +452,7 @@ class Simplifier(pysmt.walkers.DagWalker):
             else:
                 return self.manager.Int(0)
 
-        return self.manager.Minus(sl, sr)
+        return self._cancel_summands(self.manager.Minus(sl, sr))
 
     def walk_function(self, formula, args, **kwargs):
         return self.manager.Function(formula.function_name(), args)
@@ -0,0 +1,292 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Cone-of-influence slicing of assertions.
+
+The cone of influence of a set of target terms is the set of
+assertions that are (transitively) connected to the targets through
+shared symbols (including uninterpreted function symbols). Assertions
+without free symbols are always part of the cone.
+
+The assertions outside of the cone do not share symbols with it: the
+values of the targets in a model of the cone can be extended to a
+model of all the assertions, as long as the remaining assertions are
+satisfiable.
+"""
+
+from pysmt.environment import get_env
+
+
+class ConeOfInfluence(object):
+    """Incremental computation of cones of influence.
+
+    Assertions are added one at a time; the symbols are kept in a
+    union-find (by size, without path compression), so that additions
+    can be undone with backtrack.
+    """
+
+    def __init__(self, environment=None):
+        self.env = environment if environment is not None else get_env()
+        self.get_free_variables = self.env.fvo.get_free_variables
+        self.assertions = []
+        self._parent = {}
+        # Maps each root to the sorted indices of its assertions
+        self._members = {}
+        self._ground = []
+        self._trail = []
+
+    def find(self, var):
+        while var in self._parent:
+            var = self._parent[var]
+        return var
+
+    def add_assertion(self, formula):
+        idx = len(self.assertions)
+        self.assertions.append(formula)
+        support = self.get_free_variables(formula)
+        if not support:
+            self._ground.append(idx)
+            self._trail.append(("ground",))
+            return
+        roots = set(self.find(v) for v in support)
+        root = max(roots, key=lambda r: len(self._members.get(r, ())))
+        if root not in self._members:
+            self._members[root] = []
+            self._trail.append(("new", root))
+        members = self._members[root]
+        for r in roots:
+            if r == root:
+                continue
+            other = self._members.pop(r, [])
+            self._parent[r] = root
+            self._trail.append(("union", r, root, len(members), other))
+            members.extend(other)
+        self._trail.append(("member", root))
+        # Indices are increasing, unless lists have been merged
+        if len(roots) > 1:
+            members.sort()
+        members.append(idx)
+
+    def add_assertions(self, formulae):
+        for f in formulae:
+            self.add_assertion(f)
+
+    def checkpoint(self):
+        """Returns a token to be used with backtrack."""
+        return (len(self.assertions), len(self._trail))
+
+    def backtrack(self, checkpoint):
+        """Removes the assertions added after checkpoint."""
+        num_assertions, trail_size = checkpoint
+        while len(self._trail) > trail_size:
+            entry = self._trail.pop()
+            if entry[0] == "ground":
+                self._ground.pop()
+            elif entry[0] == "new":
+                del self._members[entry[1]]
+            elif entry[0] == "member":
+                self._members[entry[1]].pop()
+            else:
+                _, r, root, size, other = entry
+                members = self._members[root]
+                # The merged lists are restored from the saved copy
+                merged = set(other)
+                self._members[root] = [i for i in members
+                                       if i not in merged][:size]
+                self._members[r] = other
+                del self._parent[r]
+        del self.assertions[num_assertions:]
+
+    def get_symbols(self, targets):
+        """Returns the free symbols of the target terms."""
+        res = set()
+        for t in targets:
+            res.update(self.get_free_variables(t))
+        return res
+
+    def get_slice_indices(self, targets):
+        """Returns the sorted indices of the assertions in the cone of
+        influence of targets."""
+        roots = set(self.find(v) for v in self.get_symbols(targets))
+        res = list(self._ground)
+        for r in roots:
+            res.extend(self._members.get(r, ()))
+        res.sort()
+        return res
+
+    def get_slice(self, targets):
+        """Returns the assertions in the cone of influence of targets,
+        in order of insertion."""
+        return [self.assertions[i] for i in self.get_slice_indices(targets)]
+
+# EOC ConeOfInfluence
+
+
+def slice_assertions(assertions, targets, environment=None):
+    """Returns the assertions in the cone of influence of targets."""
+    coi = ConeOfInfluence(environment)
+    coi.add_assertions(assertions)
+    return coi.get_slice(targets)
+
+
+class SlicingSolver(object):
+    """Wrapper of a Solver that only receives the assertions in the
+    cone of influence of the target terms and of the assumptions.
+
+    If targets is None all the assertions are forwarded. Since
+    the remaining assertions are not checked, a satisfiable result
+    only holds for the slice, unless check_remaining is True: in that
+    case the remaining assertions are checked (once, until they
+    change) within a push/pop of the backend.
+
+    The wrapper keeps its own assertion stack: push and pop are not
+    forwarded, and the backend is reset when a forwarded assertion is
+    popped or the slice shrinks. Other methods (e.g., get_model,
+    get_values) are forwarded to the backend.
+    """
+
+    def __init__(self, solver, targets=None, check_remaining=False,
+                 environment=None):
+        if environment is None:
+            environment = getattr(solver, "environment", None)
+        self.solver = solver
+        self.coi = ConeOfInfluence(environment)
+        self.targets = list(targets) if targets is not None else None
+        self.check_remaining = check_remaining
+        self._names = {}
+        self._forwarded = []
+        self._forwarded_set = set()
+        self._backtrack_points = []
+        self._remaining_checked = None
+
+    def set_targets(self, targets):
+        self.targets = list(targets) if targets is not None else None
+
+    @property
+    def assertions(self):
+        return list(self.coi.assertions)
+
+    def add_assertion(self, formula, named=None):
+        if named is not None:
+            self._names[len(self.coi.assertions)] = named
+        self.coi.add_assertion(formula)
+
+    def add_assertions(self, formulae):
+        for formula in formulae:
+            self.add_assertion(formula)
+
+    def push(self, levels=1):
+        for _ in range(levels):
+            self._backtrack_points.append(self.coi.checkpoint())
+
+    def pop(self, levels=1):
+        for _ in range(levels):
+            checkpoint = self._backtrack_points.pop()
+            self.coi.backtrack(checkpoint)
+        size = len(self.coi.assertions)
+        if any(i >= size for i in self._forwarded):
+            self._reset_backend()
+        for i in list(self._names):
+            if i >= size:
+                del self._names[i]
+
+    def reset_assertions(self):
+        self.coi = ConeOfInfluence(self.coi.env)
+        self._names = {}
+        self._backtrack_points = []
+        self._reset_backend()
+
+    def _reset_backend(self):
+        self.solver.reset_assertions()
+        self._forwarded = []
+        self._forwarded_set = set()
+        self._remaining_checked = None
+
+    def get_slice(self, assumptions=None):
+        """Returns the assertions that are forwarded by solve."""
+        return [self.coi.assertions[i]
+                for i in self._slice_indices(assumptions)]
+
+    def _slice_indices(self, assumptions):
+        if self.targets is None:
+            return list(range(len(self.coi.assertions)))
+        targets = list(self.targets)
+        if assumptions is not None:
+            targets.extend(assumptions)
+        return self.coi.get_slice_indices(targets)
+
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
+        return self._solve(assumptions, assumptions, timeout=timeout,
+                           memory_limit=memory_limit)
+
+    def _solve(self, extra_targets, assumptions, timeout=None,
+               memory_limit=None):
+        indices = self._slice_indices(extra_targets)
+        index_set = set(indices)
+        if not self._forwarded_set <= index_set:
+            # The slice is smaller than what the backend has
+            self._reset_backend()
+        if self.check_remaining:
+            remaining = [i for i in range(len(self.coi.assertions))
+                         if i not in index_set]
+            if remaining and not self._check_remaining(remaining):
+                return False
+        for i in indices:
+            if i not in self._forwarded_set:
+                self._forwarded.append(i)
+                self._forwarded_set.add(i)
+                self.solver.add_assertion(self.coi.assertions[i],
+                                          named=self._names.get(i))
+        return self.solver.solve(assumptions=assumptions, timeout=timeout,
+                                 memory_limit=memory_limit)
+
+    def _check_remaining(self, remaining):
+        key = tuple(self.coi.assertions[i] for i in remaining)
+        if self._remaining_checked is not None and \
+           self._remaining_checked[0] == key:
+            return self._remaining_checked[1]
+        self.solver.push()
+        try:
+            for i in remaining:
+                self.solver.add_assertion(self.coi.assertions[i])
+            res = self.solver.solve()
+        finally:
+            self.solver.pop()
+        self._remaining_checked = (key, res)
+        return res
+
+    def is_sat(self, formula):
+        self.push()
+        try:
+            self.add_assertion(formula)
+            return self._solve([formula], None)
+        finally:
+            self.pop()
+
+    def exit(self):
+        return self.solver.exit()
+
+    def __getattr__(self, name):
+        return getattr(self.solver, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.exit()
+
+# EOC SlicingSolver
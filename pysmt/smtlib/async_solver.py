@@ -0,0 +1,457 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""asyncio interface to solvers with a textual SMT-LIB interface.
+
+This module requires Python 3.5 or later.
+
+AsyncSmtLibSolver runs the solver in a subprocess created with
+asyncio.create_subprocess_exec: all the methods that interact with
+the solver are coroutines, and do not block the event loop while the
+solver is working. AsyncSolverPool runs many sessions on a bounded
+number of solver processes, that are reused across sessions.
+
+Example::
+
+    async def check(formulae):
+        pool = AsyncSolverPool(["z3", "-smt2", "-in"], max_processes=4)
+        try:
+            return await asyncio.gather(*[pool.is_sat(f, timeout=10)
+                                          for f in formulae])
+        finally:
+            await pool.close()
+"""
+
+import asyncio
+import signal
+
+from six.moves import cStringIO
+
+import pysmt.smtlib.commands as smtcmd
+from pysmt.environment import get_env
+from pysmt.solvers.eager import EagerModel
+from pysmt.smtlib.parser import SmtLibParser
+from pysmt.smtlib.script import SmtLibCommand
+from pysmt.exceptions import (SolverReturnedUnknownResultError,
+                              SolverTimeoutError, UnknownSolverAnswerError,
+                              InternalSolverError)
+
+
+class AsyncSmtLibSolver(object):
+    """asyncio-based wrapper for a solver with an SMT-LIB interface.
+
+    The process is launched by start() (or by entering the solver as
+    an asynchronous context manager). As in the pipelined
+    SmtLibSolver, the commands that are only acknowledged with
+    "success" are written without waiting for the answer, and the
+    acknowledgments are checked before the next command that returns
+    a result.
+
+    solve() accepts a timeout (in seconds): when it expires, the
+    solver is interrupted with SIGINT, and killed if it does not
+    answer within INTERRUPT_GRACE seconds; SolverTimeoutError is
+    raised in both cases. If a task is cancelled while answers of
+    the solver are still to be read (e.g., during solve()), the
+    process is killed. A killed solver cannot be used anymore.
+    """
+
+    # Seconds to wait for the answer of an interrupted solver
+    INTERRUPT_GRACE = 1.0
+    # Maximum number of unchecked acknowledgments
+    MAX_PENDING = 1000
+    # Maximum length of a line in the answers of the solver
+    LINE_LIMIT = 2**24
+
+    def __init__(self, args, environment=None, logic=None,
+                 generate_models=True):
+        self.environment = environment if environment is not None \
+                           else get_env()
+        self.args = args
+        self.logic = logic
+        self.generate_models = generate_models
+        self.parser = SmtLibParser(environment=self.environment)
+        self.declared_vars = set()
+        # Variables declared at each push level
+        self._scopes = []
+        self._pending = []
+        self._process = None
+        self._killed = False
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.exit()
+
+    async def start(self):
+        """Launches the solver process and initializes it."""
+        self._process = await asyncio.create_subprocess_exec(
+            *self.args, stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=self.LINE_LIMIT)
+        await self.set_option(":print-success", "true")
+        if self.generate_models:
+            await self.set_option(":produce-models", "true")
+        # Redirect diagnostic output to stdout
+        await self.set_option(":diagnostic-output-channel", '"stdout"')
+        if self.logic is not None:
+            await self._send_silent_command(
+                SmtLibCommand(smtcmd.SET_LOGIC, [self.logic]))
+
+    def is_running(self):
+        """Returns True if the solver process is alive."""
+        return self._process is not None and not self._killed and \
+            self._process.returncode is None
+
+    def _write(self, cmd):
+        if not self.is_running():
+            raise InternalSolverError("The solver process is not running")
+        buf = cStringIO()
+        cmd.serialize(buf, daggify=True)
+        buf.write("\n")
+        self._process.stdin.write(buf.getvalue().encode())
+
+    async def _send_command(self, cmd):
+        """Sends a command whose answer will be read by the caller."""
+        await self._check_pending()
+        self._write(cmd)
+        try:
+            await self._process.stdin.drain()
+        except asyncio.CancelledError:
+            # The answer would be left unread
+            self.kill()
+            raise
+
+    async def _send_silent_command(self, cmd):
+        """Sends a command that is acknowledged with "success"."""
+        self._write(cmd)
+        self._pending.append(cmd)
+        if len(self._pending) >= self.MAX_PENDING:
+            await self._check_pending()
+        else:
+            await self._process.stdin.drain()
+
+    async def _check_pending(self):
+        """Checks the acknowledgments of the commands sent so far.
+
+        All the answers are consumed; the error refers to the first
+        failing command.
+        """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        error = None
+        try:
+            await self._process.stdin.drain()
+            for cmd in pending:
+                res = await self._get_answer()
+                if res != "success" and error is None:
+                    error = UnknownSolverAnswerError(
+                        "Solver returned: '%s' for command: %s" %
+                        (res, cmd.serialize_to_string()))
+        except asyncio.CancelledError:
+            # The remaining acknowledgments would be left unread
+            self.kill()
+            raise
+        if error is not None:
+            raise error
+
+    async def _readline(self):
+        line = await self._process.stdout.readline()
+        if not line:
+            raise InternalSolverError("The solver process terminated")
+        return line.decode()
+
+    async def _get_answer(self):
+        """Reads a single line answer."""
+        res = await self._readline()
+        return res.strip()
+
+    async def _get_sexpr_answer(self):
+        """Reads an answer that can span several lines.
+
+        The lines are accumulated until the parentheses are balanced,
+        skipping quoted symbols, string literals and comments.
+        """
+        lines = []
+        depth = 0
+        quote = None
+        started = False
+        while True:
+            line = await self._readline()
+            lines.append(line)
+            if quote is None and not any(c in line for c in '|";'):
+                opened = line.count("(")
+                depth += opened - line.count(")")
+                started = started or opened > 0 or line.strip() != ""
+            else:
+                for c in line:
+                    if quote is not None:
+                        if c == quote:
+                            quote = None
+                    elif c == "|" or c == '"':
+                        quote = c
+                    elif c == ";":
+                        break
+                    elif c == "(":
+                        depth += 1
+                        started = True
+                    elif c == ")":
+                        depth -= 1
+                    elif not c.isspace():
+                        started = True
+            if started and depth <= 0 and quote is None:
+                return "".join(lines)
+
+    async def set_option(self, name, value):
+        await self._send_silent_command(
+            SmtLibCommand(smtcmd.SET_OPTION, [name, value]))
+
+    async def add_assertion(self, formula, named=None):
+        # See SmtLibSolver.add_assertion
+        formula = formula.simplify()
+        for d in formula.get_free_variables():
+            if d not in self.declared_vars:
+                await self._declare_variable(d)
+        await self._send_silent_command(SmtLibCommand(smtcmd.ASSERT,
+                                                      [formula]))
+
+    async def add_assertions(self, formulae):
+        for f in formulae:
+            await self.add_assertion(f)
+
+    async def _declare_variable(self, symbol):
+        await self._send_silent_command(SmtLibCommand(smtcmd.DECLARE_FUN,
+                                                      [symbol]))
+        self.declared_vars.add(symbol)
+        if self._scopes:
+            self._scopes[-1].append(symbol)
+
+    async def push(self, levels=1):
+        await self._send_silent_command(SmtLibCommand(smtcmd.PUSH,
+                                                      [levels]))
+        for _ in range(levels):
+            self._scopes.append([])
+
+    async def pop(self, levels=1):
+        await self._send_silent_command(SmtLibCommand(smtcmd.POP, [levels]))
+        # Declarations are removed together with their level
+        for _ in range(min(levels, len(self._scopes))):
+            self.declared_vars.difference_update(self._scopes.pop())
+
+    async def reset_assertions(self):
+        await self._send_silent_command(
+            SmtLibCommand(smtcmd.RESET_ASSERTIONS, []))
+        self.declared_vars = set()
+        self._scopes = []
+
+    async def solve(self, timeout=None):
+        """Checks the satisfiability of the current assertions.
+
+        If timeout is not None, SolverTimeoutError is raised if the
+        solver does not answer within timeout seconds.
+        """
+        await self._send_command(SmtLibCommand(smtcmd.CHECK_SAT, []))
+        try:
+            if timeout is None:
+                ans = await self._get_answer()
+            else:
+                try:
+                    ans = await asyncio.wait_for(self._get_answer(),
+                                                 timeout)
+                except asyncio.TimeoutError:
+                    ans = await self._interrupt()
+                    if ans is None or ans == "unknown":
+                        raise SolverTimeoutError
+        except asyncio.CancelledError:
+            self.kill()
+            raise
+        if ans == "sat":
+            return True
+        elif ans == "unsat":
+            return False
+        elif ans == "unknown":
+            raise SolverReturnedUnknownResultError
+        else:
+            raise UnknownSolverAnswerError("Solver returned: " + ans)
+
+    async def _interrupt(self):
+        """Interrupts the solver, and returns its answer.
+
+        If the solver does not answer, it is killed and None is
+        returned.
+        """
+        try:
+            self._process.send_signal(signal.SIGINT)
+            return await asyncio.wait_for(self._get_answer(),
+                                          self.INTERRUPT_GRACE)
+        except (asyncio.TimeoutError, InternalSolverError,
+                ProcessLookupError):
+            self.kill()
+            return None
+
+    async def get_value(self, item):
+        values = await self.get_values([item])
+        return values[item]
+
+    async def get_values(self, formulae):
+        """Returns a dictionary with the values of the formulae,
+        retrieved with a single get-value command."""
+        formulae = list(formulae)
+        if len(formulae) == 0:
+            return {}
+        await self._send_command(SmtLibCommand(smtcmd.GET_VALUE, formulae))
+        try:
+            text = await self._get_sexpr_answer()
+        except asyncio.CancelledError:
+            self.kill()
+            raise
+        lst = self.parser.get_assignment_list(cStringIO(text))
+        if len(lst) != len(formulae):
+            raise UnknownSolverAnswerError("Solver returned: " + text)
+        return dict((f, v) for f, (_, v) in zip(formulae, lst))
+
+    async def get_model(self):
+        """Returns the values of the declared variables."""
+        symbols = [s for s in self.declared_vars if s.is_term()]
+        assignment = await self.get_values(symbols)
+        return EagerModel(assignment=assignment,
+                          environment=self.environment)
+
+    def kill(self):
+        """Kills the solver process."""
+        if self.is_running():
+            self._process.kill()
+            self._killed = True
+        self._pending = []
+
+    async def exit(self):
+        """Terminates the solver process."""
+        if self._process is None:
+            return
+        if self.is_running():
+            self._pending = []
+            try:
+                self._write(SmtLibCommand(smtcmd.EXIT, []))
+                self._process.stdin.close()
+                await asyncio.wait_for(self._process.wait(),
+                                       self.INTERRUPT_GRACE)
+            except (asyncio.TimeoutError, BrokenPipeError,
+                    ConnectionResetError):
+                self.kill()
+        # Reap the (possibly killed) process
+        await self._process.wait()
+
+# EOC AsyncSmtLibSolver
+
+
+class AsyncSolverPool(object):
+    """Runs solver sessions on a bounded set of solver processes.
+
+    At most max_processes processes are running at the same time;
+    sessions in excess wait for a process to be released. Each session
+    runs within a push; at the end of the session the level is popped
+    and the process is kept for the next session, unless it is not
+    healthy anymore. (reset-assertions is not used, since some solvers
+    forget the logic when resetting the assertions.)
+    """
+
+    def __init__(self, args, environment=None, logic=None,
+                 max_processes=8, generate_models=True):
+        self.args = args
+        self.environment = environment
+        self.logic = logic
+        self.generate_models = generate_models
+        self.max_processes = max_processes
+        self._semaphore = asyncio.Semaphore(max_processes)
+        self._idle = []
+
+    async def acquire(self):
+        """Returns a started solver, with no assertions."""
+        await self._semaphore.acquire()
+        try:
+            while self._idle:
+                solver = self._idle.pop()
+                if solver.is_running():
+                    break
+            else:
+                solver = AsyncSmtLibSolver(
+                    self.args, environment=self.environment,
+                    logic=self.logic, generate_models=self.generate_models)
+                await solver.start()
+            # The session works within its own level, that is popped
+            # when the solver is released
+            await solver.push()
+            return solver
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def release(self, solver):
+        """Gives back a solver obtained with acquire()."""
+        try:
+            try:
+                if not solver.is_running():
+                    # E.g., killed by a cancellation
+                    raise InternalSolverError("The solver process is not "
+                                              "running")
+                if len(solver._scopes) == 0:
+                    # The level of the session has been popped
+                    raise InternalSolverError("Unbalanced pop")
+                await solver.pop(len(solver._scopes))
+                await solver._check_pending()
+                self._idle.append(solver)
+            except (UnknownSolverAnswerError, InternalSolverError,
+                    BrokenPipeError, ConnectionResetError):
+                # E.g., the process died but has not been reaped yet
+                await solver.exit()
+        finally:
+            self._semaphore.release()
+
+    def session(self):
+        """Asynchronous context manager that acquires and releases a
+        solver."""
+        return _PoolSession(self)
+
+    async def is_sat(self, formula, timeout=None):
+        """Checks the satisfiability of formula in a new session."""
+        async with self.session() as solver:
+            await solver.add_assertion(formula)
+            return await solver.solve(timeout=timeout)
+
+    async def close(self):
+        """Terminates the idle processes."""
+        idle, self._idle = self._idle, []
+        for solver in idle:
+            await solver.exit()
+
+# EOC AsyncSolverPool
+
+
+class _PoolSession(object):
+    def __init__(self, pool):
+        self.pool = pool
+        self.solver = None
+
+    async def __aenter__(self):
+        self.solver = await self.pool.acquire()
+        return self.solver
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.pool.release(self.solver)
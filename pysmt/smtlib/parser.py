@@ -877,21 +877,62 @@ class SmtLibParser(object):
         """
         symbols = self.env.formula_manager.symbols
         self.cache.update(symbols)
-        tokens = tokenizer(script, interactive=self.interactive)
+        tokens = self._assignment_tokenizer(script)
+        mgr = self.env.formula_manager
         res = []
         self.consume_opening(tokens, "<main>")
         current = next(tokens)
         while current != ")":
             if current != "(":
                 raise SyntaxError("'(' expected")
-            vname = self.get_expression(tokens)
-            expr = self.get_expression(tokens)
+            # Fast path for atoms (e.g., symbols and constants)
+            tk = next(tokens)
+            if tk != "(":
+                vname = self.atom(tk, mgr)
+            else:
+                vname = self.get_expression(itertools.chain([tk], tokens))
+            tk = next(tokens)
+            if tk != "(":
+                expr = self.atom(tk, mgr)
+            else:
+                expr = self.get_expression(itertools.chain([tk], tokens))
             self.consume_closing(tokens, current)
             res.append((vname, expr))
             current = next(tokens)
         self.cache.unbind_all(symbols)
         return res
 
+    def _assignment_tokenizer(self, script):
+        """Tokenizes the answer to a get-value or get-model command.
+
+        The answer is read line by line until its parentheses are
+        balanced. If it contains no quoted symbol, string literal or
+        comment, it is split on parentheses and spaces; otherwise, the
+        lines read so far are passed to the generic tokenizer.
+        """
+        if not hasattr(script, "readline"):
+            return tokenizer(script, interactive=self.interactive)
+        lines = []
+        depth = 0
+        started = False
+        while True:
+            line = script.readline()
+            lines.append(line)
+            if not line or "|" in line or '"' in line or ";" in line:
+                break
+            depth += line.count("(") - line.count(")")
+            # The closing parenthesis can be on a line of its own
+            started = started or line.strip() != ""
+            if started and depth <= 0:
+                text = "".join(lines)
+                return iter(text.replace("(", " ( ").replace(")", " ) ")
+                            .split())
+        if self.interactive:
+            rest = interactive_char_iterator(script)
+        else:
+            rest = script
+        return tokenizer(itertools.chain(lines, rest), interactive=False)
+
     def get_command(self, tokens):
         """Builds an SmtLibCommand instance out of a parsed term."""
         while True:
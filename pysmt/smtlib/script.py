@@ -79,7 +79,11 @@ class SmtLibCommand(namedtuple('SmtLibCommand', ['name', 'args'])):
         elif self.name == smtcmd.GET_VALUE:
             outstream.write("(%s (" % self.name)
             for a in self.args:
-                printer.printer(a)
+                if a.is_symbol():
+                    # Shortcut for the common case of model retrieval
+                    outstream.write(quote(a.symbol_name()))
+                else:
+                    printer.printer(a)
                 outstream.write(" ")
             outstream.write("))")
 
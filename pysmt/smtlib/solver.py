@@ -13,27 +13,54 @@
 # limitations under the License.
 
 import time
+import signal
+import threading
 from io import TextIOWrapper
 from subprocess import Popen, PIPE
 
 from six import PY2
+from six.moves import xrange
 
 import pysmt.smtlib.commands as smtcmd
 from pysmt.solvers.eager import EagerModel
 from pysmt.smtlib.parser import SmtLibParser
 from pysmt.smtlib.script import SmtLibCommand
-from pysmt.solvers.solver import Solver
+from pysmt.solvers.solver import Solver, Watchdog
 from pysmt.exceptions import (SolverReturnedUnknownResultError,
-                              UnknownSolverAnswerError)
+                              SolverTimeoutError, UnknownSolverAnswerError,
+                              InternalSolverError)
 
 class SmtLibSolver(Solver):
     """Wrapper for using a solver via textual SMT-LIB interface.
 
     The solver is launched in a subprocess using args as arguments of
     the executable. Interaction with the solver occurs via pipe.
+
+    If pipelined is True, commands that only return an acknowledgment
+    (e.g., declare-fun, assert, push and pop) are buffered and their
+    "success" answers are checked lazily, before the next command
+    that returns a result (check-sat, get-value). In this way, a
+    sequence of commands costs a single write and a single round trip.
+    Errors still report the offending command, but they are raised
+    only when the pending acknowledgments are checked. Set pipelined
+    to False to check each command as soon as it is sent.
+
+    The options, declarations and assertions are recorded (for each
+    push level), so that the solver process can be replaced by a new
+    one if it is killed because of a limit passed to solve().
     """
 
-    def __init__(self, args, environment, logic, LOGICS=None, **options):
+    # Maximum number of unchecked acknowledgments. The answers are
+    # read before they can fill the STDOUT pipe of the solver, that
+    # would otherwise block and stop reading its STDIN.
+    MAX_PENDING = 1000
+
+    # Seconds to wait for the answer of a solver that is interrupted
+    # because of a timeout, before killing it
+    INTERRUPT_GRACE = 1.0
+
+    def __init__(self, args, environment, logic, LOGICS=None,
+                 pipelined=True, pool=None, **options):
         Solver.__init__(self,
                         environment,
                         logic=logic)
@@ -44,44 +71,138 @@ class SmtLibSolver(Solver):
         if LOGICS is not None: self.LOGICS = LOGICS
         self.args = args
         self.declared_vars = set()
-        self.solver = Popen(args, stdout=PIPE, stderr=PIPE, stdin=PIPE,
-                            bufsize=-1)
-        # Give time to the process to start-up
-        time.sleep(0.01)
-        self.parser = SmtLibParser(interactive=True)
-        if PY2:
-            self.solver_stdin = self.solver.stdin
-            self.solver_stdout = self.solver.stdout
+        # Symbols declared at each push level, removed on pop
+        self._scopes = []
+        self.pipelined = pipelined
+        # Commands sent whose acknowledgment has not been read yet
+        self._pending = []
+        # Number of push levels opened by the user
+        self._depth = 0
+        # Options set by the user, and declarations and assertions of
+        # each level, replayed on a new process by _restart()
+        self._options = []
+        self._levels = [[]]
+        # State of solve() with limits, shared with the Watchdog
+        self._answer_lock = threading.Lock()
+        self._answered = False
+        self._interrupted = False
+        # True if check-sat must be repeated before reading the model
+        self._needs_check = False
+        self.pool = pool
+        self.parser = SmtLibParser(environment=self.environment,
+                                   interactive=True)
+        self._start_process()
+
+    def _start_process(self):
+        """Acquires (or launches) and initializes the solver process."""
+        if self.pool is None:
+            self._process = SolverProcess(self.args)
         else:
-            self.solver_stdin = TextIOWrapper(self.solver.stdin)
-            self.solver_stdout = TextIOWrapper(self.solver.stdout)
+            self._process = self.pool.acquire(self.args, self.logic,
+                                              self.options.generate_models)
+        self.solver = self._process.popen
+        self.solver_stdin = self._process.stdin
+        self.solver_stdout = self._process.stdout
 
-        # Initialize solver
-        self.set_option(":print-success", "true")
-        if self.options.generate_models:
-            self.set_option(":produce-models", "true")
-        # Redirect diagnostic output to stdout
-        self.set_option(":diagnostic-output-channel", '"stdout"')
-        self.set_logic(logic)
+        if not self._process.initialized:
+            # Initialize solver
+            self._set_option(":print-success", "true")
+            if self.options.generate_models:
+                self._set_option(":produce-models", "true")
+            # Redirect diagnostic output to stdout
+            self._set_option(":diagnostic-output-channel", '"stdout"')
+            self.set_logic(self.logic)
+            if self.pool is not None:
+                # A process is returned to the pool only if it was
+                # initialized correctly
+                try:
+                    self._check_pending()
+                except UnknownSolverAnswerError:
+                    self._process.close()
+                    raise
+            self._process.initialized = True
+        if self.pool is not None:
+            # The assertions are kept within a level, that is popped
+            # when the process is released
+            self._send_silent_command(SmtLibCommand(smtcmd.PUSH, [1]))
 
-    def set_option(self, name, value):
+    def _restart(self):
+        """Replaces the solver process with a new one, on which the
+        options, declarations and assertions are replayed."""
+        self._pending = []
+        self._process.close()
+        self._start_process()
+        for cmd in self._options:
+            self._send_silent_command(cmd)
+        for i, level in enumerate(self._levels):
+            if i > 0:
+                self._send_silent_command(SmtLibCommand(smtcmd.PUSH, [1]))
+            for cmd in level:
+                self._send_silent_command(cmd)
+        self._check_pending()
+
+    def _set_option(self, name, value):
         self._send_silent_command(SmtLibCommand(smtcmd.SET_OPTION,
                                                 [name, value]))
 
+    def set_option(self, name, value):
+        cmd = SmtLibCommand(smtcmd.SET_OPTION, [name, value])
+        self._options.append(cmd)
+        self._send_silent_command(cmd)
+
     def set_logic(self, logic):
         self._send_silent_command(SmtLibCommand(smtcmd.SET_LOGIC, [logic]))
 
-    def _send_command(self, cmd):
-        """Sends a command to the STDIN pipe."""
+    def _send_command(self, cmd, flush=True):
+        """Sends a command to the STDIN pipe.
+
+        All the pending acknowledgments are checked before sending a
+        command that returns an answer.
+        """
+        if flush:
+            if not self._process.is_alive():
+                raise InternalSolverError("The solver process terminated")
+            self._check_pending()
         if self.dbg: print("Sending: " + cmd.serialize_to_string())
         cmd.serialize(self.solver_stdin, daggify=True)
         self.solver_stdin.write("\n")
-        self.solver_stdin.flush()
+        if flush:
+            self.solver_stdin.flush()
 
     def _send_silent_command(self, cmd):
-        """Sends a command to the STDIN pipe and awaits for acknowledgment."""
-        self._send_command(cmd)
-        self._check_success()
+        """Sends a command to the STDIN pipe and awaits for acknowledgment.
+
+        In pipelined mode, the command is buffered and the
+        acknowledgment is checked by the next _check_pending().
+        """
+        if self.pipelined:
+            self._send_command(cmd, flush=False)
+            self._pending.append(cmd)
+            if len(self._pending) >= self.MAX_PENDING:
+                self._check_pending()
+        else:
+            self._send_command(cmd)
+            self._check_success(cmd)
+
+    def _check_pending(self):
+        """Flushes the buffered commands and checks their acknowledgments.
+
+        All the answers are consumed, so that the communication stays
+        in sync; the error refers to the first failing command.
+        """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self.solver_stdin.flush()
+        error = None
+        for cmd in pending:
+            try:
+                self._check_success(cmd)
+            except UnknownSolverAnswerError as ex:
+                if error is None:
+                    error = ex
+        if error is not None:
+            raise error
 
     def _get_answer(self):
         """Reads a line from STDOUT pipe"""
@@ -98,17 +219,28 @@ class SmtLibSolver(Solver):
     def _declare_variable(self, symbol):
         cmd = SmtLibCommand(smtcmd.DECLARE_FUN, [symbol])
         self._send_silent_command(cmd)
+        self._levels[-1].append(cmd)
         self.declared_vars.add(symbol)
+        if self._scopes:
+            self._scopes[-1].append(symbol)
 
-    def _check_success(self):
+    def _check_success(self, cmd=None):
         res = self._get_answer()
         if res != "success":
-            raise UnknownSolverAnswerError("Solver returned: '%s'" % res)
+            if cmd is None:
+                raise UnknownSolverAnswerError("Solver returned: '%s'" % res)
+            raise UnknownSolverAnswerError("Solver returned: '%s' for "
+                                           "command: %s" %
+                                           (res, cmd.serialize_to_string()))
 
-    def solve(self, assumptions=None):
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
         assert assumptions is None
+        self._needs_check = False
         self._send_command(SmtLibCommand(smtcmd.CHECK_SAT, []))
-        ans = self._get_answer()
+        if timeout is None and memory_limit is None:
+            ans = self._get_answer()
+        else:
+            ans = self._get_answer_with_limits(timeout, memory_limit)
         if ans == "sat":
             return True
         elif ans == "unsat":
@@ -118,8 +250,113 @@ class SmtLibSolver(Solver):
         else:
             raise UnknownSolverAnswerError("Solver returned: " + ans)
 
+    def _get_answer_with_limits(self, timeout, memory_limit):
+        """Reads the answer to check-sat within the given limits.
+
+        When the timeout expires, the solver is interrupted with
+        SIGINT, and killed if it does not answer within
+        INTERRUPT_GRACE seconds. The memory limit is a limit on the
+        address space of the process (this requires resource.prlimit,
+        i.e., Linux and Python 3). If the process is killed (or
+        terminates because of the memory limit), it is replaced by a
+        new one on which the assertions are replayed, so that the
+        solver remains usable.
+        """
+        previous = None
+        if memory_limit is not None:
+            previous = self._set_memory_limit(memory_limit)
+        self._killer = None
+        self._answered = self._interrupted = False
+        try:
+            with Watchdog(timeout, self._interrupt) as watchdog:
+                ans = self._get_answer()
+                with self._answer_lock:
+                    self._answered = True
+        finally:
+            if self._killer is not None:
+                self._killer.cancel()
+            if previous is not None and self._process.is_alive():
+                self._set_memory_limit(None, previous)
+
+        if ans == "":
+            # The process terminated: it is replaced
+            self._kill_process(force=True)
+            self.solver.wait()
+            self._restart()
+        elif self._interrupted and ans in ("sat", "unsat"):
+            # The answer arrived together with the interrupt, that
+            # might terminate an idle solver: the process is replaced,
+            # and the query is repeated if the model is needed
+            self._restart()
+            self._needs_check = True
+        if watchdog.expired and ans in ("unknown", ""):
+            raise SolverTimeoutError
+        if ans == "":
+            if memory_limit is not None:
+                raise SolverReturnedUnknownResultError("The solver "
+                                                       "terminated (out of "
+                                                       "memory?)")
+            raise InternalSolverError("The solver process terminated")
+        return ans
+
+    def _interrupt(self):
+        with self._answer_lock:
+            # The answer has already been read
+            if self._answered:
+                return
+            try:
+                self.solver.send_signal(signal.SIGINT)
+            except OSError:
+                return
+            self._interrupted = True
+            self._killer = threading.Timer(self.INTERRUPT_GRACE,
+                                           self._kill_process)
+            self._killer.daemon = True
+            self._killer.start()
+
+    def _kill_process(self, force=False):
+        with self._answer_lock:
+            if self._answered and not force:
+                return
+            try:
+                self.solver.kill()
+            except OSError:
+                pass
+
+    def _set_memory_limit(self, limit, limits=None):
+        """Sets the (soft) limit on the address space of the solver
+        process to limit MB, or to the given limits, and returns the
+        previous limits."""
+        try:
+            import resource
+            prlimit = resource.prlimit
+        except (ImportError, AttributeError):
+            raise NotImplementedError("Memory limits are not supported on "
+                                      "this platform")
+        pid = self.solver.pid
+        previous = prlimit(pid, resource.RLIMIT_AS)
+        if limits is None:
+            soft, hard = int(limit * 1024 * 1024), previous[1]
+            if hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+            limits = (soft, hard)
+        prlimit(pid, resource.RLIMIT_AS, limits)
+        return previous
+
     def reset_assertions(self):
-        self._send_silent_command(SmtLibCommand(smtcmd.RESET_ASSERTIONS, []))
+        self._levels = [[]]
+        if self.pool is None:
+            self._send_silent_command(SmtLibCommand(smtcmd.RESET_ASSERTIONS,
+                                                    []))
+        else:
+            # Pooled processes are reset by popping the session level
+            self._send_silent_command(SmtLibCommand(smtcmd.POP,
+                                                    [self._depth + 1]))
+            self._send_silent_command(SmtLibCommand(smtcmd.PUSH, [1]))
+        self._depth = 0
+        # Declarations are removed together with the assertions
+        self.declared_vars = set()
+        self._scopes = []
         return
 
     def add_assertion(self, formula, named=None):
@@ -130,39 +367,251 @@ class SmtLibSolver(Solver):
         for d in deps:
             if d not in self.declared_vars:
                 self._declare_variable(d)
-        self._send_silent_command(SmtLibCommand(smtcmd.ASSERT, [formula]))
+        cmd = SmtLibCommand(smtcmd.ASSERT, [formula])
+        self._send_silent_command(cmd)
+        self._levels[-1].append(cmd)
 
     def push(self, levels=1):
         self._send_silent_command(SmtLibCommand(smtcmd.PUSH, [levels]))
+        self._depth += levels
+        for _ in xrange(levels):
+            self._scopes.append([])
+            self._levels.append([])
 
     def pop(self, levels=1):
         self._send_silent_command(SmtLibCommand(smtcmd.POP, [levels]))
+        self._depth -= levels
+        del self._levels[max(1, len(self._levels) - levels):]
+        # The solver forgets the declarations of the popped levels
+        for _ in xrange(min(levels, len(self._scopes))):
+            self.declared_vars.difference_update(self._scopes.pop())
 
     def get_value(self, item):
-        self._send_command(SmtLibCommand(smtcmd.GET_VALUE, [item]))
+        return self.get_values([item])[item]
+
+    def get_values(self, formulae):
+        """Retrieves the values of all the formulae with a single
+        get-value command."""
+        formulae = list(formulae)
+        if len(formulae) == 0:
+            return {}
+        if self._needs_check:
+            self._needs_check = False
+            self._send_command(SmtLibCommand(smtcmd.CHECK_SAT, []))
+            self._get_answer()
+        self._send_command(SmtLibCommand(smtcmd.GET_VALUE, formulae))
         lst = self._get_value_answer()
-        assert len(lst) == 1
-        assert len(lst[0]) == 2
-        return lst[0][1]
+        if len(lst) != len(formulae):
+            raise UnknownSolverAnswerError("Solver returned %d values for "
+                                           "%d terms" % (len(lst),
+                                                         len(formulae)))
+        # Values are returned in the same order as the terms
+        return dict((f, v) for f, (_, v) in zip(formulae, lst))
 
     def print_model(self, name_filter=None):
         if name_filter is not None:
             raise NotImplementedError
-        for v in self.declared_vars:
-            print("%s = %s" % (v, self.get_value(v)))
+        for v, value in self.get_values(self.declared_vars).items():
+            print("%s = %s" % (v, value))
 
     def get_model(self):
-        assignment = {}
-        for s in self.environment.formula_manager.get_all_symbols():
-            if s.is_term():
-                v = self.get_value(s)
-                assignment[s] = v
+        """Returns the values of the declared variables.
+
+        The values are retrieved with a single get-value command.
+        """
+        symbols = [s for s in self.declared_vars if s.is_term()]
+        assignment = self.get_values(symbols)
         return EagerModel(assignment=assignment, environment=self.environment)
 
     def _exit(self):
-        self._send_command(SmtLibCommand(smtcmd.EXIT, []))
-        self.solver_stdin.close()
-        self.solver_stdout.close()
-        self.solver.stderr.close()
-        self.solver.terminate()
+        # Pending acknowledgments are not checked on exit
+        self._pending = []
+        if self.pool is None:
+            self._process.close()
+            return
+        # The process is returned to the pool only if the level of the
+        # session can be popped. The options set with set_option are
+        # not undone by pop: they would leak into the next session.
+        try:
+            if self._depth >= 0 and not self._options and \
+               self._process.is_alive():
+                self._send_silent_command(SmtLibCommand(smtcmd.POP,
+                                                        [self._depth + 1]))
+                self._check_pending()
+                self.pool.release(self._process)
+                return
+        except (UnknownSolverAnswerError, IOError, OSError):
+            pass
+        self._process.close()
         return
+
+# EOC SmtLibSolver
+
+
+class SolverProcess(object):
+    """A solver process, together with its text pipes."""
+
+    # Seconds given to the process to exit, before it is terminated
+    # (and then killed)
+    EXIT_GRACE = 1.0
+
+    def __init__(self, args):
+        self.args = args
+        self.popen = Popen(args, stdout=PIPE, stderr=PIPE, stdin=PIPE,
+                           bufsize=-1)
+        if PY2:
+            self.stdin = self.popen.stdin
+            self.stdout = self.popen.stdout
+        else:
+            self.stdin = TextIOWrapper(self.popen.stdin)
+            self.stdout = TextIOWrapper(self.popen.stdout)
+        # True if the options and the logic have been set
+        self.initialized = False
+        # Number of solvers that used the process
+        self.uses = 0
+        # Key of the SolverProcessPool
+        self.key = None
+
+    def is_alive(self):
+        return self.popen.poll() is None
+
+    def memory(self):
+        """Returns the resident memory of the process (in kB).
+
+        Returns None if it cannot be determined (this requires /proc).
+        """
+        try:
+            with open("/proc/%d/status" % self.popen.pid) as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except (IOError, OSError, ValueError):
+            pass
+        return None
+
+    def close(self):
+        """Terminates the process, and waits for it to exit."""
+        try:
+            if self.is_alive():
+                self.stdin.write("(exit)\n")
+                self.stdin.flush()
+        except (IOError, OSError, ValueError):
+            pass
+        for stream in (self.stdin, self.stdout, self.popen.stderr):
+            try:
+                stream.close()
+            except (IOError, OSError):
+                pass
+        if not self._wait(self.EXIT_GRACE):
+            try:
+                self.popen.terminate()
+            except OSError:
+                pass
+            if not self._wait(self.EXIT_GRACE):
+                try:
+                    self.popen.kill()
+                except OSError:
+                    pass
+                self.popen.wait()
+
+    def _wait(self, timeout):
+        """Waits up to timeout seconds for the process to exit, and
+        reaps it. Returns False if the process is still running."""
+        deadline = time.time() + timeout
+        delay = 0.001
+        while self.popen.poll() is None:
+            if time.time() >= deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        return True
+
+# EOC SolverProcess
+
+
+class SolverProcessPool(object):
+    """Keeps solver processes alive across SmtLibSolver instances.
+
+    Starting a solver process is often more expensive than solving a
+    small query. The pool keeps the processes that are released by
+    the SmtLibSolvers that use it, and hands them out to the next
+    solvers with the same command line, logic and model generation
+    option.
+
+    Each solver works within a push level, that is popped when the
+    process is released: the pop also acts as a health check. The
+    solvers that changed an option with set_option close their
+    process instead of releasing it. Processes are terminated (rather than kept) after max_uses
+    solvers, if their resident memory exceeds max_memory MB, or if
+    max_idle processes with the same key are already idle.
+    """
+
+    def __init__(self, max_idle=4, max_uses=100, max_memory=None):
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.max_memory = max_memory
+        self._idle = {}
+
+    @staticmethod
+    def _key(args, logic, generate_models):
+        return (tuple(args), str(logic), bool(generate_models))
+
+    def prestart(self, args, logic, generate_models=True, count=1):
+        """Starts processes for the given key, until count are idle."""
+        key = self._key(args, logic, generate_models)
+        processes = self._idle.setdefault(key, [])
+        while len(processes) < count:
+            process = SolverProcess(args)
+            process.key = key
+            processes.append(process)
+
+    def acquire(self, args, logic, generate_models=True):
+        """Returns an idle process for the key, or a new one."""
+        key = self._key(args, logic, generate_models)
+        processes = self._idle.get(key, [])
+        while processes:
+            process = processes.pop()
+            if process.is_alive():
+                break
+            process.close()
+        else:
+            process = SolverProcess(args)
+            process.key = key
+        process.uses += 1
+        return process
+
+    def release(self, process):
+        """Gives back a process obtained with acquire()."""
+        processes = self._idle.setdefault(process.key, [])
+        if not process.is_alive() or \
+           process.uses >= self.max_uses or \
+           len(processes) >= self.max_idle or \
+           self._exceeds_memory(process):
+            process.close()
+        else:
+            processes.append(process)
+
+    def _exceeds_memory(self, process):
+        if self.max_memory is None:
+            return False
+        memory = process.memory()
+        return memory is not None and memory > self.max_memory * 1024
+
+    def idle_count(self):
+        """Returns the number of idle processes."""
+        return sum(len(processes) for processes in self._idle.values())
+
+    def close(self):
+        """Terminates all the idle processes."""
+        idle, self._idle = self._idle, {}
+        for processes in idle.values():
+            for process in processes:
+                process.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+# EOC SolverProcessPool
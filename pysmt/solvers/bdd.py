@@ -26,11 +26,11 @@ except ImportError:
 
 import pysmt.logics
 from pysmt import typing as types
-from pysmt.solvers.solver import Solver, Converter, SolverOptions
+from pysmt.solvers.solver import Solver, Converter, SolverOptions, Watchdog
 from pysmt.solvers.eager import EagerModel
 from pysmt.walkers import DagWalker
 from pysmt.decorators import clear_pending_pop, catch_conversion_error
-from pysmt.exceptions import ConvertExpressionError
+from pysmt.exceptions import ConvertExpressionError, SolverTimeoutError
 from pysmt.oracles import get_logic
 from pysmt.solvers.qelim import QuantifierEliminator
 
@@ -146,18 +146,27 @@ class BddSolver(Solver):
         self.assertions_stack.append((formula, None))
 
     @clear_pending_pop
-    def solve(self, assumptions=None):
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
+        self._check_no_limits(None, memory_limit)
         if assumptions is not None:
             self.push()
             self.add_assertion(self.mgr.And(assumptions))
             self.pending_pop = True
 
-        for (i, (expr, bdd)) in enumerate(self.assertions_stack):
-            if bdd is None:
-                bdd_expr = self.converter.convert(expr)
-                _, previous_bdd = self.assertions_stack[i-1]
-                new_bdd = self.ddmanager.And(previous_bdd, bdd_expr)
-                self.assertions_stack[i] = (expr, new_bdd)
+        # CUDD operations cannot be stopped: the timeout is checked by
+        # the converter before each operation. The BDDs computed so
+        # far are kept, and reused by the next call.
+        try:
+            with Watchdog(timeout, self.converter.interrupt):
+                for (i, (expr, bdd)) in enumerate(self.assertions_stack):
+                    if bdd is None:
+                        bdd_expr = self.converter.convert(expr)
+                        _, previous_bdd = self.assertions_stack[i-1]
+                        self.converter.check_interrupted()
+                        new_bdd = self.ddmanager.And(previous_bdd, bdd_expr)
+                        self.assertions_stack[i] = (expr, new_bdd)
+        finally:
+            self.converter.interrupted = False
 
         _, current_state = self.assertions_stack[-1]
         res = (current_state != self.ddmanager.Zero())
@@ -228,12 +237,27 @@ class BddConverter(Converter, DagWalker):
         self.idx2var = {}
         self.var2node = {}
         self.back_memoization = {}
+        self.interrupted = False
 
     @catch_conversion_error
     def convert(self, formula):
         """Convert a PySMT formula into a BDD."""
         return self.walk(formula)
 
+    def interrupt(self):
+        """Stops the current conversion (called from another thread)."""
+        self.interrupted = True
+
+    def check_interrupted(self):
+        if self.interrupted:
+            # Drop the partial walk: the memoized BDDs are still valid
+            del self.stack[:]
+            raise SolverTimeoutError
+
+    def _compute_node_result(self, formula, **kwargs):
+        self.check_interrupted()
+        DagWalker._compute_node_result(self, formula, **kwargs)
+
     def back(self, bdd_expr):
         return self._walk_back(bdd_expr, self.fmgr).simplify()
 
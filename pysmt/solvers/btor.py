@@ -17,6 +17,8 @@
 #
 from math import log, ceil
 
+import time
+
 from pysmt.exceptions import SolverAPINotFound
 
 try:
@@ -30,6 +32,7 @@ from pysmt.solvers.smtlib import SmtLibBasicSolver, SmtLibIgnoreMixin
 from pysmt.solvers.eager import EagerModel
 from pysmt.walkers import DagWalker
 from pysmt.exceptions import (SolverReturnedUnknownResultError,
+                              SolverTimeoutError,
                               ConvertExpressionError)
 from pysmt.decorators import clear_pending_pop, catch_conversion_error
 from pysmt.logics import QF_BV, QF_UFBV, QF_ABV, QF_AUFBV, QF_AX
@@ -57,6 +60,7 @@ class BoolectorSolver(IncrementalTrackingSolver,
         self.converter = BTORConverter(environment, self.btor)
         self.mgr = environment.formula_manager
         self.declarations = {}
+        self._deadline = None
         return
 
     @clear_pending_pop
@@ -95,6 +99,25 @@ class BoolectorSolver(IncrementalTrackingSolver,
         else:
             raise SolverReturnedUnknownResultError
 
+    def _terminate(self, _):
+        """Termination callback, polled by Boolector during Sat()."""
+        if self._deadline is not None and time.time() >= self._deadline:
+            return 1
+        return 0
+
+    def _solve_with_limits(self, assumptions, timeout, memory_limit):
+        self._check_no_limits(None, memory_limit)
+        self._deadline = time.time() + timeout
+        self.btor.Set_term(self._terminate, None)
+        try:
+            return self._solve(assumptions=assumptions)
+        except SolverReturnedUnknownResultError:
+            if self._terminate(None):
+                raise SolverTimeoutError
+            raise
+        finally:
+            self._deadline = None
+
     def get_unsat_core(self):
         raise NotImplementedError
 
@@ -0,0 +1,727 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""Pure-Python CDCL SAT solver.
+
+This solver does not require any binding, and is therefore always
+available for QF_BOOL. The engine (CDCL) works on integer clauses, as
+produced by the PolarityCNFizer, and implements two-watched-literal
+propagation, VSIDS, phase saving, Luby restarts, first-UIP learning
+with recursive clause minimization, reduction of the learned clauses
+and solving under assumptions.
+"""
+
+import heapq
+from array import array
+
+from six.moves import xrange
+
+import pysmt.logics
+from pysmt import typing as types
+from pysmt.solvers.solver import (IncrementalTrackingSolver, UnsatCoreSolver,
+                                  Watchdog)
+from pysmt.solvers.eager import EagerModel
+from pysmt.rewritings import PolarityCNFizer
+from pysmt.decorators import clear_pending_pop, catch_conversion_error
+from pysmt.exceptions import (ConvertExpressionError, SolverStatusError,
+                              SolverNotConfiguredForUnsatCoresError,
+                              SolverReturnedUnknownResultError,
+                              SolverTimeoutError)
+
+
+class CDCL(object):
+    """A CDCL SAT engine over integer (DIMACS-like) literals.
+
+    Variables are positive integers created with new_var(). Internally,
+    the literal of variable v is 2*v if positive, 2*v+1 if negative.
+    Clauses can only be added between calls to solve(); after a
+    satisfiable call the model is available in model, after an
+    unsatisfiable one the subset of the assumptions responsible for
+    the conflict is available in core. A running solve() can be
+    stopped (e.g., from another thread) with interrupt(), in which
+    case it returns None.
+    """
+
+    RESTART_BASE = 100
+    VAR_DECAY = 0.95
+
+    def __init__(self):
+        self.num_vars = 0
+        # Indexed by internal literal: 1 (true), -1 (false), 0
+        self._value = [0, 0]
+        self._level = [0]
+        self._reason = [None]
+        self._activity = [0.0]
+        self._polarity = bytearray([1])
+        self._seen = bytearray([0])
+        self._watches = [[], []]
+        self._heap = []
+        self._var_inc = 1.0
+
+        self._trail = []
+        self._trail_lim = []
+        self._qhead = 0
+
+        self._clauses = []
+        self._learnts = []
+        self._lbd = {}
+        self._max_learnts = 2000
+        self._simp_trail = 0
+
+        self.ok = True
+        self.model = None
+        self.core = None
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.interrupted = False
+
+    def interrupt(self):
+        """Stops the running (or the next) call to solve()."""
+        self.interrupted = True
+
+    def new_var(self):
+        """Returns a new variable."""
+        self.num_vars += 1
+        v = self.num_vars
+        self._value.extend((0, 0))
+        self._level.append(0)
+        self._reason.append(None)
+        self._activity.append(0.0)
+        self._polarity.append(1)
+        self._seen.append(0)
+        self._watches.extend(([], []))
+        heapq.heappush(self._heap, (0.0, v))
+        return v
+
+    @staticmethod
+    def _internal(lit):
+        return 2 * lit if lit > 0 else 1 - 2 * lit
+
+    @staticmethod
+    def _external(lit):
+        return -(lit >> 1) if lit & 1 else lit >> 1
+
+    def value(self, lit):
+        """Returns the current value (True, False or None) of lit."""
+        val = self._value[self._internal(lit)]
+        return None if val == 0 else val > 0
+
+    #
+    # Clauses
+    #
+
+    def add_clause(self, lits):
+        """Adds a clause, given as an iterable of non-zero integers.
+
+        Returns False if the clauses are unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+        value = self._value
+        lits = set(self._internal(l) for l in lits)
+        clause = []
+        for l in lits:
+            if value[l] == 1 or (l ^ 1) in lits:
+                # Satisfied at level 0, or tautological
+                return True
+            if value[l] == 0:
+                clause.append(l)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self._clauses.append(clause)
+            self._attach(clause)
+        return self.ok
+
+    def _attach(self, clause):
+        self._watches[clause[0]].append(clause)
+        self._watches[clause[1]].append(clause)
+
+    def _locked(self, clause):
+        v = clause[0] >> 1
+        return self._reason[v] is clause and self._value[clause[0]] == 1
+
+    def _reduce_db(self):
+        """Removes half of the learned clauses, the ones with the
+        largest LBD (literal block distance) first."""
+        lbd = self._lbd
+        self._learnts.sort(key=lambda c: (lbd[id(c)], len(c)))
+        keep = len(self._learnts) // 2
+        kept = self._learnts[:keep]
+        for c in self._learnts[keep:]:
+            if lbd[id(c)] <= 2 or self._locked(c):
+                kept.append(c)
+            else:
+                del lbd[id(c)]
+                # Watch lists drop the empty clauses lazily
+                del c[:]
+        self._learnts = kept
+
+    def _simplify(self):
+        """Removes the clauses satisfied at level 0."""
+        if len(self._trail) == self._simp_trail:
+            return
+        self._simp_trail = len(self._trail)
+        value = self._value
+        for clauses in (self._clauses, self._learnts):
+            kept = []
+            for c in clauses:
+                if any(value[l] == 1 for l in c):
+                    self._lbd.pop(id(c), None)
+                    del c[:]
+                else:
+                    kept.append(c)
+            clauses[:] = kept
+
+    #
+    # Assignments and propagation
+    #
+
+    def _assign(self, lit, reason):
+        v = lit >> 1
+        self._value[lit] = 1
+        self._value[lit ^ 1] = -1
+        self._level[v] = len(self._trail_lim)
+        self._reason[v] = reason
+        self._trail.append(lit)
+
+    def _cancel_until(self, level):
+        if len(self._trail_lim) <= level:
+            return
+        value = self._value
+        polarity = self._polarity
+        activity = self._activity
+        heap = self._heap
+        start = self._trail_lim[level]
+        for lit in self._trail[start:]:
+            v = lit >> 1
+            value[lit] = 0
+            value[lit ^ 1] = 0
+            self._reason[v] = None
+            polarity[v] = lit & 1
+            heapq.heappush(heap, (-activity[v], v))
+        del self._trail[start:]
+        del self._trail_lim[level:]
+        self._qhead = len(self._trail)
+
+    def _propagate(self):
+        """Propagates the assignments on the trail.
+
+        Returns a conflicting clause, or None.
+        """
+        value = self._value
+        watches = self._watches
+        trail = self._trail
+        conflict = None
+        while self._qhead < len(trail) and conflict is None:
+            false_lit = trail[self._qhead] ^ 1
+            self._qhead += 1
+            self.propagations += 1
+            ws = watches[false_lit]
+            i = j = 0
+            n = len(ws)
+            while i < n:
+                c = ws[i]
+                i += 1
+                if not c:
+                    # Deleted clause
+                    continue
+                if c[0] == false_lit:
+                    c[0] = c[1]
+                    c[1] = false_lit
+                first = c[0]
+                if value[first] == 1:
+                    ws[j] = c
+                    j += 1
+                    continue
+                moved = False
+                for k in xrange(2, len(c)):
+                    l = c[k]
+                    if value[l] != -1:
+                        c[1] = l
+                        c[k] = false_lit
+                        watches[l].append(c)
+                        moved = True
+                        break
+                if moved:
+                    continue
+                ws[j] = c
+                j += 1
+                if value[first] == -1:
+                    conflict = c
+                    while i < n:
+                        ws[j] = ws[i]
+                        j += 1
+                        i += 1
+                else:
+                    self._assign(first, c)
+            del ws[j:]
+        if conflict is not None:
+            self._qhead = len(trail)
+        return conflict
+
+    #
+    # Conflict analysis
+    #
+
+    def _bump(self, v):
+        act = self._activity[v] + self._var_inc
+        self._activity[v] = act
+        if act > 1e100:
+            # Rescale all the activities
+            self._activity = [a * 1e-100 for a in self._activity]
+            self._var_inc *= 1e-100
+            self._heap = [(-self._activity[u], u)
+                          for u in xrange(1, self.num_vars + 1)
+                          if self._value[2 * u] == 0]
+            heapq.heapify(self._heap)
+        elif self._value[2 * v] == 0:
+            heapq.heappush(self._heap, (-act, v))
+
+    def _analyze(self, conflict):
+        """First-UIP conflict analysis.
+
+        Returns the learned clause (with the asserting literal first)
+        and the backjump level.
+        """
+        seen = self._seen
+        level = self._level
+        trail = self._trail
+        current = len(self._trail_lim)
+        learnt = [None]
+        to_clear = []
+        path = 0
+        p = None
+        idx = len(trail) - 1
+        clause = conflict
+        while True:
+            for q in (clause if p is None else clause[1:]):
+                v = q >> 1
+                if not seen[v] and level[v] > 0:
+                    seen[v] = 1
+                    to_clear.append(v)
+                    self._bump(v)
+                    if level[v] >= current:
+                        path += 1
+                    else:
+                        learnt.append(q)
+            while not seen[trail[idx] >> 1]:
+                idx -= 1
+            p = trail[idx]
+            idx -= 1
+            clause = self._reason[p >> 1]
+            seen[p >> 1] = 0
+            path -= 1
+            if path == 0:
+                break
+        learnt[0] = p ^ 1
+
+        # Recursive minimization: removes the literals implied by the
+        # other literals of the clause
+        levels = 0
+        for q in learnt[1:]:
+            levels |= 1 << (level[q >> 1] & 31)
+        res = [learnt[0]]
+        for q in learnt[1:]:
+            if self._reason[q >> 1] is None or \
+               not self._redundant(q, levels, to_clear):
+                res.append(q)
+        for v in to_clear:
+            seen[v] = 0
+
+        if len(res) == 1:
+            return res, 0
+        best = 1
+        for i in xrange(2, len(res)):
+            if level[res[i] >> 1] > level[res[best] >> 1]:
+                best = i
+        res[1], res[best] = res[best], res[1]
+        return res, level[res[1] >> 1]
+
+    def _redundant(self, lit, levels, to_clear):
+        seen = self._seen
+        level = self._level
+        reason = self._reason
+        stack = [lit]
+        top = len(to_clear)
+        while stack:
+            c = reason[stack.pop() >> 1]
+            for q in c[1:]:
+                v = q >> 1
+                if seen[v] or level[v] == 0:
+                    continue
+                if reason[v] is not None and \
+                   (1 << (level[v] & 31)) & levels:
+                    seen[v] = 1
+                    stack.append(q)
+                    to_clear.append(v)
+                else:
+                    # Undo the marks of this call
+                    for u in to_clear[top:]:
+                        seen[u] = 0
+                    del to_clear[top:]
+                    return False
+        return True
+
+    def _analyze_final(self, lit):
+        """Returns the assumptions implying the negation of lit (an
+        assumption that is false), including lit itself."""
+        core = [lit]
+        if not self._trail_lim:
+            return core
+        seen = self._seen
+        seen[lit >> 1] = 1
+        for i in xrange(len(self._trail) - 1, self._trail_lim[0] - 1, -1):
+            v = self._trail[i] >> 1
+            if seen[v]:
+                c = self._reason[v]
+                if c is None:
+                    if self._level[v] > 0:
+                        core.append(self._trail[i])
+                else:
+                    for q in c[1:]:
+                        if self._level[q >> 1] > 0:
+                            seen[q >> 1] = 1
+                seen[v] = 0
+        seen[lit >> 1] = 0
+        return core
+
+    #
+    # Search
+    #
+
+    def _pick_branch(self):
+        heap = self._heap
+        value = self._value
+        while heap:
+            _, v = heapq.heappop(heap)
+            if value[2 * v] == 0:
+                self.decisions += 1
+                return 2 * v + self._polarity[v]
+        return None
+
+    @staticmethod
+    def _luby(y, x):
+        size, seq = 1, 0
+        while size < x + 1:
+            seq += 1
+            size = 2 * size + 1
+        while size - 1 != x:
+            size = (size - 1) >> 1
+            seq -= 1
+            x = x % size
+        return y ** seq
+
+    def _search(self, budget, assumptions):
+        """Runs CDCL for at most budget conflicts.
+
+        Returns True, False or None (budget exhausted).
+        """
+        conflicts = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self._trail_lim:
+                    self.ok = False
+                    return False
+                learnt, backjump = self._analyze(conflict)
+                self._cancel_until(backjump)
+                if len(learnt) == 1:
+                    self._assign(learnt[0], None)
+                else:
+                    levels = set(self._level[l >> 1] for l in learnt)
+                    self._learnts.append(learnt)
+                    self._lbd[id(learnt)] = len(levels)
+                    self._attach(learnt)
+                    self._assign(learnt[0], learnt)
+                self._var_inc /= self.VAR_DECAY
+                continue
+
+            if conflicts >= budget or self.interrupted:
+                self._cancel_until(0)
+                return None
+            if not self._trail_lim:
+                self._simplify()
+            if len(self._learnts) - len(self._trail) >= self._max_learnts:
+                self._reduce_db()
+
+            lit = None
+            while len(self._trail_lim) < len(assumptions):
+                p = assumptions[len(self._trail_lim)]
+                if self._value[p] == 1:
+                    # Dummy decision level
+                    self._trail_lim.append(len(self._trail))
+                elif self._value[p] == -1:
+                    self.core = [self._external(l)
+                                 for l in self._analyze_final(p)]
+                    return False
+                else:
+                    lit = p
+                    break
+            if lit is None:
+                lit = self._pick_branch()
+                if lit is None:
+                    return True
+            self._trail_lim.append(len(self._trail))
+            self._assign(lit, None)
+
+    def solve(self, assumptions=None):
+        """Returns True iff the clauses are satisfiable under the
+        given assumptions (an iterable of integer literals), or None
+        if the search has been interrupted."""
+        self.model = None
+        self.core = None
+        if not self.ok:
+            self.core = []
+            return False
+        self._cancel_until(0)
+        assumptions = [self._internal(l) for l in (assumptions or ())]
+        self._max_learnts = max(self._max_learnts, len(self._clauses) // 3)
+
+        res = None
+        restarts = 0
+        while res is None and not self.interrupted:
+            budget = self._luby(2, restarts) * self.RESTART_BASE
+            res = self._search(budget, assumptions)
+            restarts += 1
+            if restarts % 4 == 0:
+                self._max_learnts = int(self._max_learnts * 1.1)
+
+        if res is None:
+            self.interrupted = False
+            return None
+        if res:
+            self.model = array('b', [0] * (self.num_vars + 1))
+            for lit in self._trail:
+                self.model[lit >> 1] = -1 if lit & 1 else 1
+        elif self.core is None:
+            # Unsatisfiable independently of the assumptions
+            self.core = []
+        self._cancel_until(0)
+        return res
+
+# EOC CDCL
+
+
+class CDCLSolver(IncrementalTrackingSolver, UnsatCoreSolver):
+    """Pure-Python CDCL solver for QF_BOOL.
+
+    Formulae are converted with the PolarityCNFizer. push() creates an
+    activation literal that guards the clauses asserted in the new
+    level, and is assumed by solve() until the level is popped. When
+    unsat cores are enabled, each assertion has its own activation
+    literal.
+    """
+
+    LOGICS = [pysmt.logics.QF_BOOL]
+
+    def __init__(self, environment, logic, **options):
+        IncrementalTrackingSolver.__init__(self,
+                                           environment=environment,
+                                           logic=logic,
+                                           **options)
+        self.mgr = environment.formula_manager
+        self.cnfizer = PolarityCNFizer(environment=environment)
+        self._reset_engine()
+
+    def _reset_engine(self):
+        self.engine = CDCL()
+        # Maps the variables of the cnfizer into variables of the engine
+        self._var_ids = array('i')
+        # One activation literal for each pushed level
+        self._levels = []
+        # Activation literals of the (tracked) assertions
+        self._selectors = {}
+        self._model = None
+        self._core = None
+
+    def _get_lit(self, lit):
+        var = abs(lit)
+        if var >= len(self._var_ids):
+            self._var_ids.extend([0] * (var + 1 - len(self._var_ids)))
+        vid = self._var_ids[var]
+        if vid == 0:
+            atom = self.cnfizer.get_atom(var)
+            if atom is not None and not atom.is_symbol(types.BOOL):
+                raise ConvertExpressionError("No theory terms are supported "
+                                             "in the CDCL solver", atom)
+            vid = self.engine.new_var()
+            self._var_ids[var] = vid
+        return vid if lit > 0 else -vid
+
+    def _add_cnf(self, cnf, guard=None):
+        # Map all the literals first, so that conversion errors do
+        # not leave partial clauses in the solver
+        lits = [self._get_lit(l) for l in cnf.literals]
+        offsets = cnf.offsets
+        for i in xrange(len(cnf)):
+            clause = lits[offsets[i]:offsets[i + 1]]
+            if guard is not None:
+                clause.append(-guard)
+            self.engine.add_clause(clause)
+
+    @clear_pending_pop
+    def _reset_assertions(self):
+        self._reset_engine()
+
+    @clear_pending_pop
+    def declare_variable(self, var):
+        pass
+
+    @clear_pending_pop
+    @catch_conversion_error
+    def _add_assertion(self, formula, named=None):
+        self._assert_is_boolean(formula)
+        cnf = self.cnfizer.convert(formula)
+        if self.options.unsat_cores_mode is not None:
+            key = self.engine.new_var()
+            self._add_cnf(cnf, guard=key)
+            self._selectors[key] = (named, formula)
+            return (key, named, formula)
+        self._add_cnf(cnf, guard=self._levels[-1] if self._levels else None)
+        return formula
+
+    @clear_pending_pop
+    @catch_conversion_error
+    def _solve(self, assumptions=None):
+        lits = list(self._levels)
+        if self.options.unsat_cores_mode is not None:
+            lits.extend(key for key, _, _ in self.assertions)
+        temporary = []
+        if assumptions is not None:
+            for a in assumptions:
+                if a.is_literal():
+                    lits.append(self._get_lit(self.cnfizer.literal(a)))
+                else:
+                    # Guarded by a fresh literal, disabled after solving
+                    guard = self.engine.new_var()
+                    self._add_cnf(self.cnfizer.convert(a), guard=guard)
+                    temporary.append(guard)
+                    lits.append(guard)
+
+        res = self.engine.solve(lits)
+        if res:
+            self._model = self._extract_model()
+            self._core = None
+        else:
+            self._model = None
+            self._core = self.engine.core
+        for guard in temporary:
+            self.engine.add_clause([-guard])
+        if res is None:
+            raise SolverReturnedUnknownResultError("Interrupted")
+        return res
+
+    def _solve_with_limits(self, assumptions, timeout, memory_limit):
+        self._check_no_limits(None, memory_limit)
+        try:
+            with Watchdog(timeout, self.engine.interrupt) as watchdog:
+                try:
+                    return self._solve(assumptions=assumptions)
+                except SolverReturnedUnknownResultError:
+                    if watchdog.expired:
+                        raise SolverTimeoutError
+                    raise
+        finally:
+            # The watchdog can expire after the end of the search
+            self.engine.interrupted = False
+
+    def _extract_model(self):
+        model = self.engine.model
+        assignment = {}
+        for cnf_var, atom in self.cnfizer.iter_atoms():
+            if cnf_var >= len(self._var_ids) or self._var_ids[cnf_var] == 0:
+                continue
+            assignment[atom] = self.mgr.Bool(model[self._var_ids[cnf_var]] > 0)
+        return EagerModel(assignment=assignment,
+                          environment=self.environment)
+
+    def get_model(self):
+        if self._model is None:
+            raise SolverStatusError("No model available")
+        return self._model
+
+    def get_value(self, item):
+        self._assert_no_function_type(item)
+        return self.get_model().get_value(item)
+
+    def print_model(self, name_filter=None):
+        for var, value in self.get_model():
+            if name_filter is None or \
+               not var.symbol_name().startswith(name_filter):
+                print("%s = %s" % (var.symbol_name(), value))
+
+    def get_unsat_core(self):
+        """After a call to solve() yielding UNSAT, returns the unsat core as a
+        set of formulae"""
+        return self.get_named_unsat_core().values()
+
+    def get_named_unsat_core(self):
+        """After a call to solve() yielding UNSAT, returns the unsat core as a
+        dict of names to formulae"""
+        if self.options.unsat_cores_mode is None:
+            raise SolverNotConfiguredForUnsatCoresError
+
+        if self.last_result is not False:
+            raise SolverStatusError("The last call to solve() was not" \
+                                    " unsatisfiable")
+
+        if self.last_command != "solve":
+            raise SolverStatusError("The solver status has been modified by a" \
+                                    " '%s' command after the last call to" \
+                                    " solve()" % self.last_command)
+
+        res = {}
+        cnt = 0
+        for lit in sorted(self._core):
+            if lit not in self._selectors:
+                continue
+            name, formula = self._selectors[lit]
+            if name is None:
+                name = "_a_%d" % cnt
+                cnt += 1
+            res[name] = formula
+        return res
+
+    @clear_pending_pop
+    def _push(self, levels=1):
+        for _ in xrange(levels):
+            self._levels.append(self.engine.new_var())
+
+    @clear_pending_pop
+    def _pop(self, levels=1):
+        # The clauses of the popped levels are disabled for good
+        for _ in xrange(levels):
+            self.engine.add_clause([-self._levels.pop()])
+        if self.options.unsat_cores_mode is not None:
+            point = self._backtrack_points[-levels]
+            for key, _, _ in self.assertions[point:]:
+                self.engine.add_clause([-key])
+                del self._selectors[key]
+
+    def _exit(self):
+        del self.engine
+
+# EOC CDCLSolver
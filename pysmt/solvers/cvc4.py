@@ -29,6 +29,7 @@ from pysmt.logics import PYSMT_LOGICS, ARRAYS_CONST_LOGICS
 
 from pysmt.solvers.solver import Solver, Converter
 from pysmt.exceptions import (SolverReturnedUnknownResultError,
+                              SolverTimeoutError,
                               InternalSolverError,
                               NonLinearError)
 from pysmt.walkers import DagWalker
@@ -90,7 +91,19 @@ class CVC4Solver(Solver, SmtLibBasicSolver, SmtLibIgnoreMixin):
                 assignment[s] = v
         return EagerModel(assignment=assignment, environment=self.environment)
 
-    def solve(self, assumptions=None):
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
+        self._check_no_limits(None, memory_limit)
+        if timeout is None:
+            return self._solve(assumptions)
+        # The per-call time limit (in ms) of CVC4
+        self.cvc4.setOption("tlimit-per",
+                            CVC4.SExpr(max(1, int(timeout * 1000))))
+        try:
+            return self._solve(assumptions)
+        finally:
+            self.cvc4.setOption("tlimit-per", CVC4.SExpr(0))
+
+    def _solve(self, assumptions=None):
         if assumptions is not None:
             conj_assumptions = self.environment.formula_manager.And(assumptions)
             cvc4_assumption = self.converter.convert(conj_assumptions)
@@ -104,6 +117,8 @@ class CVC4Solver(Solver, SmtLibBasicSolver, SmtLibIgnoreMixin):
         # Convert returned type
         res_type = res.isSat()
         if res_type == CVC4.Result.SAT_UNKNOWN:
+            if res.whyUnknown() == CVC4.Result.TIMEOUT:
+                raise SolverTimeoutError()
             raise SolverReturnedUnknownResultError()
         else:
             return res_type == CVC4.Result.SAT
@@ -15,6 +15,8 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 #
+import time
+
 from warnings import warn
 from six.moves import xrange
 
@@ -36,6 +38,7 @@ from pysmt.solvers.solver import (IncrementalTrackingSolver, UnsatCoreSolver,
 from pysmt.solvers.smtlib import SmtLibBasicSolver, SmtLibIgnoreMixin
 from pysmt.walkers import DagWalker
 from pysmt.exceptions import (SolverReturnedUnknownResultError,
+                              SolverTimeoutError,
                               SolverNotConfiguredForUnsatCoresError,
                               SolverStatusError,
                               InternalSolverError,
@@ -256,6 +259,24 @@ class MathSAT5Solver(IncrementalTrackingSolver, UnsatCoreSolver,
 
         return (res == mathsat.MSAT_SAT)
 
+    def _solve_with_limits(self, assumptions, timeout, memory_limit):
+        # MathSAT polls the termination test during the search
+        self._check_no_limits(None, memory_limit)
+        deadline = time.time() + timeout
+
+        def expired():
+            return 1 if time.time() >= deadline else 0
+
+        mathsat.msat_set_termination_test(self.msat_env(), expired)
+        try:
+            return self._solve(assumptions=assumptions)
+        except SolverReturnedUnknownResultError:
+            if expired():
+                raise SolverTimeoutError
+            raise
+        finally:
+            mathsat.msat_set_termination_test(self.msat_env(), None)
+
     def _check_unsat_core_config(self):
         if self.options.unsat_cores_mode is None:
             raise SolverNotConfiguredForUnsatCoresError
@@ -22,16 +22,19 @@ try:
 except ImportError:
     raise SolverAPINotFound
 
+import time
+
+from array import array
+
 from six.moves import xrange
-from six import iteritems
 
 import pysmt.logics
 from pysmt import typing as types
 from pysmt.solvers.solver import Solver
 from pysmt.solvers.eager import EagerModel
-from pysmt.rewritings import CNFizer
+from pysmt.rewritings import PolarityCNFizer, ClauseBuffer
 from pysmt.decorators import clear_pending_pop, catch_conversion_error
-from pysmt.exceptions import ConvertExpressionError
+from pysmt.exceptions import ConvertExpressionError, SolverTimeoutError
 
 
 class PicosatSolver(Solver):
@@ -39,6 +42,9 @@ class PicosatSolver(Solver):
 
     LOGICS = [ pysmt.logics.QF_BOOL ]
 
+    # Number of decisions between two checks of the timeout
+    DECISIONS_PER_SLICE = 10000
+
     def __init__(self, environment, logic, **options):
         Solver.__init__(self,
                         environment=environment,
@@ -48,44 +54,38 @@ class PicosatSolver(Solver):
         self.mgr = environment.formula_manager
         self.pico = picosat.picosat_init()
         self.converter = None
-        self.cnfizer = CNFizer(environment=environment)
+        self.cnfizer = PolarityCNFizer(environment=environment)
         self.latest_model = None
-        self._var_ids = {}
-
+        # Maps the variables of the cnfizer into PicoSAT variables
+        self._var_ids = array('i')
 
-    def _get_var_id(self, symbol):
-        if not symbol.is_symbol(types.BOOL):
-            raise ConvertExpressionError("No theory terms are supported in PicoSAT")
 
-        if symbol in self._var_ids:
-            return self._var_ids[symbol]
-        else:
+    def _get_pico_lit(self, lit):
+        var = abs(lit)
+        if var >= len(self._var_ids):
+            self._var_ids.extend([0] * (var + 1 - len(self._var_ids)))
+        vid = self._var_ids[var]
+        if vid == 0:
+            atom = self.cnfizer.get_atom(var)
+            if atom is not None and not atom.is_symbol(types.BOOL):
+                raise ConvertExpressionError("No theory terms are supported "
+                                             "in PicoSAT")
             vid = picosat.picosat_inc_max_var(self.pico)
-            self._var_ids[symbol] = vid
-            return vid
+            self._var_ids[var] = vid
+        return vid if lit > 0 else -vid
 
 
     @clear_pending_pop
     def reset_assertions(self):
         picosat.picosat_reset(self.pico)
         self.pico = picosat.picosat_init()
+        self._var_ids = array('i')
 
     @clear_pending_pop
     def declare_variable(self, var):
         # no need to declare variables
         pass
 
-    def _get_pico_lit(self, lit):
-        mult = 1
-        var = lit
-        if lit.is_not():
-            mult = -1
-            var = lit.arg(0)
-
-        vid = self._get_var_id(var)
-        return vid * mult
-
-
     @clear_pending_pop
     @catch_conversion_error
     def add_assertion(self, formula, named=None):
@@ -98,34 +98,45 @@ class PicosatSolver(Solver):
             self._add_cnf_assertion(cnf)
 
     def _add_cnf_assertion(self, cnf):
-        for clause in cnf:
-            for lit in clause:
-                v = self._get_pico_lit(lit)
-                picosat.picosat_add(self.pico, v)
+        # Map all the literals first, so that conversion errors do
+        # not leave partial clauses in the solver
+        lits = [self._get_pico_lit(l) for l in cnf.literals]
+        start = 0
+        for end in cnf.offsets[1:]:
+            for i in xrange(start, end):
+                picosat.picosat_add(self.pico, lits[i])
             picosat.picosat_add(self.pico, 0)
+            start = end
 
     @clear_pending_pop
     @catch_conversion_error
-    def solve(self, assumptions=None):
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
+        self._check_no_limits(None, memory_limit)
+        assumed = []
         if assumptions is not None:
-            cnf = []
+            cnf = ClauseBuffer()
             for a in assumptions:
-                cnf += self.cnfizer.convert(a)
+                cnf.extend(self.cnfizer.convert(a))
 
-            missing = []
+            missing = ClauseBuffer()
             for clause in cnf:
                 if len(clause) == 1:
-                    v = self._get_pico_lit(next(iter(clause)))
-                    picosat.picosat_assume(self.pico, v)
+                    assumed.append(self._get_pico_lit(clause[0]))
                 else:
-                    missing.append(clause)
+                    missing.add_clause(clause)
 
             if len(missing) > 0:
                 self.push()
                 self._add_cnf_assertion(missing)
                 self.pending_pop = True
 
-        res = picosat.picosat_sat(self.pico, -1)
+        self.latest_model = None
+        if timeout is None:
+            for v in assumed:
+                picosat.picosat_assume(self.pico, v)
+            res = picosat.picosat_sat(self.pico, -1)
+        else:
+            res = self._sat_with_deadline(assumed, time.time() + timeout)
         if res == picosat.PICOSAT_SATISFIABLE:
             self.latest_model = self.get_model()
             return True
@@ -134,6 +145,20 @@ class PicosatSolver(Solver):
             return False
 
 
+    def _sat_with_deadline(self, assumed, deadline):
+        """Runs the search in slices of DECISIONS_PER_SLICE decisions,
+        until it terminates or the deadline expires."""
+        while True:
+            # The assumptions are valid for a single call
+            for v in assumed:
+                picosat.picosat_assume(self.pico, v)
+            res = picosat.picosat_sat(self.pico, self.DECISIONS_PER_SLICE)
+            if res != picosat.PICOSAT_UNKNOWN:
+                return res
+            if time.time() >= deadline:
+                raise SolverTimeoutError()
+
+
     def get_value(self, item):
         if self.latest_model is None:
             self.get_model()
@@ -142,7 +167,10 @@ class PicosatSolver(Solver):
 
     def get_model(self):
         assignment = {}
-        for var, vid in iteritems(self._var_ids):
+        for cnf_var, var in self.cnfizer.iter_atoms():
+            if cnf_var >= len(self._var_ids) or self._var_ids[cnf_var] == 0:
+                continue
+            vid = self._var_ids[cnf_var]
             v = picosat.picosat_deref(self.pico, vid)
             if v == 0:
                 assert False
@@ -15,10 +15,12 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 #
+from six import iteritems
+
 import pysmt.logics
 
 from pysmt.walkers.identitydag import IdentityDagWalker
-from pysmt.utils import all_assignments
+from pysmt.oracles import SizeOracle, get_logic
 from pysmt.exceptions import InternalSolverError
 
 
@@ -63,17 +65,53 @@ class QuantifierEliminator(object):
 
 
 class ShannonQuantifierEliminator(QuantifierEliminator, IdentityDagWalker):
-    """Quantifier Elimination using Shannon Expansion."""
+    """Quantifier Elimination using Shannon Expansion.
+
+    The quantified variables are eliminated one at a time, in the
+    order chosen by the ordering heuristic:
+
+    * "min-fill": the variable whose elimination adds the fewest edges
+      to the interaction graph of the variables (two variables
+      interact if they occur in the same conjunct of an existential,
+      or disjunct of a universal, quantifier); ties are broken by the
+      number of occurrences;
+    * "occurrences": the variable with the fewest occurrences;
+    * None: the order of the quantifier.
+
+    Only the conjuncts (disjuncts) depending on the variable are
+    expanded, and the cofactors are simplified as soon as they are
+    built; universal (existential) quantifiers are distributed over
+    conjunctions (disjunctions). The cofactors are memoized on (node,
+    partial assignment) during the elimination of a formula.
+
+    If node_budget is given and the DAG of the expansion grows beyond
+    it, the remaining variables are eliminated with BDDs, if
+    available.
+    """
 
     LOGICS = [pysmt.logics.BOOL]
 
-    def __init__(self, environment, logic=None):
+    ORDERINGS = ("min-fill", "occurrences", None)
+
+    def __init__(self, environment, logic=None, ordering="min-fill",
+                 node_budget=None):
         IdentityDagWalker.__init__(self, env=environment)
         QuantifierEliminator.__init__(self)
+        if ordering not in self.ORDERINGS:
+            raise ValueError("Unknown variable ordering '%s'" % ordering)
         self.logic = logic
+        self.ordering = ordering
+        self.node_budget = node_budget
+        self._cofactors = {}
+        self._bdd_qelim = None
 
     def eliminate_quantifiers(self, formula):
-        return self.walk(formula)
+        try:
+            return self.walk(formula)
+        finally:
+            # The cofactors of a formula are rarely reused by the next
+            # one: do not keep them alive
+            self._cofactors.clear()
 
     def _assert_vars_boolean(self, var_set):
         for v in var_set:
@@ -83,21 +121,220 @@ class ShannonQuantifierEliminator(QuantifierEliminator, IdentityDagWalker):
                     "quantification over Boolean variables: "\
                     "(%s is %s)" % (v, v.symbol_type()))
 
-    def _expand(self, formula, args):
-        """Returns the list of elements from the Shannon expansion."""
+    def cofactor(self, formula, assignment):
+        """Returns the simplified formula obtained by replacing the
+        Boolean variables in assignment (a dict var -> bool) with their
+        values.
+
+        The results are memoized on the node and on the restriction of
+        the assignment to the free variables of the node, so that the
+        sub-formulae that do not depend on the assignment are shared.
+        """
+        fvo = self.env.fvo
+        items = list(iteritems(assignment))
+
+        def key(node):
+            fv = fvo.get_free_variables(node)
+            restricted = frozenset((v, b) for v, b in items if v in fv)
+            return (node, restricted) if restricted else None
+
+        root_key = key(formula)
+        if root_key is None:
+            return formula
+        res = self._cofactors.get(root_key)
+        if res is not None:
+            return res
+
+        keys = {formula: root_key}
+        stack = [(formula, False)]
+        while stack:
+            node, expanded = stack.pop()
+            k = keys[node]
+            if k in self._cofactors:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                for c in node.args():
+                    if c not in keys:
+                        keys[c] = key(c)
+                    if keys[c] is not None and keys[c] not in self._cofactors:
+                        stack.append((c, False))
+                continue
+            if node.is_symbol():
+                res = self.mgr.Bool(assignment[node])
+            else:
+                args = [self._cofactors[keys[c]] if keys[c] is not None
+                        else c for c in node.args()]
+                if node.is_and() or node.is_or():
+                    res = self._connective(args, node.is_and())
+                else:
+                    res = self.mgr.create_node(node.node_type(), tuple(args),
+                                               node._content.payload)
+                    res = self.env.simplifier.simplify(res)
+            self._cofactors[k] = res
+        return self._cofactors[root_key]
+
+    def _connective(self, args, conjunction):
+        """Returns the conjunction (disjunction) of args, flattened and
+        without duplicates; complementary literals are detected."""
+        mgr = self.mgr
+        if conjunction:
+            neutral, absorbing = mgr.TRUE(), mgr.FALSE()
+        else:
+            neutral, absorbing = mgr.FALSE(), mgr.TRUE()
+        res, seen, negated = [], set(), set()
+        for a in self._flatten(args, conjunction):
+            if a == absorbing:
+                return absorbing
+            if a == neutral or a in seen:
+                continue
+            if a in negated or (a.is_not() and a.arg(0) in seen):
+                return absorbing
+            seen.add(a)
+            if a.is_not():
+                negated.add(a.arg(0))
+            res.append(a)
+        if not res:
+            return neutral
+        if len(res) == 1:
+            return res[0]
+        return mgr.And(res) if conjunction else mgr.Or(res)
+
+    def _flatten(self, formulae, conjunction):
+        """Returns the conjuncts (disjuncts, if not conjunction) of the
+        given formulae."""
+        res, stack = [], list(reversed(formulae))
+        while stack:
+            f = stack.pop()
+            if (f.is_and() if conjunction else f.is_or()):
+                stack.extend(reversed(f.args()))
+            else:
+                res.append(f)
+        return res
+
+    def _occurrences(self, formula, qvars):
+        """Returns the number of DAG nodes having each variable as a
+        direct child."""
+        counts = dict((v, 0) for v in qvars)
+        visited, stack = set(), [formula]
+        while stack:
+            f = stack.pop()
+            if f in visited:
+                continue
+            visited.add(f)
+            for c in f.args():
+                if c in counts:
+                    counts[c] += 1
+                stack.append(c)
+        return counts
+
+    def _elimination_order(self, formula, qvars, universal):
+        """Returns qvars sorted according to the ordering heuristic."""
+        if self.ordering is None:
+            return list(qvars)
+        position = dict((v, i) for i, v in enumerate(qvars))
+        counts = self._occurrences(formula, qvars)
+        if self.ordering == "occurrences":
+            return sorted(qvars, key=lambda v: (counts[v], position[v]))
+
+        # Greedy min-fill on the variable interaction graph
+        graph = dict((v, set()) for v in qvars)
+        fvo = self.env.fvo
+        for part in self._flatten([formula], not universal):
+            fv = fvo.get_free_variables(part)
+            for v in fv:
+                graph.setdefault(v, set()).update(fv)
+        for v in graph:
+            graph[v].discard(v)
+
+        def fill(v):
+            nbrs = list(graph[v])
+            missing = 0
+            for i, a in enumerate(nbrs):
+                for b in nbrs[i+1:]:
+                    if b not in graph[a]:
+                        missing += 1
+            return missing
+
+        res, todo = [], set(qvars)
+        while todo:
+            v = min(todo, key=lambda v: (fill(v), counts[v], position[v]))
+            todo.remove(v)
+            res.append(v)
+            nbrs = graph.pop(v)
+            for a in nbrs:
+                graph[a].discard(v)
+                graph[a].update(nbrs)
+                graph[a].discard(a)
+        return res
+
+    def _get_bdd_qelim(self, formula):
+        """Returns the BDD quantifier eliminator, or None if it is not
+        available or formula is not purely Boolean."""
+        if self._bdd_qelim is None:
+            factory = self.env.factory
+            if "bdd" not in factory.all_quantifier_eliminators():
+                return None
+            self._bdd_qelim = factory.QuantifierEliminator(
+                name="bdd", logic=pysmt.logics.BOOL)
+        if not get_logic(formula, self.env) <= pysmt.logics.BOOL:
+            return None
+        return self._bdd_qelim
+
+    def _eliminate_var(self, formula, v, universal):
+        """Eliminates v from formula, that is quantifier-free."""
+        absorbing = self.mgr.Bool(not universal)
+        depends_on = self.env.fvo.depends_on
+
+        # ForAll distributes over And, and Exists over Or
+        res = []
+        for p in self._flatten([formula], universal):
+            if not depends_on(p, v):
+                res.append(p)
+                continue
+            parts = self._flatten([p], not universal)
+            g = self._connective([q for q in parts if depends_on(q, v)],
+                                 not universal)
+            rest = [q for q in parts if not depends_on(q, v)]
+            expansion = self.cofactor(g, {v: not universal})
+            if expansion != absorbing:
+                expansion = self._connective(
+                    [expansion, self.cofactor(g, {v: universal})], universal)
+            res.append(self._connective(rest + [expansion], not universal))
+        return self._connective(res, universal)
+
+    def _eliminate(self, formula, args, universal):
         qvars = formula.quantifier_vars()
         self._assert_vars_boolean(qvars)
-        res = []
-        f = args[0]
-        for subs in all_assignments(qvars, self.env):
-            res.append(f.substitute(subs))
-        return res
+        fvo = self.env.fvo
+
+        f = self.env.simplifier.simplify(args[0])
+        order = self._elimination_order(f, qvars, universal)
+        for i, v in enumerate(order):
+            if not fvo.depends_on(f, v):
+                continue
+            f = self._eliminate_var(f, v, universal)
+
+            if self.node_budget is not None and \
+               self.env.sizeo.get_size(f, SizeOracle.MEASURE_DAG_NODES) > \
+               self.node_budget:
+                remaining = [u for u in order[i+1:] if fvo.depends_on(f, u)]
+                qelim = self._get_bdd_qelim(f)
+                if remaining and qelim is not None:
+                    if universal:
+                        f = self.mgr.ForAll(remaining, f)
+                    else:
+                        f = self.mgr.Exists(remaining, f)
+                    return qelim.eliminate_quantifiers(f)
+        return f
 
     def walk_forall(self, formula, args, **kwargs):
-        return self.mgr.And(self._expand(formula, args))
+        return self._eliminate(formula, args, universal=True)
 
     def walk_exists(self, formula, args, **kwargs):
-        return self.mgr.Or(self._expand(formula, args))
+        return self._eliminate(formula, args, universal=False)
 
     def _exit(self):
-        pass
+        if self._bdd_qelim is not None:
+            self._bdd_qelim.exit()
+            self._bdd_qelim = None
@@ -15,9 +15,11 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 #
+import threading
+
 from pysmt.typing import BOOL
-from pysmt.exceptions import SolverReturnedUnknownResultError
-from six.moves import xrange
+from pysmt.exceptions import (SolverReturnedUnknownResultError,
+                              SolverStatusError)
 
 
 class SolverOptions(object):
@@ -26,6 +28,7 @@ class SolverOptions(object):
     VALID_OPTIONS = [("generate_models", True),
                      ("unsat_cores_mode", None),
                      ("incremental", True),
+                     ("track_assertions", True),
     ]
 
     def __init__(self, **kwargs):
@@ -132,6 +135,98 @@ class Solver(object):
             res[f] = v
         return res
 
+    def iter_models(self, important=None, limit=None, implicant_of=None):
+        """Enumerates the models of the current assertions.
+
+        Models are projected over the 'important' symbols: after each
+        model is found, a blocking clause over the important symbols
+        is asserted, so that no two yielded models agree on all of
+        them. If 'important' is None, the symbols of the first model
+        (or the free variables of 'implicant_of') are used.
+
+        If 'implicant_of' is given, it must be a formula implying the
+        current assertions (typically, their conjunction). In this
+        case, each model is shrunk to an implicant of the formula: an
+        important symbol is dropped from the model if the formula,
+        with all the other symbols fixed to their value, is simplified
+        to True independently of it. Each yielded model then
+        represents all its completions, and fewer models are needed to
+        cover the solution space.
+
+        The enumeration is performed within a push/pop pair: the
+        blocking clauses are removed when the generator is exhausted
+        or closed.
+
+        :param important: The symbols to project the models on
+        :type important: Iterable of FNodes
+        :param limit: The maximum number of models to yield
+        :type limit: int
+        :param implicant_of: The formula used to shrink the models
+        :type implicant_of: FNode
+        :returns: A generator of EagerModel
+        """
+        from pysmt.solvers.eager import EagerModel
+
+        mgr = self.environment.formula_manager
+        if important is not None:
+            important = list(important)
+            for v in important:
+                self._assert_no_function_type(v)
+        elif implicant_of is not None:
+            important = [v for v in implicant_of.get_free_variables()
+                         if not v.symbol_type().is_function_type()]
+
+        others = []
+        if implicant_of is not None:
+            others = [v for v in implicant_of.get_free_variables()
+                      if not v.symbol_type().is_function_type() and \
+                      v not in important]
+
+        count = 0
+        self.push()
+        try:
+            while limit is None or count < limit:
+                if not self.solve():
+                    break
+                if important is None:
+                    important = [v for v, _ in self.get_model()
+                                 if not v.symbol_type().is_function_type()]
+                values = self.get_values(important + others)
+                cube = [(v, values[v]) for v in important]
+                if implicant_of is not None:
+                    cube = self._shrink_implicant(implicant_of, cube,
+                                                  [(v, values[v])
+                                                   for v in others])
+                count += 1
+                yield EagerModel(assignment=dict(cube),
+                                 environment=self.environment)
+
+                literals = []
+                for v, value in cube:
+                    if value.is_bool_constant():
+                        literals.append(v if value.is_true() else mgr.Not(v))
+                    else:
+                        literals.append(mgr.Equals(v, value))
+                self.add_assertion(mgr.Not(mgr.And(literals)))
+        finally:
+            self.pop()
+
+    def _shrink_implicant(self, formula, cube, fixed):
+        """Drops from the cube the assignments that are not needed to
+        make the formula True.
+
+        The symbols in 'fixed' are substituted with their value
+        first. Each assignment of the cube is then removed in turn, if
+        the formula still simplifies to True without it.
+        """
+        formula = formula.substitute(dict(fixed))
+        res = list(cube)
+        for item in cube:
+            candidate = [x for x in res if x is not item]
+            if formula.substitute(dict(candidate)).simplify().is_true():
+                res = candidate
+        return res
+
     def push(self, levels=1):
         """Push the current context of the given number of levels.
 
@@ -172,7 +267,7 @@ class Solver(object):
         raise NotImplementedError
 
 
-    def solve(self, assumptions=None):
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
         """Returns the satisfiability value of the asserted formulas.
 
         Assumptions is a list of Boolean variables or negations of
@@ -189,9 +284,22 @@ class Solver(object):
         return res
 
         but is in general more efficient.
+
+        If timeout (in seconds) is given and the solver does not
+        terminate in time, SolverTimeoutError is raised. If
+        memory_limit (in MB) is given and the solver runs out of
+        memory, SolverReturnedUnknownResultError is raised. Solvers
+        that cannot enforce the limits raise NotImplementedError.
         """
         raise NotImplementedError
 
+    def _check_no_limits(self, timeout, memory_limit):
+        """Raises NotImplementedError if a limit is given to a solver
+        that does not support them."""
+        if timeout is not None or memory_limit is not None:
+            raise NotImplementedError("%s does not support time or memory "
+                                      "limits" % self.__class__.__name__)
+
     def print_model(self, name_filter=None):
         """Prints the model (if one exists).
 
@@ -269,6 +377,39 @@ class Solver(object):
             raise TypeError("Argument must be boolean.")
 
 
+class Watchdog(object):
+    """Runs action in a separate thread if the body of the with
+    statement does not terminate within timeout seconds.
+
+    This is used to interrupt solvers that have no native timeout.
+    After the with statement, expired tells whether the action was
+    executed.
+    """
+
+    def __init__(self, timeout, action):
+        self.timeout = timeout
+        self.action = action
+        self.expired = False
+        self._timer = None
+
+    def _expire(self):
+        self.expired = True
+        self.action()
+
+    def __enter__(self):
+        if self.timeout is not None:
+            self._timer = threading.Timer(self.timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._timer is not None:
+            self._timer.cancel()
+            # Wait for an action that is already running
+            self._timer.join()
+
+
 class IncrementalTrackingSolver(Solver):
     """A solver that keeps track of the asserted formulae
 
@@ -289,6 +430,11 @@ class IncrementalTrackingSolver(Solver):
     version except for _add_assertion that is supposed to return a
     result (of any type) that will constitute the elements of the
     self.assertions list.
+
+    If the option track_assertions is False, the assertions are not
+    recorded (unless unsat cores are enabled, since they are computed
+    from the tracked assertions), and self.assertions is not
+    available.
     """
 
     def __init__(self, environment, logic, **options):
@@ -298,6 +444,8 @@ class IncrementalTrackingSolver(Solver):
         self._last_result = None
         self._last_command = None
 
+        self._tracking = self.options.track_assertions or \
+                         self.options.unsat_cores_mode is not None
         self._assertion_stack = []
         self._backtrack_points = []
 
@@ -323,6 +471,9 @@ class IncrementalTrackingSolver(Solver):
         Returns the list of results of calls to _add_assertion() that
         are still asserted in the solver
         """
+        if not self._tracking:
+            raise SolverStatusError("Assertions are not tracked "
+                                    "(track_assertions=False)")
         return self._assertion_stack
 
     def _reset_assertions(self):
@@ -330,6 +481,8 @@ class IncrementalTrackingSolver(Solver):
 
     def reset_assertions(self):
         self._reset_assertions()
+        del self._assertion_stack[:]
+        del self._backtrack_points[:]
         self._last_command = "reset_assertions"
 
     def _add_assertion(self, formula, named=None):
@@ -346,15 +499,28 @@ class IncrementalTrackingSolver(Solver):
 
     def add_assertion(self, formula, named=None):
         tracked = self._add_assertion(formula, named=named)
-        self._assertion_stack.append(tracked)
+        if self._tracking:
+            self._assertion_stack.append(tracked)
         self._last_command = "assert"
 
     def _solve(self, assumptions=None):
         raise NotImplementedError
 
-    def solve(self, assumptions=None):
+    def _solve_with_limits(self, assumptions, timeout, memory_limit):
+        """Calls _solve() with the given time and memory limits.
+
+        Solvers that support limits override this method.
+        """
+        self._check_no_limits(timeout, memory_limit)
+        return self._solve(assumptions=assumptions)
+
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
         try:
-            res = self._solve(assumptions=assumptions)
+            if timeout is None and memory_limit is None:
+                res = self._solve(assumptions=assumptions)
+            else:
+                res = self._solve_with_limits(assumptions, timeout,
+                                              memory_limit)
             self._last_result = res
             return res
         except SolverReturnedUnknownResultError:
@@ -369,9 +535,9 @@ class IncrementalTrackingSolver(Solver):
 
     def push(self, levels=1):
         self._push(levels=levels)
-        point = len(self._assertion_stack)
-        for _ in xrange(levels):
-            self._backtrack_points.append(point)
+        if self._tracking:
+            point = len(self._assertion_stack)
+            self._backtrack_points.extend([point] * levels)
         self._last_command = "push"
 
     def _pop(self, levels=1):
@@ -379,9 +545,11 @@ class IncrementalTrackingSolver(Solver):
 
     def pop(self, levels=1):
         self._pop(levels=levels)
-        for _ in xrange(levels):
-            point = self._backtrack_points.pop()
-            self._assertion_stack = self._assertion_stack[0:point]
+        if self._tracking and levels > 0:
+            # The stack is truncated in place, once
+            point = self._backtrack_points[-levels]
+            del self._backtrack_points[-levels:]
+            del self._assertion_stack[point:]
         self._last_command = "pop"
 
 
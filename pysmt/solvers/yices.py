@@ -28,11 +28,12 @@ except ImportError:
 
 
 from pysmt.solvers.eager import EagerModel
-from pysmt.solvers.solver import Solver, Converter
+from pysmt.solvers.solver import Solver, Converter, Watchdog
 from pysmt.solvers.smtlib import SmtLibBasicSolver, SmtLibIgnoreMixin
 
 from pysmt.walkers import DagWalker
-from pysmt.exceptions import SolverReturnedUnknownResultError
+from pysmt.exceptions import (SolverReturnedUnknownResultError,
+                              SolverTimeoutError)
 from pysmt.exceptions import InternalSolverError, NonLinearError
 from pysmt.decorators import clear_pending_pop, catch_conversion_error
 from pysmt.constants import Fraction, is_pysmt_integer
@@ -59,6 +60,7 @@ def cleanup():
 STATUS_UNKNOWN = 2
 STATUS_SAT = 3
 STATUS_UNSAT = 4
+STATUS_INTERRUPTED = 5
 
 
 class YicesSolver(Solver, SmtLibBasicSolver, SmtLibIgnoreMixin):
@@ -118,20 +120,29 @@ class YicesSolver(Solver, SmtLibBasicSolver, SmtLibIgnoreMixin):
         return EagerModel(assignment=assignment, environment=self.environment)
 
     @clear_pending_pop
-    def solve(self, assumptions=None):
+    def solve(self, assumptions=None, timeout=None, memory_limit=None):
+        self._check_no_limits(None, memory_limit)
         if assumptions is not None:
             self.push()
             self.add_assertion(self.mgr.And(assumptions))
             self.pending_pop = True
 
-        out = yicespy.yices_check_context(self.yices, None)
+        # yices_stop_search is thread-safe: the search returns
+        # STATUS_INTERRUPTED and the context goes back to its state
+        # before the check.
+        with Watchdog(timeout,
+                      lambda: yicespy.yices_stop_search(self.yices)):
+            out = yicespy.yices_check_context(self.yices, None)
 
         if self.model is not None:
             yicespy.yices_free_model(self.model)
             self.model = None
 
-        assert out in [STATUS_SAT, STATUS_UNSAT, STATUS_UNKNOWN]
-        if out == STATUS_UNKNOWN:
+        assert out in [STATUS_SAT, STATUS_UNSAT, STATUS_UNKNOWN,
+                       STATUS_INTERRUPTED]
+        if out == STATUS_INTERRUPTED:
+            raise SolverTimeoutError()
+        elif out == STATUS_UNKNOWN:
             raise SolverReturnedUnknownResultError()
         elif out == STATUS_SAT:
             self.model = yicespy.yices_get_model(self.yices, 1)
@@ -39,6 +39,7 @@ from pysmt.solvers.interpolation import Interpolator
 
 from pysmt.walkers import DagWalker
 from pysmt.exceptions import (SolverReturnedUnknownResultError,
+                              SolverTimeoutError,
                               SolverNotConfiguredForUnsatCoresError,
                               SolverStatusError,
                               ConvertExpressionError,
@@ -181,6 +182,32 @@ class Z3Solver(IncrementalTrackingSolver, UnsatCoreSolver,
             raise SolverReturnedUnknownResultError
         return (sres == 'sat')
 
+    def _solve_with_limits(self, assumptions, timeout, memory_limit):
+        # The timeout is a parameter of the solver, while the memory
+        # limit is a global parameter of z3
+        if timeout is not None:
+            self.z3.set(timeout=max(1, int(timeout * 1000)))
+        if memory_limit is not None:
+            # Restore the value set by the user, if any
+            old_memory_limit = z3.get_param("memory_max_size")
+            z3.set_param("memory_max_size", max(1, int(memory_limit)))
+        try:
+            return self._solve(assumptions=assumptions)
+        except SolverReturnedUnknownResultError:
+            if timeout is not None and \
+               self.z3.reason_unknown() in ("timeout", "canceled"):
+                raise SolverTimeoutError
+            raise
+        except z3.Z3Exception as ex:
+            if memory_limit is not None:
+                raise SolverReturnedUnknownResultError(str(ex))
+            raise
+        finally:
+            if timeout is not None:
+                self.z3.set(timeout=4294967295)
+            if memory_limit is not None:
+                z3.set_param("memory_max_size", old_memory_limit)
+
     def get_unsat_core(self):
         """After a call to solve() yielding UNSAT, returns the unsat core as a
         set of formulae"""
@@ -0,0 +1,269 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import os
+import sys
+import time
+from tempfile import mkstemp
+from unittest import skipIf
+from distutils.spawn import find_executable
+
+from six import PY2
+
+from pysmt.test import TestCase, main
+from pysmt.shortcuts import (Symbol, And, Not, Or, Equals, Int, LT, TRUE,
+                             FALSE)
+from pysmt.typing import INT
+from pysmt.logics import QF_LIA
+from pysmt.exceptions import (UnknownSolverAnswerError, InternalSolverError,
+                              SolverTimeoutError)
+
+Z3_BINARY = find_executable("z3")
+
+# A scripted solver: it answers "unsat" iff "false" is asserted, and
+# runs until it is interrupted if the symbol "slow" is asserted. All
+# the values are "true".
+FAKE_SOLVER = r'''
+import sys, signal, time
+interrupted = []
+signal.signal(signal.SIGINT, lambda s, f: interrupted.append(s))
+stack = [[]]
+def answer(s):
+    sys.stdout.write(s + "\n")
+    sys.stdout.flush()
+for line in iter(sys.stdin.readline, ""):
+    cmd = line.strip()
+    if cmd.startswith("(check-sat"):
+        text = " ".join(a for level in stack for a in level)
+        if "slow" in text:
+            while not interrupted:
+                time.sleep(0.01)
+            del interrupted[:]
+            answer("unknown")
+        else:
+            answer("unsat" if "false" in text else "sat")
+    elif cmd.startswith("(get-value"):
+        terms = cmd[len("(get-value ("):-2].split()
+        answer("(" + "\n ".join("(%s true)" % t for t in terms) + ")")
+    elif cmd.startswith("(exit"):
+        break
+    elif cmd.startswith("(assert"):
+        stack[-1].append(cmd)
+        answer("success")
+    elif cmd.startswith("(push"):
+        stack.append([])
+        answer("success")
+    elif cmd.startswith("(pop"):
+        stack.pop()
+        answer("success")
+    elif cmd.startswith("(reset-assertions"):
+        stack = [[]]
+        answer("success")
+    elif ":bad" in cmd:
+        answer('(error "bad option")')
+    else:
+        answer("success")
+'''
+
+
+@skipIf(PY2, "asyncio requires Python 3")
+class TestAsyncSolver(TestCase):
+
+    def setUp(self):
+        TestCase.setUp(self)
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        fd, self.fake = mkstemp(suffix=".py")
+        with os.fdopen(fd, "w") as f:
+            f.write(FAKE_SOLVER)
+        self.fake_args = [sys.executable, self.fake]
+
+    def tearDown(self):
+        import asyncio
+        os.remove(self.fake)
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        TestCase.tearDown(self)
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_fake_solver(self):
+        from pysmt.smtlib.async_solver import AsyncSmtLibSolver
+        a, b = Symbol("a"), Symbol("b")
+        s = AsyncSmtLibSolver(self.fake_args)
+        self.run_async(s.start())
+        self.run_async(s.add_assertion(And(a, b)))
+        self.assertTrue(self.run_async(s.solve()))
+        self.assertEqual(self.run_async(s.get_values([a, b])),
+                         {a: TRUE(), b: TRUE()})
+        model = self.run_async(s.get_model())
+        self.assertTrue(model.get_py_value(a))
+
+        self.run_async(s.push())
+        self.run_async(s.add_assertion(FALSE()))
+        self.assertFalse(self.run_async(s.solve()))
+        self.run_async(s.pop())
+        self.assertTrue(self.run_async(s.solve()))
+
+        # Errors refer to the offending command
+        self.run_async(s.set_option(":bad", "true"))
+        self.run_async(s.add_assertion(b))
+        with self.assertRaises(UnknownSolverAnswerError) as cm:
+            self.run_async(s.solve())
+        self.assertIn("bad", str(cm.exception))
+        self.assertTrue(self.run_async(s.solve()))
+
+        self.run_async(s.exit())
+        self.assertFalse(s.is_running())
+
+    def test_timeout(self):
+        import asyncio
+        from pysmt.smtlib.async_solver import AsyncSmtLibSolver
+        slow = Symbol("slow")
+        s = AsyncSmtLibSolver(self.fake_args)
+        self.run_async(s.start())
+        self.run_async(s.push())
+        self.run_async(s.add_assertion(slow))
+        with self.assertRaises(SolverTimeoutError):
+            self.run_async(s.solve(timeout=0.2))
+        # The solver has been interrupted, and it is still usable
+        self.assertTrue(s.is_running())
+        self.run_async(s.pop())
+        self.assertTrue(self.run_async(s.solve(timeout=5)))
+
+        # Cancellation kills the solver
+        self.run_async(s.add_assertion(slow))
+        task = self.loop.create_task(s.solve())
+        self.loop.call_later(0.2, task.cancel)
+        with self.assertRaises(asyncio.CancelledError):
+            self.run_async(task)
+        self.run_async(s._process.wait())
+        self.assertFalse(s.is_running())
+        with self.assertRaises(InternalSolverError):
+            self.run_async(s.solve())
+
+    def test_pool(self):
+        import asyncio
+        from pysmt.smtlib.async_solver import AsyncSolverPool
+        pool = AsyncSolverPool(self.fake_args, max_processes=4)
+        a = Symbol("a")
+        formulae = [Or(a, FALSE()) if i % 3 else And(a, Not(a), FALSE())
+                    for i in range(200)]
+        start = time.time()
+        res = self.run_async(asyncio.gather(*[pool.is_sat(f)
+                                              for f in formulae]))
+        self.assertEqual(res, [i % 3 != 0 for i in range(200)])
+        # Processes are reused across sessions
+        self.assertLessEqual(len(pool._idle), 4)
+        self.assertTrue(all(s.is_running() for s in pool._idle))
+        self.run_async(pool.close())
+        self.assertEqual(len(pool._idle), 0)
+        self.assertLess(time.time() - start, 60)
+
+        # A session that times out does not block the others
+        pool = AsyncSolverPool(self.fake_args, max_processes=2)
+        results = self.run_async(asyncio.gather(
+            pool.is_sat(Symbol("slow"), timeout=0.2),
+            *[pool.is_sat(f) for f in formulae[:10]],
+            return_exceptions=True))
+        self.assertIsInstance(results[0], SolverTimeoutError)
+        self.assertEqual(results[1:], [i % 3 != 0 for i in range(10)])
+        self.run_async(pool.close())
+
+    def test_cancel_pending(self):
+        import asyncio
+        from pysmt.smtlib.async_solver import AsyncSolverPool
+        pool = AsyncSolverPool(self.fake_args, max_processes=1)
+        a, b = Symbol("a"), Symbol("b")
+
+        async def cancelled_session():
+            async with pool.session() as s:
+                await s.add_assertion(a)
+                await s.add_assertion(b)
+                # The cancellation lands while the acknowledgments of
+                # the assertions are being read
+                task = asyncio.ensure_future(s.solve())
+                await asyncio.sleep(0)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+                self.assertFalse(s.is_running())
+            return s
+
+        s = self.run_async(cancelled_session())
+        self.assertEqual(pool._idle, [])
+        self.assertIsNotNone(s._process.returncode)
+        # The next session gets a fresh process
+        self.assertTrue(self.run_async(pool.is_sat(And(a, b))))
+        self.assertFalse(self.run_async(pool.is_sat(And(a, FALSE()))))
+        self.run_async(pool.close())
+
+    def test_dead_process(self):
+        import signal
+        from pysmt.smtlib.async_solver import AsyncSolverPool
+        pool = AsyncSolverPool(self.fake_args, max_processes=1)
+        a = Symbol("a")
+
+        async def session():
+            async with pool.session() as s:
+                os.kill(s._process.pid, signal.SIGKILL)
+                time.sleep(0.2)
+                raise ValueError("session error")
+
+        # The error of the session is not hidden by the release of
+        # the dead process
+        with self.assertRaisesRegex(ValueError, "session error"):
+            self.run_async(session())
+        self.assertEqual(pool._idle, [])
+
+        # The process died, but the event loop did not notice it yet
+        s = self.run_async(pool.acquire())
+        os.kill(s._process.pid, signal.SIGKILL)
+        time.sleep(0.2)
+        self.assertTrue(s.is_running())
+        self.run_async(pool.release(s))
+        self.assertEqual(pool._idle, [])
+        self.assertIsNotNone(s._process.returncode)
+        self.assertTrue(self.run_async(pool.is_sat(a)))
+        self.run_async(pool.close())
+
+    @skipIf(Z3_BINARY is None, "z3 executable not available")
+    def test_z3(self):
+        import asyncio
+        from pysmt.smtlib.async_solver import AsyncSolverPool
+        pool = AsyncSolverPool([Z3_BINARY, "-smt2", "-in"], logic=QF_LIA,
+                               max_processes=4)
+        x = Symbol("x", INT)
+        formulae = [And(LT(x, Int(i)), LT(Int(i % 7), x))
+                    for i in range(20)]
+        res = self.run_async(asyncio.gather(*[pool.is_sat(f, timeout=10)
+                                              for f in formulae]))
+        self.assertEqual(res, [i % 7 + 1 < i for i in range(20)])
+
+        s = self.run_async(pool.acquire())
+        self.run_async(s.add_assertion(LT(x, Int(3))))
+        self.assertTrue(self.run_async(s.solve()))
+        self.assertLess(self.run_async(s.get_value(x)).constant_value(), 3)
+        self.run_async(s.add_assertion(Equals(x, Int(3))))
+        self.assertFalse(self.run_async(s.solve(timeout=10)))
+        self.run_async(pool.release(s))
+        self.run_async(pool.close())
+
+if __name__ == '__main__':
+    main()
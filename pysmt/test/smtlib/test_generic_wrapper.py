@@ -16,15 +16,19 @@
 #   limitations under the License.
 #
 import os
+import signal
 from unittest import skipIf
+from distutils.spawn import find_executable
 
 from pysmt.test import TestCase, main
 from pysmt.shortcuts import get_env, Solver, is_valid, is_sat
 from pysmt.shortcuts import LE, LT, Real, GT, Int, Symbol, And, Not
+from pysmt.shortcuts import Equals, Plus
 from pysmt.typing import BOOL, REAL, INT
 from pysmt.logics import QF_UFLIRA, QF_UFLRA, QF_UFLIA, QF_BOOL, QF_UFBV
 from pysmt.exceptions import (SolverRedefinitionError, NoSolverAvailableError,
-                              UnknownSolverAnswerError)
+                              UnknownSolverAnswerError, SolverTimeoutError,
+                              InternalSolverError)
 
 from pysmt.test.examples import get_example_formulae
 
@@ -38,6 +42,8 @@ for _, _, fnames in os.walk(BASE_DIR):
             path = os.path.join(BASE_DIR, "bin/" + f)
             ALL_WRAPPERS.append((name, path))
 
+Z3_BINARY = find_executable("z3")
+
 
 class TestGenericWrapper(TestCase):
 
@@ -146,6 +152,205 @@ class TestGenericWrapper(TestCase):
                 res = s.solve()
                 self.assertFalse(res)
 
+    @skipIf(Z3_BINARY is None, "z3 executable not available")
+    def test_pipelined(self):
+        from pysmt.smtlib.solver import SmtLibSolver
+        xs = [Symbol("x%d" % i, INT) for i in range(300)]
+        for pipelined in [True, False]:
+            s = SmtLibSolver([Z3_BINARY, "-smt2", "-in"], self.env,
+                             QF_UFLIA, pipelined=pipelined)
+            try:
+                for x, y in zip(xs, xs[1:]):
+                    s.add_assertion(LT(x, y))
+                s.push()
+                s.add_assertion(GT(xs[0], xs[-1]))
+                self.assertFalse(s.solve())
+                s.pop()
+                self.assertTrue(s.solve())
+                self.assertEqual(len(s._pending), 0)
+
+                # The error refers to the command that caused it, and
+                # the following commands are not affected
+                with self.assertRaises(UnknownSolverAnswerError) as cm:
+                    s.pop(5)
+                    s.solve()
+                self.assertIn("(pop 5)", str(cm.exception))
+                s.add_assertion(LT(xs[-1], xs[0]))
+                self.assertFalse(s.solve())
+            finally:
+                s.exit()
+
+    @skipIf(Z3_BINARY is None, "z3 executable not available")
+    def test_get_model(self):
+        from pysmt.smtlib.solver import SmtLibSolver
+        xs = [Symbol("x%d" % i, INT) for i in range(500)]
+        p, q = Symbol("p", BOOL), Symbol("q", BOOL)
+        with SmtLibSolver([Z3_BINARY, "-smt2", "-in"], self.env,
+                          QF_UFLIA) as s:
+            for i, x in enumerate(xs):
+                s.add_assertion(Equals(x, Int(i - 250)))
+            s.add_assertion(p)
+            self.assertTrue(s.solve())
+            # A single get-value command is sent for all the terms
+            values = s.get_values(xs + [Plus(xs[0], xs[1])])
+            self.assertEqual(len(values), 501)
+            self.assertEqual(values[xs[3]], Int(-247))
+            self.assertEqual(values[Plus(xs[0], xs[1])], Int(-499))
+            # The model contains only the declared variables
+            model = s.get_model()
+            self.assertEqual(set(v for v, _ in model), set(xs + [p]))
+            self.assertNotIn(q, set(v for v, _ in model))
+            self.assertEqual(model.get_value(xs[499]), Int(249))
+            self.assertTrue(model.get_py_value(p))
+
+    @skipIf(Z3_BINARY is None, "z3 executable not available")
+    def test_process_pool(self):
+        from pysmt.smtlib.solver import SmtLibSolver, SolverProcessPool
+        args = [Z3_BINARY, "-smt2", "-in"]
+        x, y = Symbol("x", INT), Symbol("y", INT)
+        with SolverProcessPool(max_uses=3) as pool:
+            pool.prestart(args, QF_UFLIA)
+            self.assertEqual(pool.idle_count(), 1)
+            pids = []
+            for i in range(4):
+                with SmtLibSolver(args, self.env, QF_UFLIA,
+                                  pool=pool) as s:
+                    pids.append(s.solver.pid)
+                    self.assertEqual(pool.idle_count(), 0)
+                    # The assertions of the previous solver are gone
+                    s.add_assertion(Equals(x, Int(i)))
+                    s.push()
+                    s.add_assertion(LT(y, x))
+                    self.assertTrue(s.solve())
+                    self.assertEqual(s.get_value(x), Int(i))
+                    s.reset_assertions()
+                    s.add_assertion(Equals(x, Int(10)))
+                    self.assertTrue(s.solve())
+                self.assertEqual(pool.idle_count(), 0 if i == 2 else 1)
+            # The process is recycled after max_uses solvers
+            self.assertEqual(pids[:3], [pids[0]] * 3)
+            self.assertNotEqual(pids[3], pids[0])
+
+            # Processes that did not terminate correctly are dropped
+            s = SmtLibSolver(args, self.env, QF_UFLIA, pool=pool)
+            s.pop()
+            s.exit()
+            self.assertEqual(pool.idle_count(), 0)
+            s = SmtLibSolver(args, self.env, QF_UFLIA, pool=pool)
+            s.solver.kill()
+            s.solver.wait()
+            s.exit()
+            self.assertEqual(pool.idle_count(), 0)
+
+            # The options of a session do not leak into the next one
+            with SmtLibSolver(args, self.env, QF_UFLIA, pool=pool) as s:
+                pid = s.solver.pid
+            with SmtLibSolver(args, self.env, QF_UFLIA, pool=pool) as s:
+                self.assertEqual(s.solver.pid, pid)
+                s.set_option(":timeout", "1")
+            self.assertEqual(pool.idle_count(), 0)
+            with SmtLibSolver(args, self.env, QF_UFLIA, pool=pool) as s:
+                self.assertNotEqual(s.solver.pid, pid)
+                s.add_assertion(Equals(x, Int(3)))
+                self.assertTrue(s.solve())
+
+    @skipIf(Z3_BINARY is None, "z3 executable not available")
+    def test_generic_solver_pool(self):
+        self.env.factory.add_generic_solver("z3-pooled",
+                                            [Z3_BINARY, "-smt2", "-in"],
+                                            [QF_UFLIA])
+        pids = set()
+        for i in range(3):
+            with Solver(name="z3-pooled", logic=QF_UFLIA) as s:
+                pids.add(s.solver.pid)
+                self.assertFalse(s.is_sat(And(LT(Symbol("x", INT), Int(i)),
+                                              GT(Symbol("x", INT), Int(i)))))
+        self.assertEqual(len(pids), 1)
+        pool = self.env.factory.process_pool
+        self.assertEqual(pool.idle_count(), 1)
+        process = list(pool._idle.values())[0][0]
+        pool.close()
+        # The process has been reaped
+        self.assertIsNotNone(process.popen.returncode)
+
+    @skipIf(find_executable("sh") is None, "sh not available")
+    def test_process_close(self):
+        from pysmt.smtlib.solver import SolverProcess
+        # A process that ignores (exit), the end of input and SIGTERM
+        process = SolverProcess(["sh", "-c", "trap '' TERM; "
+                                 "cat > /dev/null; exec sleep 60"])
+        process.EXIT_GRACE = 0.2
+        process.close()
+        self.assertFalse(process.is_alive())
+        self.assertEqual(process.popen.returncode, -signal.SIGKILL)
+
+    @skipIf(Z3_BINARY is None, "z3 executable not available")
+    def test_scoped_declarations(self):
+        from pysmt.smtlib.solver import SmtLibSolver
+        x, y = Symbol("x", INT), Symbol("y", INT)
+        with SmtLibSolver([Z3_BINARY, "-smt2", "-in"], self.env,
+                          QF_UFLIA) as s:
+            s.add_assertion(GT(y, Int(0)))
+            s.push()
+            s.add_assertion(GT(x, y))
+            s.push(2)
+            self.assertEqual(s.declared_vars, set([x, y]))
+            s.pop(3)
+            # x has been removed by the solver, and is declared again
+            self.assertEqual(s.declared_vars, set([y]))
+            s.add_assertion(LT(x, y))
+            self.assertTrue(s.solve())
+            self.assertTrue(s.get_py_value(x) < s.get_py_value(y))
+
+    @skipIf(Z3_BINARY is None, "z3 executable not available")
+    def test_solve_limits(self):
+        from pysmt.smtlib.solver import SmtLibSolver
+        from pysmt.test.test_solver_limits import pigeonhole
+        a = Symbol("a", BOOL)
+        with SmtLibSolver([Z3_BINARY, "-smt2", "-in"], self.env,
+                          QF_UFLIA) as s:
+            s.add_assertion(a)
+            s.push()
+            s.add_assertion(pigeonhole(11))
+            with self.assertRaises(SolverTimeoutError):
+                s.solve(timeout=0.2)
+            # z3 answers unknown when interrupted, and can be reused
+            s.pop()
+            self.assertTrue(s.solve(timeout=30, memory_limit=4096))
+            self.assertTrue(s.solve())
+            # A watchdog expiring after the answer does not interrupt
+            # the (idle) solver
+            process = s.solver
+            s._interrupt()
+            self.assertIs(s.solver, process)
+            self.assertIsNone(process.poll())
+            self.assertTrue(s.solve(timeout=30))
+
+        x = Symbol("x", INT)
+        with SmtLibSolver([Z3_BINARY, "-smt2", "-in"], self.env,
+                          QF_UFLIA) as s:
+            # A solver that ignores the interruption is killed, and
+            # replaced by a new process with the same assertions
+            s.INTERRUPT_GRACE = 0.1
+            s.add_assertion(a)
+            s.add_assertion(GT(x, Int(3)))
+            s.push()
+            s.add_assertion(pigeonhole(11))
+            s._check_pending()
+            process = s.solver
+            process.send_signal(signal.SIGSTOP)
+            with self.assertRaises(SolverTimeoutError):
+                s.solve(timeout=0.2)
+            self.assertIsNotNone(process.poll())
+            self.assertIsNot(s.solver, process)
+            s.pop()
+            self.assertTrue(s.solve())
+            self.assertTrue(s.get_py_value(a))
+            self.assertGreater(s.get_py_value(x), 3)
+            s.push()
+            s.add_assertion(LT(x, Int(3)))
+            self.assertFalse(s.solve())
+
 
 if __name__ == "__main__":
     main()
@@ -16,6 +16,7 @@
 #   limitations under the License.
 #
 import os
+import threading
 from tempfile import mkstemp
 
 from six.moves import cStringIO
@@ -25,7 +26,8 @@ from pysmt.test import TestCase, skipIfNoSolverForLogic, main
 from pysmt.test.examples import get_example_formulae
 from pysmt.smtlib.parser import SmtLibParser
 from pysmt.smtlib.script import smtlibscript_from_formula
-from pysmt.shortcuts import Iff
+from pysmt.shortcuts import Iff, Symbol, Plus, Int, Real, BV, TRUE
+from pysmt.typing import INT, REAL, BVType
 from pysmt.shortcuts import read_smtlib, write_smtlib
 
 class TestSMTParseExamples(TestCase):
@@ -144,5 +146,47 @@ class TestSMTParseExamples(TestCase):
         # Clean-up
         os.remove(tmp_fname)
 
+    def test_assignment_list(self):
+        x, y = Symbol("x", INT), Symbol("y", REAL)
+        z, w = Symbol("z", BVType(8)), Symbol("a b", INT)
+        p = Symbol("p")
+        expected = [(x, Int(-5)), (y, Real((1, 3))), (z, BV(5, 8)),
+                    (Plus(x, Int(1)), Int(-4)), (p, TRUE())]
+        for interactive in [False, True]:
+            parser = SmtLibParser(interactive=interactive)
+            # Fast path
+            buf = cStringIO("((x (- 5))\n (y (/ 1 3))\n (z #b00000101)"
+                            " ((+ x 1) (- 4)) (p true))\nsat\n")
+            self.assertEqual(parser.get_assignment_list(buf), expected)
+            self.assertEqual(buf.read(), "sat\n")
+            # Quoted symbols and comments use the generic tokenizer
+            buf = cStringIO("\n((x (- 5)) ; comment\n (|a b| 3)\n)\nsat\n")
+            self.assertEqual(parser.get_assignment_list(buf),
+                             [(x, Int(-5)), (w, Int(3))])
+            self.assertEqual(buf.read().strip(), "sat")
+
+    def test_assignment_list_pipe(self):
+        # The answer of a live solver: the pipe stays open, and the
+        # closing parenthesis is on a line of its own
+        x, y = Symbol("x", INT), Symbol("y", INT)
+        for interactive in [False, True]:
+            parser = SmtLibParser(interactive=interactive)
+            rfd, wfd = os.pipe()
+            stream = os.fdopen(rfd, "r")
+            os.write(wfd, b"((x 1)\n (y 2)\n)\n")
+            res = []
+            reader = threading.Thread(
+                target=lambda: res.append(parser.get_assignment_list(stream)))
+            reader.daemon = True
+            reader.start()
+            reader.join(5)
+            # The answer is parsed without waiting for the end of file
+            answered = not reader.is_alive()
+            os.close(wfd)
+            reader.join()
+            stream.close()
+            self.assertTrue(answered)
+            self.assertEqual(res, [[(x, Int(1)), (y, Int(2))]])
+
 if __name__ == "__main__":
     main()
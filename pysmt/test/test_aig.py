@@ -0,0 +1,145 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+from io import BytesIO
+
+from pysmt.shortcuts import Symbol, And, Or, Not, Iff, Implies, Ite, Int, GT
+from pysmt.typing import INT
+from pysmt.logics import QF_BOOL
+from pysmt.aig import AIG, AIGEncoder, to_aig
+from pysmt.exceptions import ConvertExpressionError
+from pysmt.test import TestCase, skipIfNoSolverForLogic, main
+from pysmt.test.examples import get_example_formulae
+
+
+class TestAIG(TestCase):
+
+    def test_constants(self):
+        aig = AIG()
+        a, b = aig.new_input(), aig.new_input()
+        self.assertEqual(aig.And(a, AIG.TRUE), a)
+        self.assertEqual(aig.And(AIG.FALSE, b), AIG.FALSE)
+        self.assertEqual(aig.And(a, a), a)
+        self.assertEqual(aig.And(a, AIG.Not(a)), AIG.FALSE)
+        self.assertEqual(aig.Or(a, AIG.Not(a)), AIG.TRUE)
+        self.assertEqual(aig.num_ands, 0)
+
+    def test_strash(self):
+        aig = AIG()
+        a, b, c = aig.new_input(), aig.new_input(), aig.new_input()
+        ab = aig.And(a, b)
+        self.assertEqual(aig.And(b, a), ab)
+        self.assertEqual(aig.num_ands, 1)
+        self.assertTrue(aig.is_and(ab))
+        self.assertEqual(sorted(aig.fanins(ab)), sorted([a, b]))
+
+        # Two-level rules
+        self.assertEqual(aig.And(ab, a), ab)
+        self.assertEqual(aig.And(ab, AIG.Not(b)), AIG.FALSE)
+        self.assertEqual(aig.And(AIG.Not(ab), AIG.Not(a)), AIG.Not(a))
+        self.assertEqual(aig.And(AIG.Not(ab), a), aig.And(a, AIG.Not(b)))
+        bc = aig.And(AIG.Not(b), c)
+        self.assertEqual(aig.And(ab, bc), AIG.FALSE)
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_examples(self):
+        for example in get_example_formulae():
+            if example.logic != QF_BOOL:
+                continue
+            f = example.expr
+            encoder = AIGEncoder()
+            lit = encoder.encode(f)
+            g = encoder.aig.to_formula(lit, symbols=encoder.get_symbols())
+            self.assertValid(Iff(f, g), logic=QF_BOOL)
+
+    def test_unsupported(self):
+        p = Symbol("p", INT)
+        with self.assertRaises(ConvertExpressionError):
+            AIGEncoder().encode(GT(p, Int(0)))
+
+    def aiger_round_trip(self, aig, binary):
+        out = BytesIO()
+        aig.write_aiger(out, binary=binary)
+        data = out.getvalue()
+        self.assertTrue(data.startswith(b"aig" if binary else b"aag"))
+        res = AIG.read_aiger(BytesIO(data))
+        out2 = BytesIO()
+        res.write_aiger(out2, binary=binary)
+        self.assertEqual(data, out2.getvalue())
+        return res
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_aiger(self):
+        a, b, c = (Symbol(x) for x in "abc")
+        f1 = Or(And(a, Not(b)), Iff(b, c))
+        f2 = Ite(a, Implies(b, c), Not(c))
+        encoder = AIGEncoder()
+        aig = encoder.aig
+        aig.add_output(encoder.encode(f1))
+        aig.add_output(encoder.encode(f2), "second")
+        self.assertEqual(aig.outputs, to_aig([f1, f2]).outputs)
+        for binary in [True, False]:
+            res = self.aiger_round_trip(aig, binary)
+            self.assertEqual(len(res.inputs), 3)
+            self.assertEqual(res.get_output_name(1), "second")
+            symbols = dict((var, Symbol(res.get_name(2 * var)))
+                           for var in res.inputs)
+            for f, out in zip([f1, f2], res.outputs):
+                g = res.to_formula(out, symbols=symbols)
+                self.assertValid(Iff(f, g), logic=QF_BOOL)
+
+    def test_aiger_latches(self):
+        # A 2-bit counter
+        aig = AIG()
+        enable = aig.new_input("enable")
+        l0 = aig.new_latch("l0")
+        l1 = aig.new_latch("l1", init=None)
+        aig.set_next(l0, aig.Xor(l0, enable))
+        aig.set_next(l1, aig.Xor(l1, aig.And(l0, enable)))
+        aig.add_output(aig.And(l0, l1), "full")
+        for binary in [True, False]:
+            res = self.aiger_round_trip(aig, binary)
+            self.assertEqual(len(res.latches), 2)
+            self.assertEqual(res.get_init(2 * res.latches[0]), 0)
+            self.assertIsNone(res.get_init(2 * res.latches[1]))
+            self.assertEqual(res.get_name(2 * res.latches[1]), "l1")
+
+    def test_aiger_ascii(self):
+        # XOR, with gates defined after their use
+        data = b"aag 5 2 0 1 3\n2\n4\n11\n10 9 7\n6 2 5\n8 3 4\n"
+        aig = AIG.read_aiger(data)
+        self.assertEqual(len(aig.outputs), 1)
+        self.assertEqual(aig.num_ands, 3)
+        a, b = aig.inputs
+        self.assertEqual(aig.outputs[0], aig.Xor(2 * a, 2 * b))
+
+        # The conjunction of two contradicting gates is FALSE
+        data = b"aag 5 2 0 1 3\n2\n4\n10\n10 8 6\n6 2 5\n8 3 4\n"
+        aig = AIG.read_aiger(data)
+        self.assertEqual(aig.outputs[0], AIG.FALSE)
+
+    def test_aiger_errors(self):
+        for data in [b"aag 1 1 0 1\n2\n2\n",
+                     b"aag 1 1 0 1 0 1\n2\n2\n",
+                     b"aag 3 1 0 1 1\n2\n6\n6 2 4\n",
+                     b"aig 2 1 0 1 1\n4\n"]:
+            with self.assertRaises(SyntaxError):
+                AIG.read_aiger(data)
+
+
+if __name__ == '__main__':
+    main()
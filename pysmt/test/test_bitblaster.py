@@ -0,0 +1,141 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+from pysmt.shortcuts import (Symbol, And, Iff, Implies, Equals, BV, BVAdd,
+                             BVSub, BVMul, BVUDiv, BVURem, BVSDiv, BVSRem,
+                             BVLShl, BVLShr, BVAShr, BVAnd, BVOr, BVXor,
+                             BVConcat, BVNeg, BVNot, BVRol, BVRor, BVZExt,
+                             BVSExt, BVExtract, BVULT, BVULE, BVSLT, BVSLE,
+                             BVComp, LT, get_model)
+from pysmt.typing import BVType, INT
+from pysmt.logics import QF_BV, QF_BOOL
+from pysmt.aig import AIG
+from pysmt.dimacs import DimacsCNF
+from pysmt.bitblaster import BitBlaster, bitblast
+from pysmt.exceptions import ConvertExpressionError
+from pysmt.test import TestCase, skipIfNoSolverForLogic, main
+from pysmt.test.examples import get_example_formulae
+
+
+BINARY = [BVAdd, BVSub, BVMul, BVUDiv, BVURem, BVSDiv, BVSRem, BVLShl,
+          BVLShr, BVAShr, BVAnd, BVOr, BVXor, BVConcat, BVComp]
+
+UNARY = [BVNeg, BVNot, lambda x: BVRol(x, 3), lambda x: BVRor(x, 1),
+         lambda x: BVZExt(x, 2), lambda x: BVSExt(x, 3),
+         lambda x: BVExtract(x, 1, 2)]
+
+PREDICATES = [BVULT, BVULE, BVSLT, BVSLE, Equals]
+
+
+class TestBitBlaster(TestCase):
+
+    def _check_constants(self, blaster):
+        c = blaster.circuit
+        def value(bits):
+            self.assertTrue(all(b in (c.TRUE, c.FALSE) for b in bits))
+            return sum(1 << i for i, b in enumerate(bits) if b == c.TRUE)
+
+        for x in range(16):
+            for op in UNARY:
+                t = op(BV(x, 4))
+                self.assertEqual(value(blaster.blast_term(t)),
+                                 t.simplify().constant_value(), t)
+            for y in range(16):
+                for op in BINARY:
+                    t = op(BV(x, 4), BV(y, 4))
+                    self.assertEqual(value(blaster.blast_term(t)),
+                                     t.simplify().constant_value(), t)
+                for op in PREDICATES:
+                    t = op(BV(x, 4), BV(y, 4))
+                    self.assertEqual(blaster.blast(t) == c.TRUE,
+                                     t.simplify().is_true(), t)
+
+    def test_constants(self):
+        # Constants are propagated through the circuits: all the
+        # operators are checked exhaustively on 4 bits
+        for adder in ["ripple", "cla"]:
+            self._check_constants(BitBlaster(adder=adder))
+            self._check_constants(BitBlaster(aig=AIG(), adder=adder))
+
+    def _link(self, blaster, symbols):
+        return And([Iff(b, Equals(BVExtract(s, i, i), BV(1, 1)))
+                    for s in symbols
+                    for i, b in enumerate(blaster.get_bits(s))])
+
+    @skipIfNoSolverForLogic(QF_BV)
+    def test_operators(self):
+        x, y, z = (Symbol(n, BVType(6)) for n in "xyz")
+        for adder in ["ripple", "cla"]:
+            blaster = BitBlaster(adder=adder)
+            ops = BINARY[:-2] + [lambda a, b: BVMul(a, BV(13, 6)),
+                                 lambda a, b: BVUDiv(a, BV(5, 6))]
+            for op in ops:
+                f = Equals(op(x, y), z)
+                g = blaster.blast(f)
+                self.assertValid(Implies(self._link(blaster, [x, y, z]),
+                                         Iff(f, g)), logic=QF_BV)
+
+    @skipIfNoSolverForLogic(QF_BV)
+    def test_examples(self):
+        for example in get_example_formulae():
+            if example.logic != QF_BV:
+                continue
+            f = example.expr
+            blaster = BitBlaster()
+            g = blaster.blast(f)
+            model = get_model(g, logic=QF_BOOL)
+            self.assertEqual(model is not None, example.is_sat, f)
+            if model is not None:
+                values = blaster.get_bv_values(model)
+                for s in f.get_free_variables():
+                    if s.symbol_type().is_bool_type():
+                        values[s] = model.get_value(s)
+                self.assertTrue(f.substitute(values).simplify().is_true())
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_aig(self):
+        x, y = Symbol("x", BVType(8)), Symbol("y", BVType(8))
+        aig = AIG()
+        blaster = BitBlaster(aig=aig, adder="cla")
+        f = And(Equals(BVMul(x, y), BV(143, 8)), BVULT(BV(1, 8), x),
+                BVULT(x, y), BVULT(y, BV(16, 8)))
+        lit = blaster.blast(f)
+        self.assertEqual(len(blaster.get_bits(x)), 8)
+        self.assertTrue(all(aig.is_input(b) for b in blaster.get_bits(x)))
+
+        cnf = DimacsCNF.from_aig(aig, [lit])
+        model = get_model(cnf.to_formula(), logic=QF_BOOL)
+        self.assertIsNotNone(model)
+        values = blaster.get_bv_values(
+            lambda bit: model.get_py_value(cnf.get_symbol(bit >> 1)))
+        self.assertEqual(values, {x: BV(11, 8), y: BV(13, 8)})
+
+        cnf = DimacsCNF.from_aig(aig, [lit, AIG.FALSE])
+        self.assertUnsat(cnf.to_formula(), logic=QF_BOOL)
+
+    def test_errors(self):
+        p = Symbol("p", BVType(4))
+        with self.assertRaises(ConvertExpressionError):
+            bitblast(LT(Symbol("i", INT), Symbol("j", INT)))
+        with self.assertRaises(ConvertExpressionError):
+            BitBlaster().blast(p)
+        with self.assertRaises(ValueError):
+            BitBlaster(adder="unknown")
+
+
+if __name__ == '__main__':
+    main()
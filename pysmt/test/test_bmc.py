@@ -0,0 +1,102 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+from pysmt.shortcuts import (Symbol, And, Or, Not, Equals, Int, Plus, Times,
+                             LE, Ite, TRUE, FALSE)
+from pysmt.typing import INT
+from pysmt.logics import QF_LIA
+from pysmt.bmc import TransitionSystem, Unroller, BMCUnroller
+from pysmt.test import TestCase, skipIfNoSolverForLogic, main
+
+
+class TestBMC(TestCase):
+
+    def counter(self):
+        x, y = Symbol("x", INT), Symbol("y", INT)
+        system = TransitionSystem([x, y],
+                                  And(Equals(x, Int(1)), Equals(y, Int(2))),
+                                  TRUE())
+        system.trans = And(Equals(system.next(x), Plus(x, Int(1))),
+                           Equals(system.next(y), Plus(y, Int(2))))
+        return system
+
+    def test_unroller(self):
+        system = self.counter()
+        x, y = system.variables
+        unroller = Unroller(system)
+        trans_3 = unroller.at_time(system.trans, 3)
+        self.assertEqual(trans_3, system.trans.substitute(
+            unroller.get_step_map(3)))
+        self.assertEqual(trans_3.get_free_variables(),
+                         set([unroller.get_symbol(x, 3),
+                              unroller.get_symbol(x, 4),
+                              unroller.get_symbol(y, 3),
+                              unroller.get_symbol(y, 4)]))
+        self.assertEqual(unroller.get_symbol(x, 3).symbol_name(), "x@3")
+        self.assertEqual(unroller.at_time(system.get_next(x), 3),
+                         unroller.get_symbol(x, 4))
+
+        # Each step only visits the nodes of the transition relation
+        # once, and the constants are shared by all the steps
+        size = len(unroller.memoization)
+        unroller.at_time(system.trans, 4)
+        step = len(unroller.memoization) - size
+        for k in range(5, 100):
+            unroller.at_time(system.trans, k)
+        self.assertEqual(len(unroller.memoization), size + 96 * step)
+        self.assertIn(Int(1), unroller.memoization)
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_bmc(self):
+        system = self.counter()
+        x, y = system.variables
+        for mode in ["assumptions", "push"]:
+            with BMCUnroller(system, logic=QF_LIA, mode=mode) as bmc:
+                self.assertIsNone(bmc.check_property(
+                    Equals(y, Times(x, Int(2))), 12))
+                self.assertEqual(bmc.check_property(LE(x, Int(10)), 20), 10)
+                trace = bmc.get_trace()
+                self.assertEqual(len(trace), 11)
+                self.assertEqual(trace[0], {x: Int(1), y: Int(2)})
+                self.assertEqual(trace[10], {x: Int(11), y: Int(22)})
+                # The unrolling is not repeated for smaller bounds
+                self.assertEqual(bmc.depth, 12)
+                self.assertFalse(bmc.check_bound(LE(x, Int(2)), 1))
+                self.assertTrue(bmc.check_bound(LE(x, Int(2)), 2))
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_nondeterministic(self):
+        # A counter modulo 4 that can be reset at any step
+        c, r = Symbol("c", INT), Symbol("r")
+        nc = Symbol("c'", INT)
+        system = TransitionSystem(
+            [c, r], Equals(c, Int(0)),
+            Equals(nc, Ite(r, Int(0),
+                           Ite(Equals(c, Int(3)), Int(0),
+                               Plus(c, Int(1))))),
+            next_vars={c: nc, r: Symbol("r'")})
+        with BMCUnroller(system, logic=QF_LIA) as bmc:
+            self.assertIsNone(bmc.check_property(LE(c, Int(3)), 10))
+            self.assertEqual(bmc.check_property(
+                Or(Not(Equals(c, Int(2))), r), 10), 2)
+            trace = bmc.get_trace()
+            self.assertEqual([s[c] for s in trace], [Int(0), Int(1), Int(2)])
+            self.assertEqual(trace[2][r], FALSE())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import os
+from tempfile import mkstemp
+
+from pysmt.shortcuts import (Symbol, And, Or, Not, Int, Real, Plus, Times,
+                             Equals, GT, LT, Minus, BV, BVAdd, ForAll,
+                             Solver, FALSE)
+from pysmt.typing import INT, REAL, BV8
+from pysmt.logics import QF_LIA, QF_BOOL
+from pysmt.environment import Environment
+from pysmt.caching import (Canonizer, CachingSolver, ResultCache,
+                           canonical_hash)
+from pysmt.test import (TestCase, skipIfNoSolverForLogic,
+                        skipIfSolverNotAvailable, main)
+
+
+class TestCaching(TestCase):
+
+    def test_canonical_hash(self):
+        x, y, z = (Symbol(n, INT) for n in "xyz")
+        a, b = Symbol("a"), Symbol("b")
+        f = [Or(a, GT(x, Plus(y, Int(1)))), LT(y, z)]
+        h = canonical_hash(f)
+        # Renaming, commutativity and order of the assertions
+        g = [LT(x, y), Or(GT(z, Plus(Int(1), x)), b)]
+        self.assertEqual(canonical_hash(g), h)
+        self.assertEqual(canonical_hash([And(reversed(f))]), h)
+        self.assertEqual(canonical_hash(f + [f[0]]), h)
+        # Non-commutative operators and types matter
+        self.assertNotEqual(canonical_hash([GT(y, x), LT(y, z)]),
+                            canonical_hash([GT(x, y), LT(y, z)]))
+        self.assertNotEqual(canonical_hash([LT(x, y), LT(y, z)]),
+                            canonical_hash([LT(x, y), LT(z, y)]))
+        r = Symbol("r", REAL)
+        self.assertNotEqual(canonical_hash([GT(x, Int(0))]),
+                            canonical_hash([GT(r, Real(0))]))
+        self.assertEqual(canonical_hash([Equals(Minus(x, y), Int(1))]),
+                         canonical_hash([Equals(Int(1), Minus(y, x))]))
+        self.assertNotEqual(canonical_hash([Equals(Minus(x, y), Int(1))]),
+                            canonical_hash([Equals(Minus(x, Int(1)), y)]))
+        # Bound variables and function symbols are renamed too
+        self.assertEqual(canonical_hash([ForAll([x], GT(x, y))]),
+                         canonical_hash([ForAll([z], GT(z, x))]))
+        v = Symbol("v", BV8)
+        self.assertEqual(canonical_hash([Equals(BVAdd(v, BV(1, 8)),
+                                                BV(3, 8))]),
+                         canonical_hash([Equals(BV(3, 8),
+                                                BVAdd(BV(1, 8), v))]))
+
+        # The hash does not depend on the environment
+        env = Environment()
+        mgr = env.formula_manager
+        x2, y2, z2 = (mgr.Symbol(n, INT) for n in "pqr")
+        g2 = [mgr.LT(x2, y2),
+              mgr.Or(mgr.GT(z2, mgr.Plus(mgr.Int(1), x2)), mgr.Symbol("c"))]
+        self.assertEqual(canonical_hash(g2, env), h)
+
+        key, symbols = Canonizer().canonize(g)
+        self.assertEqual(key, h)
+        self.assertEqual(set(symbols), set([x, y, z, b]))
+
+    def test_result_cache(self):
+        fd, path = mkstemp(suffix=".sqlite")
+        os.close(fd)
+        try:
+            with ResultCache(path, max_entries=10) as cache:
+                self.assertIsNone(cache.get("k0"))
+                cache.put("k0", True, {0: ["i", "5"]})
+                cache.put("k1", False)
+                self.assertEqual(cache.get("k0"), (True, {0: ["i", "5"]}))
+                self.assertEqual(cache.get("k1"), (False, None))
+            # The results are persistent
+            with ResultCache(path, max_entries=10) as cache:
+                self.assertEqual(cache.get("k1"), (False, None))
+                for i in range(2, 10):
+                    cache.put("k%d" % i, True)
+                self.assertEqual(len(cache), 10)
+                cache.get("k1")
+                cache.put("k10", True)
+                self.assertEqual(len(cache), 9)
+                self.assertEqual(cache.evictions, 2)
+                # The least recently used entries are evicted
+                self.assertIsNone(cache.get("k0"))
+                self.assertIsNone(cache.get("k2"))
+                self.assertIsNotNone(cache.get("k1"))
+                stats = cache.statistics()
+                self.assertEqual((stats["hits"], stats["misses"]), (3, 2))
+        finally:
+            os.remove(path)
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_caching_solver(self):
+        x, y = Symbol("x", INT), Symbol("y", INT)
+        cache = ResultCache()
+        with CachingSolver(Solver(logic=QF_LIA), cache) as s:
+            s.add_assertion(GT(x, Int(2)))
+            s.add_assertion(LT(Times(Int(2), x), y))
+            self.assertTrue(s.solve())
+            self.assertTrue(s.get_py_value(y) > 2 * s.get_py_value(x))
+            s.push()
+            s.add_assertion(LT(y, Int(6)))
+            self.assertFalse(s.solve())
+            s.pop()
+            # The backend is not needed for the hit
+            self.assertTrue(s.solve())
+            self.assertEqual(len(s.solver.assertions), 2)
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        # An alpha-equivalent query is served by the cache
+        p, q = Symbol("p", INT), Symbol("q", INT)
+        backend = Solver(logic=QF_LIA)
+        with CachingSolver(backend, cache) as s:
+            s.add_assertion(LT(Times(Int(2), q), p))
+            s.add_assertion(GT(q, Int(2)))
+            self.assertTrue(s.solve())
+            self.assertEqual(len(backend.assertions), 0)
+            model = s.get_model()
+            self.assertTrue(model.get_py_value(p) >
+                            2 * model.get_py_value(q))
+            self.assertFalse(s.solve([LT(p, Int(6))]))
+            self.assertEqual(cache.hits, 3)
+            self.assertTrue(s.is_sat(GT(p, Int(100))))
+            self.assertEqual(cache.misses, 3)
+            self.assertEqual(len(backend.assertions), 2)
+            self.assertEqual(len(cache), 3)
+
+        # Without stored models, the backend is solved on demand
+        backend = Solver(logic=QF_LIA)
+        with CachingSolver(backend, ResultCache(), store_models=False) as s:
+            s.add_assertion(GT(x, Int(2)))
+            self.assertTrue(s.solve())
+            self.assertTrue(s.solve())
+            self.assertEqual(s.cache.hits, 1)
+            self.assertTrue(s.get_py_value(x) > 2)
+            self.assertEqual(len(backend.assertions), 1)
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_factory(self):
+        fd, path = mkstemp(suffix=".sqlite")
+        os.close(fd)
+        a, b = Symbol("a"), Symbol("b")
+        try:
+            hits = []
+            for _ in range(2):
+                with Solver(logic=QF_BOOL, cache=path) as s:
+                    s.add_assertion(Or(a, b))
+                    self.assertTrue(s.solve([Not(a)]))
+                    self.assertTrue(s.get_py_value(b))
+                    self.assertFalse(s.solve([Not(a), Not(b)]))
+                    self.assertFalse(s.is_sat(FALSE()))
+                hits.append(s.cache.hits)
+                s.cache.close()
+            self.assertEqual(hits, [0, 3])
+        finally:
+            os.remove(path)
+
+    @skipIfSolverNotAvailable("cdcl")
+    def test_unsat_cores(self):
+        a, b = Symbol("a"), Symbol("b")
+        cache = ResultCache()
+        cores = []
+        for _ in range(2):
+            with Solver(name="cdcl", logic=QF_BOOL, unsat_cores_mode="named",
+                        cache=cache) as s:
+                s.add_assertion(a, named="A")
+                s.add_assertion(Not(a), named="NA")
+                s.add_assertion(b, named="B")
+                self.assertFalse(s.solve())
+                cores.append(set(s.get_named_unsat_core()))
+                self.assertEqual(len(s.get_unsat_core()), 2)
+        # The second core is computed by the backend after the hit
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cores, [set(["A", "NA"])] * 2)
+
+
+if __name__ == '__main__':
+    main()
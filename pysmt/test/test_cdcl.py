@@ -0,0 +1,160 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import itertools
+import random
+
+from pysmt.shortcuts import (Symbol, And, Or, Not, Iff, Implies, Solver,
+                             UnsatCoreSolver, GT, Int, TRUE)
+from pysmt.typing import INT
+from pysmt.logics import QF_BOOL
+from pysmt.solvers.cdcl import CDCL
+from pysmt.exceptions import ConvertExpressionError, SolverStatusError
+from pysmt.test import TestCase, main
+from pysmt.test.examples import get_example_formulae
+
+
+def brute_force(num_vars, clauses, assumptions):
+    for bits in itertools.product([False, True], repeat=num_vars):
+        if all(bits[abs(a) - 1] == (a > 0) for a in assumptions) and \
+           all(any(bits[abs(l) - 1] == (l > 0) for l in c) for c in clauses):
+            return True
+    return False
+
+
+def pigeonhole(engine, pigeons, holes):
+    var = dict(((i, j), engine.new_var())
+               for i in range(pigeons) for j in range(holes))
+    for i in range(pigeons):
+        engine.add_clause([var[i, j] for j in range(holes)])
+    for j in range(holes):
+        for a in range(pigeons):
+            for b in range(a + 1, pigeons):
+                engine.add_clause([-var[a, j], -var[b, j]])
+
+
+class TestCDCL(TestCase):
+
+    def test_engine_random(self):
+        rnd = random.Random(7)
+        for _ in range(300):
+            n = rnd.randint(1, 8)
+            clauses = [[rnd.choice([-1, 1]) * rnd.randint(1, n)
+                        for _ in range(rnd.randint(1, 3))]
+                       for _ in range(rnd.randint(0, 35))]
+            engine = CDCL()
+            for _ in range(n):
+                engine.new_var()
+            for c in clauses:
+                engine.add_clause(c)
+            for _ in range(3):
+                assumptions = [rnd.choice([-1, 1]) * rnd.randint(1, n)
+                               for _ in range(rnd.randint(0, 3))]
+                res = engine.solve(assumptions)
+                self.assertEqual(res, brute_force(n, clauses, assumptions))
+                if res:
+                    model = engine.model
+                    for c in clauses:
+                        self.assertTrue(any((model[abs(l)] > 0) == (l > 0)
+                                            for l in c))
+                else:
+                    self.assertTrue(set(engine.core) <= set(assumptions))
+                    self.assertFalse(brute_force(n, clauses, engine.core))
+                # Clauses can be added between calls
+                c = [rnd.choice([-1, 1]) * rnd.randint(1, n)]
+                clauses.append(c)
+                engine.add_clause(c)
+
+    def test_engine_pigeonhole(self):
+        engine = CDCL()
+        pigeonhole(engine, 6, 5)
+        self.assertFalse(engine.solve())
+        self.assertTrue(engine.conflicts > 0)
+        self.assertFalse(engine.ok)
+
+        engine = CDCL()
+        pigeonhole(engine, 5, 5)
+        self.assertTrue(engine.solve())
+
+    def test_solver(self):
+        a, b, c = (Symbol(x) for x in "abc")
+        with Solver(name="cdcl", logic=QF_BOOL) as s:
+            s.add_assertion(Or(a, b))
+            s.add_assertion(Implies(a, c))
+            self.assertTrue(s.solve([Not(b)]))
+            self.assertEqual(s.get_value(a), TRUE())
+            self.assertEqual(s.get_value(c), TRUE())
+            self.assertFalse(s.solve([Not(b), Not(c)]))
+            # Non-literal assumptions
+            self.assertFalse(s.solve([Not(Or(b, c))]))
+            self.assertTrue(s.solve())
+
+            s.push()
+            s.add_assertion(Not(c))
+            self.assertFalse(s.is_sat(Not(b)))
+            self.assertTrue(s.solve())
+            self.assertEqual(s.get_py_value(b), True)
+            s.push()
+            s.add_assertion(Not(b))
+            self.assertFalse(s.solve())
+            s.pop(2)
+            self.assertTrue(s.solve([Not(b), c]))
+            self.assertEqual(len(s.assertions), 2)
+
+            s.reset_assertions()
+            self.assertTrue(s.solve([Not(a), Not(b)]))
+
+        x = Symbol("x", INT)
+        with Solver(name="cdcl", logic=QF_BOOL) as s:
+            with self.assertRaises(ConvertExpressionError):
+                s.add_assertion(And(a, GT(x, Int(0))))
+
+    def test_unsat_core(self):
+        a, b, c = (Symbol(x) for x in "abc")
+        with UnsatCoreSolver(name="cdcl", logic=QF_BOOL,
+                             unsat_cores_mode="named") as s:
+            s.add_assertion(Or(a, b), named="ab")
+            s.add_assertion(c, named="c")
+            s.add_assertion(Not(a), named="na")
+            s.push()
+            s.add_assertion(Not(b), named="nb")
+            self.assertFalse(s.solve())
+            self.assertEqual(s.get_named_unsat_core(),
+                             {"ab": Or(a, b), "na": Not(a), "nb": Not(b)})
+            s.pop()
+            self.assertTrue(s.solve())
+            with self.assertRaises(SolverStatusError):
+                s.get_unsat_core()
+            s.add_assertion(Iff(b, Not(c)), named="bc")
+            self.assertFalse(s.solve())
+            self.assertEqual(set(s.get_unsat_core()),
+                             set([Or(a, b), c, Not(a), Iff(b, Not(c))]))
+
+    def test_examples(self):
+        for example in get_example_formulae():
+            if example.logic != QF_BOOL:
+                continue
+            with Solver(name="cdcl", logic=QF_BOOL) as s:
+                s.add_assertion(example.expr)
+                self.assertEqual(s.solve(), example.is_sat, example.expr)
+                if example.is_sat:
+                    model = s.get_model()
+                    self.assertEqual(model.get_value(example.expr), TRUE())
+
+
+if __name__ == '__main__':
+    main()
@@ -18,10 +18,11 @@
 import os
 from nose.plugins.attrib import attr
 
-from pysmt.shortcuts import Implies, is_sat, reset_env, Symbol, Iff
-from pysmt.rewritings import CNFizer
+from pysmt.shortcuts import (Implies, is_sat, reset_env, Symbol, Iff, And, Or,
+                             Not, Ite, ForAll)
+from pysmt.rewritings import CNFizer, PolarityCNFizer
 from pysmt.logics import QF_BOOL, QF_LRA, QF_LIA, QF_UFLIRA
-from pysmt.test import TestCase, skipIfNoSolverForLogic, main
+from pysmt.test import TestCase, skipIfNoSolverForLogic, main, unittest
 from pysmt.test.examples import get_example_formulae
 from pysmt.test.smtlib.parser_utils import SMTLIB_TEST_FILES, SMTLIB_DIR
 from pysmt.smtlib.parser import get_formula_fname
@@ -100,5 +101,94 @@ class TestCnf(TestCase):
 
         self.assertValid(Implies(cnf, f), logic=QF_BOOL)
 
+
+class TestPolarityCnf(TestCase):
+
+    def do_examples(self, logic):
+        conv = PolarityCNFizer()
+        for example in get_example_formulae():
+            if example.logic != logic or not logic.quantifier_free:
+                continue
+            cnf = conv.convert_as_formula(example.expr)
+
+            self.assertValid(Implies(cnf, example.expr), logic=logic)
+
+            res = is_sat(cnf, logic=logic)
+            self.assertEqual(res, example.is_sat)
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_examples_solving_bool(self):
+        self.do_examples(QF_BOOL)
+
+    @skipIfNoSolverForLogic(QF_LRA)
+    def test_examples_solving_lra(self):
+        self.do_examples(QF_LRA)
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_examples_solving_lia(self):
+        self.do_examples(QF_LIA)
+
+    def test_clauses(self):
+        a, b, c, d = (Symbol(x) for x in "abcd")
+        conv = PolarityCNFizer()
+        va, vb, vc, vd = (conv.literal(x) for x in (a, b, c, d))
+
+        # Negations reuse the literal of their argument
+        self.assertEqual(conv.literal(Not(a)), -va)
+        self.assertEqual(conv.literal(Not(Not(a))), va)
+
+        # Top-level conjunctions and disjunctions do not need definitions
+        cnf = conv.convert(And(a, Or(Not(b), c)))
+        self.assertEqual(sorted(sorted(cl) for cl in cnf),
+                         sorted([[va], sorted([-vb, vc])]))
+
+        # Only the positive half of the definition of And(c, d) is needed
+        cnf = conv.convert(Or(a, And(c, d)))
+        self.assertEqual(len(cnf), 3)
+        k = conv.literal(And(c, d))
+        self.assertEqual(sorted(sorted(cl) for cl in cnf),
+                         sorted([sorted([va, k]),
+                                 sorted([-k, vc]), sorted([-k, vd])]))
+        self.assertEqual(cnf.max_var(), k)
+        self.assertEqual(conv.get_atom(va), a)
+        self.assertIsNone(conv.get_atom(k))
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_polarity(self):
+        a, b, c, d = (Symbol(x) for x in "abcd")
+        f = Implies(Iff(a, b), Ite(c, Not(d), And(a, d)))
+        pg = PolarityCNFizer().convert(f)
+        ts = CNFizer().convert(f)
+        self.assertTrue(len(pg) < len(ts))
+        cnf = PolarityCNFizer().convert_as_formula(f)
+        self.assertValid(Implies(cnf, f), logic=QF_BOOL)
+        self.assertUnsat(And(cnf, Not(f)), logic=QF_BOOL)
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_constants(self):
+        a = Symbol("a")
+        conv = PolarityCNFizer()
+        self.assertEqual(len(conv.convert(Iff(a, a).simplify())), 0)
+        f = Or(And(a, Not(a)), Iff(a, Not(a)))
+        self.assertUnsat(conv.convert_as_formula(f), logic=QF_BOOL)
+
+    def test_quantifiers(self):
+        a = Symbol("a")
+        with self.assertRaises(NotImplementedError):
+            PolarityCNFizer().convert(ForAll([a], a))
+
+    def test_as_numpy(self):
+        try:
+            import numpy as np
+        except ImportError:
+            raise unittest.SkipTest("NumPy is not available")
+        a, b = Symbol("a"), Symbol("b")
+        cnf = PolarityCNFizer().convert(And(a, Or(Not(a), b)))
+        lits, offsets = cnf.as_numpy()
+        self.assertEqual(lits.dtype, np.intc)
+        self.assertEqual(list(offsets), list(cnf.offsets))
+        self.assertEqual(list(lits), list(cnf.literals))
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,94 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+from fractions import Fraction
+
+from pysmt.shortcuts import (Symbol, And, Or, Not, Int, Real, Plus, Times,
+                             Equals, GT, LT, Function, TRUE, FALSE)
+from pysmt.typing import INT, REAL, FunctionType
+from pysmt.logics import QF_LIA, QF_UFLIRA
+from pysmt.components import get_components, ComponentSolver, solve_components
+from pysmt.test import TestCase, skipIfNoSolverForLogic, main
+
+
+class TestComponents(TestCase):
+
+    def setUp(self):
+        TestCase.setUp(self)
+        self.x, self.y, self.z, self.w = (Symbol(n, INT) for n in "xyzw")
+        self.a, self.b = Symbol("a"), Symbol("b")
+
+    def test_get_components(self):
+        x, y, z, w, a, b = self.x, self.y, self.z, self.w, self.a, self.b
+        f = Symbol("f", FunctionType(INT, [INT]))
+        assertions = [GT(x, y), a, Equals(Function(f, [z]), Int(1)),
+                      Or(b, LT(y, Int(0))), TRUE(),
+                      GT(Function(f, [w]), Int(2)), Not(FALSE())]
+        components = get_components(assertions)
+        self.assertEqual(components,
+                         [[GT(x, y), Or(b, LT(y, Int(0)))],
+                          [a],
+                          [Equals(Function(f, [z]), Int(1)),
+                           GT(Function(f, [w]), Int(2))],
+                          [TRUE(), Not(FALSE())]])
+        self.assertEqual(get_components([]), [])
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_solve(self):
+        x, y, z, w, a, b = self.x, self.y, self.z, self.w, self.a, self.b
+        assertions = [GT(x, y), Or(a, Equals(y, Int(3))), Not(a),
+                      Equals(Plus(z, w), Int(10)), GT(z, Int(20)), b]
+        solver = ComponentSolver(logic=QF_LIA)
+        self.assertTrue(solver.solve(assertions))
+        self.assertEqual(len(solver.components), 3)
+        model = solver.get_model()
+        self.assertEqual(model.get_value(And(assertions)), TRUE())
+        self.assertEqual(model[y], Int(3))
+
+        # An unsatisfiable component
+        assertions.append(GT(w, Int(0)))
+        self.assertFalse(solver.solve(assertions))
+        self.assertIsNone(solver.get_model())
+        self.assertIn(GT(z, Int(20)), solver.unsat_component)
+        self.assertIsNone(solve_components(assertions, logic=QF_LIA))
+
+    @skipIfNoSolverForLogic(QF_UFLIRA)
+    def test_solve_parallel(self):
+        x, y, z, w, a, b = self.x, self.y, self.z, self.w, self.a, self.b
+        r = Symbol("r", REAL)
+        f = Symbol("f", FunctionType(INT, [INT]))
+        assertions = [GT(x, y), LT(y, Int(-5)),
+                      Equals(Times(Real(3), r), Real(1)),
+                      Equals(Function(f, [z]), Int(1)), Not(a),
+                      Or(a, b)]
+        model = solve_components(assertions, processes=2)
+        self.assertIsNotNone(model)
+        self.assertEqual(model[r], Real(Fraction(1, 3)))
+        self.assertEqual(model[a], FALSE())
+        self.assertEqual(model[b], TRUE())
+        self.assertTrue(model.get_py_value(y) < -5)
+        self.assertEqual(model.get_value(And(assertions[:3] +
+                                             assertions[4:])), TRUE())
+
+        assertions.append(Equals(Function(f, [w]), Int(2)))
+        assertions.append(Equals(z, w))
+        self.assertIsNotNone(solve_components(assertions[:-1], processes=2))
+        self.assertIsNone(solve_components(assertions, processes=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import os
+import tempfile
+from io import StringIO, BytesIO
+
+from pysmt.shortcuts import Symbol, And, Or, Not, Iff, Implies, ForAll, Exists
+from pysmt.rewritings import ClauseBuffer, CNFizer
+from pysmt.logics import QF_BOOL, BOOL
+from pysmt.dimacs import DimacsCNF, read_dimacs, write_dimacs, parse_dimacs
+from pysmt.test import TestCase, skipIfNoSolverForLogic, main
+from pysmt.test.examples import get_example_formulae
+
+
+DIMACS = b"""c A small instance
+c
+p cnf 4 3
+1 -2 0
+2 3
+-4 0
+c a comment between clauses
+0
+"""
+
+QDIMACS = b"""p cnf 3 2
+a 1 2 0
+e 3 0
+-1 3 0
+2 -3 0
+"""
+
+
+class TestDimacs(TestCase):
+
+    def test_parse(self):
+        cnf = parse_dimacs(DIMACS)
+        self.assertEqual(cnf.num_vars, 4)
+        self.assertEqual([list(c) for c in cnf.clauses],
+                         [[1, -2], [2, 3, -4], []])
+        self.assertFalse(cnf.is_qdimacs)
+
+        v = [None] + [Symbol("v%d" % i) for i in range(1, 5)]
+        f = cnf.to_formula()
+        self.assertEqual(f, And(Or(v[1], Not(v[2])),
+                                Or(v[2], v[3], Not(v[4])),
+                                Or()))
+
+    def test_parse_qdimacs(self):
+        cnf = parse_dimacs(QDIMACS)
+        self.assertTrue(cnf.is_qdimacs)
+        self.assertEqual([(q, list(vs)) for q, vs in cnf.prefix],
+                         [("a", [1, 2]), ("e", [3])])
+        v1, v2, v3 = (Symbol("v%d" % i) for i in range(1, 4))
+        f = cnf.to_formula()
+        self.assertEqual(f, ForAll([v1, v2],
+                                   Exists([v3], And(Or(Not(v1), v3),
+                                                    Or(v2, Not(v3))))))
+
+    def test_round_trip(self):
+        for data in [DIMACS, QDIMACS]:
+            cnf = parse_dimacs(data)
+            out = StringIO()
+            cnf.write(out)
+            self.assertEqual(parse_dimacs(out.getvalue().encode("ascii")),
+                             cnf)
+
+    def test_files(self):
+        cnf = parse_dimacs(QDIMACS)
+        fd, fname = tempfile.mkstemp(suffix=".cnf")
+        os.close(fd)
+        try:
+            write_dimacs(cnf, fname)
+            self.assertEqual(read_dimacs(fname), cnf)
+            with open(fname) as stream:
+                self.assertEqual(read_dimacs(stream), cnf)
+        finally:
+            os.remove(fname)
+
+    def test_write(self):
+        clauses = ClauseBuffer()
+        clauses.add_clause([1, -3])
+        clauses.add_clause([])
+        clauses.add_clause([])
+        clauses.add_clause([2])
+        out = StringIO()
+        write_dimacs(clauses, out)
+        self.assertEqual(out.getvalue(),
+                         "p cnf 3 4\n1 -3 0\n0\n0\n2 0\n")
+        out = BytesIO()
+        write_dimacs(clauses, out)
+        self.assertEqual(out.getvalue(), b"p cnf 3 4\n1 -3 0\n0\n0\n2 0\n")
+
+    def test_errors(self):
+        for data in [b"1 2 0\n",
+                     b"p cnf 2\n1 2 0\n",
+                     b"p cnf 2 1\n1 2\n",
+                     b"p cnf 2 2\n1 2 0\n",
+                     b"p cnf 2 1\n1 x 0\n",
+                     b"p cnf 2 1\na 1 2\n1 2 0\n"]:
+            with self.assertRaises(SyntaxError):
+                parse_dimacs(data)
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_examples(self):
+        for example in get_example_formulae():
+            if example.logic != QF_BOOL:
+                continue
+            f = example.expr
+            for cnf in [DimacsCNF.from_formula(f),
+                        DimacsCNF.from_cnf_set(CNFizer().convert(f))]:
+                out = StringIO()
+                write_dimacs(cnf, out)
+                res = read_dimacs(StringIO(out.getvalue()))
+                res.symbols = cnf.symbols
+                g = res.to_formula()
+                self.assertValid(Implies(g, f), logic=QF_BOOL)
+                self.assertEqual(self.env.factory.is_sat(g, logic=QF_BOOL),
+                                 example.is_sat)
+
+    @skipIfNoSolverForLogic(BOOL)
+    def test_qdimacs_solving(self):
+        # Forall x. Exists y. x <-> y
+        data = b"p cnf 2 2\na 1 0\ne 2 0\n1 -2 0\n-1 2 0\n"
+        f = parse_dimacs(data).to_formula()
+        self.assertValid(f, logic=BOOL)
+        x, y = Symbol("v1"), Symbol("v2")
+        self.assertValid(Iff(f, ForAll([x], Exists([y], Iff(x, y)))),
+                         logic=BOOL)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import random
+
+from six.moves import xrange
+
+import pysmt.logics as logics
+from pysmt.shortcuts import (Symbol, And, Or, Not, Ite, Int, Real, Plus, Times,
+                             LE, GT, Equals, ToReal, BV, BVAdd, BVConcat,
+                             BVExtract, BVSLT, BVZExt, BVMul, Function)
+from pysmt.typing import BOOL, INT, REAL, BVType, FunctionType
+from pysmt.solvers.eager import EagerModel
+from pysmt.exceptions import UnsupportedOperatorError
+from pysmt.constants import Fraction
+from pysmt.test import TestCase, main, unittest
+from pysmt.test.examples import get_example_formulae
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if np is not None:
+    from pysmt.evaluation import evaluate_batch
+
+
+SUPPORTED_LOGICS = [logics.QF_BOOL, logics.QF_LIA, logics.QF_LRA,
+                    logics.QF_IDL, logics.QF_RDL, logics.QF_BV]
+
+
+@unittest.skipIf(np is None, "NumPy is not available")
+class TestBatchEvaluation(TestCase):
+
+    def random_value(self, ty):
+        if ty.is_bool_type():
+            return random.choice([True, False])
+        elif ty.is_int_type():
+            return random.randint(-10, 10)
+        elif ty.is_real_type():
+            return Fraction(random.randint(-10, 10), random.randint(1, 4))
+        assert ty.is_bv_type()
+        return random.randint(0, 2**ty.width - 1)
+
+    def pysmt_value(self, ty, value):
+        mgr = self.env.formula_manager
+        if ty.is_bool_type():
+            return mgr.Bool(value)
+        elif ty.is_int_type():
+            return mgr.Int(value)
+        elif ty.is_real_type():
+            return mgr.Real(value)
+        return mgr.BV(value, ty.width)
+
+    def check_against_model(self, formula, rows=20, exact=True):
+        symbols = list(formula.get_free_variables())
+        columns = dict((s, [self.random_value(s.symbol_type())
+                            for _ in xrange(rows)])
+                       for s in symbols)
+        if not symbols:
+            columns[Symbol("unused_column")] = [False] * rows
+
+        res = evaluate_batch(formula, columns, exact=exact)
+        self.assertEqual(len(res), rows)
+        for i in xrange(rows):
+            model = EagerModel(dict((s, self.pysmt_value(s.symbol_type(),
+                                                         columns[s][i]))
+                                    for s in symbols))
+            expected = model.get_value(formula).constant_value()
+            self.assertEqual(res[i], expected, (formula, i))
+
+    def test_examples(self):
+        random.seed(42)
+        for example in get_example_formulae():
+            if example.logic not in SUPPORTED_LOGICS:
+                continue
+            self.check_against_model(example.expr)
+            if example.logic in [logics.QF_BOOL, logics.QF_BV]:
+                # Native dtypes are exact for these theories
+                self.check_against_model(example.expr, exact=False)
+
+    def test_bool(self):
+        x, y = Symbol("x"), Symbol("y")
+        f = And(Or(x, y), Not(And(x, y)))
+        res = evaluate_batch(f, {x: [True, True, False, False],
+                                 y: [True, False, True, False]})
+        self.assertEqual(res.dtype, np.bool_)
+        self.assertEqual(list(res), [False, True, True, False])
+
+    def test_arithmetic(self):
+        p, r = Symbol("p", INT), Symbol("r", REAL)
+        t = Ite(GT(p, Int(0)), Plus(p, Int(1)), Times(p, Int(-2)))
+        res = evaluate_batch(t, {p: [3, -2, 0]})
+        self.assertEqual(res.dtype, np.int64)
+        self.assertEqual(list(res), [4, 4, 0])
+
+        f = LE(ToReal(p), Times(r, Real(2)))
+        res = evaluate_batch(f, {p: [1, 3], r: [0.5, 1.25]})
+        self.assertEqual(list(res), [True, False])
+
+    def test_exact(self):
+        r = Symbol("r", REAL)
+        f = Equals(Plus(r, r, r), Real(1))
+        third = Fraction(1, 3)
+        res = evaluate_batch(f, {r: [third, Fraction(1, 2)]}, exact=True)
+        self.assertEqual(list(res), [True, False])
+
+        p = Symbol("p", INT)
+        big = Times(p, Int(2**40), Int(2**40))
+        res = evaluate_batch(big, {p: [1, 3]}, exact=True)
+        self.assertEqual(list(res), [2**80, 3 * 2**80])
+
+    def test_bv(self):
+        a, b = Symbol("a", BVType(8)), Symbol("b", BVType(8))
+        res = evaluate_batch(BVAdd(a, b), {a: [250, 1], b: [10, 2]})
+        self.assertEqual(res.dtype, np.uint64)
+        self.assertEqual(list(res), [4, 3])
+
+        res = evaluate_batch(BVSLT(a, b), {a: [255, 1], b: [0, 2]})
+        self.assertEqual(list(res), [True, True])
+
+    def test_wide_bv(self):
+        a = Symbol("a", BVType(64))
+        b = Symbol("b", BVType(64))
+        wide = BVConcat(a, b)
+        res = evaluate_batch(wide, {a: [1, 2**64 - 1], b: [2, 3]})
+        self.assertEqual(res.dtype, object)
+        self.assertEqual(list(res), [2**64 + 2, (2**64 - 1) * 2**64 + 3])
+
+        f = Equals(BVExtract(BVMul(BVZExt(a, 64), BVZExt(b, 64)), 64, 127),
+                   BV(1, 64))
+        res = evaluate_batch(f, {a: [2**63, 2**32], b: [2, 2**32]})
+        self.assertEqual(list(res), [True, True])
+        self.check_against_model(wide)
+
+    def test_constant_formula(self):
+        x = Symbol("x")
+        res = evaluate_batch(And(x, Not(x)), {x: [True, False, True]})
+        self.assertEqual(list(res), [False, False, False])
+        res = evaluate_batch(Int(3), {x: [True, False]})
+        self.assertEqual(list(res), [3, 3])
+
+    def test_errors(self):
+        x, y = Symbol("x"), Symbol("y")
+        with self.assertRaises(ValueError):
+            evaluate_batch(And(x, y), {x: [True]})
+        with self.assertRaises(ValueError):
+            evaluate_batch(And(x, y), {x: [True], y: [True, False]})
+
+        f = Symbol("f", FunctionType(BOOL, [BOOL]))
+        with self.assertRaises(UnsupportedOperatorError):
+            evaluate_batch(Function(f, [x]), {x: [True]})
+
+
+if __name__ == '__main__':
+    main()
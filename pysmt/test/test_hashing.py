@@ -0,0 +1,129 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+from pysmt.shortcuts import (Symbol, And, Or, Int, Plus, GT, LT, LE, Equals,
+                             ForAll, Exists, Function, BV,
+                             structural_hash, get_env)
+from pysmt.typing import INT, BV8, FunctionType
+from pysmt.environment import Environment
+from pysmt.test import TestCase, main
+
+
+def build(mgr):
+    x, y = mgr.Symbol("x", INT), mgr.Symbol("y", INT)
+    f = mgr.Symbol("f", FunctionType(INT, [INT]))
+    v = mgr.Symbol("v", BV8)
+    return mgr.And(mgr.Or(mgr.Symbol("a"),
+                          mgr.LT(mgr.Function(f, [x]), mgr.Plus(x, y))),
+                   mgr.Equals(mgr.BVAdd(v, mgr.BV(1, 8)), mgr.BV(3, 8)),
+                   mgr.ForAll([x], mgr.GT(x, mgr.Int(-5))))
+
+
+class TestHashing(TestCase):
+
+    def test_environment_independent(self):
+        mgr = get_env().formula_manager
+        f = build(mgr)
+        h = structural_hash(f)
+        self.assertEqual(len(h), 32)
+        self.assertEqual(f.structural_hash(), h)
+        self.assertEqual(mgr.structural_hash(f), h)
+
+        # Nodes created in a different order get different ids
+        env = Environment()
+        env.formula_manager.Symbol("v", BV8)
+        env.formula_manager.Int(-5)
+        g = build(env.formula_manager)
+        self.assertEqual(env.formula_manager.structural_hash(g), h)
+
+        # Any change of the structure changes the hash
+        x, y = Symbol("x", INT), Symbol("y", INT)
+        hashes = set(structural_hash(t) for t in
+                     [LT(x, y), LT(y, x), LE(x, y), LT(x, Plus(y, Int(0))),
+                      LT(x, Symbol("z", INT)), Equals(x, y), Symbol("w"),
+                      Int(1), Symbol("p"), BV(1, 8), BV(1, 16)])
+        self.assertEqual(len(hashes), 11)
+
+    def test_options(self):
+        x, y, z = (Symbol(n, INT) for n in "xyz")
+        a, b = Symbol("a"), Symbol("b")
+        f, g = And(a, b), And(b, a)
+        self.assertNotEqual(structural_hash(f), structural_hash(g))
+        self.assertEqual(structural_hash(f, commutative=True),
+                         structural_hash(g, commutative=True))
+        self.assertNotEqual(structural_hash(LT(x, y), commutative=True),
+                            structural_hash(LT(y, x), commutative=True))
+
+        q1 = ForAll([x], And(GT(x, y), Exists([z], GT(z, Int(0)))))
+        q2 = ForAll([z], And(GT(z, y), Exists([x], GT(x, Int(0)))))
+        self.assertNotEqual(structural_hash(q1), structural_hash(q2))
+        self.assertEqual(structural_hash(q1, alpha=True),
+                         structural_hash(q2, alpha=True))
+        # Free variables are not renamed
+        q3 = ForAll([y], And(GT(y, x), Exists([z], GT(z, Int(0)))))
+        self.assertNotEqual(structural_hash(q1, alpha=True),
+                            structural_hash(q3, alpha=True))
+        # Bound variables are identified by their binder
+        self.assertEqual(structural_hash(ForAll([x], Exists([y], LT(x, y))),
+                                         alpha=True),
+                         structural_hash(ForAll([y], Exists([x], LT(y, x))),
+                                         alpha=True))
+        self.assertNotEqual(structural_hash(ForAll([x], Exists([y],
+                                                               LT(x, y))),
+                                            alpha=True),
+                            structural_hash(ForAll([x], Exists([y],
+                                                               LT(y, x))),
+                                            alpha=True))
+        # Shadowing
+        self.assertEqual(structural_hash(ForAll([x], Exists([x], LT(x, y))),
+                                         alpha=True),
+                         structural_hash(ForAll([z], Exists([x], LT(x, y))),
+                                         alpha=True))
+
+    def test_index(self):
+        mgr = get_env().formula_manager
+        x = Symbol("x", INT)
+        f = Or(Symbol("a"), GT(Function(Symbol("f", FunctionType(INT, [INT])),
+                                        [x]), x))
+        h = structural_hash(f)
+        self.assertIs(mgr.get_by_structural_hash(h), f)
+        # Sub-formulae are indexed too
+        self.assertIs(mgr.get_by_structural_hash(structural_hash(x)), x)
+        self.assertIsNone(mgr.get_by_structural_hash(h, commutative=True))
+
+        # Hashes computed in other environments can be looked up,
+        # once the corresponding formula has been hashed
+        env = Environment()
+        gh = env.formula_manager.structural_hash(build(env.formula_manager))
+        self.assertIsNone(mgr.get_by_structural_hash(gh))
+        g = build(mgr)
+        self.assertEqual(structural_hash(g), gh)
+        self.assertIs(mgr.get_by_structural_hash(gh), g)
+
+    def test_deep(self):
+        x = Symbol("x", INT)
+        f = x
+        for i in range(20000):
+            f = Plus(f, Int(i))
+        h = structural_hash(LT(f, Int(0)), commutative=True)
+        self.assertEqual(len(h), 32)
+        q = ForAll([x], LT(f, Int(0)))
+        self.assertEqual(len(structural_hash(q, alpha=True)), 32)
+
+
+if __name__ == '__main__':
+    main()
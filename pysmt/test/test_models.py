@@ -15,11 +15,12 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 #
-from pysmt.shortcuts import Solver, Symbol, And, Real, GT, LT, Implies, FALSE
+from pysmt.shortcuts import Solver, Symbol, And, Or, Not, Real, GT, LT, Implies, FALSE
+from pysmt.shortcuts import Int, LE, GE, iter_models
 from pysmt.shortcuts import get_env
-from pysmt.typing import BOOL, REAL
+from pysmt.typing import BOOL, REAL, INT
 from pysmt.test import TestCase, skipIfNoSolverForLogic, main
-from pysmt.logics import QF_UFLIRA, QF_LRA, QF_BOOL
+from pysmt.logics import QF_UFLIRA, QF_LRA, QF_BOOL, QF_LIA
 from pysmt.solvers.eager import EagerModel
 
 
@@ -72,6 +73,62 @@ class TestModels(TestCase):
             self.assertFalse(k == z)
 
 
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_iter_models(self):
+        x, y, z = [Symbol(s) for s in "xyz"]
+        f = Or(x, y)
+        models = list(iter_models(f, important=[x, y]))
+        self.assertEqual(len(models), 3)
+        seen = set()
+        for m in models:
+            self.assertTrue(m.get_value(f).is_true())
+            seen.add((m.get_py_value(x), m.get_py_value(y)))
+        self.assertEqual(len(seen), 3)
+
+        # Projection on a subset of the symbols
+        models = list(iter_models(And(f, z), important=[z]))
+        self.assertEqual(len(models), 1)
+        self.assertTrue(models[0].get_py_value(z))
+
+        self.assertEqual(len(list(iter_models(f, limit=2))), 2)
+        self.assertEqual(list(iter_models(And(x, Not(x)))), [])
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_iter_models_minimize(self):
+        x, y, z = [Symbol(s) for s in "xyz"]
+        f = Or(x, And(y, z))
+        models = list(iter_models(f, minimize=True))
+        # Every model is an implicant and they cover all the solutions
+        self.assertTrue(len(models) <= 2)
+        for m in models:
+            cube = And([v if m.get_py_value(v) else Not(v) for v, _ in m])
+            self.assertValid(Implies(cube, f), logic=QF_BOOL)
+        cover = Or([And([v if m.get_py_value(v) else Not(v) for v, _ in m])
+                    for m in models])
+        self.assertValid(Implies(f, cover), logic=QF_BOOL)
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_iter_models_solver(self):
+        p, q = Symbol("p", INT), Symbol("q", INT)
+        x = Symbol("x")
+        f = And(GE(p, Int(0)), LE(p, Int(3)), Implies(x, GT(q, p)))
+        with Solver(logic=QF_LIA) as s:
+            s.add_assertion(f)
+            models = list(s.iter_models(important=[p]))
+            values = sorted(m.get_py_value(p) for m in models)
+            self.assertEqual(values, [0, 1, 2, 3])
+
+            # Blocking clauses are removed at the end of the enumeration
+            self.assertTrue(s.solve())
+
+            # The stack is restored also if the generator is closed early
+            gen = s.iter_models(important=[p, x])
+            next(gen)
+            gen.close()
+            self.assertEqual(len(list(s.iter_models(important=[p], limit=3))),
+                             3)
+            self.assertTrue(s.solve())
+
 
 if __name__ == '__main__':
     main()
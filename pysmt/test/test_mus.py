@@ -0,0 +1,109 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+from pysmt.shortcuts import (Symbol, Or, Not, Implies, Int, GT, LT,
+                             get_unsat_core, is_sat, And)
+from pysmt.typing import INT
+from pysmt.logics import QF_BOOL, QF_LIA
+from pysmt.mus import MUSExtractor, get_mus
+from pysmt.test import TestCase, skipIfNoSolverForLogic, main
+
+
+def chain(n):
+    """Satisfiable implications p0 -> p1 -> ... -> pn, with a few
+    redundant constraints."""
+    ps = [Symbol("p%d" % i) for i in range(n + 1)]
+    res = [Implies(ps[i], ps[i+1]) for i in range(n)]
+    res.extend(Or(ps[i], Not(ps[i+2])) for i in range(0, n - 1, 3))
+    return ps, res
+
+
+class TestMUS(TestCase):
+
+    def assertMUS(self, core):
+        self.assertFalse(is_sat(And(core)))
+        for i in range(len(core)):
+            self.assertTrue(is_sat(And(core[:i] + core[i+1:])))
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_algorithms(self):
+        ps, constraints = chain(20)
+        # The only MUS is the chain with p0 and not p20
+        constraints = [ps[0]] + constraints + [Not(ps[-1])]
+        for algorithm in ["deletion", "quickxplain", "parallel"]:
+            core = get_mus(constraints, algorithm=algorithm, processes=2,
+                           logic=QF_BOOL)
+            self.assertMUS(core)
+            self.assertEqual(len(core), 22)
+
+        with MUSExtractor([ps[0], Not(ps[0])]) as extractor:
+            extractor.parallel(processes=2, chunk_size=1)
+            self.assertTrue(extractor.minimal)
+
+        with self.assertRaises(ValueError):
+            get_mus(constraints[1:])
+        with self.assertRaises(ValueError):
+            get_mus(constraints, algorithm="foo")
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_progress(self):
+        ps, constraints = chain(10)
+        constraints = [ps[0]] + constraints + [Not(ps[-1])]
+        progress = []
+
+        def callback(extractor):
+            progress.append((extractor.checks, len(extractor.core)))
+
+        with MUSExtractor(constraints, callback=callback) as extractor:
+            core = extractor.quickxplain()
+            self.assertTrue(extractor.minimal)
+            self.assertEqual(extractor.necessary, len(core))
+        self.assertEqual([c for c, _ in progress],
+                         list(range(1, len(progress) + 1)))
+        # The best core never grows
+        sizes = [s for _, s in progress]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+        self.assertEqual(sizes[-1], 12)
+
+        # When the budget expires, the best core so far is returned
+        with MUSExtractor(constraints, time_budget=0) as extractor:
+            core = extractor.deletion()
+            self.assertFalse(extractor.minimal)
+            self.assertEqual(core, constraints)
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_named(self):
+        x = Symbol("x", INT)
+        named = dict(("c%d" % i, GT(x, Int(i))) for i in range(10))
+        named["upper"] = LT(x, Int(5))
+        core = get_mus(named, algorithm="quickxplain")
+        self.assertEqual(set(core), set(["c4", "upper"]))
+        self.assertEqual(core["upper"], named["upper"])
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_get_unsat_core(self):
+        ps, constraints = chain(9)
+        constraints = [ps[0]] + constraints + [Not(ps[-1]), Not(ps[5])]
+        core = get_unsat_core(constraints, minimize=True)
+        self.assertMUS(list(core))
+        self.assertEqual(len(core), 7)
+        core = get_unsat_core(constraints, minimize="quickxplain")
+        self.assertEqual(len(core), 7)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,11 +16,12 @@
 #   limitations under the License.
 #
 from pysmt.shortcuts import get_env, get_free_variables
-from pysmt.shortcuts import Symbol, Implies, And, Not
+from pysmt.shortcuts import Symbol, Implies, And, Not, Or, ForAll, Function
+from pysmt.shortcuts import Int, Plus, Equals
 from pysmt.test.examples import get_example_formulae
 from pysmt.test import TestCase, main
-from pysmt.oracles import get_logic
-from pysmt.typing import BOOL
+from pysmt.oracles import get_logic, FreeVarsOracle, FreeVarsBitsetOracle
+from pysmt.typing import BOOL, INT, FunctionType
 
 
 class TestOracles(TestCase):
@@ -45,6 +46,48 @@ class TestOracles(TestCase):
         s = get_free_variables(f)
         self.assertEqual(set([x,y]), s)
 
+    def test_free_vars_sharing(self):
+        x, y, z = Symbol("x"), Symbol("y"), Symbol("z")
+        oracle = FreeVarsOracle()
+        f1 = And(x, y)
+        f2 = Or(f1, Not(x))
+        f3 = And(Or(y, x), z)
+        self.assertIs(oracle.get_free_variables(f2),
+                      oracle.get_free_variables(f1))
+        self.assertIs(oracle.get_free_variables(Or(y, x)),
+                      oracle.get_free_variables(f1))
+        self.assertEqual(oracle.get_free_variables(f3), set([x, y, z]))
+
+    def test_free_vars_oracles(self):
+        x, y = Symbol("x"), Symbol("y")
+        p = Symbol("p", INT)
+        g = Symbol("g", FunctionType(INT, [INT]))
+        extra = [ForAll([x], Or(x, y)),
+                 And(x, ForAll([x], Or(x, y))),
+                 Equals(Function(g, [p]), Plus(p, Int(1)))]
+        for f in [e.expr for e in get_example_formulae()] + extra:
+            oracle = FreeVarsOracle()
+            bits = FreeVarsBitsetOracle()
+            expected = f.get_free_variables()
+            self.assertEqual(oracle.get_free_variables(f), expected)
+            self.assertEqual(bits.get_free_variables(f), expected)
+            for v in self.env.formula_manager.get_all_symbols():
+                self.assertEqual(FreeVarsOracle().depends_on(f, v),
+                                 v in expected, (f, v))
+                self.assertEqual(bits.depends_on(f, v), v in expected)
+            # Queries after the sets have been computed
+            for v in expected:
+                self.assertTrue(oracle.depends_on(f, v))
+        mask = bits.symbols_to_mask([x, g])
+        self.assertEqual(set(bits.mask_to_symbols(mask)), set([x, g]))
+
+    def test_symbol_index(self):
+        mgr = self.env.formula_manager
+        a, b = Symbol("a"), Symbol("b")
+        self.assertEqual(mgr.get_symbol_index(b),
+                         mgr.get_symbol_index(a) + 1)
+        self.assertEqual(mgr.get_symbol_by_index(mgr.get_symbol_index(a)), a)
+
 
     def test_atoms_oracle(self):
         oracle = get_env().ao
@@ -0,0 +1,287 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+from six.moves import cStringIO
+
+from pysmt.shortcuts import (Symbol, And, Or, Not, Iff, Implies, Int, Plus,
+                             Minus, Times, Equals, GT, LE, LT, TRUE, FALSE,
+                             Function, Solver, get_model)
+from pysmt.typing import INT, FunctionType
+from pysmt.logics import QF_BOOL, QF_LIA, QF_LRA
+from pysmt.rewritings import NNFizer
+from pysmt.preprocessing import (Preprocessor, SimplifierStage, NNFStage,
+                                 CNFStage, SubstitutionStage, WalkerStage,
+                                 FunctionStage, EqualityPropagator,
+                                 EqualityPropagationStage, extend_model)
+from pysmt.solvers.eager import EagerModel
+from pysmt.test import TestCase, skipIfNoSolverForLogic, main
+from pysmt.test.examples import get_example_formulae
+
+
+class TestPreprocessing(TestCase):
+
+    def test_statistics(self):
+        a, b, c = (Symbol(x) for x in "abc")
+        pre = Preprocessor([SimplifierStage(), NNFStage()])
+        f1 = And(a, Or(b, TRUE()))
+        f2 = Not(And(b, Implies(a, c)))
+        res = pre.process([f1, f2])
+        self.assertEqual(res[0], a)
+        self.assertEqual(res[1], Or(Not(b), And(a, Not(c))))
+
+        self.assertEqual([s.name for s in pre.statistics],
+                         ["simplify", "nnf"])
+        simp, nnf = pre.statistics
+        self.assertTrue(simp.changed)
+        self.assertTrue(simp.size_after < simp.size_before)
+        self.assertEqual(simp.size_before, pre.get_size([f1, f2]))
+        self.assertEqual(nnf.size_before, simp.size_after)
+        self.assertEqual(nnf.size_after, pre.get_size(res))
+        self.assertTrue(all(s.time >= 0 for s in pre.statistics))
+
+        out = cStringIO()
+        pre.print_statistics(out)
+        self.assertIn("nnf", out.getvalue())
+
+    def test_rounds(self):
+        p, q = Symbol("p", INT), Symbol("q", INT)
+        a = Symbol("a")
+        f = And(a, Equals(p, Plus(q, Int(1))))
+        subs = {a: TRUE(), q: Int(2)}
+        pre = Preprocessor([SimplifierStage(), SubstitutionStage(subs)],
+                           max_rounds=5)
+        res = pre.process([f])
+        self.assertEqual(res, [Equals(p, Int(3))])
+        names = [(s.name, s.round, s.skipped) for s in pre.statistics]
+        # The substitution makes no progress in the second round, and
+        # its input does not change afterwards: it is skipped.
+        self.assertEqual(names, [("simplify", 0, False),
+                                 ("substitute", 0, False),
+                                 ("simplify", 1, False),
+                                 ("substitute", 1, False),
+                                 ("simplify", 2, False),
+                                 ("substitute", 2, True)])
+
+        pre.skip_unproductive = False
+        pre.process([f])
+        self.assertFalse(any(s.skipped for s in pre.statistics))
+
+    def test_shared_memoization(self):
+        a, b, c = (Symbol(x) for x in "abc")
+        nnfizer = NNFizer()
+        pre = Preprocessor()
+        stage = pre.add_stage(WalkerStage(nnfizer, "convert"))
+        common = Not(Or(a, b))
+        pre.process([And(common, c), Or(common, Not(c))])
+        self.assertIn(common, nnfizer.memoization)
+        stage.reset()
+        self.assertEqual(len(nnfizer.memoization), 0)
+
+        called = []
+        def count(f):
+            called.append(f)
+            return f
+        stage = pre.add_stage(count)
+        self.assertIsInstance(stage, FunctionStage)
+        self.assertEqual(stage.name, "count")
+        pre.process([a, b])
+        self.assertEqual(called, [a, b])
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_examples(self):
+        pre = Preprocessor([SimplifierStage(), NNFStage(), CNFStage()])
+        for example in get_example_formulae():
+            if example.logic != QF_BOOL:
+                continue
+            f = example.expr
+            g = pre.process_formula(f)
+            self.assertValid(Implies(g, f), logic=QF_BOOL)
+            self.assertEqual(self.env.factory.is_sat(g, logic=QF_BOOL),
+                             example.is_sat)
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_solver(self):
+        p, q = Symbol("p", INT), Symbol("q", INT)
+        a = Symbol("a")
+        pre = Preprocessor([SimplifierStage(), NNFStage()])
+        f1 = Not(And(a, LE(p, q)))
+        f2 = Iff(a, GT(Plus(p, Int(0)), Int(3)))
+        with pre.wrap(Solver(logic=QF_LIA)) as solver:
+            solver.add_assertion(f1)
+            solver.add_assertion(f2)
+            self.assertTrue(solver.solve())
+            model = solver.get_model()
+            self.assertTrue(model.get_value(And(f1, f2)).is_true())
+            self.assertEqual(pre.statistics[0].name, "simplify")
+
+            solver.push()
+            solver.add_assertion(Equals(p, q))
+            self.assertTrue(solver.solve())
+            self.assertFalse(solver.is_sat(a))
+            solver.pop()
+            self.assertTrue(solver.is_sat(a))
+
+
+    def test_equality_propagation(self):
+        a, b = Symbol("a"), Symbol("b")
+        x, y, z, w = (Symbol(n, INT) for n in "xyzw")
+        assertions = [And(a, Not(b)),
+                      Equals(x, y),
+                      Equals(Plus(y, Int(1)), z),
+                      Equals(z, Int(4)),
+                      Or(b, GT(w, x))]
+        propagator = EqualityPropagator()
+        res, rec = propagator.propagate(assertions)
+        self.assertEqual(res, [GT(w, Int(3))])
+        self.assertEqual(rec, {a: TRUE(), b: FALSE(), x: Int(3),
+                               y: Int(3), z: Int(4)})
+
+        model = extend_model(EagerModel({w: Int(5)}), rec)
+        self.assertEqual(model.get_value(And(assertions)), TRUE())
+
+        # Conflicting constants
+        res, _ = EqualityPropagator().propagate([Equals(x, y),
+                                                 Equals(x, Int(1)),
+                                                 Equals(y, Int(2))])
+        self.assertEqual(res, [FALSE()])
+        res, _ = EqualityPropagator().propagate([a, Not(a)])
+        self.assertEqual(res, [FALSE()])
+
+    def test_equality_propagation_cycles(self):
+        x, y, z = (Symbol(n, INT) for n in "xyz")
+        f = Symbol("f", FunctionType(INT, [INT]))
+        propagator = EqualityPropagator()
+        assertions = [Equals(x, Function(f, [y])),
+                      Equals(y, Function(f, [x])),
+                      Equals(z, Times(x, y)),
+                      LT(z, Int(0))]
+        res, rec = propagator.propagate(assertions)
+        self.assertEqual(set(rec), set([x, z]))
+        self.assertEqual(rec[x], Function(f, [y]))
+        fy = Function(f, [y])
+        self.assertEqual(len(res), 2)
+        self.assertIn(Equals(y, Function(f, [fy])), res)
+        # The definitions do not depend on eliminated symbols
+        for term in rec.values():
+            self.assertFalse(set(term.get_free_variables()) & set(rec))
+
+        # x = y + 1 and y = x - 1 cannot both be definitions
+        res, rec = EqualityPropagator().propagate(
+            [Equals(x, Plus(y, Int(1))), Equals(y, Minus(x, Int(1)))])
+        self.assertEqual(res, [])
+        self.assertEqual(list(rec), [x])
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_equality_propagation_solver(self):
+        a = Symbol("a")
+        x, y, z = (Symbol(n, INT) for n in "xyz")
+        assertions = [Iff(a, GT(x, Int(2))),
+                      Equals(x, Plus(y, z)),
+                      Equals(y, Int(2)),
+                      a]
+        formula = And(assertions)
+        pre = Preprocessor([EqualityPropagationStage(), SimplifierStage()])
+        reduced = pre.process(assertions)
+        self.assertEqual(len(reduced), 1)
+        self.assertEqual(reduced[0].get_free_variables(), set([z]))
+        model = pre.extend_model(get_model(And(reduced)))
+        self.assertEqual(model.get_value(formula), TRUE())
+
+        with pre.wrap(Solver(logic=QF_LIA)) as solver:
+            solver.add_assertions(assertions)
+            self.assertTrue(solver.solve())
+            self.assertEqual(solver.get_value(formula), TRUE())
+
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_equality_propagation_incremental(self):
+        x, y = Symbol("x", INT), Symbol("y", INT)
+        pre = Preprocessor([EqualityPropagationStage(), SimplifierStage()])
+        with pre.wrap(Solver(logic=QF_LIA)) as solver:
+            solver.add_assertion(GT(x, Int(3)))
+            self.assertTrue(solver.solve())
+            # The definition x = 0 is checked against x > 3
+            solver.push()
+            solver.add_assertion(Equals(x, Int(0)))
+            self.assertFalse(solver.solve())
+            solver.pop()
+            self.assertTrue(solver.solve())
+            self.assertFalse(solver.is_sat(Equals(x, Int(1))))
+            self.assertTrue(solver.solve([LT(x, Int(5))]))
+            self.assertEqual(solver.get_py_value(x), 4)
+
+        pre = Preprocessor([EqualityPropagationStage(), SimplifierStage()])
+        with pre.wrap(Solver(logic=QF_LIA)) as solver:
+            solver.add_assertion(GT(y, Int(3)))
+            solver.push()
+            solver.add_assertion(Equals(x, Plus(y, Int(1))))
+            self.assertTrue(solver.solve())
+            solver.pop()
+            # The definition of x is forgotten by the pop
+            solver.add_assertion(Equals(x, Int(0)))
+            self.assertTrue(solver.solve())
+            self.assertEqual(solver.get_py_value(x), 0)
+            self.assertTrue(solver.get_py_value(y) > 3)
+            # Assumptions on the eliminated symbols are checked
+            self.assertFalse(solver.solve([GT(x, Int(0))]))
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_equality_propagation_definitions(self):
+        x, y, z = (Symbol(v, INT) for v in "xyz")
+        pre = Preprocessor([EqualityPropagationStage(), SimplifierStage()])
+        backend = Solver(logic=QF_LIA)
+        with pre.wrap(backend) as solver:
+            solver.add_assertion(Equals(x, Plus(y, Int(1))))
+            solver.add_assertion(GT(y, Int(3)))
+            self.assertTrue(solver.solve())
+            self.assertEqual(solver.get_py_value(x),
+                             solver.get_py_value(y) + 1)
+            # The eliminated symbol is not passed to the solver
+            free = set()
+            for f in backend.assertions:
+                free.update(f.get_free_variables())
+            self.assertNotIn(x, free)
+            # ... until an assumption mentions it
+            self.assertFalse(solver.solve([LT(x, Int(5))]))
+            self.assertIn(Equals(x, Plus(y, Int(1))), backend.assertions)
+            self.assertTrue(solver.solve([LT(x, Int(6))]))
+
+            # The definitions of the symbols of a later batch, and
+            # those of the symbols in the definitions, are asserted
+            solver.add_assertion(Equals(z, Int(7)))
+            solver.add_assertion(Equals(y, Minus(z, Int(2))))
+            self.assertTrue(solver.solve())
+            self.assertEqual(solver.get_py_value(x), 6)
+            self.assertFalse(solver.solve([LT(x, Int(6))]))
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_equality_propagation_examples(self):
+        for example in get_example_formulae():
+            if example.logic not in (QF_BOOL, QF_LIA, QF_LRA):
+                continue
+            f = example.expr
+            reduced, rec = EqualityPropagator().propagate([f])
+            g = And(reduced)
+            self.assertEqual(self.env.factory.is_sat(g, logic=example.logic),
+                             example.is_sat, f)
+            if example.is_sat:
+                model = extend_model(get_model(g, logic=example.logic), rec)
+                self.assertEqual(model.get_value(f), TRUE(), f)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,16 +17,20 @@
 #
 from pysmt.shortcuts import (And, Iff, Or, Symbol, Implies, Not,
                              Exists, ForAll,
-                             Times, Plus, Minus, Equals, Real,
-                             is_valid)
+                             Times, Plus, Minus, Equals, Real, Int, Ite, GT,
+                             is_valid, BV, BVAdd, BVSub, BVMul, BVNeg,
+                             BVExtract, BVConcat, BVZExt, BVSExt, BVLShl,
+                             BVLShr, BVAShr, BVULT, BVULE, BVSLT, BVComp,
+                             TRUE, FALSE)
 from pysmt.test import TestCase, skipIfNoSolverForLogic, main
 from pysmt.rewritings import prenex_normal_form, nnf, conjunctive_partition, aig
 from pysmt.rewritings import disjunctive_partition
-from pysmt.rewritings import TimesDistributor
+from pysmt.rewritings import TimesDistributor, LinearNormalizer
+from pysmt.rewritings import linear_normal_form, BVRewriter, bv_rewrite
 from pysmt.test.examples import get_example_formulae
 from pysmt.exceptions import SolverReturnedUnknownResultError
-from pysmt.logics import BOOL, QF_NRA, QF_LRA, QF_LIA, QF_NIA
-from pysmt.typing import REAL
+from pysmt.logics import BOOL, QF_NRA, QF_LRA, QF_LIA, QF_NIA, QF_BV
+from pysmt.typing import REAL, INT, BVType
 
 
 class TestRewritings(TestCase):
@@ -194,6 +198,133 @@ class TestRewritings(TestCase):
                 if old is new: continue # Nothing changed
                 self.assertValid(Equals(old, new),
                                  (old, new), solver_name="z3")
+    def test_linear_normal_form(self):
+        x, y, z = (Symbol(v, INT) for v in "xyz")
+        t1 = Plus(Times(Int(2), Plus(x, y)), Minus(z, x), Int(1))
+        t2 = Plus(Int(1), y, Times(y, Int(1)), Plus(x, z))
+        self.assertEqual(linear_normal_form(t1), linear_normal_form(t2))
+        self.assertEqual(linear_normal_form(Minus(x, x)), Int(0))
+        self.assertEqual(linear_normal_form(Times(Int(3), x)),
+                         linear_normal_form(Plus(x, x, x)))
+
+        norm = LinearNormalizer()
+        poly = norm.get_polynomial(t1)
+        self.assertEqual(poly, {(x,): 1, (y,): 2, (z,): 1, (): 1})
+        self.assertEqual(norm.difference(t1, t2), {})
+
+        # Non-linear monomials and atoms
+        c = Ite(GT(x, y), x, y)
+        poly = norm.get_polynomial(Plus(Times(x, y, Int(2)), Times(y, x), c))
+        self.assertEqual(len(poly), 2)
+        self.assertEqual(poly[(c,)], 1)
+        self.assertEqual(list(poly.values()).count(3), 1)
+
+        nl = Times(Plus(x, Int(1)), Plus(y, Int(1)))
+        self.assertEqual(len(norm.get_polynomial(nl)), 1)
+        self.assertEqual(norm.difference(Times(Plus(x, y), z),
+                                         Times(z, Plus(y, x))), {})
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_linear_normal_form_examples(self):
+        norm = LinearNormalizer()
+        for example in get_example_formulae():
+            if example.logic not in (QF_LIA, QF_LRA):
+                continue
+            for sub in example.expr.args():
+                for t in sub.args():
+                    ty = self.env.stc.get_type(t)
+                    if not (ty.is_int_type() or ty.is_real_type()):
+                        continue
+                    self.assertValid(Equals(t, norm.normalize(t)),
+                                     logic=example.logic)
+
+
+    def test_bv_rewriter_arith(self):
+        x, y = Symbol("x", BVType(8)), Symbol("y", BVType(8))
+        rewriter = BVRewriter()
+        t = BVSub(BVAdd(BVAdd(x, BV(3, 8)), y), BVAdd(y, BV(5, 8)))
+        self.assertEqual(rewriter.rewrite(t), BVAdd(x, BV(254, 8)))
+        self.assertEqual(rewriter.rewrite(BVSub(BVAdd(x, y), x)), y)
+        self.assertEqual(rewriter.rewrite(BVNeg(BVNeg(x))), x)
+        self.assertEqual(rewriter.rewrite(BVMul(BVMul(x, BV(3, 8)), BV(5, 8))),
+                         BVMul(x, BV(15, 8)))
+        self.assertEqual(rewriter.rewrite(BVMul(BVAdd(x, y), BV(0, 8))),
+                         BV(0, 8))
+        # Nothing to gain
+        t = BVAdd(x, BVMul(y, BV(3, 8)))
+        self.assertEqual(rewriter.rewrite(t), t)
+        self.assertTrue(rewriter.stats["add_chain"] > 0)
+        self.assertTrue(rewriter.stats["mul_chain"] > 0)
+
+        # Linear equalities over a single atom are solved
+        f = Equals(BVAdd(x, BV(1, 8)), BV(0, 8))
+        self.assertEqual(bv_rewrite(f), Equals(x, BV(255, 8)))
+        self.assertEqual(bv_rewrite(Equals(BVAdd(x, y), BVAdd(y, x))), TRUE())
+
+    def test_bv_rewriter_extract(self):
+        x, y = Symbol("x", BVType(8)), Symbol("y", BVType(8))
+        rewriter = BVRewriter()
+        c = BVConcat(x, y)
+        self.assertEqual(rewriter.rewrite(BVExtract(c, 8, 15)), x)
+        self.assertEqual(rewriter.rewrite(BVExtract(c, 2, 5)),
+                         BVExtract(y, 2, 5))
+        self.assertEqual(rewriter.rewrite(BVExtract(c, 4, 11)),
+                         BVConcat(BVExtract(x, 0, 3), BVExtract(y, 4, 7)))
+        self.assertEqual(rewriter.rewrite(BVExtract(BVExtract(x, 2, 7), 1, 3)),
+                         BVExtract(x, 3, 5))
+        self.assertEqual(rewriter.rewrite(BVExtract(BVZExt(x, 8), 0, 7)), x)
+        self.assertEqual(rewriter.rewrite(BVExtract(BVZExt(x, 8), 9, 12)),
+                         BV(0, 4))
+        self.assertEqual(rewriter.rewrite(BVConcat(BVExtract(x, 4, 7),
+                                                   BVExtract(x, 0, 3))), x)
+        self.assertEqual(rewriter.rewrite(BVConcat(BV(0, 8), x)),
+                         BVZExt(x, 8))
+        # Shifts by constants
+        self.assertEqual(rewriter.rewrite(BVLShr(x, 3)),
+                         BVZExt(BVExtract(x, 3, 7), 3))
+        self.assertEqual(rewriter.rewrite(BVExtract(BVLShl(x, 4), 4, 7)),
+                         BVExtract(x, 0, 3))
+        self.assertEqual(rewriter.rewrite(BVAShr(x, BV(9, 8))),
+                         BVSExt(BVExtract(x, 7, 7), 7))
+        for rule in ["extract_concat", "extract_extract", "extract_extend",
+                     "concat_extract", "concat_zero", "shift_const"]:
+            self.assertTrue(rewriter.stats[rule] > 0, rule)
+
+    def test_bv_rewriter_compare(self):
+        x, y = Symbol("x", BVType(8)), Symbol("y", BVType(8))
+        rewriter = BVRewriter()
+        self.assertEqual(rewriter.rewrite(BVULT(x, BV(0, 8))), FALSE())
+        self.assertEqual(rewriter.rewrite(BVULE(x, BV(255, 8))), TRUE())
+        self.assertEqual(rewriter.rewrite(BVULT(BV(0, 8), x)),
+                         Not(Equals(x, BV(0, 8))))
+        self.assertEqual(rewriter.rewrite(BVSLT(x, BV(128, 8))), FALSE())
+        self.assertEqual(rewriter.rewrite(BVSLT(BVZExt(x, 1), BVZExt(y, 1))),
+                         BVULT(x, y))
+        self.assertEqual(rewriter.rewrite(BVSLT(BVConcat(BV(0, 1), x),
+                                                BV(3, 9))),
+                         BVULT(x, BV(3, 8)))
+        f = Equals(BVComp(x, y), BV(0, 1))
+        self.assertEqual(rewriter.rewrite(f), Not(Equals(x, y)))
+        f = Equals(BVConcat(x, y), BV(0x0102, 16))
+        self.assertEqual(rewriter.rewrite(f), And(Equals(x, BV(1, 8)),
+                                                  Equals(y, BV(2, 8))))
+        self.assertEqual(rewriter.rewrite(Equals(BVZExt(x, 8), BV(256, 16))),
+                         FALSE())
+        for rule in ["compare_min_max", "signed_to_unsigned", "comp_equals",
+                     "concat_equals", "compare_extend"]:
+            self.assertTrue(rewriter.stats[rule] > 0, rule)
+        rewriter.reset_stats()
+        self.assertEqual(len(rewriter.stats), 0)
+
+    @skipIfNoSolverForLogic(QF_BV)
+    def test_bv_rewriter_examples(self):
+        rewriter = BVRewriter()
+        for example in get_example_formulae():
+            if example.logic != QF_BV:
+                continue
+            f = example.expr
+            self.assertValid(Iff(f, rewriter.rewrite(f)), logic=QF_BV)
+
 
 if __name__ == "__main__":
     main()
@@ -18,9 +18,11 @@
 
 import pysmt.logics
 from pysmt.shortcuts import And, Symbol, Exists, FALSE, ForAll, Or, TRUE
-from pysmt.shortcuts import qelim
+from pysmt.shortcuts import qelim, Not, Iff, is_valid, get_env
+from pysmt.solvers.qelim import ShannonQuantifierEliminator
 from pysmt.exceptions import InternalSolverError, NoSolverAvailableError
 from pysmt.test import TestCase, main
+from pysmt.test import skipIfNoSolverForLogic, skipIfQENotAvailable
 from pysmt.test.examples import get_example_formulae
 
 
@@ -92,5 +94,65 @@ class TestShannon(TestCase):
                 self.assertTrue(example.logic > pysmt.logics.BOOL, example)
 
 
+    def test_cofactor(self):
+        z = Symbol("z")
+        f = And(Or(self.x, z), Or(Not(self.y), z))
+        with ShannonQuantifierEliminator(get_env()) as qe:
+            self.assertEqual(qe.cofactor(f, {self.x: True}), Or(Not(self.y), z))
+            self.assertEqual(qe.cofactor(f, {self.x: False, self.y: True}), z)
+            self.assertEqual(qe.cofactor(f, {Symbol("w"): True}), f)
+            # The cofactors of the sub-formulae are shared
+            self.assertIn((Or(self.x, z), frozenset([(self.x, False)])),
+                          qe._cofactors)
+            # The memoization does not outlive the elimination
+            qe.eliminate_quantifiers(Exists([self.x], f))
+            self.assertEqual(len(qe._cofactors), 0)
+
+    def test_ordering(self):
+        xs = [Symbol("x%d" % i) for i in range(5)]
+        # A star centered in x0, with a chain x1 - x2 - x3 - x4
+        f = And([Or(xs[0], v) for v in xs[1:]] +
+                [Or(xs[i], xs[i+1]) for i in range(1, 4)])
+        with ShannonQuantifierEliminator(get_env()) as qe:
+            self.assertEqual(qe._elimination_order(f, xs, False)[:2],
+                             [xs[1], xs[4]])
+        with ShannonQuantifierEliminator(get_env(),
+                                         ordering="occurrences") as qe:
+            self.assertEqual(qe._elimination_order(f, xs, False)[0], xs[1])
+        with ShannonQuantifierEliminator(get_env(), ordering=None) as qe:
+            self.assertEqual(qe._elimination_order(f, xs, False), xs)
+        with self.assertRaises(ValueError):
+            ShannonQuantifierEliminator(get_env(), ordering="foo")
+
+    @skipIfNoSolverForLogic(pysmt.logics.QF_BOOL)
+    def test_many_variables(self):
+        n = 40
+        xs = [Symbol("x%d" % i) for i in range(n)]
+        ys = [Symbol("y%d" % i) for i in range(n)]
+        f = And([Or(Not(xs[i]), xs[i+1], ys[i]) for i in range(n - 1)] +
+                [Iff(xs[i], Not(ys[i+1])) for i in range(0, n - 1, 2)])
+        for ordering in ShannonQuantifierEliminator.ORDERINGS[:2]:
+            with ShannonQuantifierEliminator(get_env(),
+                                             ordering=ordering) as qe:
+                g = qe.eliminate_quantifiers(Exists(xs, f))
+                self.assertFalse(g.get_free_variables() & set(xs))
+                h = qe.eliminate_quantifiers(Exists(xs[2:], f))
+                # Eliminating the remaining variables gives the same result
+                self.assertTrue(is_valid(Iff(g, qe.eliminate_quantifiers(
+                    Exists(xs[:2], h)))))
+                g = qe.eliminate_quantifiers(ForAll(xs, f))
+                self.assertTrue(g.is_false())
+
+    @skipIfQENotAvailable("bdd")
+    @skipIfNoSolverForLogic(pysmt.logics.QF_BOOL)
+    def test_node_budget(self):
+        xs = [Symbol("x%d" % i) for i in range(6)]
+        f = And([Iff(xs[i], Not(xs[i+1])) for i in range(5)] +
+                [Or(self.x, xs[0]), Or(self.y, xs[5])])
+        with ShannonQuantifierEliminator(get_env(), node_budget=1) as qe:
+            g = qe.eliminate_quantifiers(Exists(xs, f))
+            self.assertTrue(is_valid(Iff(g, Or(self.x, self.y))))
+
+
 if __name__ == '__main__':
     main()
@@ -20,7 +20,7 @@ from pysmt.test import TestCase, skipIfSolverNotAvailable, main
 from pysmt.test.examples import get_example_formulae
 from pysmt.environment import get_env
 from pysmt.shortcuts import (Array, Store, Int, Iff, Symbol, Plus, Equals, And,
-                             Real, Times)
+                             Real, Times, Minus, LE, LT, TRUE, FALSE)
 from pysmt.typing import INT, REAL
 from pysmt.simplifier import BddSimplifier
 from pysmt.logics import QF_BOOL
@@ -109,5 +109,57 @@ class TestSimplify(TestCase):
         f = f.simplify()
         self.assertNotIn(Real(1), f.args())
 
+    def test_linear_cancellation(self):
+        x, y = Symbol("x", INT), Symbol("y", INT)
+        self.assertEqual(Minus(Plus(x, y), x).simplify(), y)
+        self.assertEqual(Plus(x, Times(Int(-1), x)).simplify(), Int(0))
+        self.assertEqual(Minus(Plus(x, y), Plus(y, x)).simplify(), Int(0))
+
+    def test_linear_relations(self):
+        x, y = Symbol("x", INT), Symbol("y", INT)
+        r = Symbol("r", REAL)
+        one, three = Int(1), Int(3)
+        self.assertEqual(LE(Plus(x, one), Plus(three, x)).simplify(), TRUE())
+        self.assertEqual(LT(Plus(x, three), Plus(one, x)).simplify(), FALSE())
+        self.assertEqual(LT(x, Plus(x, one)).simplify(), TRUE())
+        self.assertEqual(Equals(Plus(x, y, Int(2)),
+                                Plus(y, one, x)).simplify(), FALSE())
+        self.assertEqual(Equals(Times(Int(2), Plus(x, y)),
+                                Plus(y, x, y, x)).simplify(), TRUE())
+        self.assertEqual(Equals(Plus(r, Real(0.5)),
+                                Minus(Real(1.5), Times(Real(-1), r))).simplify(),
+                         FALSE())
+        # Non-linear products are compared modulo the order of factors
+        z = Symbol("z", INT)
+        self.assertEqual(LT(Times(Plus(x, y), z),
+                            Times(z, Plus(y, x))).simplify(), FALSE())
+        # Terms that do not differ by a constant are not decided
+        self.assertEqual(LE(x, y).simplify(), LE(x, y))
+        self.assertEqual(LE(Plus(x, x), x).simplify().is_le(), True)
+
+    def test_linear_normalizer_usage(self):
+        simplifier = get_env().simplifier
+        calls = []
+        get_polynomial = simplifier._linear.get_polynomial
+        def counting_get_polynomial(term):
+            calls.append(term)
+            return get_polynomial(term)
+        simplifier._linear.get_polynomial = counting_get_polynomial
+        try:
+            xs = [Symbol("s%d" % i, INT) for i in range(500)]
+            big = Plus(xs)
+            # Sums of distinct symbols cannot cancel
+            self.assertEqual(big.simplify(), big)
+            self.assertEqual(LE(big, xs[0]).simplify(), LE(big, xs[0]))
+            self.assertEqual(Equals(xs[0], xs[1]).simplify(),
+                             Equals(xs[0], xs[1]))
+            self.assertEqual(calls, [])
+            self.assertEqual(Minus(big, xs[0]).simplify(), Plus(xs[1:]))
+            self.assertTrue(len(calls) > 0)
+        finally:
+            del simplifier._linear.get_polynomial
+        # The polynomials are not kept across simplifications
+        self.assertEqual(len(simplifier._linear.memoization), 0)
+
 if __name__ == '__main__':
     main()
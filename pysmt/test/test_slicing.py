@@ -0,0 +1,97 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import random
+
+from pysmt.shortcuts import (Symbol, And, Or, Not, Int, Plus, Equals, GT, LT,
+                             Function, TRUE, FALSE, Solver)
+from pysmt.typing import INT, FunctionType
+from pysmt.logics import QF_LIA
+from pysmt.slicing import ConeOfInfluence, SlicingSolver, slice_assertions
+from pysmt.test import TestCase, skipIfNoSolverForLogic, main
+
+
+class TestSlicing(TestCase):
+
+    def test_slice(self):
+        x, y, z, w = (Symbol(n, INT) for n in "xyzw")
+        a = Symbol("a")
+        f = Symbol("f", FunctionType(INT, [INT]))
+        assertions = [GT(x, y), Or(a, LT(z, Int(0))), Not(FALSE()),
+                      Equals(Function(f, [y]), Int(1)),
+                      Equals(Function(f, [w]), Int(2)), a]
+        self.assertEqual(slice_assertions(assertions, [x]),
+                         [assertions[0], assertions[2], assertions[3],
+                          assertions[4]])
+        self.assertEqual(slice_assertions(assertions, [Plus(z, Int(1))]),
+                         [assertions[1], assertions[2], assertions[5]])
+        self.assertEqual(slice_assertions(assertions, [TRUE()]),
+                         [assertions[2]])
+        # An unsat core seed can be used as target
+        self.assertEqual(slice_assertions(assertions, [assertions[5]]),
+                         slice_assertions(assertions, [z]))
+
+    def test_backtrack(self):
+        syms = [Symbol("s%d" % i, INT) for i in range(12)]
+        rnd = random.Random(42)
+        coi = ConeOfInfluence()
+        checkpoints = []
+        for _ in range(300):
+            if checkpoints and rnd.random() < 0.2:
+                coi.backtrack(checkpoints.pop())
+            else:
+                if rnd.random() < 0.3:
+                    checkpoints.append(coi.checkpoint())
+                args = rnd.sample(syms, rnd.randint(0, 3))
+                coi.add_assertion(Equals(Plus([Int(0)] + args), Int(0)))
+            target = [rnd.choice(syms)]
+            self.assertEqual(coi.get_slice(target),
+                             slice_assertions(coi.assertions, target))
+
+    @skipIfNoSolverForLogic(QF_LIA)
+    def test_slicing_solver(self):
+        x, y, z = (Symbol(n, INT) for n in "xyz")
+        backend = Solver(logic=QF_LIA)
+        with SlicingSolver(backend, targets=[x]) as solver:
+            solver.add_assertion(Equals(x, Plus(y, Int(1))))
+            solver.add_assertion(GT(y, Int(2)))
+            # Unsatisfiable, but not in the cone of x
+            solver.add_assertion(And(GT(z, Int(0)), LT(z, Int(0))))
+            self.assertTrue(solver.solve())
+            self.assertEqual(len(backend.assertions), 2)
+            self.assertTrue(solver.get_py_value(x) > 3)
+
+            solver.push()
+            solver.add_assertion(Equals(x, Int(4)))
+            self.assertTrue(solver.solve())
+            self.assertEqual(solver.get_value(y), Int(3))
+            self.assertFalse(solver.is_sat(LT(y, Int(3))))
+            solver.pop()
+            self.assertTrue(solver.is_sat(GT(x, Int(10))))
+
+            # The cone of the assumptions is also considered
+            self.assertFalse(solver.solve([GT(z, Int(0))]))
+
+            solver.check_remaining = True
+            self.assertFalse(solver.solve())
+            solver.set_targets(None)
+            self.assertFalse(solver.solve())
+            self.assertEqual(len(backend.assertions), 3)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#
+# This file is part of pySMT.
+#
+#   Copyright 2014 Andrea Micheli and Marco Gario
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+import time
+
+from pysmt.shortcuts import Symbol, And, Or, Not, Solver
+from pysmt.logics import QF_BOOL
+from pysmt.solvers.solver import IncrementalTrackingSolver
+from pysmt.exceptions import (SolverTimeoutError,
+                              SolverReturnedUnknownResultError)
+from pysmt.test import (TestCase, skipIfNoSolverForLogic,
+                        skipIfSolverNotAvailable, main)
+
+
+def pigeonhole(n):
+    """n+1 pigeons in n holes: unsatisfiable, and hard for resolution."""
+    p = [[Symbol("p_%d_%d" % (i, j)) for j in range(n)]
+         for i in range(n + 1)]
+    clauses = [Or(row) for row in p]
+    for j in range(n):
+        for a in range(n + 1):
+            for b in range(a + 1, n + 1):
+                clauses.append(Or(Not(p[a][j]), Not(p[b][j])))
+    return And(clauses)
+
+
+class TestSolverLimits(TestCase):
+
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_timeout(self):
+        hard = pigeonhole(11)
+        a = Symbol("a")
+        for name in self.env.factory.all_solvers(logic=QF_BOOL):
+            with Solver(name=name, logic=QF_BOOL) as s:
+                s.add_assertion(a)
+                try:
+                    self.assertTrue(s.solve(timeout=30), name)
+                except NotImplementedError:
+                    continue
+                s.push()
+                s.add_assertion(hard)
+                start = time.time()
+                with self.assertRaises(SolverTimeoutError):
+                    s.solve(timeout=0.2)
+                self.assertLess(time.time() - start, 10, name)
+                tracking = isinstance(s, IncrementalTrackingSolver)
+                if tracking:
+                    self.assertEqual(s.last_result, "unknown", name)
+                # The timeout applies only to the call
+                s.pop()
+                self.assertTrue(s.solve(), name)
+                if tracking:
+                    self.assertEqual(s.last_result, True, name)
+                self.assertFalse(s.solve([Not(a)], timeout=30), name)
+
+    @skipIfSolverNotAvailable("cdcl")
+    def test_cdcl(self):
+        with Solver(name="cdcl", logic=QF_BOOL) as s:
+            s.add_assertion(pigeonhole(5))
+            with self.assertRaises(NotImplementedError):
+                s.solve(memory_limit=100)
+            self.assertFalse(s.solve(timeout=60))
+        with Solver(name="cdcl", logic=QF_BOOL) as s:
+            s.add_assertion(Symbol("a"))
+            # An interrupted search returns unknown
+            s.engine.interrupt()
+            with self.assertRaises(SolverReturnedUnknownResultError):
+                s.solve()
+            self.assertEqual(s.last_result, "unknown")
+            self.assertTrue(s.solve())
+
+    @skipIfSolverNotAvailable("z3")
+    def test_z3_memory_limit(self):
+        with Solver(name="z3", logic=QF_BOOL) as s:
+            s.add_assertion(pigeonhole(4))
+            self.assertFalse(s.solve(memory_limit=4096))
+            self.assertFalse(s.solve(timeout=60, memory_limit=4096))
+
+    @skipIfSolverNotAvailable("bdd")
+    def test_unsupported(self):
+        with Solver(name="bdd", logic=QF_BOOL) as s:
+            s.add_assertion(Symbol("a"))
+            with self.assertRaises(NotImplementedError):
+                s.solve(memory_limit=100)
+            self.assertTrue(s.solve(timeout=1))
+
+    @skipIfSolverNotAvailable("z3")
+    def test_z3_memory_limit_restored(self):
+        import z3
+        z3.set_param("memory_max_size", 8192)
+        try:
+            with Solver(name="z3", logic=QF_BOOL) as s:
+                s.add_assertion(pigeonhole(3))
+                self.assertFalse(s.solve(memory_limit=4096))
+            self.assertEqual(z3.get_param("memory_max_size"), "8192")
+        finally:
+            z3.set_param("memory_max_size", 0)
+
+
+if __name__ == '__main__':
+    main()
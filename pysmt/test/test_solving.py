@@ -29,9 +29,11 @@ from pysmt.test import main
 from pysmt.test.examples import get_example_formulae
 from pysmt.exceptions import (SolverReturnedUnknownResultError,
                               InternalSolverError, NoSolverAvailableError,
-                              ConvertExpressionError, UndefinedLogicError)
+                              ConvertExpressionError, UndefinedLogicError,
+                              SolverStatusError)
 from pysmt.logics import QF_UFLIRA, QF_BOOL, QF_LRA, AUTO
 from pysmt.logics import convert_logic_from_string
+from pysmt.solvers.solver import IncrementalTrackingSolver
 
 class TestBasic(TestCase):
 
@@ -263,6 +265,9 @@ class TestBasic(TestCase):
     def test_model_picosat(self):
         self.do_model("picosat")
 
+    def test_model_cdcl(self):
+        self.do_model("cdcl")
+
     @skipIfSolverNotAvailable("z3")
     def test_tactics_z3(self):
         from z3 import Tactic, Then
@@ -532,5 +537,48 @@ class TestBasic(TestCase):
         with self.assertRaises(ValueError):
             Solver(logic=QF_BOOL, invalid_option=False)
 
+    @skipIfNoSolverForLogic(QF_BOOL)
+    def test_assertion_tracking(self):
+        a, b, c = Symbol("a"), Symbol("b"), Symbol("c")
+        for name in get_env().factory.all_solvers(logic=QF_BOOL):
+            with Solver(name=name, logic=QF_BOOL) as s:
+                if not isinstance(s, IncrementalTrackingSolver):
+                    continue
+                s.add_assertion(a)
+                stack = s.assertions
+                s.push()
+                s.add_assertion(b)
+                s.push(2)
+                s.add_assertion(c)
+                self.assertEqual(len(stack), 3, name)
+                s.pop(2)
+                self.assertEqual(len(s.assertions), 2, name)
+                s.pop(0)
+                self.assertEqual(len(s.assertions), 2, name)
+                s.pop()
+                # The stack is truncated in place
+                self.assertIs(s.assertions, stack)
+                self.assertEqual(len(stack), 1, name)
+
+            with Solver(name=name, logic=QF_BOOL,
+                        track_assertions=False) as s:
+                s.add_assertion(a)
+                s.push()
+                s.add_assertion(Not(a))
+                self.assertFalse(s.solve(), name)
+                s.pop()
+                self.assertTrue(s.solve(), name)
+                with self.assertRaises(SolverStatusError):
+                    s.assertions
+
+        for name in get_env().factory.all_unsat_core_solvers(logic=QF_BOOL):
+            # Unsat cores require tracking
+            with Solver(name=name, logic=QF_BOOL, track_assertions=False,
+                        unsat_cores_mode="all") as s:
+                if not isinstance(s, IncrementalTrackingSolver):
+                    continue
+                s.add_assertion(a)
+                self.assertEqual(len(s.assertions), 1, name)
+
 if __name__ == '__main__':
     main()
@@ -152,6 +152,9 @@ class TestUnsatCores(TestCase):
     def test_examples_z3(self):
         self._helper_check_examples("z3")
 
+    def test_examples_cdcl(self):
+        self._helper_check_examples("cdcl")
+
 
 if __name__ == '__main__':
     main()